@@ -50,6 +50,8 @@ from parsec.api.protocol.organization import (
 from parsec.api.protocol.events import (
     events_subscribe_serializer,
     events_listen_serializer,
+    events_batch_listen_serializer,
+    EVENTS_BATCH_LISTEN_MAX_SIZE,
     APIEvent,
 )
 from parsec.api.protocol.ping import ping_serializer
@@ -110,8 +112,12 @@ from parsec.api.protocol.block import block_create_serializer, block_read_serial
 from parsec.api.protocol.vlob import (
     vlob_create_serializer,
     vlob_read_serializer,
+    vlob_batch_read_serializer,
+    VLOB_BATCH_READ_MAX_SIZE,
     vlob_update_serializer,
     vlob_poll_changes_serializer,
+    vlob_batch_poll_changes_serializer,
+    VLOB_BATCH_POLL_CHANGES_MAX_REALMS,
     vlob_list_versions_serializer,
     vlob_maintenance_get_reencryption_batch_serializer,
     vlob_maintenance_save_reencryption_batch_serializer,
@@ -171,6 +177,8 @@ __all__ = (
     # Events
     "events_subscribe_serializer",
     "events_listen_serializer",
+    "events_batch_listen_serializer",
+    "EVENTS_BATCH_LISTEN_MAX_SIZE",
     "APIEvent",
     # Ping
     "ping_serializer",
@@ -228,8 +236,12 @@ __all__ = (
     # Vlob
     "vlob_create_serializer",
     "vlob_read_serializer",
+    "vlob_batch_read_serializer",
+    "VLOB_BATCH_READ_MAX_SIZE",
     "vlob_update_serializer",
     "vlob_poll_changes_serializer",
+    "vlob_batch_poll_changes_serializer",
+    "VLOB_BATCH_POLL_CHANGES_MAX_REALMS",
     "vlob_list_versions_serializer",
     "vlob_maintenance_get_reencryption_batch_serializer",
     "vlob_maintenance_save_reencryption_batch_serializer",
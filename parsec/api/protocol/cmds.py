@@ -4,6 +4,7 @@
 AUTHENTICATED_CMDS = {
     "events_subscribe",
     "events_listen",
+    "events_batch_listen",  # events_batch_listen has been added in api v2.7
     "ping",  # TODO: remove ping and ping event (only have them in tests)
     # Message
     "message_get",
@@ -29,8 +30,10 @@ AUTHENTICATED_CMDS = {
     "block_read",
     # Vlob
     "vlob_poll_changes",
+    "vlob_batch_poll_changes",  # vlob_batch_poll_changes has been added in api v2.5
     "vlob_create",
     "vlob_read",
+    "vlob_batch_read",  # vlob_batch_read has been added in api v2.2
     "vlob_update",
     "vlob_list_versions",
     "vlob_maintenance_get_reencryption_batch",
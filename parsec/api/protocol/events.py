@@ -84,6 +84,45 @@ class EventsListenRepSchema(OneOfSchema):
 events_listen_serializer = CmdSerializer(EventsListenReqSchema, EventsListenRepSchema)
 
 
+# Maximum number of events returned at once by `events_batch_listen`
+EVENTS_BATCH_LISTEN_MAX_SIZE = 1000
+
+
+# events_batch_listen has been added in api v2.7
+class EventsBatchListenReqSchema(BaseReqSchema):
+    wait = fields.Boolean(missing=True)
+    max_events = fields.Integer(
+        missing=EVENTS_BATCH_LISTEN_MAX_SIZE,
+        validate=validate.Range(min=1, max=EVENTS_BATCH_LISTEN_MAX_SIZE),
+    )
+
+
+class EventsBatchListenEventSchema(EventsListenRepSchema):
+    # Same as the `events_listen` replies, without the `status` field
+    type_schemas = {
+        APIEvent.PINGED: EventsPingedRepSchema(exclude=("status",)),
+        APIEvent.MESSAGE_RECEIVED: EventsMessageReceivedRepSchema(exclude=("status",)),
+        APIEvent.INVITE_STATUS_CHANGED: EventsInviteStatusChangedRepSchema(exclude=("status",)),
+        APIEvent.REALM_ROLES_UPDATED: EventsRealmRolesUpdatedRepSchema(exclude=("status",)),
+        APIEvent.REALM_VLOBS_UPDATED: EventsRealmVlobsUpdatedRepSchema(exclude=("status",)),
+        APIEvent.REALM_MAINTENANCE_STARTED: EventsRealmMaintenanceStartedRepSchema(
+            exclude=("status",)
+        ),
+        APIEvent.REALM_MAINTENANCE_FINISHED: EventsRealmMaintenanceFinishedRepSchema(
+            exclude=("status",)
+        ),
+    }
+
+
+class EventsBatchListenRepSchema(BaseRepSchema):
+    events = fields.List(fields.Nested(EventsBatchListenEventSchema), required=True)
+
+
+events_batch_listen_serializer = CmdSerializer(
+    EventsBatchListenReqSchema, EventsBatchListenRepSchema
+)
+
+
 class EventsSubscribeReqSchema(BaseReqSchema):
     pass
 
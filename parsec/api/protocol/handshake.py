@@ -124,6 +124,8 @@ class HandshakeAuthenticatedAnswerSchema(BaseSchema):
     device_id = DeviceIDField(required=True)
     rvk = fields.VerifyKey(required=True)
     answer = fields.Bytes(required=True)
+    # Request multiplexing has been added in api v2.8
+    multiplexing = fields.Boolean(missing=False)
 
 
 class HandshakeInvitedAnswerSchema(BaseSchema):
@@ -194,6 +196,8 @@ class HandshakeResultSchema(BaseSchema):
     handshake = fields.CheckedConstant("result", required=True)
     result = fields.String(required=True)
     help = fields.String(missing=None)
+    # Only provided if the client asked for request multiplexing and the backend accepted
+    multiplexing = fields.Boolean(missing=False)
 
 
 handshake_result_serializer = serializer_factory(HandshakeResultSchema)
@@ -214,6 +218,10 @@ class ServerHandshake:
         self.client_api_version: ApiVersion
         self.backend_api_version: ApiVersion
 
+        # Several requests can be in flight at the same time on the connection,
+        # each request providing a `req_id` field that is returned in its reply
+        self.multiplexing = False
+
         # State
         self.state = "stalled"
 
@@ -343,6 +351,11 @@ class ServerHandshake:
                 raise HandshakeFailedChallenge("Invalid answer signature") from exc
 
         self.state = "result"
+        if self.answer_data.get("multiplexing"):
+            self.multiplexing = True
+            return handshake_result_serializer.dumps(
+                {"handshake": "result", "result": "ok", "multiplexing": True}
+            )
         return handshake_result_serializer.dumps({"handshake": "result", "result": "ok"})
 
 
@@ -353,6 +366,7 @@ class BaseClientHandshake:
         self.challenge_data: Dict[str, object]
         self.backend_api_version: ApiVersion
         self.client_api_version: ApiVersion
+        self.multiplexing: bool
 
     def load_challenge_req(self, req: bytes) -> None:
         self.challenge_data = handshake_challenge_serializer.loads(req)
@@ -367,6 +381,7 @@ class BaseClientHandshake:
 
     def process_result_req(self, req: bytes) -> None:
         data = handshake_result_serializer.loads(req)
+        self.multiplexing = data["multiplexing"]
         if data["result"] != "ok":
             if data["result"] == "bad_identity":
                 raise HandshakeBadIdentity(data["help"])
@@ -400,26 +415,30 @@ class AuthenticatedClientHandshake(BaseClientHandshake):
         device_id: DeviceID,
         user_signkey: SigningKey,
         root_verify_key: VerifyKey,
+        multiplexing: bool = False,
     ):
         self.organization_id = organization_id
         self.device_id = device_id
         self.user_signkey = user_signkey
         self.root_verify_key = root_verify_key
+        self.multiplexing_requested = multiplexing
 
     def process_challenge_req(self, req: bytes) -> bytes:
         self.load_challenge_req(req)
         answer = self.user_signkey.sign(self.challenge_data["challenge"])
-        return self.HANDSHAKE_ANSWER_SERIALIZER.dumps(
-            {
-                "handshake": "answer",
-                "type": self.HANDSHAKE_TYPE,
-                "client_api_version": self.client_api_version,
-                "organization_id": self.organization_id,
-                "device_id": self.device_id,
-                "rvk": self.root_verify_key,
-                "answer": answer,
-            }
-        )
+        answer_req: Dict[str, object] = {
+            "handshake": "answer",
+            "type": self.HANDSHAKE_TYPE,
+            "client_api_version": self.client_api_version,
+            "organization_id": self.organization_id,
+            "device_id": self.device_id,
+            "rvk": self.root_verify_key,
+            "answer": answer,
+        }
+        if self.multiplexing_requested:
+            # Backends older than api v2.8 simply ignore this field
+            answer_req["multiplexing"] = True
+        return self.HANDSHAKE_ANSWER_SERIALIZER.dumps(answer_req)
 
 
 class APIV1_AuthenticatedClientHandshake(AuthenticatedClientHandshake):
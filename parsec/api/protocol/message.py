@@ -10,6 +10,8 @@ __all__ = ("message_get_serializer",)
 
 class MessageGetReqSchema(BaseReqSchema):
     offset = fields.Integer(required=True, validate=lambda n: n >= 0)
+    # Added in API 2.3, return all the messages following offset if not provided
+    page_size = fields.Integer(missing=None, allow_none=True, validate=lambda n: n > 0)
 
 
 class MessageSchema(BaseSchema):
@@ -32,8 +32,17 @@ class TrustchainSchema(BaseSchema):
     revoked_users = fields.List(fields.Bytes(required=True))
 
 
+class KnownTrustchainSchema(BaseSchema):
+    devices = fields.List(DeviceIDField(required=True), missing=[])
+    users = fields.List(UserIDField(required=True), missing=[])
+    revoked_users = fields.List(UserIDField(required=True), missing=[])
+
+
 class UserGetReqSchema(BaseReqSchema):
     user_id = UserIDField(required=True)
+    # Added in API 2.6, certificates from the trustchain already held by the
+    # client are not returned. Older backends ignore it and return them all.
+    known_trustchain = fields.Nested(KnownTrustchainSchema, missing=None, allow_none=True)
 
 
 class UserGetRepSchema(BaseRepSchema):
@@ -8,8 +8,12 @@ from parsec.api.protocol.types import DeviceIDField
 __all__ = (
     "vlob_create_serializer",
     "vlob_read_serializer",
+    "vlob_batch_read_serializer",
+    "VLOB_BATCH_READ_MAX_SIZE",
     "vlob_update_serializer",
     "vlob_poll_changes_serializer",
+    "vlob_batch_poll_changes_serializer",
+    "VLOB_BATCH_POLL_CHANGES_MAX_REALMS",
     "vlob_list_versions_serializer",
     "vlob_maintenance_get_reencryption_batch_serializer",
     "vlob_maintenance_save_reencryption_batch_serializer",
@@ -18,6 +22,11 @@ __all__ = (
 
 _validate_version = validate.Range(min=1)
 
+# Maximum number of vlobs that can be requested at once with `vlob_batch_read`
+VLOB_BATCH_READ_MAX_SIZE = 1000
+# Maximum number of realms that can be polled at once with `vlob_batch_poll_changes`
+VLOB_BATCH_POLL_CHANGES_MAX_REALMS = 100
+
 
 class VlobCreateReqSchema(BaseReqSchema):
     realm_id = fields.UUID(required=True)
@@ -57,6 +66,33 @@ class VlobReadRepSchema(BaseRepSchema):
 vlob_read_serializer = CmdSerializer(VlobReadReqSchema, VlobReadRepSchema)
 
 
+# vlob_batch_read has been added in api v2.2
+class VlobBatchReadReqSchema(BaseReqSchema):
+    realm_id = fields.UUID(required=True)
+    encryption_revision = fields.Integer(required=True)
+    vlob_ids = fields.List(
+        fields.UUID(), required=True, validate=validate.Length(max=VLOB_BATCH_READ_MAX_SIZE)
+    )
+    timestamp = fields.DateTime(allow_none=True, missing=None)
+
+
+class VlobBatchReadEntrySchema(BaseSchema):
+    vlob_id = fields.UUID(required=True)
+    version = fields.Integer(required=True, validate=_validate_version)
+    blob = fields.Bytes(required=True)
+    author = DeviceIDField(required=True)
+    timestamp = fields.DateTime(required=True)
+
+
+class VlobBatchReadRepSchema(BaseRepSchema):
+    # Vlobs that don't exist (or didn't exist at the given timestamp)
+    # are omitted from the result
+    vlobs = fields.List(fields.Nested(VlobBatchReadEntrySchema), required=True)
+
+
+vlob_batch_read_serializer = CmdSerializer(VlobBatchReadReqSchema, VlobBatchReadRepSchema)
+
+
 class VlobUpdateReqSchema(BaseReqSchema):
     encryption_revision = fields.Integer(required=True)
     vlob_id = fields.UUID(required=True)
@@ -75,6 +111,8 @@ vlob_update_serializer = CmdSerializer(VlobUpdateReqSchema, VlobUpdateRepSchema)
 class VlobPollChangesReqSchema(BaseReqSchema):
     realm_id = fields.UUID(required=True)
     last_checkpoint = fields.Integer(required=True)
+    # Added in API 2.4, return all the changes following last_checkpoint if not provided
+    page_size = fields.Integer(missing=None, allow_none=True, validate=lambda n: n > 0)
 
 
 class VlobPollChangesRepSchema(BaseRepSchema):
@@ -85,6 +123,38 @@ class VlobPollChangesRepSchema(BaseRepSchema):
 vlob_poll_changes_serializer = CmdSerializer(VlobPollChangesReqSchema, VlobPollChangesRepSchema)
 
 
+# vlob_batch_poll_changes has been added in api v2.5
+class VlobBatchPollChangesReqSchema(BaseReqSchema):
+    # Realm ID -> last checkpoint
+    realms = fields.Map(
+        fields.UUID(),
+        fields.Integer(required=True),
+        required=True,
+        validate=validate.Length(max=VLOB_BATCH_POLL_CHANGES_MAX_REALMS),
+    )
+    # Maximum number of changes returned per realm
+    page_size = fields.Integer(missing=None, allow_none=True, validate=lambda n: n > 0)
+
+
+class VlobBatchPollChangesRealmSchema(BaseSchema):
+    # Same status as `vlob_poll_changes` (i.e. `ok`, `not_found`, `not_allowed`
+    # or `in_maintenance`), changes are only provided if status is `ok`
+    status = fields.String(required=True)
+    changes = fields.Map(fields.UUID(), fields.Integer(required=True))
+    current_checkpoint = fields.Integer()
+
+
+class VlobBatchPollChangesRepSchema(BaseRepSchema):
+    realms = fields.Map(
+        fields.UUID(), fields.Nested(VlobBatchPollChangesRealmSchema), required=True
+    )
+
+
+vlob_batch_poll_changes_serializer = CmdSerializer(
+    VlobBatchPollChangesReqSchema, VlobBatchPollChangesRepSchema
+)
+
+
 # List available vlobs
 class VlobListVersionsReqSchema(BaseReqSchema):
     vlob_id = fields.UUID(required=True)
@@ -54,6 +54,10 @@ class Transport:
         self.logger = logger.bind(conn_id=self.conn_id)
         self._ws_events = ws.events()
         self._handshake: Optional[ServerHandshake] = None
+        # With request multiplexing, replies (and websocket pongs) can be sent
+        # concurrently, however the stream doesn't allow concurrent sends
+        self._send_lock = trio.Lock()
+        self._recv_buffer = bytearray()
 
     # Application handshake interface
     # TODO: Investigate a better place for providing an access to the peer API version
@@ -101,7 +105,8 @@ class Transport:
 
     async def _net_send(self, wsmsg: Event) -> None:
         try:
-            await self.stream.send_all(self.ws.send(wsmsg))
+            async with self._send_lock:
+                await self.stream.send_all(self.ws.send(wsmsg))
 
         except BrokenResourceError as exc:
             raise TransportError(*exc.args) from exc
@@ -157,9 +162,10 @@ class Transport:
     async def aclose(self) -> None:
         try:
             try:
-                await self.stream.send_all(
-                    self.ws.send(CloseConnection(code=CloseReason.NORMAL_CLOSURE))
-                )
+                async with self._send_lock:
+                    await self.stream.send_all(
+                        self.ws.send(CloseConnection(code=CloseReason.NORMAL_CLOSURE))
+                    )
             except LocalProtocolError:
                 # TODO: exception occurs when ws.state is already closed...
                 pass
@@ -180,7 +186,9 @@ class Transport:
         Raises:
             TransportError
         """
-        data = bytearray()
+        # The message being received is kept on the transport so that a
+        # cancelled `recv` doesn't lose the already received parts
+        data = self._recv_buffer
         while True:
             if self.keepalive:
                 with trio.move_on_after(self.keepalive) as cancel_scope:
@@ -206,6 +214,7 @@ class Transport:
                 # Msgpack will refuse to unpack it so we should fail early on if that happens
                 data += event.data
                 if event.message_finished:
+                    self._recv_buffer = bytearray()
                     return data
 
             elif isinstance(event, Ping):
@@ -44,6 +44,9 @@ logger = get_logger()
 # The choice of 8Ko is more or less arbitrary but it range with what most web servers do.
 MAX_INITIAL_HTTP_REQUEST_SIZE = 8 * 1024
 
+# Max number of requests handled concurrently on a connection using request multiplexing
+MAX_MULTIPLEXED_REQUESTS = 32
+
 
 def _filter_binary_fields(data):
     return {k: v if not isinstance(v, bytes) else b"[...]" for k, v in data.items()}
@@ -281,7 +284,10 @@ class BackendApp:
                         client_ctx.event_bus_ctx.connect(
                             BackendEvent.ORGANIZATION_EXPIRED, _on_expired
                         )
-                        await self._handle_client_websocket_loop(transport, client_ctx)
+                        try:
+                            await self._handle_client_websocket_loop(transport, client_ctx)
+                        finally:
+                            self.events.unsubscribe(client_ctx)
 
             elif isinstance(client_ctx, InvitedClientContext):
                 await self.invite.claimer_joined(
@@ -343,6 +349,10 @@ class BackendApp:
             selected_logger.info("Connection dropped: invalid data", reason=str(exc))
 
     async def _handle_client_websocket_loop(self, transport, client_ctx):
+        if client_ctx.handshake.multiplexing:
+            await self._handle_client_websocket_multiplexed_loop(transport, client_ctx)
+            return
+
         # Retrieve the allowed commands according to api version and auth type
         api_cmds = self.apis[client_ctx.handshake_type]
 
@@ -352,42 +362,68 @@ class BackendApp:
             # while processing a command
             raw_req = raw_req or await transport.recv()
             req = unpackb(raw_req)
-            if get_log_level() <= LOG_LEVEL_DEBUG:
-                client_ctx.logger.debug("Request", req=_filter_binary_fields(req))
             try:
-                cmd = req.get("cmd", "<missing>")
-                if not isinstance(cmd, str):
-                    raise KeyError()
+                rep = await self._handle_request(api_cmds, client_ctx, req)
 
-                cmd_func = api_cmds[cmd]
+            except CancelledByNewRequest as exc:
+                # Long command handling such as message_get can be cancelled
+                # when the peer send a new request
+                raw_req = exc.new_raw_req
+                continue
 
-            except KeyError:
-                rep = {"status": "unknown_command", "reason": "Unknown command"}
-
-            else:
-                try:
-                    rep = await cmd_func(client_ctx, req)
-
-                except InvalidMessageError as exc:
-                    rep = {
-                        "status": "bad_message",
-                        "errors": exc.errors,
-                        "reason": "Invalid message.",
-                    }
-
-                except ProtocolError as exc:
-                    rep = {"status": "bad_message", "reason": str(exc)}
-
-                except CancelledByNewRequest as exc:
-                    # Long command handling such as message_get can be cancelled
-                    # when the peer send a new request
-                    raw_req = exc.new_raw_req
-                    continue
-
-            if get_log_level() <= LOG_LEVEL_DEBUG:
-                client_ctx.logger.debug("Response", rep=_filter_binary_fields(rep))
-            else:
-                client_ctx.logger.info("Request", cmd=cmd, status=rep["status"])
             raw_rep = packb(rep)
             await transport.send(raw_rep)
             raw_req = None
+
+    async def _handle_client_websocket_multiplexed_loop(self, transport, client_ctx):
+        # Request multiplexing has been negotiated during the handshake: each request
+        # is handled in its own task and its reply is sent (along with the request id)
+        # as soon as it is ready
+        api_cmds = self.apis[client_ctx.handshake_type]
+        requests_semaphore = trio.Semaphore(MAX_MULTIPLEXED_REQUESTS)
+
+        async def _handle_multiplexed_request(req_id, req):
+            try:
+                rep = await self._handle_request(api_cmds, client_ctx, req)
+                await transport.send(packb({**rep, "req_id": req_id}))
+            finally:
+                requests_semaphore.release()
+
+        async with trio.open_service_nursery() as nursery:
+            while True:
+                req = unpackb(await transport.recv())
+                req_id = req.pop("req_id", None) if isinstance(req, dict) else None
+                if not isinstance(req_id, int):
+                    raise MessageSerializationError("Missing request id")
+                # Stop reading new requests until the number of requests in flight decreases
+                await requests_semaphore.acquire()
+                nursery.start_soon(_handle_multiplexed_request, req_id, req)
+
+    async def _handle_request(self, api_cmds, client_ctx, req):
+        if get_log_level() <= LOG_LEVEL_DEBUG:
+            client_ctx.logger.debug("Request", req=_filter_binary_fields(req))
+        try:
+            cmd = req.get("cmd", "<missing>")
+            if not isinstance(cmd, str):
+                raise KeyError()
+
+            cmd_func = api_cmds[cmd]
+
+        except KeyError:
+            rep = {"status": "unknown_command", "reason": "Unknown command"}
+
+        else:
+            try:
+                rep = await cmd_func(client_ctx, req)
+
+            except InvalidMessageError as exc:
+                rep = {"status": "bad_message", "errors": exc.errors, "reason": "Invalid message."}
+
+            except ProtocolError as exc:
+                rep = {"status": "bad_message", "reason": str(exc)}
+
+        if get_log_level() <= LOG_LEVEL_DEBUG:
+            client_ctx.logger.debug("Response", rep=_filter_binary_fields(rep))
+        else:
+            client_ctx.logger.info("Request", cmd=cmd, status=rep["status"])
+        return rep
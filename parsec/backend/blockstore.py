@@ -72,7 +72,7 @@ def blockstore_factory(
 
         blocks = [blockstore_factory(subconf, postgresql_dbh) for subconf in config.blockstores]
 
-        return RAID1BlockStoreComponent(blocks)
+        return RAID1BlockStoreComponent(blocks, read_strategy=config.read_strategy)
 
     elif config.type == "RAID0":
         from parsec.backend.raid0_blockstore import RAID0BlockStoreComponent
@@ -91,5 +91,16 @@ def blockstore_factory(
 
         return RAID5BlockStoreComponent(blocks)
 
+    elif config.type == "CACHED":
+        from parsec.backend.cached_blockstore import CachedBlockStoreComponent
+
+        return CachedBlockStoreComponent(
+            blockstore_factory(config.blockstore, postgresql_dbh),
+            memory_size=config.memory_size,
+            eviction_policy=config.eviction_policy,
+            disk_path=config.disk_path,
+            disk_size=config.disk_size,
+        )
+
     else:
         raise ValueError(f"Unknown block store type `{config.type}`")
@@ -0,0 +1,317 @@
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+import os
+import attr
+import trio
+from uuid import UUID, uuid4
+from pathlib import Path
+from typing import Dict, Set, Tuple, Optional
+from collections import OrderedDict, defaultdict
+from structlog import get_logger
+
+from parsec.api.protocol import OrganizationID
+from parsec.backend.blockstore import BaseBlockStoreComponent
+from parsec.backend.block import BlockNotFoundError, BlockTimeoutError
+
+
+logger = get_logger()
+
+BlockKey = Tuple[OrganizationID, UUID]
+
+
+class LRUCache:
+    """Size-bounded cache evicting the least recently used entries first."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[BlockKey, int]" = OrderedDict()
+
+    def __contains__(self, key: BlockKey) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def touch(self, key: BlockKey) -> None:
+        self._entries.move_to_end(key)
+
+    def add(self, key: BlockKey, size: int) -> None:
+        self._entries[key] = size
+        self.size += size
+
+    def remove(self, key: BlockKey) -> None:
+        self.size -= self._entries.pop(key)
+
+    def pop_victim(self) -> BlockKey:
+        key, size = self._entries.popitem(last=False)
+        self.size -= size
+        self.evictions += 1
+        return key
+
+
+class LFUCache(LRUCache):
+    """Size-bounded cache evicting the least frequently used entries first
+    (least recently used first among entries with the same frequency)."""
+
+    def __init__(self, max_size: int):
+        super().__init__(max_size)
+        self._frequencies: Dict[BlockKey, int] = {}
+        self._buckets: Dict[int, "OrderedDict[BlockKey, None]"] = defaultdict(OrderedDict)
+        self._min_frequency = 0
+
+    def _unlink(self, key: BlockKey) -> int:
+        frequency = self._frequencies.pop(key)
+        bucket = self._buckets[frequency]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[frequency]
+            if self._min_frequency == frequency:
+                self._min_frequency += 1
+        return frequency
+
+    def touch(self, key: BlockKey) -> None:
+        frequency = self._unlink(key) + 1
+        self._frequencies[key] = frequency
+        self._buckets[frequency][key] = None
+
+    def add(self, key: BlockKey, size: int) -> None:
+        super().add(key, size)
+        self._frequencies[key] = 1
+        self._buckets[1][key] = None
+        self._min_frequency = 1
+
+    def remove(self, key: BlockKey) -> None:
+        self._unlink(key)
+        super().remove(key)
+
+    def pop_victim(self) -> BlockKey:
+        while self._min_frequency not in self._buckets:
+            self._min_frequency += 1
+        key = next(iter(self._buckets[self._min_frequency]))
+        self._unlink(key)
+        self.size -= self._entries.pop(key)
+        self.evictions += 1
+        return key
+
+
+EVICTION_POLICIES = {"LRU": LRUCache, "LFU": LFUCache}
+
+
+class MemoryTier:
+    def __init__(self, max_size: int, eviction_policy: str):
+        self._index = EVICTION_POLICIES[eviction_policy](max_size)
+        self._blocks: Dict[BlockKey, bytes] = {}
+
+    def get(self, key: BlockKey) -> Optional[bytes]:
+        block = self._blocks.get(key)
+        if block is not None:
+            self._index.touch(key)
+        return block
+
+    def set(self, key: BlockKey, block: bytes) -> None:
+        if key in self._index or len(block) > self._index.max_size:
+            return
+        while self._index.size + len(block) > self._index.max_size:
+            del self._blocks[self._index.pop_victim()]
+        self._index.add(key, len(block))
+        self._blocks[key] = block
+
+
+class DiskTier:
+    """Blocks stored as files in `<path>/<organization_id>/<block_id>`.
+
+    File accesses are done in threads, and each block file is written under
+    a temporary name then renamed so a crash never leaves a truncated block.
+    """
+
+    def __init__(self, path: Path, max_size: int, eviction_policy: str):
+        self.path = path
+        self._index = EVICTION_POLICIES[eviction_policy](max_size)
+        self._writing: Set[BlockKey] = set()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _block_path(self, key: BlockKey) -> Path:
+        organization_id, id = key
+        return self.path / str(organization_id) / str(id)
+
+    def _load_index(self) -> None:
+        # Blocks are immutable, so the content of a previous cache is still valid
+        files = []
+        for org_path in self.path.iterdir():
+            if not org_path.is_dir():
+                continue
+            for block_path in org_path.iterdir():
+                try:
+                    key = (OrganizationID(org_path.name), UUID(block_path.name))
+                except ValueError:
+                    # Temporary file from a write that didn't complete
+                    block_path.unlink()
+                    continue
+                stat = block_path.stat()
+                files.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(files, key=lambda x: x[0]):
+            self._index.add(key, size)
+        while self._index.size > self._index.max_size:
+            self._remove_file(self._index.pop_victim())
+
+    def _remove_file(self, key: BlockKey) -> None:
+        try:
+            self._block_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    async def get(self, key: BlockKey) -> Optional[bytes]:
+        if key not in self._index or key in self._writing:
+            return None
+        self._index.touch(key)
+        try:
+            return await trio.to_thread.run_sync(self._block_path(key).read_bytes)
+        except OSError as exc:
+            # The block may have been evicted by a concurrent `set` in the meantime
+            if key in self._index and key not in self._writing:
+                logger.warning("Cannot read block from disk cache", key=key, exc_info=exc)
+                self._index.remove(key)
+            return None
+
+    def _write_file(self, key: BlockKey, block: bytes, victims) -> None:
+        for victim in victims:
+            self._remove_file(victim)
+        block_path = self._block_path(key)
+        block_path.parent.mkdir(exist_ok=True)
+        tmp_path = block_path.parent / f"{block_path.name}.{uuid4().hex}.tmp"
+        tmp_path.write_bytes(block)
+        os.replace(tmp_path, block_path)
+
+    async def set(self, key: BlockKey, block: bytes) -> None:
+        if key in self._index or len(block) > self._index.max_size:
+            return
+        victims = []
+        while self._index.size + len(block) > self._index.max_size:
+            victims.append(self._index.pop_victim())
+        # Register the block first so concurrent sets of the same block are no-op
+        self._index.add(key, len(block))
+        self._writing.add(key)
+        try:
+            await trio.to_thread.run_sync(self._write_file, key, block, victims)
+        except OSError as exc:
+            logger.warning("Cannot write block to disk cache", key=key, exc_info=exc)
+            self._index.remove(key)
+            self._remove_file(key)
+        finally:
+            self._writing.discard(key)
+
+
+@attr.s(slots=True, auto_attribs=True)
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    deduplicated_misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+
+class _PendingRead:
+    def __init__(self):
+        self.done = trio.Event()
+        self.block: Optional[bytes] = None
+        self.error: Optional[Exception] = None
+
+
+class CachedBlockStoreComponent(BaseBlockStoreComponent):
+    """Read cache on top of another blockstore.
+
+    Blocks are immutable once created, so cached blocks never need to be
+    invalidated. Concurrent misses on the same block are deduplicated so only
+    a single read is done on the underlying blockstore.
+    """
+
+    def __init__(
+        self,
+        blockstore: BaseBlockStoreComponent,
+        memory_size: int,
+        eviction_policy: str = "LRU",
+        disk_path: Optional[Path] = None,
+        disk_size: int = 0,
+    ):
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy `{eviction_policy}`")
+        self.blockstore = blockstore
+        self.stats = CacheStats()
+        self._memory = MemoryTier(memory_size, eviction_policy)
+        self._disk = DiskTier(Path(disk_path), disk_size, eviction_policy) if disk_path else None
+        self._pending_reads: Dict[BlockKey, _PendingRead] = {}
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "memory_hits": self.stats.memory_hits,
+            "disk_hits": self.stats.disk_hits,
+            "misses": self.stats.misses,
+            "deduplicated_misses": self.stats.deduplicated_misses,
+            "hit_ratio": self.stats.hit_ratio,
+            "memory_size": self._memory._index.size,
+            "memory_evictions": self._memory._index.evictions,
+            "disk_size": self._disk._index.size if self._disk else 0,
+            "disk_evictions": self._disk._index.evictions if self._disk else 0,
+        }
+
+    async def _cache_block(self, key: BlockKey, block: bytes) -> None:
+        self._memory.set(key, block)
+        if self._disk:
+            await self._disk.set(key, block)
+
+    async def _fetch_block(self, key: BlockKey) -> bytes:
+        if self._disk:
+            block = await self._disk.get(key)
+            if block is not None:
+                self.stats.disk_hits += 1
+                self._memory.set(key, block)
+                return block
+        self.stats.misses += 1
+        block = await self.blockstore.read(*key)
+        await self._cache_block(key, block)
+        return block
+
+    async def read(self, organization_id: OrganizationID, id: UUID) -> bytes:
+        key = (organization_id, id)
+        while True:
+            block = self._memory.get(key)
+            if block is not None:
+                self.stats.memory_hits += 1
+                return block
+
+            pending = self._pending_reads.get(key)
+            if not pending:
+                break
+            # Another task is already fetching this block, wait for it
+            self.stats.deduplicated_misses += 1
+            await pending.done.wait()
+            if pending.block is not None:
+                return pending.block
+            if pending.error is not None:
+                raise type(pending.error)() from pending.error
+            # The fetching task has been cancelled, go for another try
+
+        pending = _PendingRead()
+        self._pending_reads[key] = pending
+        try:
+            pending.block = await self._fetch_block(key)
+            return pending.block
+        except (BlockNotFoundError, BlockTimeoutError) as exc:
+            pending.error = exc
+            raise
+        finally:
+            del self._pending_reads[key]
+            pending.done.set()
+
+    async def create(self, organization_id: OrganizationID, id: UUID, block: bytes) -> None:
+        await self.blockstore.create(organization_id, id, block)
+        # Freshly created blocks are likely to be read soon by the other members
+        # of the workspace (e.g. right after a large file has been shared)
+        await self._cache_block((organization_id, id), block)
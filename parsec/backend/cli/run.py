@@ -23,6 +23,7 @@ from parsec.backend.config import (
     RAID0BlockStoreConfig,
     RAID1BlockStoreConfig,
     RAID5BlockStoreConfig,
+    CachedBlockStoreConfig,
 )
 from parsec.core.types import BackendAddr
 
@@ -118,7 +119,49 @@ def _parse_blockstore_param(value):
             raise click.BadParameter(f"Invalid blockstore type `{parts[0]}`")
 
 
+def _parse_size(value):
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    try:
+        if value[-1:].upper() in units:
+            return int(value[:-1]) * units[value[-1:].upper()]
+        return int(value)
+    except ValueError:
+        raise click.BadParameter(f"Invalid size `{value}` (must be integer with K/M/G suffix)")
+
+
+def _parse_cache_param(value, blockstore):
+    parts = _split_with_escaping(value)
+    if len(parts) == 3:
+        _, eviction_policy, memory_size = parts
+        disk_path = disk_size = None
+    elif len(parts) == 5:
+        _, eviction_policy, memory_size, disk_path, disk_size = parts
+    else:
+        raise click.BadParameter(
+            "Invalid CACHED config, must be `cached:<LRU|LFU>:<memory_size>[:<disk_path>:<disk_size>]`"
+        )
+    if eviction_policy.upper() not in ("LRU", "LFU"):
+        raise click.BadParameter(f"Invalid cache eviction policy `{eviction_policy}`")
+    return CachedBlockStoreConfig(
+        blockstore=blockstore,
+        memory_size=_parse_size(memory_size),
+        eviction_policy=eviction_policy.upper(),
+        disk_path=disk_path or None,
+        disk_size=_parse_size(disk_size) if disk_path else 0,
+    )
+
+
 def _parse_blockstore_params(raw_params):
+    cache_params = [x for x in raw_params if x.split(":", 1)[0].upper() == "CACHED"]
+    if cache_params:
+        if len(cache_params) > 1:
+            raise click.BadParameter("Multiple blockstore cache configs")
+        blockstore = _parse_blockstore_params([x for x in raw_params if x not in cache_params])
+        return _parse_cache_param(cache_params[0], blockstore)
+
+    if not raw_params:
+        raise click.BadParameter("Missing blockstore config")
+
     raid_configs = defaultdict(list)
     for raw_param in raw_params:
         raw_param_parts = raw_param.split(":", 2)
@@ -272,6 +315,10 @@ RAID0/1/5 cluster.
 Each configuration must be provided with the form
 `<raid_type>:<node>:<config>` with `<raid_type>` RAID0/RAID1/RAID5, `<node>` a
 integer and `<config>` the MOCKED/POSTGRESQL/S3/SWIFT config.
+
+Finally, a read cache can be added in front of the blockstore(s) by providing
+an additional `cached:<LRU|LFU>:<memory_size>[:<disk_path>:<disk_size>]`
+configuration (sizes in bytes, with optional K/M/G suffix).
 """,
 )
 @click.option(
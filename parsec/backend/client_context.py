@@ -1,6 +1,5 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
-import trio
 from typing import Optional
 
 from parsec.crypto import VerifyKey, PublicKey
@@ -16,6 +15,7 @@ from parsec.api.protocol import (
     HumanHandle,
 )
 from parsec.backend.invite import Invitation
+from parsec.backend.events import EventsQueue
 
 
 class BaseClientContext:
@@ -43,7 +43,7 @@ class AuthenticatedClientContext(BaseClientContext):
         "public_key",
         "verify_key",
         "event_bus_ctx",
-        "channels",
+        "events_queue",
         "realms",
         "events_subscribed",
         "conn_id",
@@ -70,7 +70,7 @@ class AuthenticatedClientContext(BaseClientContext):
         self.verify_key = verify_key
 
         self.event_bus_ctx = None  # Overwritten in BackendApp.handle_client
-        self.channels = trio.open_memory_channel(100)
+        self.events_queue = EventsQueue()
         self.realms = set()
         self.events_subscribed = False
 
@@ -101,16 +101,6 @@ class AuthenticatedClientContext(BaseClientContext):
     def device_display(self) -> str:
         return self.device_label or str(self.device_id.device_name)
 
-    @property
-    def send_events_channel(self):
-        send_channel, _ = self.channels
-        return send_channel
-
-    @property
-    def receive_events_channel(self):
-        _, receive_channel = self.channels
-        return receive_channel
-
 
 class InvitedClientContext(BaseClientContext):
     __slots__ = ("organization_id", "invitation", "conn_id", "logger")
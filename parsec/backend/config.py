@@ -22,6 +22,8 @@ class RAID1BlockStoreConfig(BaseBlockStoreConfig):
     type = "RAID1"
 
     blockstores: List[BaseBlockStoreConfig]
+    # HEDGED: read the fastest mirror first, FANOUT: read all the mirrors at once
+    read_strategy: str = "HEDGED"
 
 
 @attr.s(frozen=True, auto_attribs=True)
@@ -31,6 +33,17 @@ class RAID5BlockStoreConfig(BaseBlockStoreConfig):
     blockstores: List[BaseBlockStoreConfig]
 
 
+@attr.s(frozen=True, auto_attribs=True)
+class CachedBlockStoreConfig(BaseBlockStoreConfig):
+    type = "CACHED"
+
+    blockstore: BaseBlockStoreConfig
+    memory_size: int
+    eviction_policy: str = "LRU"
+    disk_path: Optional[str] = None
+    disk_size: int = 0
+
+
 @attr.s(frozen=True, auto_attribs=True)
 class S3BlockStoreConfig(BaseBlockStoreConfig):
     type = "S3"
@@ -1,132 +1,276 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
 import trio
+from uuid import UUID
+from itertools import count, islice
+from collections import defaultdict
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Set
 
-from parsec.api.protocol import events_subscribe_serializer, events_listen_serializer, APIEvent
+from parsec.event_bus import EventBus
+from parsec.api.protocol import (
+    OrganizationID,
+    UserID,
+    events_subscribe_serializer,
+    events_listen_serializer,
+    events_batch_listen_serializer,
+    APIEvent,
+)
 from parsec.backend.utils import catch_protocol_errors, run_with_breathing_transport, api
 from parsec.backend.realm import BaseRealmComponent
 from parsec.backend.backend_events import BackendEvent
-from functools import partial
-from typing import Callable
 
 
-class EventsComponent:
-    def __init__(self, realm_component: BaseRealmComponent, send_event: Callable):
-        self._realm_component = realm_component
-        self.send = send_event
+# Maximum number of pending events per client (once coalesced)
+DEFAULT_EVENTS_QUEUE_MAX_SIZE = 1000
 
-    @api("events_subscribe")
-    @catch_protocol_errors
-    async def api_events_subscribe(self, client_ctx, msg):
-        msg = events_subscribe_serializer.req_load(msg)
 
-        def _on_roles_updated(event, backend_event, organization_id, author, realm_id, user, role):
-            if organization_id != client_ctx.organization_id or user != client_ctx.user_id:
-                return
+class EventsQueue:
+    """Events waiting to be retrieved by a client with `events_listen`.
+
+    Pending `realm.vlobs_updated` events are coalesced per vlob: the client only
+    needs the latest checkpoint to know what to synchronize, so a burst of
+    updates on a vlob takes a single place in the queue (and a single event
+    to retrieve). The coalesced event is moved at the end of the queue to
+    keep the events ordered.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_EVENTS_QUEUE_MAX_SIZE):
+        self.max_size = max_size
+        self._events: Dict[object, dict] = {}
+        self._keys = count()
+        self._not_empty = trio.Event()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def send_nowait(self, event_data: dict) -> None:
+        """
+        Raises:
+            trio.WouldBlock: if the queue is full
+        """
+        if event_data["event"] == APIEvent.REALM_VLOBS_UPDATED:
+            key: object = (event_data["realm_id"], event_data["src_id"])
+            previous = self._events.pop(key, None)
+            if previous and previous["checkpoint"] > event_data["checkpoint"]:
+                event_data = previous
+        else:
+            key = next(self._keys)
+        if len(self._events) >= self.max_size:
+            raise trio.WouldBlock
+        self._events[key] = event_data
+        self._not_empty.set()
+
+    def receive_batch_nowait(self, max_events: int) -> List[dict]:
+        """
+        Raises:
+            trio.WouldBlock: if the queue is empty
+        """
+        if not self._events:
+            raise trio.WouldBlock
+        batch = [self._events.pop(key) for key in list(islice(self._events, max_events))]
+        if not self._events:
+            self._not_empty = trio.Event()
+        return batch
+
+    async def receive_batch(self, max_events: int) -> List[dict]:
+        while not self._events:
+            await self._not_empty.wait()
+        return self.receive_batch_nowait(max_events)
+
+
+class _OrganizationSubscriptions:
+    __slots__ = ("clients", "users", "realms")
+
+    def __init__(self):
+        self.clients = set()
+        self.users: Dict[UserID, Set] = defaultdict(set)
+        self.realms: Dict[UUID, Set] = defaultdict(set)
 
+
+class EventsRouter:
+    """Dispatch the backend events to the clients subscribed to them.
+
+    Instead of connecting one callback per client and per event on the event
+    bus (which means each event is filtered by every connected client), the
+    subscribed clients are indexed by organization, user and realm. Hence
+    dispatching an event only costs the number of clients interested in it.
+    """
+
+    def __init__(self, event_bus: EventBus):
+        self._organizations: Dict[OrganizationID, _OrganizationSubscriptions] = {}
+        event_bus.connect(BackendEvent.PINGED, partial(self._on_pinged, APIEvent.PINGED))
+        event_bus.connect(
+            BackendEvent.REALM_VLOBS_UPDATED,
+            partial(self._on_realm_events, APIEvent.REALM_VLOBS_UPDATED),
+        )
+        event_bus.connect(
+            BackendEvent.REALM_MAINTENANCE_STARTED,
+            partial(self._on_realm_events, APIEvent.REALM_MAINTENANCE_STARTED),
+        )
+        event_bus.connect(
+            BackendEvent.REALM_MAINTENANCE_FINISHED,
+            partial(self._on_realm_events, APIEvent.REALM_MAINTENANCE_FINISHED),
+        )
+        event_bus.connect(
+            BackendEvent.MESSAGE_RECEIVED,
+            partial(self._on_message_received, APIEvent.MESSAGE_RECEIVED),
+        )
+        event_bus.connect(
+            BackendEvent.INVITE_STATUS_CHANGED,
+            partial(self._on_invite_status_changed, APIEvent.INVITE_STATUS_CHANGED),
+        )
+        event_bus.connect(
+            BackendEvent.REALM_ROLES_UPDATED,
+            partial(self._on_roles_updated, APIEvent.REALM_ROLES_UPDATED),
+        )
+
+    def stats(self) -> dict:
+        return {
+            organization_id: len(subscriptions.clients)
+            for organization_id, subscriptions in self._organizations.items()
+        }
+
+    def subscribe(self, client_ctx) -> None:
+        try:
+            subscriptions = self._organizations[client_ctx.organization_id]
+        except KeyError:
+            subscriptions = self._organizations[
+                client_ctx.organization_id
+            ] = _OrganizationSubscriptions()
+        subscriptions.clients.add(client_ctx)
+        subscriptions.users[client_ctx.user_id].add(client_ctx)
+        for realm_id in client_ctx.realms:
+            subscriptions.realms[realm_id].add(client_ctx)
+
+    def unsubscribe(self, client_ctx) -> None:
+        subscriptions = self._organizations.get(client_ctx.organization_id)
+        if not subscriptions or client_ctx not in subscriptions.clients:
+            return
+        subscriptions.clients.discard(client_ctx)
+        self._discard(subscriptions.users, client_ctx.user_id, client_ctx)
+        for realm_id in client_ctx.realms:
+            self._discard(subscriptions.realms, realm_id, client_ctx)
+        if not subscriptions.clients:
+            del self._organizations[client_ctx.organization_id]
+
+    def set_client_realms(self, client_ctx, realms: Iterable[UUID]) -> None:
+        subscriptions = self._organizations.get(client_ctx.organization_id)
+        realms = set(realms)
+        if subscriptions and client_ctx in subscriptions.clients:
+            for realm_id in client_ctx.realms - realms:
+                self._discard(subscriptions.realms, realm_id, client_ctx)
+            for realm_id in realms - client_ctx.realms:
+                subscriptions.realms[realm_id].add(client_ctx)
+        client_ctx.realms = realms
+
+    @staticmethod
+    def _discard(index: Dict, key, client_ctx) -> None:
+        clients = index.get(key)
+        if clients is None:
+            return
+        clients.discard(client_ctx)
+        if not clients:
+            del index[key]
+
+    @staticmethod
+    def _send(client_ctx, event_data: dict) -> None:
+        try:
+            client_ctx.events_queue.send_nowait(event_data)
+        except trio.WouldBlock:
+            client_ctx.logger.warning(f"event queue is full for {client_ctx}")
+
+    def _on_roles_updated(
+        self, event, backend_event, organization_id, author, realm_id, user, role
+    ):
+        subscriptions = self._organizations.get(organization_id)
+        if not subscriptions:
+            return
+
+        # Copy the clients given the realm index (not the user one) is modified
+        for client_ctx in list(subscriptions.users.get(user, ())):
             if role is None:
                 client_ctx.realms.discard(realm_id)
+                self._discard(subscriptions.realms, realm_id, client_ctx)
             else:
                 client_ctx.realms.add(realm_id)
+                subscriptions.realms[realm_id].add(client_ctx)
 
             # Note for this event we don't filter out the ones sent by the client's
             # device, there is two reason for this:
             # 1) A user cannot change it own role, so this case should never occur
             # 2) Returning this event inform the peer we are ready to send it
             #    `realm.vlobs_updated` events on this realm (especially useful during tests)
-            try:
-                client_ctx.send_events_channel.send_nowait(
-                    {"event": event, "realm_id": realm_id, "role": role}
-                )
-            except trio.WouldBlock:
-                client_ctx.logger.warning(f"event queue is full for {client_ctx}")
+            self._send(client_ctx, {"event": event, "realm_id": realm_id, "role": role})
 
-        def _on_pinged(event, backend_event, organization_id, author, ping):
-            if organization_id != client_ctx.organization_id or author == client_ctx.device_id:
-                return
+    def _on_pinged(self, event, backend_event, organization_id, author, ping):
+        subscriptions = self._organizations.get(organization_id)
+        if not subscriptions:
+            return
 
-            try:
-                client_ctx.send_events_channel.send_nowait({"event": event, "ping": ping})
-            except trio.WouldBlock:
-                client_ctx.logger.warning(f"event queue is full for {client_ctx}")
+        for client_ctx in subscriptions.clients:
+            if client_ctx.device_id != author:
+                self._send(client_ctx, {"event": event, "ping": ping})
 
-        def _on_realm_events(event, backend_event, organization_id, author, realm_id, **kwargs):
-            if (
-                organization_id != client_ctx.organization_id
-                or author == client_ctx.device_id
-                or realm_id not in client_ctx.realms
-            ):
-                return
+    def _on_realm_events(self, event, backend_event, organization_id, author, realm_id, **kwargs):
+        subscriptions = self._organizations.get(organization_id)
+        if not subscriptions:
+            return
 
-            try:
-                client_ctx.send_events_channel.send_nowait(
-                    {"event": event, "realm_id": realm_id, **kwargs}
-                )
-            except trio.WouldBlock:
-                client_ctx.logger.warning(f"event queue is full for {client_ctx}")
+        for client_ctx in subscriptions.realms.get(realm_id, ()):
+            if client_ctx.device_id != author:
+                self._send(client_ctx, {"event": event, "realm_id": realm_id, **kwargs})
 
-        def _on_message_received(event, backend_event, organization_id, author, recipient, index):
-            if organization_id != client_ctx.organization_id or recipient != client_ctx.user_id:
-                return
+    def _on_message_received(self, event, backend_event, organization_id, author, recipient, index):
+        subscriptions = self._organizations.get(organization_id)
+        if not subscriptions:
+            return
 
-            try:
-                client_ctx.send_events_channel.send_nowait({"event": event, "index": index})
-            except trio.WouldBlock:
-                client_ctx.logger.warning(f"event queue is full for {client_ctx}")
+        for client_ctx in subscriptions.users.get(recipient, ()):
+            self._send(client_ctx, {"event": event, "index": index})
 
-        def _on_invite_status_changed(
-            event, backend_event, organization_id, greeter, token, status
-        ):
-            if organization_id != client_ctx.organization_id or greeter != client_ctx.user_id:
-                return
+    def _on_invite_status_changed(
+        self, event, backend_event, organization_id, greeter, token, status
+    ):
+        subscriptions = self._organizations.get(organization_id)
+        if not subscriptions:
+            return
 
-            try:
-                client_ctx.send_events_channel.send_nowait(
-                    {"event": event, "token": token, "invitation_status": status}
-                )
-            except trio.WouldBlock:
-                client_ctx.logger.warning(f"event queue is full for {client_ctx}")
+        for client_ctx in subscriptions.users.get(greeter, ()):
+            self._send(client_ctx, {"event": event, "token": token, "invitation_status": status})
+
+
+class EventsComponent:
+    def __init__(
+        self, realm_component: BaseRealmComponent, send_event: Callable, event_bus: EventBus
+    ):
+        self._realm_component = realm_component
+        self.send = send_event
+        self.router = EventsRouter(event_bus)
+
+    def unsubscribe(self, client_ctx) -> None:
+        """Must be called once the client is disconnected"""
+        if client_ctx.events_subscribed:
+            self.router.unsubscribe(client_ctx)
+            client_ctx.events_subscribed = False
+
+    @api("events_subscribe")
+    @catch_protocol_errors
+    async def api_events_subscribe(self, client_ctx, msg):
+        msg = events_subscribe_serializer.req_load(msg)
 
         # Command should be idempotent
         if not client_ctx.events_subscribed:
 
-            # Connect the new callbacks
-            client_ctx.event_bus_ctx.connect(
-                BackendEvent.PINGED, partial(_on_pinged, APIEvent.PINGED)
-            )
-            client_ctx.event_bus_ctx.connect(
-                BackendEvent.REALM_VLOBS_UPDATED,
-                partial(_on_realm_events, APIEvent.REALM_VLOBS_UPDATED),
-            )
-            client_ctx.event_bus_ctx.connect(
-                BackendEvent.REALM_MAINTENANCE_STARTED,
-                partial(_on_realm_events, APIEvent.REALM_MAINTENANCE_STARTED),
-            )
-            client_ctx.event_bus_ctx.connect(
-                BackendEvent.REALM_MAINTENANCE_FINISHED,
-                partial(_on_realm_events, APIEvent.REALM_MAINTENANCE_FINISHED),
-            )
-            client_ctx.event_bus_ctx.connect(
-                BackendEvent.MESSAGE_RECEIVED,
-                partial(_on_message_received, APIEvent.MESSAGE_RECEIVED),
-            )
-            client_ctx.event_bus_ctx.connect(
-                BackendEvent.INVITE_STATUS_CHANGED,
-                partial(_on_invite_status_changed, APIEvent.INVITE_STATUS_CHANGED),
-            )
-
-            # Final event to keep up to date the list of realm we should listen on
-            client_ctx.event_bus_ctx.connect(
-                BackendEvent.REALM_ROLES_UPDATED,
-                partial(_on_roles_updated, APIEvent.REALM_ROLES_UPDATED),
-            )
+            # Subscribe before retrieving the realms so no role change can be missed
+            client_ctx.events_subscribed = True
+            self.router.subscribe(client_ctx)
 
             # Finally populate the list of realm we should listen on
             realms_for_user = await self._realm_component.get_realms_for_user(
                 client_ctx.organization_id, client_ctx.user_id
             )
-            client_ctx.realms = set(realms_for_user.keys())
-            client_ctx.events_subscribed = True
+            self.router.set_client_realms(client_ctx, realms_for_user.keys())
 
         return events_subscribe_serializer.rep_dump({"status": "ok"})
 
@@ -136,17 +280,38 @@ class EventsComponent:
         msg = events_listen_serializer.req_load(msg)
 
         if msg["wait"]:
-            event_data = await run_with_breathing_transport(
-                client_ctx.transport, client_ctx.receive_events_channel.receive
+            events = await run_with_breathing_transport(
+                client_ctx.transport, client_ctx.events_queue.receive_batch, 1
+            )
+
+            if not events:
+                return {"status": "cancelled", "reason": "Client cancelled the listening"}
+
+        else:
+            try:
+                events = client_ctx.events_queue.receive_batch_nowait(1)
+            except trio.WouldBlock:
+                return {"status": "no_events"}
+
+        return events_listen_serializer.rep_dump({"status": "ok", **events[0]})
+
+    @api("events_batch_listen")
+    @catch_protocol_errors
+    async def api_events_batch_listen(self, client_ctx, msg):
+        msg = events_batch_listen_serializer.req_load(msg)
+
+        if msg["wait"]:
+            events = await run_with_breathing_transport(
+                client_ctx.transport, client_ctx.events_queue.receive_batch, msg["max_events"]
             )
 
-            if not event_data:
+            if not events:
                 return {"status": "cancelled", "reason": "Client cancelled the listening"}
 
         else:
             try:
-                event_data = client_ctx.receive_events_channel.receive_nowait()
+                events = client_ctx.events_queue.receive_batch_nowait(msg["max_events"])
             except trio.WouldBlock:
                 return {"status": "no_events"}
 
-        return events_listen_serializer.rep_dump({"status": "ok", **event_data})
+        return events_batch_listen_serializer.rep_dump({"status": "ok", "events": events})
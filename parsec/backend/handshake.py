@@ -34,6 +34,7 @@ async def do_handshake(
 ) -> Tuple[Optional[BaseClientContext], Optional[Dict]]:
     try:
         handshake = ServerHandshake()
+        transport.handshake = handshake
         challenge_req = handshake.build_challenge_req()
         await transport.send(challenge_req)
         answer_req = await transport.recv()
@@ -43,7 +43,7 @@ async def components_factory(config: BackendConfig, event_bus: EventBus):
     ping = MemoryPingComponent(_send_event)
     block = MemoryBlockComponent()
     blockstore = blockstore_factory(config.blockstore_config)
-    events = EventsComponent(realm, send_event=_send_event)
+    events = EventsComponent(realm, send_event=_send_event, event_bus=event_bus)
 
     components = {
         "events": events,
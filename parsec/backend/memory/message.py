@@ -1,6 +1,6 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 from collections import defaultdict
 from pendulum import DateTime
 
@@ -37,7 +37,14 @@ class MemoryMessageComponent(BaseMessageComponent):
         )
 
     async def get(
-        self, organization_id: OrganizationID, recipient: UserID, offset: int
-    ) -> List[Tuple[DeviceID, bytes]]:
-        messages = self._organizations[organization_id]
-        return messages[recipient][offset:]
+        self,
+        organization_id: OrganizationID,
+        recipient: UserID,
+        offset: int,
+        page_size: Optional[int] = None,
+    ) -> List[Tuple[int, DeviceID, DateTime, bytes]]:
+        messages = self._organizations[organization_id][recipient]
+        stop = offset + page_size if page_size is not None else None
+        return [
+            (index, *message) for index, message in enumerate(messages[offset:stop], offset + 1)
+        ]
@@ -12,6 +12,7 @@ from parsec.backend.user import (
     User,
     Device,
     Trustchain,
+    KnownTrustchain,
     GetUserAndDevicesResult,
     HumanFindResultItem,
     UserInvitation,
@@ -88,8 +89,13 @@ class MemoryUserComponent(BaseUserComponent):
         )
 
     async def _get_trustchain(
-        self, organization_id: OrganizationID, *devices_ids, redacted: bool = False
+        self,
+        organization_id: OrganizationID,
+        *devices_ids,
+        redacted: bool = False,
+        known_trustchain: Optional[KnownTrustchain] = None,
     ):
+        known_trustchain = known_trustchain or KnownTrustchain()
         trustchain_devices = set()
         trustchain_users = set()
         trustchain_revoked_users = set()
@@ -104,9 +110,11 @@ class MemoryUserComponent(BaseUserComponent):
             in_trustchain.add(device_id)
             user = self._get_user(organization_id, device_id.user_id)
             device = self._get_device(organization_id, device_id)
-            trustchain_devices.add(getattr(device, device_certif_field))
-            trustchain_users.add(getattr(user, user_certif_field))
-            if user.revoked_user_certificate:
+            if device_id not in known_trustchain.devices:
+                trustchain_devices.add(getattr(device, device_certif_field))
+            if user.user_id not in known_trustchain.users:
+                trustchain_users.add(getattr(user, user_certif_field))
+            if user.revoked_user_certificate and user.user_id not in known_trustchain.revoked_users:
                 trustchain_revoked_users.add(user.revoked_user_certificate)
             await _recursive_extract_creators(device.device_certifier)
             await _recursive_extract_creators(user.revoked_user_certifier)
@@ -156,7 +164,11 @@ class MemoryUserComponent(BaseUserComponent):
         return user, user_device, trustchain
 
     async def get_user_with_devices_and_trustchain(
-        self, organization_id: OrganizationID, user_id: UserID, redacted: bool = False
+        self,
+        organization_id: OrganizationID,
+        user_id: UserID,
+        redacted: bool = False,
+        known_trustchain: Optional[KnownTrustchain] = None,
     ) -> GetUserAndDevicesResult:
         user = self._get_user(organization_id, user_id)
         user_devices = self._get_user_devices(organization_id, user_id)
@@ -167,6 +179,7 @@ class MemoryUserComponent(BaseUserComponent):
             user.revoked_user_certifier,
             *[device.device_certifier for device in user_devices_values],
             redacted=redacted,
+            known_trustchain=known_trustchain,
         )
         return GetUserAndDevicesResult(
             user_certificate=user.redacted_user_certificate if redacted else user.user_certificate,
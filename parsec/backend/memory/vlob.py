@@ -3,7 +3,7 @@
 import attr
 import pendulum
 from uuid import UUID
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Union
 from collections import defaultdict
 
 from parsec.backend.backend_events import BackendEvent
@@ -12,6 +12,7 @@ from parsec.api.protocol import RealmRole
 from parsec.backend.realm import BaseRealmComponent, RealmNotFoundError
 from parsec.backend.vlob import (
     BaseVlobComponent,
+    VlobError,
     VlobAccessError,
     VlobVersionError,
     VlobTimestampError,
@@ -260,6 +261,35 @@ class MemoryVlobComponent(BaseVlobComponent):
         except IndexError:
             raise VlobVersionError()
 
+    async def batch_read(
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        realm_id: UUID,
+        encryption_revision: int,
+        vlob_ids: List[UUID],
+        timestamp: Optional[pendulum.DateTime] = None,
+    ) -> List[Tuple[UUID, int, bytes, DeviceID, pendulum.DateTime]]:
+        self._check_realm_read_access(
+            organization_id, realm_id, author.user_id, encryption_revision
+        )
+
+        vlobs = []
+        for vlob_id in dict.fromkeys(vlob_ids):
+            vlob = self._vlobs.get((organization_id, vlob_id))
+            if vlob is None or vlob.realm_id != realm_id:
+                continue
+            if timestamp is None:
+                version = vlob.current_version
+            else:
+                for version in range(vlob.current_version, 0, -1):
+                    if vlob.data[version - 1][2] <= timestamp:
+                        break
+                else:
+                    continue
+            vlobs.append((vlob_id, version, *vlob.data[version - 1]))
+        return vlobs
+
     async def update(
         self,
         organization_id: OrganizationID,
@@ -285,17 +315,47 @@ class MemoryVlobComponent(BaseVlobComponent):
         await self._update_changes(organization_id, author, vlob.realm_id, vlob_id, version)
 
     async def poll_changes(
-        self, organization_id: OrganizationID, author: DeviceID, realm_id: UUID, checkpoint: int
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        realm_id: UUID,
+        checkpoint: int,
+        page_size: Optional[int] = None,
     ) -> Tuple[int, Dict[UUID, int]]:
         self._check_realm_read_access(organization_id, realm_id, author.user_id, None)
 
         changes = self._per_realm_changes[(organization_id, realm_id)]
-        changes_since_checkpoint = {
-            src_id: src_version
+        changes_since_checkpoint = sorted(
+            (change_checkpoint, src_id, src_version)
             for src_id, (_, change_checkpoint, src_version) in changes.changes.items()
             if change_checkpoint > checkpoint
-        }
-        return (changes.checkpoint, changes_since_checkpoint)
+        )
+        if page_size is not None and len(changes_since_checkpoint) > page_size:
+            changes_since_checkpoint = changes_since_checkpoint[:page_size]
+            new_checkpoint = changes_since_checkpoint[-1][0]
+        else:
+            new_checkpoint = changes.checkpoint
+        return (
+            new_checkpoint,
+            {src_id: src_version for _, src_id, src_version in changes_since_checkpoint},
+        )
+
+    async def batch_poll_changes(
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        checkpoints: Dict[UUID, int],
+        page_size: Optional[int] = None,
+    ) -> Dict[UUID, Union[Tuple[int, Dict[UUID, int]], VlobError]]:
+        results: Dict[UUID, Union[Tuple[int, Dict[UUID, int]], VlobError]] = {}
+        for realm_id, checkpoint in checkpoints.items():
+            try:
+                results[realm_id] = await self.poll_changes(
+                    organization_id, author, realm_id, checkpoint, page_size
+                )
+            except (VlobAccessError, VlobNotFoundError, VlobInMaintenanceError) as exc:
+                results[realm_id] = exc
+        return results
 
     async def list_versions(
         self, organization_id: OrganizationID, author: DeviceID, vlob_id: UUID
@@ -1,6 +1,6 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 from pendulum import DateTime
 
 from parsec.api.protocol import DeviceID, UserID, OrganizationID
@@ -18,15 +18,16 @@ class BaseMessageComponent:
     async def api_message_get(self, client_ctx, msg):
         msg = message_get_serializer.req_load(msg)
 
-        offset = msg["offset"]
-        messages = await self.get(client_ctx.organization_id, client_ctx.user_id, offset)
+        messages = await self.get(
+            client_ctx.organization_id, client_ctx.user_id, msg["offset"], msg["page_size"]
+        )
 
         return message_get_serializer.rep_dump(
             {
                 "status": "ok",
                 "messages": [
-                    {"count": i, "body": body, "timestamp": timestamp, "sender": sender}
-                    for i, (sender, timestamp, body) in enumerate(messages, offset + 1)
+                    {"count": index, "body": body, "timestamp": timestamp, "sender": sender}
+                    for index, sender, timestamp, body in messages
                 ],
             }
         )
@@ -42,6 +43,14 @@ class BaseMessageComponent:
         raise NotImplementedError()
 
     async def get(
-        self, organization_id: OrganizationID, recipient: UserID, offset: int
-    ) -> List[Tuple[DeviceID, DateTime, bytes]]:
+        self,
+        organization_id: OrganizationID,
+        recipient: UserID,
+        offset: int,
+        page_size: Optional[int] = None,
+    ) -> List[Tuple[int, DeviceID, DateTime, bytes]]:
+        """
+        Returns: the messages (with their index, starting at 1) following `offset`,
+        limited to `page_size` messages if provided
+        """
         raise NotImplementedError()
@@ -18,16 +18,11 @@ from parsec.backend.block import (
 from parsec.backend.postgresql.handler import PGHandler
 from parsec.backend.postgresql.utils import (
     Q,
-    q_organization_internal_id,
-    q_user_internal_id,
     q_user_can_read_vlob,
     q_user_can_write_vlob,
-    q_device_internal_id,
     q_realm,
-    q_realm_internal_id,
     q_block,
 )
-from parsec.backend.postgresql.realm_queries.maintenance import get_realm_status, RealmNotFoundError
 
 
 _q_get_realm_id_from_block_id = Q(
@@ -36,7 +31,7 @@ SELECT
     { q_realm(_id="block.realm", select="realm.realm_id") }
 FROM block
 WHERE
-    organization = { q_organization_internal_id("$organization_id") }
+    organization = $organization_internal_id
     AND block_id = $block_id
 """
 )
@@ -46,18 +41,10 @@ _q_get_block_meta = Q(
     f"""
 SELECT
     deleted_on,
-    {
-        q_user_can_read_vlob(
-            user=q_user_internal_id(
-                organization_id="$organization_id",
-                user_id="$user_id"
-            ),
-            realm="block.realm"
-        )
-    } as has_access
+    { q_user_can_read_vlob(user="$user_internal_id", realm="block.realm") } as has_access
 FROM block
 WHERE
-    organization = { q_organization_internal_id("$organization_id") }
+    organization = $organization_internal_id
     AND block_id = $block_id
 """
 )
@@ -66,16 +53,10 @@ WHERE
 _q_get_block_write_right_and_unicity = Q(
     f"""
 SELECT
-    {
-        q_user_can_write_vlob(
-            organization_id="$organization_id",
-            user_id="$user_id",
-            realm_id="$realm_id"
-        )
-    } as has_access,
+    { q_user_can_write_vlob(user="$user_internal_id", realm="$realm_internal_id") } as has_access,
     EXISTS({
         q_block(
-            organization_id="$organization_id",
+            organization="$organization_internal_id",
             block_id="$block_id"
         )
     }) as exists
@@ -84,13 +65,13 @@ SELECT
 
 
 _q_insert_block = Q(
-    f"""
+    """
 INSERT INTO block (organization, block_id, realm, author, size, created_on)
 VALUES (
-    { q_organization_internal_id("$organization_id") },
+    $organization_internal_id,
     $block_id,
-    { q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") },
-    { q_device_internal_id(organization_id="$organization_id", device_id="$author") },
+    $realm_internal_id,
+    $author_internal_id,
     $size,
     $created_on
 )
@@ -98,16 +79,31 @@ VALUES (
 )
 
 
-async def _check_realm(conn, organization_id, realm_id):
-    try:
-        rep = await get_realm_status(conn, organization_id, realm_id)
+_q_increment_realm_blocks_size = Q(
+    """
+INSERT INTO realm_stats (realm, blocks_size)
+VALUES ($realm_internal_id, $size)
+ON CONFLICT (realm) DO UPDATE SET blocks_size = realm_stats.blocks_size + EXCLUDED.blocks_size
+"""
+)
+
+
+_q_get_realm_status = Q(q_realm(_id="$realm_internal_id", select="maintenance_type"))
+
 
-    except RealmNotFoundError as exc:
-        raise BlockNotFoundError(*exc.args) from exc
+async def _check_realm(conn, internal_ids, organization_id, realm_id):
+    realm_internal_id = await internal_ids.realm(conn, organization_id, realm_id)
+    if realm_internal_id is None:
+        raise BlockNotFoundError(f"Realm `{realm_id}` doesn't exist")
 
-    if rep["maintenance_type"]:
+    maintenance_type = await conn.fetchval(
+        *_q_get_realm_status(realm_internal_id=realm_internal_id)
+    )
+    if maintenance_type:
         raise BlockInMaintenanceError("Data realm is currently under maintenance")
 
+    return realm_internal_id
+
 
 class PGBlockComponent(BaseBlockComponent):
     def __init__(
@@ -123,16 +119,22 @@ class PGBlockComponent(BaseBlockComponent):
     async def read(
         self, organization_id: OrganizationID, author: DeviceID, block_id: UUID
     ) -> bytes:
+        internal_ids = self.dbh.internal_ids
         async with self.dbh.pool.acquire() as conn, conn.transaction():
+            organization_internal_id = await internal_ids.organization(conn, organization_id)
             realm_id = await conn.fetchval(
-                *_q_get_realm_id_from_block_id(organization_id=organization_id, block_id=block_id)
+                *_q_get_realm_id_from_block_id(
+                    organization_internal_id=organization_internal_id, block_id=block_id
+                )
             )
             if not realm_id:
                 raise BlockNotFoundError(f"Realm `{realm_id}` doesn't exist")
-            await _check_realm(conn, organization_id, realm_id)
+            await _check_realm(conn, internal_ids, organization_id, realm_id)
             ret = await conn.fetchrow(
                 *_q_get_block_meta(
-                    organization_id=organization_id, block_id=block_id, user_id=author.user_id
+                    organization_internal_id=organization_internal_id,
+                    block_id=block_id,
+                    user_internal_id=await internal_ids.user(conn, organization_id, author.user_id),
                 )
             )
             if not ret or ret["deleted_on"]:
@@ -151,15 +153,17 @@ class PGBlockComponent(BaseBlockComponent):
         realm_id: UUID,
         block: bytes,
     ) -> None:
+        internal_ids = self.dbh.internal_ids
         async with self.dbh.pool.acquire() as conn, conn.transaction():
-            await _check_realm(conn, organization_id, realm_id)
+            realm_internal_id = await _check_realm(conn, internal_ids, organization_id, realm_id)
+            organization_internal_id = await internal_ids.organization(conn, organization_id)
 
             # 1) Check access rights and block unicity
             ret = await conn.fetchrow(
                 *_q_get_block_write_right_and_unicity(
-                    organization_id=organization_id,
-                    user_id=author.user_id,
-                    realm_id=realm_id,
+                    organization_internal_id=organization_internal_id,
+                    user_internal_id=await internal_ids.user(conn, organization_id, author.user_id),
+                    realm_internal_id=realm_internal_id,
                     block_id=block_id,
                 )
             )
@@ -184,10 +188,10 @@ class PGBlockComponent(BaseBlockComponent):
             # 3) Insert the block metadata into the database
             ret = await conn.execute(
                 *_q_insert_block(
-                    organization_id=organization_id,
+                    organization_internal_id=organization_internal_id,
                     block_id=block_id,
-                    realm_id=realm_id,
-                    author=author,
+                    realm_internal_id=realm_internal_id,
+                    author_internal_id=await internal_ids.device(conn, organization_id, author),
                     size=len(block),
                     created_on=pendulum.now(),
                 )
@@ -196,6 +200,12 @@ class PGBlockComponent(BaseBlockComponent):
             if ret != "INSERT 0 1":
                 raise BlockError(f"Insertion error: {ret}")
 
+            await conn.execute(
+                *_q_increment_realm_blocks_size(
+                    realm_internal_id=realm_internal_id, size=len(block)
+                )
+            )
+
 
 _q_get_block_data = Q(
     """
@@ -22,6 +22,8 @@ from parsec.backend.postgresql.utils import (
     STR_TO_INVITATION_STATUS,
     STR_TO_BACKEND_EVENTS,
 )
+from parsec.backend.postgresql.internal_ids import PGInternalIDsCache
+from parsec.backend.postgresql.trustchain_cache import PGTrustchainCache
 from parsec.backend.postgresql import migrations as migrations_module
 from parsec.backend.backend_events import BackendEvent
 
@@ -214,6 +216,8 @@ class PGHandler:
         self.pool: triopg.TrioPoolProxy
         self.notification_conn: triopg.TrioConnectionProxy
         self._task_status: Optional[TaskStatus] = None
+        self.internal_ids = PGInternalIDsCache()
+        self.trustchain_cache = PGTrustchainCache()
 
     async def init(self, nursery):
         self._task_status = await start_task(nursery, self._run_connections)
@@ -254,6 +258,12 @@ class PGHandler:
             data["role"] = STR_TO_REALM_ROLE.get(data.pop("role_str"))
         elif signal == BackendEvent.INVITE_STATUS_CHANGED:
             data["status"] = STR_TO_INVITATION_STATUS.get(data.pop("status_str"))
+        elif signal in (
+            BackendEvent.USER_CREATED,
+            BackendEvent.DEVICE_CREATED,
+            BackendEvent.USER_REVOKED,
+        ):
+            self.trustchain_cache.clear(data["organization_id"])
         self.event_bus.send(signal, **data)
 
     async def teardown(self):
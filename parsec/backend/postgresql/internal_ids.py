@@ -0,0 +1,118 @@
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+from uuid import UUID
+from typing import Dict, Tuple, Optional, TypeVar
+
+from parsec.api.protocol import OrganizationID, UserID, DeviceID
+from parsec.backend.postgresql.utils import Q
+
+
+# Maximum number of internal ids kept in cache for each kind of entity
+DEFAULT_INTERNAL_IDS_CACHE_SIZE = 100000
+
+
+_q_get_organization_internal_id = Q(
+    """
+SELECT _id FROM organization WHERE organization_id = $organization_id
+"""
+)
+
+
+_q_get_user_internal_id = Q(
+    """
+SELECT _id FROM user_ WHERE organization = $organization_internal_id AND user_id = $user_id
+"""
+)
+
+
+_q_get_device_internal_id = Q(
+    """
+SELECT _id FROM device WHERE organization = $organization_internal_id AND device_id = $device_id
+"""
+)
+
+
+_q_get_realm_internal_id = Q(
+    """
+SELECT _id FROM realm WHERE organization = $organization_internal_id AND realm_id = $realm_id
+"""
+)
+
+
+K = TypeVar("K")
+
+
+class PGInternalIDsCache:
+    """Cache of the internal ids (i.e. the `_id` primary keys) of the organizations,
+    users, devices and realms, indexed by their public ids.
+
+    An internal id never changes once the corresponding row has been committed,
+    so hot queries can take the cached ids as plain integer parameters instead of
+    resolving them again with sub-selects (see `q_realm_internal_id` & co).
+    Unknown ids are not cached given the corresponding row may be created later.
+
+    Hence the cache must not be used to resolve rows created by the current
+    transaction (which could end up being rolled back). Note those rows are
+    never deleted, so there is no need to invalidate the cache.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_INTERNAL_IDS_CACHE_SIZE):
+        self.max_size = max_size
+        self._organizations: Dict[OrganizationID, int] = {}
+        self._users: Dict[Tuple[OrganizationID, UserID], int] = {}
+        self._devices: Dict[Tuple[OrganizationID, DeviceID], int] = {}
+        self._realms: Dict[Tuple[OrganizationID, UUID], int] = {}
+
+    def _set(self, cache: Dict[K, int], key: K, internal_id: int) -> None:
+        # Evict the oldest entries first, internal ids are cheap to resolve again
+        while len(cache) >= self.max_size:
+            cache.pop(next(iter(cache)))
+        cache[key] = internal_id
+
+    async def organization(self, conn, organization_id: OrganizationID) -> Optional[int]:
+        try:
+            return self._organizations[organization_id]
+        except KeyError:
+            pass
+        internal_id = await conn.fetchval(
+            *_q_get_organization_internal_id(organization_id=organization_id)
+        )
+        if internal_id is not None:
+            self._set(self._organizations, organization_id, internal_id)
+        return internal_id
+
+    async def _organization_entity(
+        self, conn, cache: Dict, q: Q, organization_id: OrganizationID, **public_id
+    ) -> Optional[int]:
+        (value,) = public_id.values()
+        key = (organization_id, value)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        organization_internal_id = await self.organization(conn, organization_id)
+        if organization_internal_id is None:
+            return None
+        internal_id = await conn.fetchval(
+            *q(organization_internal_id=organization_internal_id, **public_id)
+        )
+        if internal_id is not None:
+            self._set(cache, key, internal_id)
+        return internal_id
+
+    async def user(self, conn, organization_id: OrganizationID, user_id: UserID) -> Optional[int]:
+        return await self._organization_entity(
+            conn, self._users, _q_get_user_internal_id, organization_id, user_id=user_id
+        )
+
+    async def device(
+        self, conn, organization_id: OrganizationID, device_id: DeviceID
+    ) -> Optional[int]:
+        return await self._organization_entity(
+            conn, self._devices, _q_get_device_internal_id, organization_id, device_id=device_id
+        )
+
+    async def realm(self, conn, organization_id: OrganizationID, realm_id: UUID) -> Optional[int]:
+        return await self._organization_entity(
+            conn, self._realms, _q_get_realm_internal_id, organization_id, realm_id=realm_id
+        )
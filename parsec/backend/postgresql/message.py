@@ -1,7 +1,7 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
 from pendulum import DateTime
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 
 from parsec.backend.backend_events import BackendEvent
 from parsec.api.protocol import UserID, DeviceID, OrganizationID
@@ -18,21 +18,25 @@ from parsec.backend.postgresql.utils import (
 
 _q_insert_message = Q(
     f"""
-    INSERT INTO message (organization, recipient, timestamp, index, sender, body)
+WITH _counter AS (
+    INSERT INTO message_counter (recipient, index)
     VALUES (
-        { q_organization_internal_id("$organization_id") },
         { q_user_internal_id(organization_id="$organization_id", user_id="$recipient") },
-        $timestamp,
-        (
-            SELECT COUNT(*) + 1
-            FROM message
-            WHERE
-                recipient = { q_user_internal_id(organization_id="$organization_id", user_id="$recipient") }
-        ),
-        { q_device_internal_id(organization_id="$organization_id", device_id="$sender") },
-        $body
+        1
     )
-    RETURNING index
+    ON CONFLICT (recipient) DO UPDATE SET index = message_counter.index + 1
+    RETURNING recipient, index
+)
+INSERT INTO message (organization, recipient, timestamp, index, sender, body)
+SELECT
+    { q_organization_internal_id("$organization_id") },
+    _counter.recipient,
+    $timestamp,
+    _counter.index,
+    { q_device_internal_id(organization_id="$organization_id", device_id="$sender") },
+    $body
+FROM _counter
+RETURNING index
 """
 )
 
@@ -40,14 +44,16 @@ _q_insert_message = Q(
 _q_get_messages = Q(
     f"""
 SELECT
+    index,
     { q_device(_id="message.sender", select="device_id") },
     timestamp,
     body
 FROM message
 WHERE
     recipient = { q_user_internal_id(organization_id="$organization_id", user_id="$recipient") }
-ORDER BY _id ASC
-OFFSET $offset
+    AND index > $offset
+ORDER BY index ASC
+LIMIT $page_size
 """
 )
 
@@ -89,12 +95,20 @@ class PGMessageComponent(BaseMessageComponent):
             await send_message(conn, organization_id, sender, recipient, timestamp, body)
 
     async def get(
-        self, organization_id: OrganizationID, recipient: UserID, offset: int
-    ) -> List[Tuple[DeviceID, DateTime, bytes]]:
+        self,
+        organization_id: OrganizationID,
+        recipient: UserID,
+        offset: int,
+        page_size: Optional[int] = None,
+    ) -> List[Tuple[int, DeviceID, DateTime, bytes]]:
         async with self.dbh.pool.acquire() as conn:
+            # `LIMIT NULL` means no limit
             data = await conn.fetch(
                 *_q_get_messages(
-                    organization_id=organization_id, recipient=recipient, offset=offset
+                    organization_id=organization_id,
+                    recipient=recipient,
+                    offset=offset,
+                    page_size=page_size,
                 )
             )
-        return [(DeviceID(d[0]), d[1], d[2]) for d in data]
+        return [(d[0], DeviceID(d[1]), d[2], d[3]) for d in data]
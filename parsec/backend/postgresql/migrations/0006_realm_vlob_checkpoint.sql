@@ -0,0 +1,20 @@
+-- Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+
+-------------------------------------------------------
+--  Migration
+-------------------------------------------------------
+
+
+-- Per-realm counter of the vlob updates, used to allocate the index of the
+-- next `realm_vlob_update` row without computing `MAX(index)` on each write.
+-- Incrementing the counter locks its row until the end of the transaction,
+-- so concurrent writers to the same realm are serialized instead of failing
+-- with a unique violation on `realm_vlob_update`.
+CREATE TABLE realm_vlob_checkpoint (
+    realm INTEGER PRIMARY KEY REFERENCES realm (_id),
+    checkpoint INTEGER NOT NULL
+);
+
+INSERT INTO realm_vlob_checkpoint (realm, checkpoint)
+SELECT realm, MAX(index) FROM realm_vlob_update GROUP BY realm;
@@ -0,0 +1,60 @@
+-- Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+
+-------------------------------------------------------
+--  Migration
+-------------------------------------------------------
+
+
+-- Counters maintained in the same transaction as the insertion of the
+-- corresponding users/vlobs/blocks, so that organization and realm stats
+-- don't have to scan the whole `user_`, `vlob_atom` and `block` tables.
+--
+-- Organization's metadata and data sizes are the sum of its realms' sizes,
+-- this way concurrent writes on different realms don't contend on a single
+-- organization-wide row.
+CREATE TABLE organization_stats (
+    organization INTEGER PRIMARY KEY REFERENCES organization (_id),
+    users INTEGER NOT NULL
+);
+
+
+CREATE TABLE realm_stats (
+    realm INTEGER PRIMARY KEY REFERENCES realm (_id),
+    -- Vlob atoms created by vlob create/update
+    vlobs_size BIGINT NOT NULL DEFAULT 0,
+    -- Vlob atoms created by realm reencryption
+    reencrypted_vlobs_size BIGINT NOT NULL DEFAULT 0,
+    blocks_size BIGINT NOT NULL DEFAULT 0
+);
+
+
+INSERT INTO organization_stats (organization, users)
+SELECT organization, COUNT(*) FROM user_ GROUP BY organization;
+
+
+INSERT INTO realm_stats (realm, vlobs_size, reencrypted_vlobs_size, blocks_size)
+SELECT
+    realm._id,
+    COALESCE(vlobs.size, 0),
+    COALESCE(all_vlobs.size, 0) - COALESCE(vlobs.size, 0),
+    COALESCE(blocks.size, 0)
+FROM realm
+LEFT JOIN (
+    SELECT realm_vlob_update.realm, SUM(vlob_atom.size) size
+    FROM realm_vlob_update
+    INNER JOIN vlob_atom ON vlob_atom._id = realm_vlob_update.vlob_atom
+    GROUP BY realm_vlob_update.realm
+) vlobs ON vlobs.realm = realm._id
+LEFT JOIN (
+    SELECT vlob_encryption_revision.realm, SUM(vlob_atom.size) size
+    FROM vlob_atom
+    INNER JOIN vlob_encryption_revision
+    ON vlob_encryption_revision._id = vlob_atom.vlob_encryption_revision
+    GROUP BY vlob_encryption_revision.realm
+) all_vlobs ON all_vlobs.realm = realm._id
+LEFT JOIN (
+    SELECT block.realm, SUM(block.size) size
+    FROM block
+    GROUP BY block.realm
+) blocks ON blocks.realm = realm._id;
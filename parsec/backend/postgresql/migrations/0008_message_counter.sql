@@ -0,0 +1,23 @@
+-- Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+
+-------------------------------------------------------
+--  Migration
+-------------------------------------------------------
+
+
+-- Per-recipient counter of the messages, used to allocate the index of the
+-- next message without counting all the previous ones. Incrementing the
+-- counter locks its row until the end of the transaction, so concurrent
+-- messages to the same recipient get distinct consecutive indexes.
+CREATE TABLE message_counter (
+    recipient INTEGER PRIMARY KEY REFERENCES user_ (_id),
+    index INTEGER NOT NULL
+);
+
+INSERT INTO message_counter (recipient, index)
+SELECT recipient, MAX(index) FROM message GROUP BY recipient;
+
+
+-- Messages are fetched by recipient from a given index
+CREATE INDEX message_recipient_index_idx ON message (recipient, index);
@@ -0,0 +1,11 @@
+-- Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+
+-------------------------------------------------------
+--  Migration
+-------------------------------------------------------
+
+
+-- Role certificates are fetched by realm, possibly from a given date, and
+-- the current role of a user is the one of its latest certificate
+CREATE INDEX realm_user_role_realm_certified_on_idx ON realm_user_role (realm, certified_on);
@@ -60,26 +60,23 @@ WHERE
 )
 
 
+# Note SUM over BIGINT returns a NUMERIC, hence the casts
 _q_get_stats = Q(
     f"""
 SELECT
-    (
-        SELECT COUNT(*)
-        FROM user_
-        WHERE user_.organization = { q_organization_internal_id("$organization_id") }
+    COALESCE(
+        (
+            SELECT users
+            FROM organization_stats
+            WHERE organization = { q_organization_internal_id("$organization_id") }
+        ),
+        0
     ) users,
-    (
-        SELECT COALESCE(SUM(size), 0)
-        FROM vlob_atom
-        WHERE
-            organization = { q_organization_internal_id("$organization_id") }
-    ) metadata_size,
-    (
-        SELECT COALESCE(SUM(size), 0)
-        FROM block
-        WHERE
-            organization = { q_organization_internal_id("$organization_id") }
-    ) data_size
+    COALESCE(SUM(realm_stats.vlobs_size + realm_stats.reencrypted_vlobs_size), 0)::BIGINT metadata_size,
+    COALESCE(SUM(realm_stats.blocks_size), 0)::BIGINT data_size
+FROM realm_stats
+INNER JOIN realm ON realm._id = realm_stats.realm
+WHERE realm.organization = { q_organization_internal_id("$organization_id") }
 """
 )
 
@@ -47,24 +47,12 @@ _q_has_realm_access = Q(
 """
 )
 
-_q_get_blocks_size_from_realm = Q(
+_q_get_realm_stats = Q(
     f"""
-    SELECT SUM(size)
-    FROM block
-    WHERE
-        realm = { q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") }
-"""
-)
-
-_q_get_vlob_size_from_realm = Q(
-    f"""
-    SELECT SUM(size)
-    FROM
-        vlob_atom
-    INNER JOIN
-        realm_vlob_update ON vlob_atom._id = realm_vlob_update.vlob_atom
-    WHERE
-        realm_vlob_update.realm = { q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") }
+SELECT vlobs_size, blocks_size
+FROM realm_stats
+WHERE
+    realm = { q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") }
 """
 )
 
@@ -78,11 +66,33 @@ ORDER BY user_, certified_on DESC
 )
 
 
-_q_get_role_certificates = Q(
+_q_get_realm_internal_id = Q(
+    f"""
+SELECT { q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") }
+"""
+)
+
+
+_q_get_user_current_role = Q(
     f"""
-SELECT { q_user(_id="realm_user_role.user_", select="user_id") }, role, certificate, certified_on
+SELECT role
+FROM realm_user_role
+WHERE
+    realm = $realm_internal_id
+    AND user_ = { q_user_internal_id(organization_id="$organization_id", user_id="$user_id") }
+ORDER BY certified_on DESC
+LIMIT 1
+"""
+)
+
+
+_q_get_role_certificates = Q(
+    """
+SELECT certificate
 FROM  realm_user_role
-WHERE realm = { q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") }
+WHERE
+    realm = $realm_internal_id
+    AND ($since::TIMESTAMPTZ IS NULL OR certified_on > $since::TIMESTAMPTZ)
 ORDER BY certified_on ASC
 """
 )
@@ -135,20 +145,13 @@ async def query_get_stats(
 
     if not ret["has_access"]:
         raise RealmAccessError()
-    blocks_size = await conn.fetch(
-        *_q_get_blocks_size_from_realm(organization_id=organization_id, realm_id=realm_id)
-    )
-    vlobs_size = await conn.fetch(
-        *_q_get_vlob_size_from_realm(organization_id=organization_id, realm_id=realm_id)
+    ret = await conn.fetchrow(
+        *_q_get_realm_stats(organization_id=organization_id, realm_id=realm_id)
     )
-    RealmStats.blocks_size = 0
-    RealmStats.vlobs_size = 0
-    if "sum" in blocks_size[0] and blocks_size[0]["sum"] is not None:
-        RealmStats.blocks_size = blocks_size[0]["sum"]
-    if "sum" in vlobs_size[0] and vlobs_size[0]["sum"] is not None:
-        RealmStats.vlobs_size = vlobs_size[0]["sum"]
-
-    return RealmStats
+    if not ret:
+        # Nothing has been written in the realm yet
+        return RealmStats(blocks_size=0, vlobs_size=0)
+    return RealmStats(blocks_size=ret["blocks_size"], vlobs_size=ret["vlobs_size"])
 
 
 @query()
@@ -174,26 +177,27 @@ async def query_get_role_certificates(
     realm_id: UUID,
     since: pendulum.DateTime,
 ) -> List[bytes]:
-    ret = await conn.fetch(
-        *_q_get_role_certificates(organization_id=organization_id, realm_id=realm_id)
+    realm_internal_id = await conn.fetchval(
+        *_q_get_realm_internal_id(organization_id=organization_id, realm_id=realm_id)
     )
-
-    if not ret:
-        # Existing group must have at least one owner user
+    if realm_internal_id is None:
         raise RealmNotFoundError(f"Realm `{realm_id}` doesn't exist")
 
-    out = []
-    author_current_role = None
-    for user_id, role, certif, certified_on in ret:
-        if not since or certified_on > since:
-            out.append(certif)
-        if user_id == author.user_id:
-            author_current_role = role
-
+    author_current_role = await conn.fetchval(
+        *_q_get_user_current_role(
+            organization_id=organization_id,
+            realm_internal_id=realm_internal_id,
+            user_id=author.user_id,
+        )
+    )
     if author_current_role is None:
         raise RealmAccessError()
 
-    return out
+    # Only the certificates the client doesn't know about are fetched
+    ret = await conn.fetch(
+        *_q_get_role_certificates(realm_internal_id=realm_internal_id, since=since)
+    )
+    return [row["certificate"] for row in ret]
 
 
 @query()
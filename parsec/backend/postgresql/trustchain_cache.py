@@ -0,0 +1,70 @@
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+import attr
+from typing import Dict, FrozenSet, Tuple, Optional
+
+from parsec.api.protocol import OrganizationID, UserID, DeviceID
+
+
+# Maximum number of trustchains kept in cache (all organizations included)
+DEFAULT_TRUSTCHAIN_CACHE_SIZE = 10000
+
+
+@attr.s(slots=True, frozen=True, auto_attribs=True)
+class TrustchainItem:
+    """User&device certificates of a single device of a trustchain"""
+
+    user_id: UserID
+    device_id: DeviceID
+    user_certificate: bytes
+    redacted_user_certificate: bytes
+    revoked_user_certificate: Optional[bytes]
+    device_certificate: bytes
+    redacted_device_certificate: bytes
+
+
+TrustchainKey = Tuple[OrganizationID, FrozenSet[DeviceID]]
+
+
+class PGTrustchainCache:
+    """Cache of the resolved trustchains, indexed by the devices they start from.
+
+    Resolving a trustchain means walking the certifiers of the organization's
+    devices with a recursive query, which is costly on large organizations
+    while the result only changes when users&devices are created or revoked.
+
+    The organization's entries are cleared when a `BackendEvent.USER_CREATED`,
+    `BackendEvent.DEVICE_CREATED` or `BackendEvent.USER_REVOKED` notification is
+    received (see `PGHandler._on_notification`). Each invalidation bumps the
+    organization generation, so a trustchain resolved concurrently with an
+    invalidation is not stored (it may have been read before the change).
+    """
+
+    def __init__(self, max_size: int = DEFAULT_TRUSTCHAIN_CACHE_SIZE):
+        self.max_size = max_size
+        self._trustchains: Dict[TrustchainKey, Tuple[TrustchainItem, ...]] = {}
+        self._generations: Dict[OrganizationID, int] = {}
+        self._global_generation = 0
+
+    def clear(self, organization_id: Optional[OrganizationID] = None) -> None:
+        if organization_id is None:
+            self._global_generation += 1
+            self._trustchains.clear()
+            return
+        self._generations[organization_id] = self._generations.get(organization_id, 0) + 1
+        for key in [key for key in self._trustchains if key[0] == organization_id]:
+            del self._trustchains[key]
+
+    def generation(self, organization_id: OrganizationID) -> int:
+        return self._global_generation + self._generations.get(organization_id, 0)
+
+    def get(self, key: TrustchainKey) -> Optional[Tuple[TrustchainItem, ...]]:
+        return self._trustchains.get(key)
+
+    def set(self, key: TrustchainKey, generation: int, items: Tuple[TrustchainItem, ...]) -> None:
+        if generation != self.generation(key[0]):
+            return
+        # Evict the oldest entries first, trustchains are resolved again on demand
+        while len(self._trustchains) >= self.max_size:
+            self._trustchains.pop(next(iter(self._trustchains)))
+        self._trustchains[key] = items
@@ -9,6 +9,7 @@ from parsec.backend.user import (
     User,
     Device,
     Trustchain,
+    KnownTrustchain,
     GetUserAndDevicesResult,
     UserInvitation,
     DeviceInvitation,
@@ -62,20 +63,33 @@ class PGUserComponent(BaseUserComponent):
         self, organization_id: OrganizationID, user_id: UserID
     ) -> Tuple[User, Trustchain]:
         async with self.dbh.pool.acquire() as conn:
-            return await query_get_user_with_trustchain(conn, organization_id, user_id)
+            return await query_get_user_with_trustchain(
+                conn, self.dbh.trustchain_cache, organization_id, user_id
+            )
 
     async def get_user_with_device_and_trustchain(
         self, organization_id: OrganizationID, device_id: DeviceID
     ) -> Tuple[User, Device, Trustchain]:
         async with self.dbh.pool.acquire() as conn:
-            return await query_get_user_with_device_and_trustchain(conn, organization_id, device_id)
+            return await query_get_user_with_device_and_trustchain(
+                conn, self.dbh.trustchain_cache, organization_id, device_id
+            )
 
     async def get_user_with_devices_and_trustchain(
-        self, organization_id: OrganizationID, user_id: UserID, redacted: bool = False
+        self,
+        organization_id: OrganizationID,
+        user_id: UserID,
+        redacted: bool = False,
+        known_trustchain: Optional[KnownTrustchain] = None,
     ) -> GetUserAndDevicesResult:
         async with self.dbh.pool.acquire() as conn:
             return await query_get_user_with_devices_and_trustchain(
-                conn, organization_id, user_id, redacted=redacted
+                conn,
+                self.dbh.trustchain_cache,
+                organization_id,
+                user_id,
+                redacted=redacted,
+                known_trustchain=known_trustchain,
             )
 
     async def get_user_with_device(
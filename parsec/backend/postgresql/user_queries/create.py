@@ -106,6 +106,15 @@ VALUES (
 )
 
 
+_q_increment_organization_users = Q(
+    f"""
+INSERT INTO organization_stats (organization, users)
+VALUES ({ q_organization_internal_id("$organization_id") }, 1)
+ON CONFLICT (organization) DO UPDATE SET users = organization_stats.users + 1
+"""
+)
+
+
 _q_insert_device = Q(
     f"""
 INSERT INTO device (
@@ -209,6 +218,7 @@ async def _create_user(
         await _do_create_user_with_human_handle(conn, organization_id, user, first_device)
     else:
         await _do_create_user_without_human_handle(conn, organization_id, user, first_device)
+    await conn.execute(*_q_increment_organization_users(organization_id=organization_id))
 
     await _create_device(conn, organization_id, first_device, first_device=True)
 
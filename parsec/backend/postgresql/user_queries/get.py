@@ -1,9 +1,17 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
-from typing import Tuple
+from typing import Tuple, Optional
 
 from parsec.api.protocol import OrganizationID, UserID, DeviceID, HumanHandle
-from parsec.backend.user import User, Device, Trustchain, UserNotFoundError, GetUserAndDevicesResult
+from parsec.backend.user import (
+    User,
+    Device,
+    Trustchain,
+    KnownTrustchain,
+    UserNotFoundError,
+    GetUserAndDevicesResult,
+)
+from parsec.backend.postgresql.trustchain_cache import PGTrustchainCache, TrustchainItem
 from parsec.backend.postgresql.utils import (
     Q,
     query,
@@ -159,6 +167,8 @@ WITH RECURSIVE cte2 (
 SELECT DISTINCT ON (_did)
     _did,
     _uid,
+    user_id,
+    device_id,
     device_certificate,
     redacted_device_certificate,
     user_certificate,
@@ -209,22 +219,52 @@ async def _get_device(conn, organization_id: OrganizationID, device_id: DeviceID
 
 
 async def _get_trustchain(
-    conn, organization_id: OrganizationID, *device_ids: Tuple[DeviceID], redacted: bool = False
-) -> Tuple[Device]:
-    rows = await conn.fetch(
-        *_q_get_trustchain(organization_id=organization_id, device_ids=device_ids)
-    )
-    user_certif_field = "redacted_user_certificate" if redacted else "user_certificate"
-    device_certif_field = "redacted_device_certificate" if redacted else "device_certificate"
+    conn,
+    trustchain_cache: PGTrustchainCache,
+    organization_id: OrganizationID,
+    *device_ids: Optional[DeviceID],
+    redacted: bool = False,
+    known_trustchain: Optional[KnownTrustchain] = None,
+) -> Trustchain:
+    key = (organization_id, frozenset(d for d in device_ids if d is not None))
+    items = trustchain_cache.get(key)
+    if items is None:
+        generation = trustchain_cache.generation(organization_id)
+        rows = await conn.fetch(
+            *_q_get_trustchain(organization_id=organization_id, device_ids=list(key[1]))
+        )
+        items = tuple(
+            TrustchainItem(
+                user_id=UserID(row["user_id"]),
+                device_id=DeviceID(row["device_id"]),
+                user_certificate=row["user_certificate"],
+                redacted_user_certificate=row["redacted_user_certificate"],
+                revoked_user_certificate=row["revoked_user_certificate"],
+                device_certificate=row["device_certificate"],
+                redacted_device_certificate=row["redacted_device_certificate"],
+            )
+            for row in rows
+        )
+        trustchain_cache.set(key, generation, items)
 
+    known_trustchain = known_trustchain or KnownTrustchain()
     users = {}
     revoked_users = {}
     devices = {}
-    for row in rows:
-        users[row["_uid"]] = row[user_certif_field]
-        if row["revoked_user_certificate"] is not None:
-            revoked_users[row["_uid"]] = row["revoked_user_certificate"]
-        devices[row["_did"]] = row[device_certif_field]
+    for item in items:
+        if item.user_id not in known_trustchain.users:
+            users[item.user_id] = (
+                item.redacted_user_certificate if redacted else item.user_certificate
+            )
+        if (
+            item.revoked_user_certificate is not None
+            and item.user_id not in known_trustchain.revoked_users
+        ):
+            revoked_users[item.user_id] = item.revoked_user_certificate
+        if item.device_id not in known_trustchain.devices:
+            devices[item.device_id] = (
+                item.redacted_device_certificate if redacted else item.device_certificate
+            )
 
     return Trustchain(
         users=tuple(users.values()),
@@ -260,21 +300,22 @@ async def query_get_user(conn, organization_id: OrganizationID, user_id: UserID)
 
 @query(in_transaction=True)
 async def query_get_user_with_trustchain(
-    conn, organization_id: OrganizationID, user_id: UserID
+    conn, trustchain_cache: PGTrustchainCache, organization_id: OrganizationID, user_id: UserID
 ) -> Tuple[User, Trustchain]:
     user = await _get_user(conn, organization_id, user_id)
-    trustchain = await _get_trustchain(conn, organization_id, user.user_certifier)
+    trustchain = await _get_trustchain(conn, trustchain_cache, organization_id, user.user_certifier)
     return user, trustchain
 
 
 @query(in_transaction=True)
 async def query_get_user_with_device_and_trustchain(
-    conn, organization_id: OrganizationID, device_id: DeviceID
+    conn, trustchain_cache: PGTrustchainCache, organization_id: OrganizationID, device_id: DeviceID
 ) -> Tuple[User, Device, Trustchain]:
     user = await _get_user(conn, organization_id, device_id.user_id)
     user_device = await _get_device(conn, organization_id, device_id)
     trustchain = await _get_trustchain(
         conn,
+        trustchain_cache,
         organization_id,
         user.user_certifier,
         user.revoked_user_certifier,
@@ -285,17 +326,24 @@ async def query_get_user_with_device_and_trustchain(
 
 @query(in_transaction=True)
 async def query_get_user_with_devices_and_trustchain(
-    conn, organization_id: OrganizationID, user_id: UserID, redacted: bool = False
+    conn,
+    trustchain_cache: PGTrustchainCache,
+    organization_id: OrganizationID,
+    user_id: UserID,
+    redacted: bool = False,
+    known_trustchain: Optional[KnownTrustchain] = None,
 ) -> GetUserAndDevicesResult:
     user = await _get_user(conn, organization_id, user_id)
     user_devices = await _get_user_devices(conn, organization_id, user_id)
     trustchain = await _get_trustchain(
         conn,
+        trustchain_cache,
         organization_id,
         user.user_certifier,
         user.revoked_user_certifier,
         *[device.device_certifier for device in user_devices],
         redacted=redacted,
+        known_trustchain=known_trustchain,
     )
     return GetUserAndDevicesResult(
         user_certificate=user.redacted_user_certificate if redacted else user.user_certificate,
@@ -2,17 +2,19 @@
 
 import pendulum
 from uuid import UUID
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Union
 
 from parsec.api.protocol import DeviceID, OrganizationID
-from parsec.backend.vlob import BaseVlobComponent
+from parsec.backend.vlob import BaseVlobComponent, VlobError
 from parsec.backend.postgresql.handler import PGHandler, retry_on_unique_violation
 from parsec.backend.postgresql.vlob_queries import (
     query_update,
     query_maintenance_save_reencryption_batch,
     query_maintenance_get_reencryption_batch,
     query_read,
+    query_batch_read,
     query_poll_changes,
+    query_batch_poll_changes,
     query_list_versions,
     query_create,
 )
@@ -36,6 +38,7 @@ class PGVlobComponent(BaseVlobComponent):
         async with self.dbh.pool.acquire() as conn:
             await query_create(
                 conn,
+                self.dbh.internal_ids,
                 organization_id,
                 author,
                 realm_id,
@@ -56,7 +59,35 @@ class PGVlobComponent(BaseVlobComponent):
     ) -> Tuple[int, bytes, DeviceID, pendulum.DateTime]:
         async with self.dbh.pool.acquire() as conn:
             return await query_read(
-                conn, organization_id, author, encryption_revision, vlob_id, version, timestamp
+                conn,
+                self.dbh.internal_ids,
+                organization_id,
+                author,
+                encryption_revision,
+                vlob_id,
+                version,
+                timestamp,
+            )
+
+    async def batch_read(
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        realm_id: UUID,
+        encryption_revision: int,
+        vlob_ids: List[UUID],
+        timestamp: Optional[pendulum.DateTime] = None,
+    ) -> List[Tuple[UUID, int, bytes, DeviceID, pendulum.DateTime]]:
+        async with self.dbh.pool.acquire() as conn:
+            return await query_batch_read(
+                conn,
+                self.dbh.internal_ids,
+                organization_id,
+                author,
+                realm_id,
+                encryption_revision,
+                vlob_ids,
+                timestamp,
             )
 
     @retry_on_unique_violation
@@ -73,6 +104,7 @@ class PGVlobComponent(BaseVlobComponent):
         async with self.dbh.pool.acquire() as conn:
             return await query_update(
                 conn,
+                self.dbh.internal_ids,
                 organization_id,
                 author,
                 encryption_revision,
@@ -83,16 +115,43 @@ class PGVlobComponent(BaseVlobComponent):
             )
 
     async def poll_changes(
-        self, organization_id: OrganizationID, author: DeviceID, realm_id: UUID, checkpoint: int
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        realm_id: UUID,
+        checkpoint: int,
+        page_size: Optional[int] = None,
     ) -> Tuple[int, Dict[UUID, int]]:
         async with self.dbh.pool.acquire() as conn:
-            return await query_poll_changes(conn, organization_id, author, realm_id, checkpoint)
+            return await query_poll_changes(
+                conn,
+                self.dbh.internal_ids,
+                organization_id,
+                author,
+                realm_id,
+                checkpoint,
+                page_size,
+            )
+
+    async def batch_poll_changes(
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        checkpoints: Dict[UUID, int],
+        page_size: Optional[int] = None,
+    ) -> Dict[UUID, Union[Tuple[int, Dict[UUID, int]], VlobError]]:
+        async with self.dbh.pool.acquire() as conn:
+            return await query_batch_poll_changes(
+                conn, self.dbh.internal_ids, organization_id, author, checkpoints, page_size
+            )
 
     async def list_versions(
         self, organization_id: OrganizationID, author: DeviceID, vlob_id: UUID
     ) -> Dict[int, Tuple[pendulum.DateTime, DeviceID]]:
         async with self.dbh.pool.acquire() as conn:
-            return await query_list_versions(conn, organization_id, author, vlob_id)
+            return await query_list_versions(
+                conn, self.dbh.internal_ids, organization_id, author, vlob_id
+            )
 
     async def maintenance_get_reencryption_batch(
         self,
@@ -104,7 +163,13 @@ class PGVlobComponent(BaseVlobComponent):
     ) -> List[Tuple[UUID, int, bytes]]:
         async with self.dbh.pool.acquire() as conn:
             return await query_maintenance_get_reencryption_batch(
-                conn, organization_id, author, realm_id, encryption_revision, size
+                conn,
+                self.dbh.internal_ids,
+                organization_id,
+                author,
+                realm_id,
+                encryption_revision,
+                size,
             )
 
     async def maintenance_save_reencryption_batch(
@@ -117,5 +182,11 @@ class PGVlobComponent(BaseVlobComponent):
     ) -> Tuple[int, int]:
         async with self.dbh.pool.acquire() as conn:
             return await query_maintenance_save_reencryption_batch(
-                conn, organization_id, author, realm_id, encryption_revision, batch
+                conn,
+                self.dbh.internal_ids,
+                organization_id,
+                author,
+                realm_id,
+                encryption_revision,
+                batch,
             )
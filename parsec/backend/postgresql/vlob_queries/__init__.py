@@ -11,7 +11,9 @@ from parsec.backend.postgresql.vlob_queries.maintenance import (
 )
 from parsec.backend.postgresql.vlob_queries.read import (
     query_read,
+    query_batch_read,
     query_poll_changes,
+    query_batch_poll_changes,
     query_list_versions,
 )
 
@@ -21,7 +23,9 @@ __all__ = (
     "query_maintenance_save_reencryption_batch",
     "query_maintenance_get_reencryption_batch",
     "query_read",
+    "query_batch_read",
     "query_poll_changes",
+    "query_batch_poll_changes",
     "query_list_versions",
     "query_create",
 )
@@ -5,15 +5,54 @@ from typing import List, Tuple
 
 from parsec.backend.realm import RealmRole
 from parsec.api.protocol import DeviceID, OrganizationID
-from parsec.backend.postgresql.utils import (
-    Q,
-    query,
-    q_vlob_encryption_revision_internal_id,
-    q_organization_internal_id,
-)
+from parsec.backend.postgresql.utils import Q, query, q_vlob_encryption_revision_internal_id
 from parsec.backend.postgresql.vlob_queries.utils import _check_realm, _check_realm_access
 
 
+# Vlob atoms are reencrypted in `(vlob_id, version)` order, so the next batch
+# starts right after the last vlob atom present in the new encryption revision.
+# Those are keyset lookups on the `(vlob_encryption_revision, vlob_id, version)`
+# unique index instead of an anti-join on the whole realm for each batch.
+_q_maintenance_get_last_reencrypted = Q(
+    f"""
+SELECT vlob_id, version
+FROM vlob_atom
+WHERE vlob_encryption_revision = {
+    q_vlob_encryption_revision_internal_id(
+        realm="$realm_internal_id",
+        encryption_revision="$encryption_revision"
+    )
+}
+ORDER BY vlob_id DESC, version DESC
+LIMIT 1
+"""
+)
+
+
+_q_maintenance_get_reencryption_batch_after = Q(
+    f"""
+SELECT
+    vlob_id,
+    version,
+    blob
+FROM vlob_atom
+WHERE
+    vlob_encryption_revision = {
+        q_vlob_encryption_revision_internal_id(
+            realm="$realm_internal_id",
+            encryption_revision="$encryption_revision - 1"
+        )
+    }
+    AND (vlob_id, version) > ($last_vlob_id::UUID, $last_version::INTEGER)
+ORDER BY vlob_id, version
+LIMIT $size
+"""
+)
+
+
+# Used for the first batch, and once the keyset lookup is exhausted to catch the
+# vlob atoms that may have been skipped (e.g. batches saved out of order by
+# concurrent jobs)
 _q_maintenance_get_reencryption_batch = Q(
     f"""
 WITH cte_to_encrypt AS (
@@ -21,8 +60,7 @@ WITH cte_to_encrypt AS (
     FROM vlob_atom
     WHERE vlob_encryption_revision = {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision - 1"
         )
     }
@@ -32,8 +70,7 @@ cte_encrypted AS (
     FROM vlob_atom
     WHERE vlob_encryption_revision = {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision"
         )
     }
@@ -46,11 +83,14 @@ FROM cte_to_encrypt
 LEFT JOIN cte_encrypted
 ON cte_to_encrypt.vlob_id = cte_encrypted.vlob_id AND cte_to_encrypt.version = cte_encrypted.version
 WHERE cte_encrypted.vlob_id IS NULL
+ORDER BY cte_to_encrypt.vlob_id, cte_to_encrypt.version
 LIMIT $size
 """
 )
 
 
+# The whole batch is inserted with a single statement, the inserted sizes are
+# returned given vlob atoms already reencrypted by a previous batch are ignored
 _q_maintenance_save_reencryption_batch = Q(
     f"""
 INSERT INTO vlob_atom(
@@ -65,27 +105,44 @@ INSERT INTO vlob_atom(
     deleted_on
 )
 SELECT
-    organization,
+    vlob_atom.organization,
     {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision",
         )
     },
-    $vlob_id,
-    $version,
-    $blob,
-    $blob_len,
-    author,
-    created_on,
-    deleted_on
-FROM vlob_atom
-WHERE
-    organization = { q_organization_internal_id("$organization_id") }
-    AND vlob_id = $vlob_id
-    AND version = $version
+    batch.vlob_id,
+    batch.version,
+    batch.blob,
+    OCTET_LENGTH(batch.blob),
+    vlob_atom.author,
+    vlob_atom.created_on,
+    vlob_atom.deleted_on
+FROM UNNEST($vlob_ids::UUID[], $versions::INTEGER[], $blobs::BYTEA[])
+    AS batch(vlob_id, version, blob)
+INNER JOIN vlob_atom
+ON
+    vlob_atom.vlob_encryption_revision = {
+        q_vlob_encryption_revision_internal_id(
+            realm="$realm_internal_id",
+            encryption_revision="$encryption_revision - 1",
+        )
+    }
+    AND vlob_atom.vlob_id = batch.vlob_id
+    AND vlob_atom.version = batch.version
 ON CONFLICT DO NOTHING
+RETURNING size
+"""
+)
+
+
+_q_increment_realm_reencrypted_vlobs_size = Q(
+    """
+INSERT INTO realm_stats (realm, reencrypted_vlobs_size)
+VALUES ($realm_internal_id, $size)
+ON CONFLICT (realm) DO UPDATE
+SET reencrypted_vlobs_size = realm_stats.reencrypted_vlobs_size + EXCLUDED.reencrypted_vlobs_size
 """
 )
 
@@ -97,8 +154,7 @@ SELECT (
     FROM vlob_atom
     WHERE vlob_encryption_revision = {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision - 1",
         )
     }
@@ -108,8 +164,7 @@ SELECT (
     FROM vlob_atom
     WHERE vlob_encryption_revision = {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision",
         )
     }
@@ -119,68 +174,97 @@ SELECT (
 
 
 async def _check_realm_and_maintenance_access(
-    conn, organization_id, author, realm_id, encryption_revision
+    conn, internal_ids, organization_id, author, realm_id, encryption_revision
 ):
-    await _check_realm(
-        conn, organization_id, realm_id, encryption_revision, expected_maintenance=True
+    realm_internal_id = await _check_realm(
+        conn,
+        internal_ids,
+        organization_id,
+        realm_id,
+        encryption_revision,
+        expected_maintenance=True,
     )
     can_write_roles = (RealmRole.OWNER,)
-    await _check_realm_access(conn, organization_id, realm_id, author, can_write_roles)
+    await _check_realm_access(
+        conn, internal_ids, organization_id, realm_internal_id, author, can_write_roles
+    )
+    return realm_internal_id
 
 
 @query(in_transaction=True)
 async def query_maintenance_get_reencryption_batch(
     conn,
+    internal_ids,
     organization_id: OrganizationID,
     author: DeviceID,
     realm_id: UUID,
     encryption_revision: int,
     size: int,
 ) -> List[Tuple[UUID, int, bytes]]:
-    await _check_realm_and_maintenance_access(
-        conn, organization_id, author, realm_id, encryption_revision
+    realm_internal_id = await _check_realm_and_maintenance_access(
+        conn, internal_ids, organization_id, author, realm_id, encryption_revision
     )
-    rep = await conn.fetch(
-        *_q_maintenance_get_reencryption_batch(
-            organization_id=organization_id,
-            realm_id=realm_id,
-            encryption_revision=encryption_revision,
-            size=size,
+    rep = None
+    last = await conn.fetchrow(
+        *_q_maintenance_get_last_reencrypted(
+            realm_internal_id=realm_internal_id, encryption_revision=encryption_revision
         )
     )
+    if last:
+        rep = await conn.fetch(
+            *_q_maintenance_get_reencryption_batch_after(
+                realm_internal_id=realm_internal_id,
+                encryption_revision=encryption_revision,
+                last_vlob_id=last["vlob_id"],
+                last_version=last["version"],
+                size=size,
+            )
+        )
+    if not rep:
+        rep = await conn.fetch(
+            *_q_maintenance_get_reencryption_batch(
+                realm_internal_id=realm_internal_id,
+                encryption_revision=encryption_revision,
+                size=size,
+            )
+        )
     return [(row["vlob_id"], row["version"], row["blob"]) for row in rep]
 
 
 @query(in_transaction=True)
 async def query_maintenance_save_reencryption_batch(
     conn,
+    internal_ids,
     organization_id: OrganizationID,
     author: DeviceID,
     realm_id: UUID,
     encryption_revision: int,
     batch: List[Tuple[UUID, int, bytes]],
 ) -> Tuple[int, int]:
-    await _check_realm_and_maintenance_access(
-        conn, organization_id, author, realm_id, encryption_revision
+    realm_internal_id = await _check_realm_and_maintenance_access(
+        conn, internal_ids, organization_id, author, realm_id, encryption_revision
     )
-    for vlob_id, version, blob in batch:
+    rows = await conn.fetch(
+        *_q_maintenance_save_reencryption_batch(
+            realm_internal_id=realm_internal_id,
+            encryption_revision=encryption_revision,
+            vlob_ids=[vlob_id for vlob_id, _, _ in batch],
+            versions=[version for _, version, _ in batch],
+            blobs=[blob for _, _, blob in batch],
+        )
+    )
+    reencrypted_size = sum(row["size"] for row in rows)
+
+    if reencrypted_size:
         await conn.execute(
-            *_q_maintenance_save_reencryption_batch(
-                organization_id=organization_id,
-                realm_id=realm_id,
-                vlob_id=vlob_id,
-                version=version,
-                encryption_revision=encryption_revision,
-                blob=blob,
-                blob_len=len(blob),
+            *_q_increment_realm_reencrypted_vlobs_size(
+                realm_internal_id=realm_internal_id, size=reencrypted_size
             )
         )
 
     rep = await conn.fetchrow(
         *_q_maintenance_save_reencryption_batch_get_stat(
-            organization_id=organization_id,
-            realm_id=realm_id,
-            encryption_revision=encryption_revision,
+            realm_internal_id=realm_internal_id, encryption_revision=encryption_revision
         )
     )
 
@@ -2,16 +2,21 @@
 
 import pendulum
 from uuid import UUID
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 
 from parsec.api.protocol import DeviceID, OrganizationID
-from parsec.backend.vlob import VlobVersionError, VlobNotFoundError
+from parsec.backend.vlob import (
+    VlobError,
+    VlobAccessError,
+    VlobVersionError,
+    VlobNotFoundError,
+    VlobInMaintenanceError,
+)
 from parsec.backend.realm import RealmRole
 from parsec.backend.postgresql.utils import (
     Q,
     query,
     q_device,
-    q_realm_internal_id,
     q_organization_internal_id,
     q_vlob_encryption_revision_internal_id,
 )
@@ -33,8 +38,7 @@ FROM vlob_atom
 WHERE
     vlob_encryption_revision = {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision",
         )
     }
@@ -55,8 +59,7 @@ FROM vlob_atom
 WHERE
     vlob_encryption_revision = {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision",
         )
     }
@@ -79,8 +82,7 @@ FROM vlob_atom
 WHERE
     vlob_encryption_revision = {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision",
         )
     }
@@ -90,17 +92,68 @@ WHERE
 )
 
 
+_q_batch_read_data_without_timestamp = Q(
+    f"""
+SELECT DISTINCT ON (vlob_id)
+    vlob_id,
+    version,
+    blob,
+    { q_device(_id="author", select="device_id") } as author,
+    created_on
+FROM vlob_atom
+WHERE
+    vlob_encryption_revision = {
+        q_vlob_encryption_revision_internal_id(
+            realm="$realm_internal_id",
+            encryption_revision="$encryption_revision",
+        )
+    }
+    AND vlob_id = ANY($vlob_ids::UUID[])
+ORDER BY vlob_id, version DESC
+"""
+)
+
+
+_q_batch_read_data_with_timestamp = Q(
+    f"""
+SELECT DISTINCT ON (vlob_id)
+    vlob_id,
+    version,
+    blob,
+    { q_device(_id="author", select="device_id") } as author,
+    created_on
+FROM vlob_atom
+WHERE
+    vlob_encryption_revision = {
+        q_vlob_encryption_revision_internal_id(
+            realm="$realm_internal_id",
+            encryption_revision="$encryption_revision",
+        )
+    }
+    AND vlob_id = ANY($vlob_ids::UUID[])
+    AND created_on <= $timestamp
+ORDER BY vlob_id, version DESC
+"""
+)
+
+
 async def _check_realm_and_read_access(
-    conn, organization_id, author, realm_id, encryption_revision
+    conn, internal_ids, organization_id, author, realm_id, encryption_revision
 ):
-    await _check_realm(conn, organization_id, realm_id, encryption_revision)
+    realm_internal_id = await _check_realm(
+        conn, internal_ids, organization_id, realm_id, encryption_revision
+    )
     can_read_roles = (RealmRole.OWNER, RealmRole.MANAGER, RealmRole.CONTRIBUTOR, RealmRole.READER)
-    await _check_realm_access(conn, organization_id, realm_id, author, can_read_roles)
+    await _check_realm_access(
+        conn, internal_ids, organization_id, realm_internal_id, author, can_read_roles
+    )
+    return realm_internal_id
 
 
 @query(in_transaction=True)
 async def query_read(
     conn,
+    internal_ids,
     organization_id: OrganizationID,
     author: DeviceID,
     encryption_revision: int,
@@ -108,15 +161,16 @@ async def query_read(
     version: Optional[int] = None,
     timestamp: Optional[pendulum.DateTime] = None,
 ) -> Tuple[int, bytes, DeviceID, pendulum.DateTime]:
-    realm_id = await _get_realm_id_from_vlob_id(conn, organization_id, vlob_id)
-    await _check_realm_and_read_access(conn, organization_id, author, realm_id, encryption_revision)
+    realm_id = await _get_realm_id_from_vlob_id(conn, internal_ids, organization_id, vlob_id)
+    realm_internal_id = await _check_realm_and_read_access(
+        conn, internal_ids, organization_id, author, realm_id, encryption_revision
+    )
 
     if version is None:
         if timestamp is None:
             data = await conn.fetchrow(
                 *_q_read_data_without_timestamp(
-                    organization_id=organization_id,
-                    realm_id=realm_id,
+                    realm_internal_id=realm_internal_id,
                     encryption_revision=encryption_revision,
                     vlob_id=vlob_id,
                 )
@@ -126,8 +180,7 @@ async def query_read(
         else:
             data = await conn.fetchrow(
                 *_q_read_data_with_timestamp(
-                    organization_id=organization_id,
-                    realm_id=realm_id,
+                    realm_internal_id=realm_internal_id,
                     encryption_revision=encryption_revision,
                     vlob_id=vlob_id,
                     timestamp=timestamp,
@@ -139,8 +192,7 @@ async def query_read(
     else:
         data = await conn.fetchrow(
             *_q_read_data_with_version(
-                organization_id=organization_id,
-                realm_id=realm_id,
+                realm_internal_id=realm_internal_id,
                 encryption_revision=encryption_revision,
                 vlob_id=vlob_id,
                 version=version,
@@ -152,18 +204,65 @@ async def query_read(
     return list(data)
 
 
+@query(in_transaction=True)
+async def query_batch_read(
+    conn,
+    internal_ids,
+    organization_id: OrganizationID,
+    author: DeviceID,
+    realm_id: UUID,
+    encryption_revision: int,
+    vlob_ids: List[UUID],
+    timestamp: Optional[pendulum.DateTime] = None,
+) -> List[Tuple[UUID, int, bytes, DeviceID, pendulum.DateTime]]:
+    realm_internal_id = await _check_realm_and_read_access(
+        conn, internal_ids, organization_id, author, realm_id, encryption_revision
+    )
+
+    if timestamp is None:
+        rows = await conn.fetch(
+            *_q_batch_read_data_without_timestamp(
+                realm_internal_id=realm_internal_id,
+                encryption_revision=encryption_revision,
+                vlob_ids=vlob_ids,
+            )
+        )
+    else:
+        rows = await conn.fetch(
+            *_q_batch_read_data_with_timestamp(
+                realm_internal_id=realm_internal_id,
+                encryption_revision=encryption_revision,
+                vlob_ids=vlob_ids,
+                timestamp=timestamp,
+            )
+        )
+
+    return [tuple(row) for row in rows]
+
+
+# Changes are compacted to the latest update of each vlob, then ordered by the
+# index of this update so the last index of a page is a valid checkpoint
+# (all the remaining vlobs have been updated after it)
 _q_poll_changes = Q(
     f"""
 SELECT
     index,
     vlob_id,
-    vlob_atom.version
-FROM realm_vlob_update
-LEFT JOIN vlob_atom ON realm_vlob_update.vlob_atom = vlob_atom._id
-WHERE
-    realm = { q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") }
-    AND index > $checkpoint
+    version
+FROM (
+    SELECT DISTINCT ON (vlob_atom.vlob_id)
+        realm_vlob_update.index,
+        vlob_atom.vlob_id,
+        vlob_atom.version
+    FROM realm_vlob_update
+    INNER JOIN vlob_atom ON realm_vlob_update.vlob_atom = vlob_atom._id
+    WHERE
+        realm_vlob_update.realm = $realm_internal_id
+        AND realm_vlob_update.index > $checkpoint
+    ORDER BY vlob_atom.vlob_id, realm_vlob_update.index DESC
+) AS latest_changes
 ORDER BY index ASC
+LIMIT $page_size
 """
 )
 
@@ -183,14 +282,24 @@ ORDER BY version DESC
 )
 
 
-@query(in_transaction=True)
-async def query_poll_changes(
-    conn, organization_id: OrganizationID, author: DeviceID, realm_id: UUID, checkpoint: int
+async def _poll_changes(
+    conn,
+    internal_ids,
+    organization_id: OrganizationID,
+    author: DeviceID,
+    realm_id: UUID,
+    checkpoint: int,
+    page_size: Optional[int],
 ) -> Tuple[int, Dict[UUID, int]]:
-    await _check_realm_and_read_access(conn, organization_id, author, realm_id, None)
+    realm_internal_id = await _check_realm_and_read_access(
+        conn, internal_ids, organization_id, author, realm_id, None
+    )
 
+    # Note `LIMIT NULL` means no limit
     ret = await conn.fetch(
-        *_q_poll_changes(organization_id=organization_id, realm_id=realm_id, checkpoint=checkpoint)
+        *_q_poll_changes(
+            realm_internal_id=realm_internal_id, checkpoint=checkpoint, page_size=page_size
+        )
     )
 
     changes_since_checkpoint = {src_id: src_version for _, src_id, src_version in ret}
@@ -198,12 +307,47 @@ async def query_poll_changes(
     return (new_checkpoint, changes_since_checkpoint)
 
 
+@query(in_transaction=True)
+async def query_poll_changes(
+    conn,
+    internal_ids,
+    organization_id: OrganizationID,
+    author: DeviceID,
+    realm_id: UUID,
+    checkpoint: int,
+    page_size: Optional[int] = None,
+) -> Tuple[int, Dict[UUID, int]]:
+    return await _poll_changes(
+        conn, internal_ids, organization_id, author, realm_id, checkpoint, page_size
+    )
+
+
+@query(in_transaction=True)
+async def query_batch_poll_changes(
+    conn,
+    internal_ids,
+    organization_id: OrganizationID,
+    author: DeviceID,
+    checkpoints: Dict[UUID, int],
+    page_size: Optional[int] = None,
+) -> Dict[UUID, Union[Tuple[int, Dict[UUID, int]], VlobError]]:
+    results: Dict[UUID, Union[Tuple[int, Dict[UUID, int]], VlobError]] = {}
+    for realm_id, checkpoint in checkpoints.items():
+        try:
+            results[realm_id] = await _poll_changes(
+                conn, internal_ids, organization_id, author, realm_id, checkpoint, page_size
+            )
+        except (VlobAccessError, VlobNotFoundError, VlobInMaintenanceError) as exc:
+            results[realm_id] = exc
+    return results
+
+
 @query(in_transaction=True)
 async def query_list_versions(
-    conn, organization_id: OrganizationID, author: DeviceID, vlob_id: UUID
+    conn, internal_ids, organization_id: OrganizationID, author: DeviceID, vlob_id: UUID
 ) -> Dict[int, Tuple[pendulum.DateTime, DeviceID]]:
-    realm_id = await _get_realm_id_from_vlob_id(conn, organization_id, vlob_id)
-    await _check_realm_and_read_access(conn, organization_id, author, realm_id, None)
+    realm_id = await _get_realm_id_from_vlob_id(conn, internal_ids, organization_id, vlob_id)
+    await _check_realm_and_read_access(conn, internal_ids, organization_id, author, realm_id, None)
 
     rows = await conn.fetch(*_q_list_versions(organization_id=organization_id, vlob_id=vlob_id))
     assert rows
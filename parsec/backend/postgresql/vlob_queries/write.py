@@ -5,14 +5,7 @@ from uuid import UUID
 from triopg import UniqueViolationError
 
 from parsec.api.protocol import DeviceID, OrganizationID
-from parsec.backend.postgresql.utils import (
-    Q,
-    query,
-    q_organization_internal_id,
-    q_device_internal_id,
-    q_realm_internal_id,
-    q_vlob_encryption_revision_internal_id,
-)
+from parsec.backend.postgresql.utils import Q, query, q_vlob_encryption_revision_internal_id
 from parsec.backend.vlob import (
     VlobVersionError,
     VlobTimestampError,
@@ -27,32 +20,56 @@ from parsec.backend.postgresql.vlob_queries.utils import (
 from parsec.backend.backend_events import BackendEvent
 
 
-q_vlob_updated = Q(
-    f"""
+_q_increment_realm_checkpoint_and_stats = Q(
+    """
+WITH _increment_stats AS (
+    INSERT INTO realm_stats (realm, vlobs_size)
+    VALUES ($realm_internal_id, $vlob_size)
+    ON CONFLICT (realm) DO UPDATE SET vlobs_size = realm_stats.vlobs_size + EXCLUDED.vlobs_size
+)
+INSERT INTO realm_vlob_checkpoint (
+    realm, checkpoint
+)
+VALUES ($realm_internal_id, 1)
+ON CONFLICT (realm) DO UPDATE SET checkpoint = realm_vlob_checkpoint.checkpoint + 1
+RETURNING checkpoint
+"""
+)
+
+
+_q_vlob_updated = Q(
+    """
 INSERT INTO realm_vlob_update (
 realm, index, vlob_atom
 )
-SELECT
-{ q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") },
-(
-    SELECT COALESCE(MAX(index) + 1, 1)
-    FROM realm_vlob_update
-    WHERE realm = { q_realm_internal_id(organization_id="$organization_id", realm_id="$realm_id") }
-),
-$vlob_atom_internal_id
-RETURNING index
+VALUES ($realm_internal_id, $index, $vlob_atom_internal_id)
 """
 )
 
 
 @query(in_transaction=True)
 async def query_vlob_updated(
-    conn, vlob_atom_internal_id, organization_id, author, realm_id, src_id, src_version=1
+    conn,
+    vlob_atom_internal_id,
+    vlob_size,
+    realm_internal_id,
+    organization_id,
+    author,
+    realm_id,
+    src_id,
+    src_version=1,
 ):
+    # The counter row stays locked until the end of the transaction, hence
+    # concurrent writes to the realm get consecutive indexes in commit order
     index = await conn.fetchval(
-        *q_vlob_updated(
-            organization_id=organization_id,
-            realm_id=realm_id,
+        *_q_increment_realm_checkpoint_and_stats(
+            realm_internal_id=realm_internal_id, vlob_size=vlob_size
+        )
+    )
+    await conn.execute(
+        *_q_vlob_updated(
+            realm_internal_id=realm_internal_id,
+            index=index,
             vlob_atom_internal_id=vlob_atom_internal_id,
         )
     )
@@ -70,13 +87,13 @@ async def query_vlob_updated(
 
 
 _q_get_vlob_version = Q(
-    f"""
+    """
 SELECT
     version,
     created_on
 FROM vlob_atom
 WHERE
-    organization = { q_organization_internal_id("$organization_id") }
+    organization = $organization_internal_id
     AND vlob_id = $vlob_id
 ORDER BY version DESC LIMIT 1
 """
@@ -96,11 +113,10 @@ INSERT INTO vlob_atom (
     created_on
 )
 SELECT
-    { q_organization_internal_id(organization_id="$organization_id") },
+    $organization_internal_id,
     {
         q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
+            realm="$realm_internal_id",
             encryption_revision="$encryption_revision"
         )
     },
@@ -108,7 +124,7 @@ SELECT
     $version,
     $blob,
     $blob_len,
-    { q_device_internal_id(organization_id="$organization_id", device_id="$author") },
+    $author_internal_id,
     $timestamp
 RETURNING _id
 """
@@ -118,6 +134,7 @@ RETURNING _id
 @query(in_transaction=True)
 async def query_update(
     conn,
+    internal_ids,
     organization_id: OrganizationID,
     author: DeviceID,
     encryption_revision: int,
@@ -126,13 +143,14 @@ async def query_update(
     timestamp: pendulum.DateTime,
     blob: bytes,
 ) -> None:
-    realm_id = await _get_realm_id_from_vlob_id(conn, organization_id, vlob_id)
-    await _check_realm_and_write_access(
-        conn, organization_id, author, realm_id, encryption_revision
+    realm_id = await _get_realm_id_from_vlob_id(conn, internal_ids, organization_id, vlob_id)
+    realm_internal_id = await _check_realm_and_write_access(
+        conn, internal_ids, organization_id, author, realm_id, encryption_revision
     )
+    organization_internal_id = await internal_ids.organization(conn, organization_id)
 
     previous = await conn.fetchrow(
-        *_q_get_vlob_version(organization_id=organization_id, vlob_id=vlob_id)
+        *_q_get_vlob_version(organization_internal_id=organization_internal_id, vlob_id=vlob_id)
     )
     if not previous:
         raise VlobNotFoundError(f"Vlob `{vlob_id}` doesn't exist")
@@ -146,9 +164,9 @@ async def query_update(
     try:
         vlob_atom_internal_id = await conn.fetchval(
             *_q_insert_vlob_atom(
-                organization_id=organization_id,
-                author=author,
-                realm_id=realm_id,
+                organization_internal_id=organization_internal_id,
+                author_internal_id=await internal_ids.device(conn, organization_id, author),
+                realm_internal_id=realm_internal_id,
                 encryption_revision=encryption_revision,
                 vlob_id=vlob_id,
                 blob=blob,
@@ -163,45 +181,22 @@ async def query_update(
         raise VlobVersionError()
 
     await query_vlob_updated(
-        conn, vlob_atom_internal_id, organization_id, author, realm_id, vlob_id, version
+        conn,
+        vlob_atom_internal_id,
+        len(blob),
+        realm_internal_id,
+        organization_id,
+        author,
+        realm_id,
+        vlob_id,
+        version,
     )
 
 
-_q_create = Q(
-    f"""
-INSERT INTO vlob_atom (
-    organization,
-    vlob_encryption_revision,
-    vlob_id,
-    version,
-    blob,
-    size,
-    author,
-    created_on
-)
-SELECT
-    { q_organization_internal_id("$organization_id") },
-    {
-        q_vlob_encryption_revision_internal_id(
-            organization_id="$organization_id",
-            realm_id="$realm_id",
-            encryption_revision="$encryption_revision"
-        )
-    },
-    $vlob_id,
-    1,
-    $blob,
-    $blob_len,
-    { q_device_internal_id(organization_id="$organization_id", device_id="$author") },
-    $timestamp
-RETURNING _id
-"""
-)
-
-
 @query(in_transaction=True)
 async def query_create(
     conn,
+    internal_ids,
     organization_id: OrganizationID,
     author: DeviceID,
     realm_id: UUID,
@@ -210,22 +205,23 @@ async def query_create(
     timestamp: pendulum.DateTime,
     blob: bytes,
 ) -> None:
-    await _check_realm_and_write_access(
-        conn, organization_id, author, realm_id, encryption_revision
+    realm_internal_id = await _check_realm_and_write_access(
+        conn, internal_ids, organization_id, author, realm_id, encryption_revision
     )
 
     # Actually create the vlob
     try:
         vlob_atom_internal_id = await conn.fetchval(
-            *_q_create(
-                organization_id=organization_id,
-                author=author,
-                realm_id=realm_id,
+            *_q_insert_vlob_atom(
+                organization_internal_id=await internal_ids.organization(conn, organization_id),
+                author_internal_id=await internal_ids.device(conn, organization_id, author),
+                realm_internal_id=realm_internal_id,
                 encryption_revision=encryption_revision,
                 vlob_id=vlob_id,
                 blob=blob,
                 blob_len=len(blob),
                 timestamp=timestamp,
+                version=1,
             )
         )
 
@@ -233,5 +229,12 @@ async def query_create(
         raise VlobAlreadyExistsError()
 
     await query_vlob_updated(
-        conn, vlob_atom_internal_id, organization_id, author, realm_id, vlob_id
+        conn,
+        vlob_atom_internal_id,
+        len(blob),
+        realm_internal_id,
+        organization_id,
+        author,
+        realm_id,
+        vlob_id,
     )
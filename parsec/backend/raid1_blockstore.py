@@ -2,17 +2,81 @@
 
 import trio
 from uuid import UUID
+from typing import List, Optional
+from collections import deque
+from structlog import get_logger
 
 from parsec.api.protocol import OrganizationID
 from parsec.backend.blockstore import BaseBlockStoreComponent
 from parsec.backend.block import BlockAlreadyExistsError, BlockNotFoundError, BlockTimeoutError
 
 
-class RAID1BlockStoreComponent(BaseBlockStoreComponent):
-    def __init__(self, blockstores):
-        self.blockstores = blockstores
+logger = get_logger()
 
-    async def read(self, organization_id: OrganizationID, id: UUID) -> bytes:
+# Weight of the last read in the latency moving average
+DEFAULT_LATENCY_EWMA_ALPHA = 0.2
+# Number of latencies kept per mirror to compute the hedging delay
+DEFAULT_LATENCY_WINDOW = 100
+# Percentile of the mirror latency after which another mirror is also read
+DEFAULT_HEDGE_PERCENTILE = 95
+# Hedging delay used until enough latencies are known for the mirror
+DEFAULT_HEDGE_INITIAL_DELAY = 0.1
+# Margin added to the percentile latency, avoids hedging too eagerly on fast mirrors
+DEFAULT_HEDGE_MARGIN = 0.005
+DEFAULT_HEDGE_MAX_DELAY = 2.0
+# Period during which a mirror that failed to answer is read as a last resort
+DEFAULT_MIRROR_DOWN_DURATION = 30.0
+
+
+class MirrorStats:
+    def __init__(self, window: int = DEFAULT_LATENCY_WINDOW):
+        self.ewma_latency: Optional[float] = None
+        self.latencies: deque = deque(maxlen=window)
+        # Elapsed time of the last read cancelled since the last answer, the
+        # actual latency is unknown but at least this long
+        self.latency_lower_bound: Optional[float] = None
+        self.down_until = 0.0
+
+    def add_latency(self, latency: float, alpha: float = DEFAULT_LATENCY_EWMA_ALPHA) -> None:
+        self.latencies.append(latency)
+        self.latency_lower_bound = None
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = alpha * latency + (1 - alpha) * self.ewma_latency
+
+    def add_latency_lower_bound(self, latency: float) -> None:
+        self.latency_lower_bound = latency
+
+    def estimated_latency(self) -> float:
+        return max(self.ewma_latency or 0.0, self.latency_lower_bound or 0.0)
+
+    def percentile_latency(self, percentile: float) -> Optional[float]:
+        if len(self.latencies) < 10:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def is_down(self, now: float) -> bool:
+        return now < self.down_until
+
+
+class BaseRAID1ReadStrategy:
+    async def read(
+        self, blockstores: List[BaseBlockStoreComponent], organization_id: OrganizationID, id: UUID
+    ) -> Optional[bytes]:
+        """
+        Returns: the block, or None if no mirror has been able to provide it
+        """
+        raise NotImplementedError()
+
+
+class FanOutRAID1ReadStrategy(BaseRAID1ReadStrategy):
+    """Read on all the mirrors at once and keep the first answer."""
+
+    async def read(
+        self, blockstores: List[BaseBlockStoreComponent], organization_id: OrganizationID, id: UUID
+    ) -> Optional[bytes]:
         async def _single_blockstore_read(nursery, blockstore):
             nonlocal value
             try:
@@ -23,9 +87,106 @@ class RAID1BlockStoreComponent(BaseBlockStoreComponent):
 
         value = None
         async with trio.open_service_nursery() as nursery:
-            for blockstore in self.blockstores:
+            for blockstore in blockstores:
                 nursery.start_soon(_single_blockstore_read, nursery, blockstore)
 
+        return value
+
+
+class HedgedRAID1ReadStrategy(BaseRAID1ReadStrategy):
+    """Read on the fastest healthy mirror first, and only read on the next mirror
+    if the current one fails or doesn't answer within its usual latency (i.e.
+    the given percentile of its last read latencies).
+
+    Mirrors that failed to answer are considered down for a while, during which
+    they are only read as a last resort.
+    """
+
+    def __init__(
+        self,
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        down_duration: float = DEFAULT_MIRROR_DOWN_DURATION,
+    ):
+        self.hedge_percentile = hedge_percentile
+        self.down_duration = down_duration
+        self.mirrors: List[MirrorStats] = []
+
+    def _ordered_mirrors(self, now: float) -> List[int]:
+        def _key(index):
+            stats = self.mirrors[index]
+            if stats.is_down(now):
+                return (1, stats.down_until)
+            # Mirrors without latency yet are tried first to get to know them
+            return (0, stats.estimated_latency())
+
+        return sorted(range(len(self.mirrors)), key=_key)
+
+    def _hedge_delay(self, index: int) -> float:
+        latency = self.mirrors[index].percentile_latency(self.hedge_percentile)
+        if latency is None:
+            return DEFAULT_HEDGE_INITIAL_DELAY
+        return min(latency + DEFAULT_HEDGE_MARGIN, DEFAULT_HEDGE_MAX_DELAY)
+
+    async def read(
+        self, blockstores: List[BaseBlockStoreComponent], organization_id: OrganizationID, id: UUID
+    ) -> Optional[bytes]:
+        async def _single_blockstore_read(nursery, index, done):
+            nonlocal value
+            stats = self.mirrors[index]
+            start = trio.current_time()
+            try:
+                value = await blockstores[index].read(organization_id, id)
+                stats.add_latency(trio.current_time() - start)
+                nursery.cancel_scope.cancel()
+
+            except BlockNotFoundError:
+                # The mirror is healthy but may have missed the block creation
+                stats.add_latency(trio.current_time() - start)
+
+            except BlockTimeoutError as exc:
+                stats.down_until = trio.current_time() + self.down_duration
+                logger.warning(
+                    f"Cannot reach RAID1 blockstore #{index} to read block {id}", exc_info=exc
+                )
+
+            except trio.Cancelled:
+                # A hedged read has been faster, the mirror is at least this slow.
+                # This is not an actual latency, so it is kept out of the average
+                # and percentile (it would drag them toward the faster mirror's)
+                stats.add_latency_lower_bound(trio.current_time() - start)
+                raise
+
+            finally:
+                done.set()
+
+        while len(self.mirrors) < len(blockstores):
+            self.mirrors.append(MirrorStats())
+
+        value = None
+        async with trio.open_service_nursery() as nursery:
+            for index in self._ordered_mirrors(trio.current_time()):
+                done = trio.Event()
+                nursery.start_soon(_single_blockstore_read, nursery, index, done)
+                with trio.move_on_after(self._hedge_delay(index)):
+                    await done.wait()
+
+        return value
+
+
+RAID1_READ_STRATEGIES = {"FANOUT": FanOutRAID1ReadStrategy, "HEDGED": HedgedRAID1ReadStrategy}
+
+
+class RAID1BlockStoreComponent(BaseBlockStoreComponent):
+    def __init__(self, blockstores, read_strategy: str = "HEDGED"):
+        self.blockstores = blockstores
+        try:
+            self.read_strategy = RAID1_READ_STRATEGIES[read_strategy]()
+        except KeyError:
+            raise ValueError(f"Unknown RAID1 read strategy `{read_strategy}`")
+
+    async def read(self, organization_id: OrganizationID, id: UUID) -> bytes:
+        value = await self.read_strategy.read(self.blockstores, organization_id, id)
+
         if not value:
             raise BlockNotFoundError()
 
@@ -15,10 +15,12 @@ from parsec.backend.block import BlockAlreadyExistsError, BlockNotFoundError, Bl
 logger = get_logger()
 
 
-def _xor_buffers(*buffers):
+def _xor_buffers(*buffers) -> bytes:
+    # Each buffer is XORed in a single operation as a big integer, CPython
+    # processes them in C by machine-word digits (so no per-byte Python loop)
     buff_len = len(buffers[0])
-    xored = int.from_bytes(buffers[0], byteorder)
-    for buff in buffers[1:]:
+    xored = 0
+    for buff in buffers:
         assert len(buff) == buff_len
         xored ^= int.from_bytes(buff, byteorder)
     return xored.to_bytes(buff_len, byteorder)
@@ -29,11 +31,20 @@ def split_block_in_chunks(block: bytes, nb_chunks: int) -> List[bytes]:
     chunk_len = payload_size // nb_chunks
     if nb_chunks * chunk_len < payload_size:
         chunk_len += 1
-    padding_len = chunk_len * nb_chunks - payload_size
 
-    payload = struct.pack("!I", len(block)) + block + b"\x00" * padding_len
+    # Payload is `<block len><block><padding>`, each chunk is built directly from
+    # its parts of the payload so the block data is only copied once
+    header = struct.pack("!I", len(block))
+    view = memoryview(block)
+    chunks = []
+    for start in range(0, chunk_len * nb_chunks, chunk_len):
+        end = start + chunk_len
+        header_part = header[start:end]
+        block_part = view[max(start - 4, 0) : max(end - 4, 0)]
+        padding_len = chunk_len - len(header_part) - len(block_part)
+        chunks.append(b"".join((header_part, block_part, b"\x00" * padding_len)))
 
-    return [payload[chunk_len * i : chunk_len * (i + 1)] for i in range(nb_chunks)]
+    return chunks
 
 
 def generate_checksum_chunk(chunks: List[bytes]) -> bytes:
@@ -43,16 +54,33 @@ def generate_checksum_chunk(chunks: List[bytes]) -> bytes:
 def rebuild_block_from_chunks(chunks: List[Optional[bytes]], checksum_chunk: bytes) -> bytes:
     valid_chunks = [chunk for chunk in chunks if chunk is not None]
     assert len(chunks) - len(valid_chunks) <= 1  # Cannot correct more than 1 chunk
-    try:
-        missing_chunk_id = next(index for index, chunk in enumerate(chunks) if chunk is None)
+    if len(valid_chunks) < len(chunks):
         assert checksum_chunk is not None
-        chunks[missing_chunk_id] = _xor_buffers(*valid_chunks, checksum_chunk)
-    except StopIteration:
-        pass
-
-    payload = b"".join(chunks)
-    block_len, = struct.unpack("!I", payload[:4])
-    return payload[4 : 4 + block_len]
+        missing_chunk = _xor_buffers(*valid_chunks, checksum_chunk)
+        chunks = [missing_chunk if chunk is None else chunk for chunk in chunks]
+
+    views = [memoryview(chunk) for chunk in chunks]
+    if len(views[0]) >= 4:
+        header = views[0][:4]
+    else:
+        header = b"".join(views)[:4]
+    block_len, = struct.unpack("!I", header)
+
+    # Only the block data is copied, the header and padding are skipped
+    block_parts = []
+    to_skip = 4
+    remaining = block_len
+    for view in views:
+        if to_skip >= len(view):
+            to_skip -= len(view)
+            continue
+        block_part = view[to_skip : to_skip + remaining]
+        to_skip = 0
+        remaining -= len(block_part)
+        block_parts.append(block_part)
+        if not remaining:
+            break
+    return b"".join(block_parts)
 
 
 class RAID5BlockStoreComponent(BaseBlockStoreComponent):
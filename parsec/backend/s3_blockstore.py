@@ -1,12 +1,16 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
+import attr
 import trio
 import boto3
+from time import monotonic
+from botocore.config import Config as S3Config
 from botocore.exceptions import (
     ClientError as S3ClientError,
     EndpointConnectionError as S3EndpointConnectionError,
 )
 from uuid import UUID
+from typing import Dict
 from functools import partial
 
 from parsec.api.protocol import OrganizationID
@@ -14,8 +18,48 @@ from parsec.backend.blockstore import BaseBlockStoreComponent
 from parsec.backend.block import BlockAlreadyExistsError, BlockNotFoundError, BlockTimeoutError
 
 
+# Maximum number of S3 requests running concurrently, each one of them
+# occupies a worker thread and an HTTP connection from the pool
+DEFAULT_S3_MAX_WORKERS = 32
+DEFAULT_S3_CONNECT_TIMEOUT = 5
+DEFAULT_S3_READ_TIMEOUT = 30
+DEFAULT_S3_MAX_ATTEMPTS = 3
+
+
+@attr.s(slots=True, auto_attribs=True)
+class S3OperationStats:
+    count: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+    def add(self, duration: float, error: bool) -> None:
+        self.count += 1
+        self.errors += error
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+
+
+def _add_if_none_match_header(params, **kwargs):
+    # Turn PutObject into a conditional write: the object is only created if
+    # no object exists for this key, otherwise a 412 error is returned
+    params["headers"]["If-None-Match"] = "*"
+
+
 class S3BlockStoreComponent(BaseBlockStoreComponent):
-    def __init__(self, s3_region, s3_bucket, s3_key, s3_secret, s3_endpoint_url=None):
+    def __init__(
+        self,
+        s3_region,
+        s3_bucket,
+        s3_key,
+        s3_secret,
+        s3_endpoint_url=None,
+        max_workers=DEFAULT_S3_MAX_WORKERS,
+    ):
         self._s3 = None
         self._s3_bucket = None
         self._s3 = boto3.client(
@@ -24,17 +68,76 @@ class S3BlockStoreComponent(BaseBlockStoreComponent):
             aws_access_key_id=s3_key,
             aws_secret_access_key=s3_secret,
             endpoint_url=s3_endpoint_url,
+            config=S3Config(
+                # Each worker has its own connection so no request ever waits
+                # for a free connection once it got a worker
+                max_pool_connections=max_workers,
+                connect_timeout=DEFAULT_S3_CONNECT_TIMEOUT,
+                read_timeout=DEFAULT_S3_READ_TIMEOUT,
+                retries={"max_attempts": DEFAULT_S3_MAX_ATTEMPTS},
+            ),
         )
+        self._s3.meta.events.register("before-call.s3.PutObject", _add_if_none_match_header)
         self._s3_bucket = s3_bucket
         self._s3.head_bucket(Bucket=s3_bucket)
+        # boto3 is synchronous, hence all the requests are done in threads
+        # (given the limiter is shared, a burst of requests on the S3 blockstore
+        # queues up here instead of spawning an unbounded number of threads)
+        self._limiter = trio.CapacityLimiter(max_workers)
+        self.stats: Dict[str, S3OperationStats] = {
+            "read": S3OperationStats(),
+            "create": S3OperationStats(),
+        }
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            operation: {
+                "count": stats.count,
+                "errors": stats.errors,
+                "mean_time": stats.mean_time,
+                "max_time": stats.max_time,
+            }
+            for operation, stats in self.stats.items()
+        }
+
+    async def _run_in_worker(self, operation: str, fn, *args, **kwargs):
+        duration = None
+
+        def _timed_fn():
+            nonlocal duration
+            start = monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # Only the S3 request is measured (not the wait for a worker)
+                duration = monotonic() - start
+
+        error = True
+        try:
+            result = await trio.to_thread.run_sync(_timed_fn, limiter=self._limiter)
+            error = False
+            return result
+        finally:
+            # Stats are only updated from the trio thread, hence no lock is needed
+            if duration is not None:
+                self.stats[operation].add(duration, error)
+
+    def _sync_read(self, slug: str) -> bytes:
+        obj = self._s3.get_object(Bucket=self._s3_bucket, Key=slug)
+        # Stream the body from within the worker thread
+        body = obj["Body"]
+        try:
+            return body.read()
+        finally:
+            body.close()
 
     async def read(self, organization_id: OrganizationID, id: UUID) -> bytes:
         slug = f"{organization_id}/{id}"
         try:
-            obj = self._s3.get_object(Bucket=self._s3_bucket, Key=slug)
+            return await self._run_in_worker("read", self._sync_read, slug)
 
         except S3ClientError as exc:
-            if exc.response["Error"]["Code"] == "404":
+            if exc.response["Error"]["Code"] in ("404", "NoSuchKey"):
                 raise BlockNotFoundError() from exc
 
             else:
@@ -43,26 +146,19 @@ class S3BlockStoreComponent(BaseBlockStoreComponent):
         except S3EndpointConnectionError as exc:
             raise BlockTimeoutError() from exc
 
-        return obj["Body"].read()
-
     async def create(self, organization_id: OrganizationID, id: UUID, block: bytes) -> None:
         slug = f"{organization_id}/{id}"
         try:
-            await trio.to_thread.run_sync(
-                partial(self._s3.head_object, Bucket=self._s3_bucket, Key=slug)
+            await self._run_in_worker(
+                "create", partial(self._s3.put_object, Bucket=self._s3_bucket, Key=slug, Body=block)
             )
+
         except S3ClientError as exc:
-            if exc.response["Error"]["Code"] == "404":
-                try:
-                    await trio.to_thread.run_sync(
-                        partial(self._s3.put_object, Bucket=self._s3_bucket, Key=slug, Body=block)
-                    )
-                except (S3ClientError, S3EndpointConnectionError) as exc:
-                    raise BlockTimeoutError() from exc
+            if exc.response["Error"]["Code"] in ("412", "PreconditionFailed"):
+                raise BlockAlreadyExistsError() from exc
+
             else:
                 raise BlockTimeoutError() from exc
 
         except S3EndpointConnectionError as exc:
             raise BlockTimeoutError() from exc
-        else:
-            raise BlockAlreadyExistsError()
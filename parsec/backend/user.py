@@ -3,7 +3,7 @@
 from parsec.backend.backend_events import BackendEvent
 import trio
 import attr
-from typing import List, Optional, Tuple
+from typing import FrozenSet, List, Optional, Tuple
 import pendulum
 
 from parsec.utils import timestamps_in_the_ballpark
@@ -122,6 +122,15 @@ class Trustchain:
     devices: Tuple[bytes, ...]
 
 
+@attr.s(slots=True, frozen=True, auto_attribs=True)
+class KnownTrustchain:
+    """Trustchain certificates already held by the client, hence not to be returned"""
+
+    users: FrozenSet[UserID] = frozenset()
+    revoked_users: FrozenSet[UserID] = frozenset()
+    devices: FrozenSet[DeviceID] = frozenset()
+
+
 @attr.s(slots=True, auto_attribs=True)
 class GetUserAndDevicesResult:
     user_certificate: bytes
@@ -180,10 +189,21 @@ class BaseUserComponent:
     async def api_user_get(self, client_ctx, msg):
         msg = user_get_serializer.req_load(msg)
         need_redacted = client_ctx.profile == UserProfile.OUTSIDER
+        if msg["known_trustchain"]:
+            known_trustchain = KnownTrustchain(
+                users=frozenset(msg["known_trustchain"]["users"]),
+                revoked_users=frozenset(msg["known_trustchain"]["revoked_users"]),
+                devices=frozenset(msg["known_trustchain"]["devices"]),
+            )
+        else:
+            known_trustchain = None
 
         try:
             result = await self.get_user_with_devices_and_trustchain(
-                client_ctx.organization_id, msg["user_id"], redacted=need_redacted
+                client_ctx.organization_id,
+                msg["user_id"],
+                redacted=need_redacted,
+                known_trustchain=known_trustchain,
             )
         except UserNotFoundError:
             return {"status": "not_found"}
@@ -919,9 +939,15 @@ class BaseUserComponent:
         raise NotImplementedError()
 
     async def get_user_with_devices_and_trustchain(
-        self, organization_id: OrganizationID, user_id: UserID, redacted: bool = False
+        self,
+        organization_id: OrganizationID,
+        user_id: UserID,
+        redacted: bool = False,
+        known_trustchain: Optional[KnownTrustchain] = None,
     ) -> GetUserAndDevicesResult:
         """
+        Certificates from `known_trustchain` are omitted from the returned trustchain.
+
         Raises:
             UserNotFoundError
         """
@@ -88,6 +88,11 @@ async def run_with_breathing_transport(transport, fn, *args, **kwargs):
     online and handles websocket pings
     """
 
+    if transport.handshake.multiplexing:
+        # The connection is already monitored by the requests reading loop,
+        # and a new request doesn't cancel the ones in flight
+        return await fn(*args, **kwargs)
+
     rep = None
 
     async def _keep_transport_breathing():
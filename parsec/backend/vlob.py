@@ -1,6 +1,6 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Union
 from uuid import UUID
 import pendulum
 
@@ -10,8 +10,10 @@ from parsec.api.protocol import (
     OrganizationID,
     vlob_create_serializer,
     vlob_read_serializer,
+    vlob_batch_read_serializer,
     vlob_update_serializer,
     vlob_poll_changes_serializer,
+    vlob_batch_poll_changes_serializer,
     vlob_list_versions_serializer,
     vlob_maintenance_get_reencryption_batch_serializer,
     vlob_maintenance_save_reencryption_batch_serializer,
@@ -124,6 +126,42 @@ class BaseVlobComponent:
             }
         )
 
+    @api("vlob_batch_read")
+    @catch_protocol_errors
+    async def api_vlob_batch_read(self, client_ctx, msg):
+        msg = vlob_batch_read_serializer.req_load(msg)
+
+        try:
+            vlobs = await self.batch_read(client_ctx.organization_id, client_ctx.device_id, **msg)
+
+        except VlobNotFoundError as exc:
+            return vlob_batch_read_serializer.rep_dump({"status": "not_found", "reason": str(exc)})
+
+        except VlobAccessError:
+            return vlob_batch_read_serializer.rep_dump({"status": "not_allowed"})
+
+        except VlobEncryptionRevisionError:
+            return vlob_batch_read_serializer.rep_dump({"status": "bad_encryption_revision"})
+
+        except VlobInMaintenanceError:
+            return vlob_batch_read_serializer.rep_dump({"status": "in_maintenance"})
+
+        return vlob_batch_read_serializer.rep_dump(
+            {
+                "status": "ok",
+                "vlobs": [
+                    {
+                        "vlob_id": vlob_id,
+                        "version": version,
+                        "blob": blob,
+                        "author": author,
+                        "timestamp": created_on,
+                    }
+                    for vlob_id, version, blob, author, created_on in vlobs
+                ],
+            }
+        )
+
     @api("vlob_update")
     @catch_protocol_errors
     async def api_vlob_update(self, client_ctx, msg):
@@ -161,13 +199,13 @@ class BaseVlobComponent:
     async def api_vlob_poll_changes(self, client_ctx, msg):
         msg = vlob_poll_changes_serializer.req_load(msg)
 
-        # TODO: raise error if too many events since offset ?
         try:
             checkpoint, changes = await self.poll_changes(
                 client_ctx.organization_id,
                 client_ctx.device_id,
                 msg["realm_id"],
                 msg["last_checkpoint"],
+                msg["page_size"],
             )
 
         except VlobAccessError:
@@ -185,6 +223,33 @@ class BaseVlobComponent:
             {"status": "ok", "current_checkpoint": checkpoint, "changes": changes}
         )
 
+    @api("vlob_batch_poll_changes")
+    @catch_protocol_errors
+    async def api_vlob_batch_poll_changes(self, client_ctx, msg):
+        msg = vlob_batch_poll_changes_serializer.req_load(msg)
+
+        results = await self.batch_poll_changes(
+            client_ctx.organization_id, client_ctx.device_id, msg["realms"], msg["page_size"]
+        )
+
+        realms = {}
+        for realm_id, result in results.items():
+            if isinstance(result, VlobAccessError):
+                realms[realm_id] = {"status": "not_allowed"}
+            elif isinstance(result, VlobNotFoundError):
+                realms[realm_id] = {"status": "not_found"}
+            elif isinstance(result, VlobInMaintenanceError):
+                realms[realm_id] = {"status": "in_maintenance"}
+            else:
+                checkpoint, changes = result
+                realms[realm_id] = {
+                    "status": "ok",
+                    "current_checkpoint": checkpoint,
+                    "changes": changes,
+                }
+
+        return vlob_batch_poll_changes_serializer.rep_dump({"status": "ok", "realms": realms})
+
     @api("vlob_list_versions")
     @catch_protocol_errors
     async def api_vlob_list_versions(self, client_ctx, msg):
@@ -329,6 +394,28 @@ class BaseVlobComponent:
         """
         raise NotImplementedError()
 
+    async def batch_read(
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        realm_id: UUID,
+        encryption_revision: int,
+        vlob_ids: List[UUID],
+        timestamp: Optional[pendulum.DateTime] = None,
+    ) -> List[Tuple[UUID, int, bytes, DeviceID, pendulum.DateTime]]:
+        """
+        Read the last version (or the last version at `timestamp`) of the given
+        vlobs. Vlobs that are not part of the realm (or don't exist at the given
+        timestamp) are omitted from the result.
+
+        Raises:
+            VlobAccessError
+            VlobNotFoundError: if the realm doesn't exist
+            VlobEncryptionRevisionError: if encryption_revision mismatch
+            VlobInMaintenanceError
+        """
+        raise NotImplementedError()
+
     async def update(
         self,
         organization_id: OrganizationID,
@@ -351,9 +438,19 @@ class BaseVlobComponent:
         raise NotImplementedError()
 
     async def poll_changes(
-        self, organization_id: OrganizationID, author: DeviceID, realm_id: UUID, checkpoint: int
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        realm_id: UUID,
+        checkpoint: int,
+        page_size: Optional[int] = None,
     ) -> Tuple[int, Dict[UUID, int]]:
         """
+        Returns: the checkpoint to continue from, and the latest version of each
+        vlob changed between `checkpoint` and it. If `page_size` is provided,
+        at most `page_size` vlobs are returned and the next ones can be polled
+        from the returned checkpoint.
+
         Raises:
             VlobInMaintenanceError
             VlobNotFoundError
@@ -361,6 +458,20 @@ class BaseVlobComponent:
         """
         raise NotImplementedError()
 
+    async def batch_poll_changes(
+        self,
+        organization_id: OrganizationID,
+        author: DeviceID,
+        checkpoints: Dict[UUID, int],
+        page_size: Optional[int] = None,
+    ) -> Dict[UUID, Union[Tuple[int, Dict[UUID, int]], VlobError]]:
+        """
+        Same as `poll_changes`, but for multiple realms at once (`checkpoints`
+        being a realm ID -> checkpoint mapping). A realm that cannot be polled
+        is associated with the error `poll_changes` would have raised for it.
+        """
+        raise NotImplementedError()
+
     async def list_versions(
         self, organization_id: OrganizationID, author: DeviceID, vlob_id: UUID
     ) -> Dict[int, Tuple[pendulum.DateTime, DeviceID]]:
@@ -42,6 +42,7 @@ class BackendAuthenticatedCmds:
 
     events_subscribe = expose_cmds_with_retrier(cmds.events_subscribe)
     events_listen = expose_cmds_with_retrier(cmds.events_listen)
+    events_batch_listen = expose_cmds_with_retrier(cmds.events_batch_listen)
     ping = expose_cmds_with_retrier(cmds.ping)
     message_get = expose_cmds_with_retrier(cmds.message_get)
     user_get = expose_cmds_with_retrier(cmds.user_get)
@@ -65,8 +66,10 @@ class BackendAuthenticatedCmds:
     block_create = expose_cmds_with_retrier(cmds.block_create)
     block_read = expose_cmds_with_retrier(cmds.block_read)
     vlob_poll_changes = expose_cmds_with_retrier(cmds.vlob_poll_changes)
+    vlob_batch_poll_changes = expose_cmds_with_retrier(cmds.vlob_batch_poll_changes)
     vlob_create = expose_cmds_with_retrier(cmds.vlob_create)
     vlob_read = expose_cmds_with_retrier(cmds.vlob_read)
+    vlob_batch_read = expose_cmds_with_retrier(cmds.vlob_batch_read)
     vlob_update = expose_cmds_with_retrier(cmds.vlob_update)
     vlob_list_versions = expose_cmds_with_retrier(cmds.vlob_list_versions)
     vlob_maintenance_get_reencryption_batch = expose_cmds_with_retrier(
@@ -97,6 +100,12 @@ def _handle_event(event_bus: EventBus, rep: dict) -> None:
         logger.warning("Bad response to `events_listen` command", rep=rep)
         return
 
+    # `events_batch_listen` returns a list of events, `events_listen` a single one
+    for event in rep.get("events", (rep,)):
+        _handle_single_event(event_bus, event)
+
+
+def _handle_single_event(event_bus: EventBus, rep: dict) -> None:
     if rep["event"] == APIEvent.MESSAGE_RECEIVED:
         event_bus.send(CoreEvent.BACKEND_MESSAGE_RECEIVED, index=rep["index"])
 
@@ -133,10 +142,14 @@ def _handle_event(event_bus: EventBus, rep: dict) -> None:
         )
 
 
-def _transport_pool_factory(addr, device_id, signing_key, max_pool, keepalive):
+def _transport_pool_factory(addr, device_id, signing_key, max_pool, keepalive, multiplexing):
     async def _connect():
         transport = await connect_as_authenticated(
-            addr, device_id=device_id, signing_key=signing_key, keepalive=keepalive
+            addr,
+            device_id=device_id,
+            signing_key=signing_key,
+            keepalive=keepalive,
+            multiplexing=multiplexing,
         )
         transport.logger = transport.logger.bind(device_id=device_id)
         return transport
@@ -154,13 +167,14 @@ class BackendAuthenticatedConn:
         max_cooldown: int = 30,
         max_pool: int = 4,
         keepalive: Optional[int] = None,
+        multiplexing: bool = False,
     ):
         if max_pool < 2:
             raise ValueError("max_pool must be at least 2 (for event listener + query sender)")
 
         self._started = False
         self._transport_pool = _transport_pool_factory(
-            addr, device_id, signing_key, max_pool, keepalive
+            addr, device_id, signing_key, max_pool, keepalive, multiplexing
         )
         self._status = BackendConnStatus.LOST
         self._status_exc = None
@@ -304,8 +318,16 @@ class BackendAuthenticatedConn:
 
                     self.set_status(BackendConnStatus.READY)
 
+                    batch_listen_supported = True
                     while True:
-                        rep = await cmds.events_listen(transport, wait=True)
+                        if batch_listen_supported:
+                            rep = await cmds.events_batch_listen(transport, wait=True)
+                            if rep["status"] == "unknown_command":
+                                # Backend is too old, `events_batch_listen` has been added in api v2.7
+                                batch_listen_supported = False
+                                continue
+                        else:
+                            rep = await cmds.events_listen(transport, wait=True)
                         _handle_event(self.event_bus, rep)
 
             finally:
@@ -1,6 +1,6 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
-from typing import Tuple, List, Dict, Optional
+from typing import Tuple, List, Dict, Optional, Union
 from uuid import UUID
 import pendulum
 from pendulum import DateTime
@@ -40,11 +40,15 @@ from parsec.api.protocol import (
     apiv1_organization_bootstrap_serializer,
     events_subscribe_serializer,
     events_listen_serializer,
+    events_batch_listen_serializer,
+    EVENTS_BATCH_LISTEN_MAX_SIZE,
     message_get_serializer,
     vlob_read_serializer,
+    vlob_batch_read_serializer,
     vlob_create_serializer,
     vlob_update_serializer,
     vlob_poll_changes_serializer,
+    vlob_batch_poll_changes_serializer,
     vlob_list_versions_serializer,
     vlob_maintenance_get_reencryption_batch_serializer,
     vlob_maintenance_save_reencryption_batch_serializer,
@@ -75,9 +79,10 @@ from parsec.api.protocol import (
 )
 from parsec.core.types import EntryID
 from parsec.core.backend_connection.exceptions import BackendNotAvailable, BackendProtocolError
+from parsec.core.backend_connection.transport import MultiplexedTransport
 
 
-async def _send_cmd(transport: Transport, serializer, **req) -> dict:
+async def _send_cmd(transport: Union[Transport, MultiplexedTransport], serializer, **req) -> dict:
     """
     Raises:
         Backend
@@ -91,6 +96,9 @@ async def _send_cmd(transport: Transport, serializer, **req) -> dict:
     """
     transport.logger.info("Request", cmd=req["cmd"])
 
+    if isinstance(transport, MultiplexedTransport):
+        return await _send_multiplexed_cmd(transport, serializer, req)
+
     try:
         raw_req = serializer.req_dumps(req)
 
@@ -120,6 +128,39 @@ async def _send_cmd(transport: Transport, serializer, **req) -> dict:
     return rep
 
 
+async def _send_multiplexed_cmd(transport: MultiplexedTransport, serializer, req: dict) -> dict:
+    try:
+        dumped_req = serializer.req_dump(req)
+
+    except ProtocolError as exc:
+        transport.logger.exception("Invalid request data", cmd=req["cmd"], error=exc)
+        raise BackendProtocolError("Invalid request data") from exc
+
+    try:
+        rep = await transport.request(dumped_req)
+
+    except TransportError as exc:
+        transport.logger.debug("Request failed (backend not available)", cmd=req["cmd"])
+        raise BackendNotAvailable(exc) from exc
+
+    except ProtocolError as exc:
+        transport.logger.exception("Invalid response data", cmd=req["cmd"], error=exc)
+        raise BackendProtocolError("Invalid response data") from exc
+
+    try:
+        rep = serializer.rep_load(rep)
+
+    except ProtocolError as exc:
+        transport.logger.exception("Invalid response data", cmd=req["cmd"], error=exc)
+        raise BackendProtocolError("Invalid response data") from exc
+
+    if rep["status"] == "invalid_msg_format":
+        transport.logger.error("Invalid request data according to backend", cmd=req["cmd"], rep=rep)
+        raise BackendProtocolError("Invalid request data according to backend")
+
+    return rep
+
+
 ###  Backend authenticated cmds  ###
 
 ### Organization API ###
@@ -144,11 +185,25 @@ async def events_listen(transport: Transport, wait: bool = True) -> dict:
     return await _send_cmd(transport, events_listen_serializer, cmd="events_listen", wait=wait)
 
 
+async def events_batch_listen(
+    transport: Transport, wait: bool = True, max_events: int = EVENTS_BATCH_LISTEN_MAX_SIZE
+) -> dict:
+    return await _send_cmd(
+        transport,
+        events_batch_listen_serializer,
+        cmd="events_batch_listen",
+        wait=wait,
+        max_events=max_events,
+    )
+
+
 ### Message API ###
 
 
-async def message_get(transport: Transport, offset: int) -> dict:
-    return await _send_cmd(transport, message_get_serializer, cmd="message_get", offset=offset)
+async def message_get(transport: Transport, offset: int, page_size: Optional[int] = None) -> dict:
+    return await _send_cmd(
+        transport, message_get_serializer, cmd="message_get", offset=offset, page_size=page_size
+    )
 
 
 ### Vlob API ###
@@ -192,6 +247,24 @@ async def vlob_read(
     )
 
 
+async def vlob_batch_read(
+    transport: Transport,
+    realm_id: UUID,
+    encryption_revision: int,
+    vlob_ids: List[UUID],
+    timestamp: pendulum.DateTime = None,
+) -> dict:
+    return await _send_cmd(
+        transport,
+        vlob_batch_read_serializer,
+        cmd="vlob_batch_read",
+        realm_id=realm_id,
+        encryption_revision=encryption_revision,
+        vlob_ids=vlob_ids,
+        timestamp=timestamp,
+    )
+
+
 async def vlob_update(
     transport: Transport,
     encryption_revision: int,
@@ -212,13 +285,28 @@ async def vlob_update(
     )
 
 
-async def vlob_poll_changes(transport: Transport, realm_id: UUID, last_checkpoint: int) -> dict:
+async def vlob_poll_changes(
+    transport: Transport, realm_id: UUID, last_checkpoint: int, page_size: Optional[int] = None
+) -> dict:
     return await _send_cmd(
         transport,
         vlob_poll_changes_serializer,
         cmd="vlob_poll_changes",
         realm_id=realm_id,
         last_checkpoint=last_checkpoint,
+        page_size=page_size,
+    )
+
+
+async def vlob_batch_poll_changes(
+    transport: Transport, realms: Dict[UUID, int], page_size: Optional[int] = None
+) -> dict:
+    return await _send_cmd(
+        transport,
+        vlob_batch_poll_changes_serializer,
+        cmd="vlob_batch_poll_changes",
+        realms=realms,
+        page_size=page_size,
     )
 
 
@@ -272,12 +360,15 @@ async def realm_status(transport: Transport, realm_id: UUID) -> dict:
     )
 
 
-async def realm_get_role_certificates(transport: Transport, realm_id: UUID) -> dict:
+async def realm_get_role_certificates(
+    transport: Transport, realm_id: UUID, since: Optional[DateTime] = None
+) -> dict:
     return await _send_cmd(
         transport,
         realm_get_role_certificates_serializer,
         cmd="realm_get_role_certificates",
         realm_id=realm_id,
+        since=since,
     )
 
 
@@ -483,8 +574,16 @@ async def invite_4_claimer_communicate(transport: Transport, payload: Optional[b
 ### User API ###
 
 
-async def user_get(transport: Transport, user_id: UserID) -> dict:
-    return await _send_cmd(transport, user_get_serializer, cmd="user_get", user_id=user_id)
+async def user_get(
+    transport: Transport, user_id: UserID, known_trustchain: Optional[dict] = None
+) -> dict:
+    return await _send_cmd(
+        transport,
+        user_get_serializer,
+        cmd="user_get",
+        user_id=user_id,
+        known_trustchain=known_trustchain,
+    )
 
 
 async def apiv1_user_find(
@@ -3,15 +3,19 @@
 import os
 import trio
 import ssl
+from itertools import count
 from async_generator import asynccontextmanager
 from structlog import get_logger
-from typing import Optional, Union
+from typing import Optional, Union, Dict, Set
 
 from parsec.crypto import SigningKey
 from parsec.api.transport import Transport, TransportError, TransportClosedByPeer
 from parsec.api.protocol import (
     DeviceID,
     ProtocolError,
+    MessageSerializationError,
+    packb,
+    unpackb,
     HandshakeError,
     BaseClientHandshake,
     AuthenticatedClientHandshake,
@@ -39,6 +43,13 @@ from parsec.core.backend_connection.exceptions import (
 logger = get_logger()
 
 
+# Max number of requests concurrently sent on a connection using request multiplexing
+MAX_MULTIPLEXED_REQUESTS = 16
+# Max time for sending a request on a multiplexed connection, sending cannot be
+# cancelled so a stalled connection is considered broken past this delay
+MULTIPLEXED_SEND_TIMEOUT = 30
+
+
 async def apiv1_connect(
     addr: Union[BackendAddr, BackendOrganizationBootstrapAddr, BackendOrganizationAddr],
     device_id: Optional[DeviceID] = None,
@@ -95,14 +106,20 @@ async def connect_as_authenticated(
     device_id: DeviceID,
     signing_key: SigningKey,
     keepalive: Optional[int] = None,
-):
+    multiplexing: bool = False,
+) -> Union[Transport, "MultiplexedTransport"]:
     handshake = AuthenticatedClientHandshake(
         organization_id=addr.organization_id,
         device_id=device_id,
         user_signkey=signing_key,
         root_verify_key=addr.root_verify_key,
+        multiplexing=multiplexing,
     )
-    return await _connect(addr.hostname, addr.port, addr.use_ssl, keepalive, handshake)
+    transport = await _connect(addr.hostname, addr.port, addr.use_ssl, keepalive, handshake)
+    # Backend older than api v2.8 doesn't support request multiplexing
+    if handshake.multiplexing:
+        return MultiplexedTransport(transport)
+    return transport
 
 
 async def _connect(
@@ -180,10 +197,130 @@ async def _do_handshake(transport: Transport, handshake):
         raise BackendProtocolError(exc) from exc
 
 
+class MultiplexedTransport:
+    """
+    Transport on which request multiplexing has been negotiated during the
+    handshake: each request is sent along with a request id, allowing multiple
+    requests to be in flight on the connection and their replies to be
+    received in any order.
+
+    There is no dedicated task reading the replies: the first request waiting
+    for its reply reads the connection on behalf of the others and hands over
+    to another request once it got its own reply (or has been cancelled).
+    """
+
+    def __init__(self, transport: Transport):
+        self.transport = transport
+        self.logger = transport.logger
+        # Number of users currently holding the transport, managed by `TransportPool`
+        self.pending_requests = 0
+        self._req_ids = count(1)
+        self._waiting: Set[int] = set()
+        self._replies: Dict[int, Dict[str, object]] = {}
+        self._reading = False
+        self._changed = trio.Event()
+        self._send_lock = trio.Lock()
+        self._broken_exc: Optional[Exception] = None
+
+    @property
+    def handshake(self) -> BaseClientHandshake:
+        return self.transport.handshake
+
+    @property
+    def broken(self) -> bool:
+        return self._broken_exc is not None
+
+    def _check_broken(self) -> None:
+        if self._broken_exc:
+            raise TransportError("Connection is broken") from self._broken_exc
+
+    def _set_broken(self, exc: Exception) -> None:
+        self._broken_exc = exc
+        self._notify()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = trio.Event()
+
+    async def request(self, req: Dict[str, object]) -> Dict[str, object]:
+        """
+        Raises:
+            TransportError
+            ProtocolError
+        """
+        self._check_broken()
+        req_id = next(self._req_ids)
+        self._waiting.add(req_id)
+        try:
+            await self._send(packb({**req, "req_id": req_id}))
+            while req_id not in self._replies:
+                self._check_broken()
+                if self._reading:
+                    # Another request is reading the connection, wait for it
+                    # to provide our reply or to stop reading
+                    await self._changed.wait()
+                else:
+                    await self._read_replies(req_id)
+            return self._replies[req_id]
+
+        finally:
+            self._waiting.discard(req_id)
+            self._replies.pop(req_id, None)
+
+    async def _send(self, raw_req: bytes) -> None:
+        # Waiting for our turn can be cancelled, but not the send itself: it
+        # could leave a partial message on the connection shared with the
+        # other requests (hence the cancellation is delayed until it's done)
+        async with self._send_lock:
+            self._check_broken()
+            with trio.CancelScope(
+                deadline=trio.current_time() + MULTIPLEXED_SEND_TIMEOUT, shield=True
+            ) as send_scope:
+                try:
+                    await self.transport.send(raw_req)
+                except TransportError as exc:
+                    self._set_broken(exc)
+                    raise
+            if send_scope.cancelled_caught:
+                exc = TransportError("Timeout while sending request")
+                self._set_broken(exc)
+                raise exc
+
+    async def _read_replies(self, req_id: int) -> None:
+        self._reading = True
+        try:
+            while req_id not in self._replies:
+                rep = unpackb(await self.transport.recv())
+                rep_id = rep.pop("req_id", None)
+                if rep_id in self._waiting:
+                    self._replies[rep_id] = rep  # type: ignore[index]
+                    self._notify()
+                elif rep_id is None:
+                    # Backend's reply to an invalid request is not related to
+                    # any request and is followed by the connection closing
+                    raise MessageSerializationError(f"Reply without request id: {rep}")
+                # Otherwise the reply concerns a cancelled request, just drop it
+
+        except (TransportError, ProtocolError) as exc:
+            self._set_broken(exc)
+            raise
+
+        finally:
+            self._reading = False
+            self._notify()
+
+
 class TransportPool:
-    def __init__(self, connect_cb, max_pool):
+    def __init__(self, connect_cb, max_pool, max_multiplexed_requests=MAX_MULTIPLEXED_REQUESTS):
         self._connect_cb = connect_cb
         self._transports = []
+        self._multiplexed_transports = []
+        self._max_multiplexed_requests = max_multiplexed_requests
+        # Keep a connection available for the dedicated transports (i.e. the event listener)
+        self._max_multiplexed_transports = max(max_pool - 1, 1)
         self._closed = False
         self._lock = trio.Semaphore(max_pool)
 
@@ -194,30 +331,82 @@ class TransportPool:
             BackendConnectionError
             trio.ClosedResourceError: if used after having being closed
         """
+        if not force_fresh:
+            # A multiplexed transport can be shared between concurrent requests,
+            # so there is no need to wait for a connection slot
+            transport = self._get_multiplexed_transport()
+            if transport:
+                async with self._acquire_multiplexed(transport):
+                    yield transport
+                return
+
+        shared_transport = None
         async with self._lock:
             transport = None
             if not force_fresh:
-                try:
-                    # Fifo style to retrieve oldest first
-                    transport = self._transports.pop(0)
-                except IndexError:
-                    pass
-
-            if not transport:
+                # A multiplexed transport may have been connected while
+                # we were waiting for the connection slot
+                shared_transport = self._get_multiplexed_transport()
+                if not shared_transport:
+                    try:
+                        # Fifo style to retrieve oldest first
+                        transport = self._transports.pop(0)
+                    except IndexError:
+                        pass
+
+            if not transport and not shared_transport:
                 if self._closed:
                     raise trio.ClosedResourceError()
 
                 transport = await self._connect_cb()
 
-            try:
-                yield transport
+            if isinstance(transport, MultiplexedTransport) and not force_fresh:
+                # Share the transport with the following acquires
+                self._multiplexed_transports.append(transport)
+                shared_transport = transport
 
-            except TransportClosedByPeer:
-                raise
+            if not shared_transport:
+                try:
+                    yield transport
+
+                except TransportClosedByPeer:
+                    raise
+
+                except Exception:
+                    await transport.aclose()
+                    raise
+
+                else:
+                    self._transports.append(transport)
+
+        if shared_transport:
+            # The connection slot is not needed to use a shared transport
+            async with self._acquire_multiplexed(shared_transport):
+                yield shared_transport
+
+    def _get_multiplexed_transport(self) -> Optional[MultiplexedTransport]:
+        # Broken transports are removed once their last request is done with them
+        transports = [t for t in self._multiplexed_transports if not t.broken]
+        if not transports:
+            return None
+        transport = min(transports, key=lambda t: t.pending_requests)
+        if (
+            transport.pending_requests < self._max_multiplexed_requests
+            or len(transports) >= self._max_multiplexed_transports
+        ):
+            return transport
+        return None
 
-            except Exception:
+    @asynccontextmanager
+    async def _acquire_multiplexed(self, transport):
+        transport.pending_requests += 1
+        try:
+            yield
+
+        finally:
+            transport.pending_requests -= 1
+            # Unlike a regular transport, an error in a request doesn't concern
+            # the other requests sharing the transport unless the connection is broken
+            if transport.broken and transport in self._multiplexed_transports:
+                self._multiplexed_transports.remove(transport)
                 await transport.aclose()
-                raise
-
-            else:
-                self._transports.append(transport)
@@ -62,6 +62,7 @@ class CoreConfig:
     backend_max_cooldown: int = 30
     backend_connection_keepalive: Optional[int] = 29
     backend_max_connections: int = 4
+    backend_multiplexing: bool = False
 
     invitation_token_size: int = 8
 
@@ -104,6 +105,7 @@ def config_factory(
     backend_max_cooldown: int = 30,
     backend_connection_keepalive: Optional[int] = 29,
     backend_max_connections: int = 4,
+    backend_multiplexing: bool = False,
     telemetry_enabled: bool = True,
     debug: bool = False,
     gui_last_device: str = None,
@@ -144,6 +146,7 @@ def config_factory(
         backend_max_cooldown=backend_max_cooldown,
         backend_connection_keepalive=backend_connection_keepalive,
         backend_max_connections=backend_max_connections,
+        backend_multiplexing=backend_multiplexing,
         telemetry_enabled=telemetry_enabled,
         debug=debug,
         sentry_url=environ.get("SENTRY_URL") or None,
@@ -14,6 +14,7 @@ class CoreEvent(Enum):
     BACKEND_REALM_ROLES_UPDATED = "backend.realm.roles_updated"
     BACKEND_REALM_VLOBS_UPDATED = "backend.realm.vlobs_updated"
     # Fs
+    FS_BLOCK_UPLOADED = "fs.block.uploaded"
     FS_ENTRY_REMOTE_CHANGED = "fs.entry.remote_changed"
     FS_ENTRY_SYNCED = "fs.entry.synced"
     FS_ENTRY_DOWNSYNCED = "fs.entry.downsynced"
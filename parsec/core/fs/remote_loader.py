@@ -1,13 +1,15 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
+import trio
 from contextlib import contextmanager
-from typing import Dict, Optional, List, Tuple, cast, Iterator, Callable
+from typing import Dict, Optional, List, Tuple, Set, cast, Iterator, Callable, Iterable
 
 from pendulum import DateTime, now as pendulum_now
+from structlog import get_logger
 
-from parsec.utils import timestamps_in_the_ballpark
+from parsec.utils import TIMESTAMP_MAX_DT, timestamps_in_the_ballpark, open_service_nursery
 from parsec.crypto import HashDigest, CryptoError
-from parsec.api.protocol import UserID, DeviceID, RealmRole
+from parsec.api.protocol import UserID, DeviceID, RealmRole, VLOB_BATCH_READ_MAX_SIZE
 from parsec.api.data import (
     DataError,
     BlockAccess,
@@ -15,7 +17,7 @@ from parsec.api.data import (
     BaseManifest as BaseRemoteManifest,
 )
 
-from parsec.core.types import EntryID, ChunkID, LocalDevice, WorkspaceEntry
+from parsec.core.types import EntryID, BlockID, ChunkID, LocalDevice, WorkspaceEntry
 
 from parsec.core.backend_connection import (
     BackendConnectionError,
@@ -43,6 +45,7 @@ from parsec.core.fs.exceptions import (
     FSRemoteManifestNotFoundBadVersion,
     FSRemoteManifestNotFoundBadTimestamp,
     FSRemoteBlockNotFound,
+    FSLocalMissError,
     FSBackendOfflineError,
     FSWorkspaceInMaintenance,
     FSBadEncryptionRevision,
@@ -55,6 +58,16 @@ from parsec.core.fs.exceptions import (
 from parsec.core.fs.storage import BaseWorkspaceStorage
 
 
+logger = get_logger()
+
+# Maximum number of blocks transferred at the same time by a single remote loader
+DEFAULT_MAX_CONCURRENT_BLOCK_DOWNLOADS = 4
+DEFAULT_MAX_CONCURRENT_BLOCK_UPLOADS = 4
+# Maximum number of users whose devices are fetched at the same time when
+# verifying realm role certificates
+DEFAULT_MAX_CONCURRENT_DEVICE_LOOKUPS = 8
+
+
 @contextmanager
 def translate_remote_devices_manager_errors() -> Iterator[None]:
     try:
@@ -95,21 +108,29 @@ class UserRemoteLoader:
         self.get_workspace_entry = get_workspace_entry
         self.backend_cmds = backend_cmds
         self.remote_devices_manager = remote_devices_manager
+        self._init_realm_role_certificates_cache()
+
+    def _init_realm_role_certificates_cache(self) -> None:
         self._realm_role_certificates_cache: Optional[List[RealmRoleCertificateContent]] = None
         self._realm_role_certificates_cache_timestamp: Optional[DateTime] = None
+        self._realm_current_roles_cache: Dict[UserID, RealmRole] = {}
+        self._realm_raw_role_certificates_cache: Set[bytes] = set()
+        self._realm_role_certificates_lock = trio.Lock()
 
     async def _get_user_realm_role_at(
         self, user_id: UserID, timestamp: DateTime
     ) -> Optional[RealmRole]:
-        if (
-            self._realm_role_certificates_cache is None
-            or self._realm_role_certificates_cache_timestamp is None
-            or self._realm_role_certificates_cache_timestamp <= timestamp
-        ):
-            cache_timestamp = pendulum_now()
-            self._realm_role_certificates_cache, _ = await self._load_realm_role_certificates()
-            # Set the cache timestamp in two times to avoid invalid value in case of exception
-            self._realm_role_certificates_cache_timestamp = cache_timestamp
+        # Concurrent callers wait for the ongoing update instead of doing their own
+        async with self._realm_role_certificates_lock:
+            if (
+                self._realm_role_certificates_cache is None
+                or self._realm_role_certificates_cache_timestamp is None
+                or self._realm_role_certificates_cache_timestamp <= timestamp
+            ):
+                cache_timestamp = pendulum_now()
+                await self._update_realm_role_certificates_cache()
+                # Set the cache timestamp in two times to avoid invalid value in case of exception
+                self._realm_role_certificates_cache_timestamp = cache_timestamp
 
         assert self._realm_role_certificates_cache is not None
         for certif in reversed(self._realm_role_certificates_cache):
@@ -118,11 +139,54 @@ class UserRemoteLoader:
         else:
             return None
 
-    async def _load_realm_role_certificates(
-        self, realm_id: Optional[EntryID] = None
-    ) -> Tuple[List[RealmRoleCertificateContent], Dict[UserID, RealmRole]]:
+    async def _update_realm_role_certificates_cache(self) -> None:
+        cached_certifs = self._realm_role_certificates_cache
+        if not cached_certifs:
+            unsecure_certifs = await self._fetch_realm_role_certificates()
+            current_roles = await self._verify_realm_role_certificates(unsecure_certifs)
+            self._realm_raw_role_certificates_cache = {raw for _, raw in unsecure_certifs}
+
+        else:
+            # Only fetch the certificates following the last known one. Certificate
+            # timestamps are provided by the clients, so a certificate accepted by
+            # the backend after the last known one may have a slightly older
+            # timestamp, hence the safety margin.
+            last_timestamp = cached_certifs[-1].timestamp
+            unsecure_certifs = [
+                (certif, raw)
+                for certif, raw in await self._fetch_realm_role_certificates(
+                    since=last_timestamp.subtract(seconds=2 * TIMESTAMP_MAX_DT)
+                )
+                if raw not in self._realm_raw_role_certificates_cache
+            ]
+            if not unsecure_certifs:
+                return
+            if unsecure_certifs[0][0].timestamp < last_timestamp:
+                # New certificates must be inserted between known ones, start over
+                self._realm_role_certificates_cache = None
+                return await self._update_realm_role_certificates_cache()
+            current_roles = await self._verify_realm_role_certificates(
+                unsecure_certifs, current_roles=self._realm_current_roles_cache
+            )
+            self._realm_raw_role_certificates_cache.update(raw for _, raw in unsecure_certifs)
+
+        # Now unsecure_certifs is no longer unsecure given we have valided it items
+        self._realm_role_certificates_cache = [
+            *(cached_certifs or ()),
+            *(certif for certif, _ in unsecure_certifs),
+        ]
+        self._realm_current_roles_cache = current_roles
+
+    async def _fetch_realm_role_certificates(
+        self, realm_id: Optional[EntryID] = None, since: Optional[DateTime] = None
+    ) -> List[Tuple[RealmRoleCertificateContent, bytes]]:
+        """
+        Returns: the unverified certificates, sorted by timestamp
+        """
         with translate_backend_cmds_errors():
-            rep = await self.backend_cmds.realm_get_role_certificates(realm_id or self.workspace_id)
+            rep = await self.backend_cmds.realm_get_role_certificates(
+                realm_id or self.workspace_id, since=since
+            )
         if rep["status"] == "not_allowed":
             # Seems we lost the access to the realm
             raise FSWorkspaceNoReadAccess("Cannot get workspace roles: no read access")
@@ -131,7 +195,7 @@ class UserRemoteLoader:
 
         try:
             # Must read unverified certificates to access metadata
-            unsecure_certifs = sorted(
+            return sorted(
                 [
                     (RealmRoleCertificateContent.unsecure_load(uv_role), uv_role)
                     for uv_role in rep["certificates"]
@@ -139,55 +203,99 @@ class UserRemoteLoader:
                 key=lambda x: x[0].timestamp,
             )
 
-            current_roles: Dict[UserID, RealmRole] = {}
-            owner_only = (RealmRole.OWNER,)
-            owner_or_manager = (RealmRole.OWNER, RealmRole.MANAGER)
+        # Decryption error
+        except DataError as exc:
+            raise FSError(f"Invalid realm role certificates: {exc}") from exc
 
-            # Now verify each certif
-            for unsecure_certif, raw_certif in unsecure_certifs:
+    async def _get_devices(
+        self, device_ids: Iterable[DeviceID]
+    ) -> Dict[DeviceID, DeviceCertificateContent]:
+        # The first lookup of a device fetches all the devices of its user, so
+        # the devices of a given user are resolved one after the other while
+        # distinct users are resolved concurrently
+        devices_per_user: Dict[UserID, Set[DeviceID]] = {}
+        for device_id in device_ids:
+            devices_per_user.setdefault(device_id.user_id, set()).add(device_id)
+        devices: Dict[DeviceID, DeviceCertificateContent] = {}
+        limiter = trio.CapacityLimiter(DEFAULT_MAX_CONCURRENT_DEVICE_LOOKUPS)
+
+        async def _get_user_devices(user_device_ids: Set[DeviceID]) -> None:
+            async with limiter:
+                for device_id in user_device_ids:
+                    with translate_remote_devices_manager_errors():
+                        devices[device_id] = await self.remote_devices_manager.get_device(device_id)
+
+        async with open_service_nursery() as nursery:
+            for user_device_ids in devices_per_user.values():
+                nursery.start_soon(_get_user_devices, user_device_ids)
+        return devices
+
+    async def _verify_realm_role_certificates(
+        self,
+        unsecure_certifs: List[Tuple[RealmRoleCertificateContent, bytes]],
+        current_roles: Optional[Dict[UserID, RealmRole]] = None,
+    ) -> Dict[UserID, RealmRole]:
+        """
+        Verify the certificates following the given current roles.
 
-                with translate_remote_devices_manager_errors():
-                    author = await self.remote_devices_manager.get_device(unsecure_certif.author)
+        Returns: the roles once the certificates are applied
+        """
+        # TODO: typing, author is optional in base.py but it seems that manifests always have an author (no RVK)
+        authors = await self._get_devices(
+            cast(DeviceID, unsecure_certif.author) for unsecure_certif, _ in unsecure_certifs
+        )
 
+        # Signatures don't depend on each other, verify them all at once
+        def _verify_signatures() -> None:
+            for unsecure_certif, raw_certif in unsecure_certifs:
+                author = authors[cast(DeviceID, unsecure_certif.author)]
                 RealmRoleCertificateContent.verify_and_load(
                     raw_certif,
                     author_verify_key=author.verify_key,
                     expected_author=author.device_id,
                 )
 
-                # Make sure author had the right to do this
-                existing_user_role = current_roles.get(unsecure_certif.user_id)
-                if not current_roles and unsecure_certif.user_id == author.device_id.user_id:
-                    # First user is autosigned
-                    needed_roles: Tuple[Optional[RealmRole], ...] = (None,)
-                elif (
-                    existing_user_role in owner_or_manager
-                    or unsecure_certif.role in owner_or_manager
-                ):
-                    needed_roles = owner_only
-                else:
-                    needed_roles = owner_or_manager
-                # TODO: typing, author is optional in base.py but it seems that manifests always have an author (no RVK)
-                if (
-                    current_roles.get(cast(DeviceID, unsecure_certif.author).user_id)
-                    not in needed_roles
-                ):
-                    raise FSError(
-                        f"Invalid realm role certificates: "
-                        f"{unsecure_certif.author} has not right to give "
-                        f"{unsecure_certif.role} role to {unsecure_certif.user_id} "
-                        f"on {unsecure_certif.timestamp}"
-                    )
-
-                if unsecure_certif.role is None:
-                    current_roles.pop(unsecure_certif.user_id, None)
-                else:
-                    current_roles[unsecure_certif.user_id] = unsecure_certif.role
-
+        try:
+            await trio.to_thread.run_sync(_verify_signatures)
         # Decryption error
         except DataError as exc:
             raise FSError(f"Invalid realm role certificates: {exc}") from exc
 
+        current_roles = dict(current_roles or {})
+        owner_only = (RealmRole.OWNER,)
+        owner_or_manager = (RealmRole.OWNER, RealmRole.MANAGER)
+
+        # Now make sure each author had the right to do this
+        for unsecure_certif, _ in unsecure_certifs:
+            author_id = cast(DeviceID, unsecure_certif.author)
+            existing_user_role = current_roles.get(unsecure_certif.user_id)
+            if not current_roles and unsecure_certif.user_id == author_id.user_id:
+                # First user is autosigned
+                needed_roles: Tuple[Optional[RealmRole], ...] = (None,)
+            elif existing_user_role in owner_or_manager or unsecure_certif.role in owner_or_manager:
+                needed_roles = owner_only
+            else:
+                needed_roles = owner_or_manager
+            if current_roles.get(author_id.user_id) not in needed_roles:
+                raise FSError(
+                    f"Invalid realm role certificates: "
+                    f"{unsecure_certif.author} has not right to give "
+                    f"{unsecure_certif.role} role to {unsecure_certif.user_id} "
+                    f"on {unsecure_certif.timestamp}"
+                )
+
+            if unsecure_certif.role is None:
+                current_roles.pop(unsecure_certif.user_id, None)
+            else:
+                current_roles[unsecure_certif.user_id] = unsecure_certif.role
+
+        return current_roles
+
+    async def _load_realm_role_certificates(
+        self, realm_id: Optional[EntryID] = None
+    ) -> Tuple[List[RealmRoleCertificateContent], Dict[UserID, RealmRole]]:
+        unsecure_certifs = await self._fetch_realm_role_certificates(realm_id)
+        current_roles = await self._verify_realm_role_certificates(unsecure_certifs)
         # Now unsecure_certifs is no longer unsecure given we have valided it items
         return [c for c, _ in unsecure_certifs], current_roles
 
@@ -303,22 +411,71 @@ class RemoteLoader(UserRemoteLoader):
         backend_cmds: BackendAuthenticatedCmds,
         remote_devices_manager: RemoteDevicesManager,
         local_storage: BaseWorkspaceStorage,
+        max_concurrent_downloads: int = DEFAULT_MAX_CONCURRENT_BLOCK_DOWNLOADS,
+        max_concurrent_uploads: int = DEFAULT_MAX_CONCURRENT_BLOCK_UPLOADS,
     ):
         super().__init__(
             device, workspace_id, get_workspace_entry, backend_cmds, remote_devices_manager
         )
         self.local_storage = local_storage
+        self._init_transfer_engine(max_concurrent_downloads, max_concurrent_uploads)
 
-    async def load_blocks(self, accesses: List[BlockAccess]) -> None:
+    def _init_transfer_engine(
+        self, max_concurrent_downloads: int, max_concurrent_uploads: int
+    ) -> None:
+        if max_concurrent_downloads < 1:
+            raise ValueError("max_concurrent_downloads must be at least 1")
+        if max_concurrent_uploads < 1:
+            raise ValueError("max_concurrent_uploads must be at least 1")
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.max_concurrent_uploads = max_concurrent_uploads
+        # The limiters are shared between all the concurrent calls, so the
+        # total fan-out is bounded per workspace
+        self._download_limiter = trio.CapacityLimiter(max_concurrent_downloads)
+        self._upload_limiter = trio.CapacityLimiter(max_concurrent_uploads)
+        self._downloads_in_progress: Dict[BlockID, trio.Event] = {}
+
+    async def load_blocks(self, accesses: Iterable[BlockAccess]) -> None:
         """
+        Download the blocks concurrently, with at most `max_concurrent_downloads`
+        requests in flight at the same time.
+
         Raises:
             FSError
             FSRemoteBlockNotFound
             FSBackendOfflineError
             FSWorkspaceInMaintenance
         """
-        for access in accesses:
-            await self.load_block(access)
+        accesses = list(accesses)
+        # Shortcut to avoid opening a nursery in the common case
+        if len(accesses) <= 1:
+            for access in accesses:
+                await self.load_block(access)
+            return
+
+        async with open_service_nursery() as nursery:
+            for access in accesses:
+                nursery.start_soon(self.load_block, access)
+
+    async def prefetch_blocks(self, accesses: Iterable[BlockAccess]) -> None:
+        """
+        Best-effort concurrent download of blocks that are likely to be needed soon.
+
+        Errors are logged and ignored: the block will be downloaded again (and the
+        error properly reported) when it is actually read.
+
+        Raises: Nothing !
+        """
+
+        async def _prefetch_block(access: BlockAccess) -> None:
+            try:
+                await self.load_block(access)
+            except FSError as exc:
+                logger.debug("Block prefetch failed", block_id=access.id, exc_info=exc)
+
+        async with open_service_nursery() as nursery:
+            for access in accesses:
+                nursery.start_soon(_prefetch_block, access)
 
     async def load_block(self, access: BlockAccess) -> None:
         """
@@ -329,6 +486,22 @@ class RemoteLoader(UserRemoteLoader):
             FSWorkspaceInMaintenance
             FSWorkspaceNoAccess
         """
+        # The block is already being downloaded by another task, just wait for it.
+        # Note the download might have failed, in which case the caller will find
+        # the block still missing from the local storage and try again.
+        in_progress = self._downloads_in_progress.get(access.id)
+        if in_progress is not None:
+            await in_progress.wait()
+            return
+
+        self._downloads_in_progress[access.id] = trio.Event()
+        try:
+            async with self._download_limiter:
+                await self._load_block(access)
+        finally:
+            self._downloads_in_progress.pop(access.id).set()
+
+    async def _load_block(self, access: BlockAccess) -> None:
         # Download
         with translate_backend_cmds_errors():
             rep = await self.backend_cmds.block_read(access.id)
@@ -356,6 +529,54 @@ class RemoteLoader(UserRemoteLoader):
         assert HashDigest.from_data(block) == access.digest, access
         await self.local_storage.set_clean_block(access.id, block)
 
+    async def upload_blocks(
+        self,
+        accesses: Iterable[BlockAccess],
+        on_uploaded: Optional[Callable[[BlockAccess], None]] = None,
+    ) -> None:
+        """
+        Upload the dirty blocks (i.e. the ones still present in the local chunk storage)
+        among the provided accesses. Blocks are read, encrypted and sent concurrently,
+        with at most `max_concurrent_uploads` blocks in flight at the same time.
+
+        The blocks that failed to upload during the concurrent pass are then retried
+        one by one, and the first error of this second pass is raised.
+
+        `on_uploaded` is called each time a block has been successfully uploaded.
+
+        Raises:
+            FSError
+            FSBackendOfflineError
+            FSWorkspaceInMaintenance
+            FSWorkspaceNoAccess
+        """
+        failed: List[BlockAccess] = []
+
+        async def _upload_dirty_block(access: BlockAccess) -> None:
+            try:
+                data = await self.local_storage.get_dirty_block(access.id)
+            # Not dirty, nothing to upload
+            except FSLocalMissError:
+                return
+            await self.upload_block(access, data)
+            if on_uploaded is not None:
+                on_uploaded(access)
+
+        async def _concurrent_upload(access: BlockAccess) -> None:
+            try:
+                async with self._upload_limiter:
+                    await _upload_dirty_block(access)
+            except FSError:
+                failed.append(access)
+
+        async with open_service_nursery() as nursery:
+            for access in accesses:
+                nursery.start_soon(_concurrent_upload, access)
+
+        # Retry in file order so the errors are reported consistently
+        for access in sorted(failed, key=lambda x: x.offset):
+            await _upload_dirty_block(access)
+
     async def upload_block(self, access: BlockAccess, data: bytes) -> None:
         """
         Raises:
@@ -452,7 +673,6 @@ class RemoteLoader(UserRemoteLoader):
             raise FSError(f"Cannot fetch vlob {entry_id}: `{rep['status']}`")
 
         expected_version = rep["version"]
-        expected_author = rep["author"]
         expected_timestamp = rep["timestamp"]
         if version not in (None, expected_version):
             raise FSError(
@@ -466,12 +686,107 @@ class RemoteLoader(UserRemoteLoader):
                 f"{version} (expecting {expected_backend_timestamp}, got {expected_timestamp})"
             )
 
+        return await self._verify_manifest(
+            workspace_entry,
+            entry_id,
+            rep["blob"],
+            expected_author=rep["author"],
+            expected_timestamp=expected_timestamp,
+            expected_version=expected_version,
+        )
+
+    async def load_manifests(
+        self, entry_ids: Iterable[EntryID], timestamp: Optional[DateTime] = None
+    ) -> Dict[EntryID, BaseRemoteManifest]:
+        """
+        Download the last version (or the last version at `timestamp`) of several
+        manifests, using as few requests as possible.
+
+        Manifests that don't exist on the backend are omitted from the result. If the
+        backend doesn't support batch reads, an empty dict is returned and it is up
+        to the caller to fall back on `load_manifest`.
+
+        Raises:
+            FSError
+            FSBackendOfflineError
+            FSWorkspaceInMaintenance
+            FSBadEncryptionRevision
+            FSWorkspaceNoAccess
+            FSUserNotFoundError
+            FSDeviceNotFoundError
+            FSInvalidTrustchainError
+        """
+        workspace_entry = self.get_workspace_entry()
+        to_fetch = list(dict.fromkeys(entry_ids))
+        manifests: Dict[EntryID, BaseRemoteManifest] = {}
+
+        for i in range(0, len(to_fetch), VLOB_BATCH_READ_MAX_SIZE):
+            batch = to_fetch[i : i + VLOB_BATCH_READ_MAX_SIZE]
+            with translate_backend_cmds_errors():
+                rep = await self.backend_cmds.vlob_batch_read(
+                    self.workspace_id, workspace_entry.encryption_revision, batch, timestamp
+                )
+            if rep["status"] == "unknown_command":
+                # Backend is too old, `vlob_batch_read` has been added in api v2.2
+                return {}
+            elif rep["status"] == "not_allowed":
+                # Seems we lost the access to the realm
+                raise FSWorkspaceNoReadAccess("Cannot load manifests: no read access")
+            elif rep["status"] == "bad_encryption_revision":
+                raise FSBadEncryptionRevision(
+                    "Cannot fetch vlobs: Bad encryption revision provided"
+                )
+            elif rep["status"] == "in_maintenance":
+                raise FSWorkspaceInMaintenance(
+                    "Cannot download vlobs while the workspace is in maintenance"
+                )
+            elif rep["status"] != "ok":
+                raise FSError(f"Cannot fetch vlobs: `{rep['status']}`")
+
+            requested = set(batch)
+            for item in rep["vlobs"]:
+                entry_id = EntryID(item["vlob_id"])
+                if entry_id not in requested:
+                    raise FSError(f"Backend returned a vlob that was not requested: {entry_id}")
+                if timestamp is not None and item["timestamp"] > timestamp:
+                    raise FSError(
+                        f"Backend returned invalid timestamp for vlob {entry_id} (expecting "
+                        f"a timestamp before {timestamp}, got {item['timestamp']})"
+                    )
+                manifests[entry_id] = await self._verify_manifest(
+                    workspace_entry,
+                    entry_id,
+                    item["blob"],
+                    expected_author=item["author"],
+                    expected_timestamp=item["timestamp"],
+                    expected_version=item["version"],
+                )
+
+        return manifests
+
+    async def _verify_manifest(
+        self,
+        workspace_entry: WorkspaceEntry,
+        entry_id: EntryID,
+        blob: bytes,
+        expected_author: DeviceID,
+        expected_timestamp: DateTime,
+        expected_version: int,
+    ) -> BaseRemoteManifest:
+        """
+        Raises:
+            FSError
+            FSBackendOfflineError
+            FSUserNotFoundError
+            FSDeviceNotFoundError
+            FSInvalidTrustchainError
+        """
         with translate_remote_devices_manager_errors():
             author = await self.remote_devices_manager.get_device(expected_author)
 
         try:
             remote_manifest = BaseRemoteManifest.decrypt_verify_and_load(
-                rep["blob"],
+                blob,
                 key=workspace_entry.key,
                 author_verify_key=author.verify_key,
                 expected_author=expected_author,
@@ -625,10 +940,28 @@ class RemoteLoaderTimestamped(RemoteLoader):
         self.backend_cmds = remote_loader.backend_cmds
         self.remote_devices_manager = remote_loader.remote_devices_manager
         self.local_storage = remote_loader.local_storage.to_timestamped(timestamp)
-        self._realm_role_certificates_cache = None
-        self._realm_role_certificates_cache_timestamp = None
+        self._init_transfer_engine(
+            remote_loader.max_concurrent_downloads, remote_loader.max_concurrent_uploads
+        )
+        self._init_realm_role_certificates_cache()
+        # Certificates already verified by the workspace's remote loader are still valid
+        self._realm_role_certificates_cache = remote_loader._realm_role_certificates_cache
+        self._realm_role_certificates_cache_timestamp = (
+            remote_loader._realm_role_certificates_cache_timestamp
+        )
+        self._realm_current_roles_cache = remote_loader._realm_current_roles_cache
+        self._realm_raw_role_certificates_cache = set(
+            remote_loader._realm_raw_role_certificates_cache
+        )
         self.timestamp = timestamp
 
+    async def upload_blocks(
+        self,
+        accesses: Iterable[BlockAccess],
+        on_uploaded: Optional[Callable[[BlockAccess], None]] = None,
+    ) -> None:
+        raise FSError("Cannot upload block through a timestamped remote loader")
+
     async def upload_block(self, access: BlockAccess, data: bytes) -> None:
         raise FSError("Cannot upload block through a timestamped remote loader")
 
@@ -664,6 +997,11 @@ class RemoteLoaderTimestamped(RemoteLoader):
             expected_backend_timestamp=expected_backend_timestamp,
         )
 
+    async def load_manifests(
+        self, entry_ids: Iterable[EntryID], timestamp: Optional[DateTime] = None
+    ) -> Dict[EntryID, BaseRemoteManifest]:
+        return await super().load_manifests(entry_ids, timestamp=timestamp or self.timestamp)
+
     async def upload_manifest(self, entry_id: EntryID, manifest: BaseRemoteManifest) -> None:
         raise FSError("Cannot upload manifest through a timestamped remote loader")
 
@@ -2,6 +2,7 @@
 
 from parsec.core.fs.storage.local_database import LocalDatabase
 from parsec.core.fs.storage.user_storage import UserStorage
+from parsec.core.fs.storage.certificate_storage import CertificateStorage
 from parsec.core.fs.storage.manifest_storage import ManifestStorage
 from parsec.core.fs.storage.chunk_storage import ChunkStorage, BlockStorage
 from parsec.core.fs.storage.workspace_storage import (
@@ -16,6 +17,7 @@ __all__ = (
     "ChunkStorage",
     "BlockStorage",
     "UserStorage",
+    "CertificateStorage",
     "BaseWorkspaceStorage",
     "WorkspaceStorage",
     "WorkspaceStorageTimestamped",
@@ -0,0 +1,115 @@
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+from pathlib import Path
+from pendulum import DateTime, from_timestamp
+from async_generator import asynccontextmanager
+from typing import Dict, Tuple, Optional, AsyncIterator
+
+from parsec.api.protocol import UserID, DeviceID
+from parsec.core.fs.storage.version import CERTIFICATE_STORAGE_NAME
+from parsec.core.fs.storage.local_database import LocalDatabase
+
+
+class CertificateStorage:
+    """Persistent storage for the user&device certificates once verified.
+
+    Certificates are immutable, so a stored device certificate is always valid.
+    However a user can get revoked at any time, hence the date the revocation
+    status of each user has last been retrieved from the backend is also stored.
+    """
+
+    def __init__(self, localdb: LocalDatabase):
+        self.localdb = localdb
+
+    @classmethod
+    @asynccontextmanager
+    async def run(cls, path: Path) -> AsyncIterator["CertificateStorage"]:
+        async with LocalDatabase.run(path / CERTIFICATE_STORAGE_NAME) as localdb:
+            self = cls(localdb)
+            await self._create_db()
+            yield self
+
+    async def _create_db(self) -> None:
+        async with self.localdb.open_cursor() as cursor:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS users
+                (
+                  user_id TEXT PRIMARY KEY NOT NULL,
+                  user_certificate BLOB NOT NULL,
+                  revoked_user_certificate BLOB,
+                  refreshed_on REAL NOT NULL  -- Timestamp
+                );
+                """
+            )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS devices
+                (
+                  device_id TEXT PRIMARY KEY NOT NULL,
+                  device_certificate BLOB NOT NULL
+                );
+                """
+            )
+
+    async def get_user_certificates(
+        self, user_id: UserID
+    ) -> Optional[Tuple[bytes, Optional[bytes], DateTime]]:
+        """
+        Returns: the user certificate, the revoked user certificate and the date
+        the revocation status has last been retrieved, or None if not stored.
+        """
+        async with self.localdb.open_cursor(commit=False) as cursor:
+            cursor.execute(
+                """
+                SELECT user_certificate, revoked_user_certificate, refreshed_on
+                FROM users WHERE user_id = ?
+                """,
+                (str(user_id),),
+            )
+            row = cursor.fetchone()
+        if not row:
+            return None
+        user_certificate, revoked_user_certificate, refreshed_on = row
+        return user_certificate, revoked_user_certificate, from_timestamp(refreshed_on)
+
+    async def get_device_certificate(self, device_id: DeviceID) -> Optional[bytes]:
+        async with self.localdb.open_cursor(commit=False) as cursor:
+            cursor.execute(
+                "SELECT device_certificate FROM devices WHERE device_id = ?", (str(device_id),)
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    async def set_certificates(
+        self,
+        now: DateTime,
+        users: Dict[UserID, bytes],
+        revoked_users: Dict[UserID, bytes],
+        devices: Dict[DeviceID, bytes],
+    ) -> None:
+        """
+        The certificates must have been verified. The revocation status of the
+        provided users is considered up to date as of `now`.
+        """
+        async with self.localdb.open_cursor() as cursor:
+            # Certificates never change, only the refresh date has to be updated
+            cursor.executemany(
+                """
+                INSERT OR IGNORE INTO users (user_id, user_certificate, refreshed_on)
+                VALUES (?, ?, ?)
+                """,
+                [(str(user_id), certif, now.timestamp()) for user_id, certif in users.items()],
+            )
+            cursor.executemany(
+                "UPDATE users SET refreshed_on = ? WHERE user_id = ?",
+                [(now.timestamp(), str(user_id)) for user_id in users],
+            )
+            cursor.executemany(
+                "UPDATE users SET revoked_user_certificate = ? WHERE user_id = ?",
+                [(certif, str(user_id)) for user_id, certif in revoked_users.items()],
+            )
+            cursor.executemany(
+                "INSERT OR IGNORE INTO devices (device_id, device_certificate) VALUES (?, ?)",
+                [(str(device_id), certif) for device_id, certif in devices.items()],
+            )
@@ -0,0 +1,68 @@
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from parsec.core.types import ChunkID
+
+
+class ChunkCache:
+    """In-memory LRU cache of decrypted chunk data, limited by its total size in bytes.
+
+    Reading a chunk from the local storage means a round-trip to the sqlite
+    thread and a decryption, which is costly compared to the typical size of
+    the reads performed through the mountpoint (4KB to 128KB within a 512KB block).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[ChunkID, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return chunk_id in self._data
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": self.size,
+            "max_size": self.max_size,
+            "entries": len(self._data),
+        }
+
+    def get(self, chunk_id: ChunkID) -> Optional[bytes]:
+        try:
+            data = self._data[chunk_id]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(chunk_id)
+        self.hits += 1
+        return data
+
+    def set(self, chunk_id: ChunkID, data: bytes) -> None:
+        self.invalidate(chunk_id)
+        # Mutable buffers could be modified behind our back
+        if not isinstance(data, bytes) or len(data) > self.max_size:
+            return
+        self._data[chunk_id] = data
+        self.size += len(data)
+        # Evict the least recently used chunks
+        while self.size > self.max_size:
+            _, evicted = self._data.popitem(last=False)
+            self.size -= len(evicted)
+
+    def invalidate(self, chunk_id: ChunkID) -> None:
+        data = self._data.pop(chunk_id, None)
+        if data is not None:
+            self.size -= len(data)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
@@ -4,16 +4,22 @@ import time
 
 import trio
 from pathlib import Path
-from typing import AsyncIterator, AsyncContextManager, TypeVar
+from typing import AsyncIterator, AsyncContextManager, TypeVar, Dict, Optional
 from async_generator import asynccontextmanager
 
 
 from parsec.core.types import ChunkID
-from parsec.core.types import LocalDevice, DEFAULT_BLOCK_SIZE
+from parsec.core.types import LocalDevice
 from parsec.core.fs.storage.local_database import LocalDatabase, Cursor
 from parsec.core.fs.exceptions import FSLocalMissError, FSLocalStorageClosedError
 
 T = TypeVar("T", bound="ChunkStorage")
+B = TypeVar("B", bound="BlockStorage")
+
+# Block access times are written to the database in batches
+ACCESS_TIMES_FLUSH_BATCH_SIZE = 100
+ACCESS_TIMES_FLUSH_DELAY = 60  # seconds
+EVICTION_FETCH_SIZE = 100
 
 
 class ChunkStorage:
@@ -96,6 +102,14 @@ class ChunkStorage:
             manifest_row = cursor.fetchone()
         return bool(manifest_row)
 
+    async def register_access(self, chunk_id: ChunkID) -> None:
+        """Update the access time of a chunk read without going through `get_chunk`."""
+        async with self._open_cursor() as cursor:
+            cursor.execute(
+                "UPDATE chunks SET accessed_on = ? WHERE chunk_id = ?",
+                (time.time(), chunk_id.bytes),
+            )
+
     async def get_chunk(self, chunk_id: ChunkID) -> bytes:
         async with self._open_cursor() as cursor:
             cursor.execute(
@@ -138,11 +152,22 @@ class ChunkStorage:
 
 
 class BlockStorage(ChunkStorage):
-    """Interface for caching the data blocks."""
+    """Interface for caching the data blocks.
+
+    The number of blocks and their total size are kept in memory so that
+    checking the cache limit doesn't require a full scan of the table.
+    Access times are recorded in memory as well and written to the database
+    in batches, which prevents the reads from turning into writes. The
+    eviction then relies on an index over the access times.
+    """
 
     def __init__(self, device: LocalDevice, localdb: LocalDatabase, cache_size: int):
         super().__init__(device, localdb)
         self.cache_size = cache_size
+        self._nb_blocks = 0
+        self._total_size = 0
+        self._pending_accesses: Dict[ChunkID, float] = {}
+        self._last_accesses_flush = time.monotonic()
 
     @classmethod
     @asynccontextmanager
@@ -152,6 +177,21 @@ class BlockStorage(ChunkStorage):
         async with cls(device, localdb, cache_size)._run() as self:
             yield self
 
+    @asynccontextmanager
+    async def _run(self: B) -> AsyncIterator[B]:
+        async with super()._run() as self:
+            await self._load_stats()
+            try:
+                yield self
+            finally:
+                with trio.CancelScope(shield=True):
+                    # Save the access times before closing the storage
+                    try:
+                        await self.flush_access_times()
+                    # Ignore storage closed exceptions, since it follows an operational error
+                    except FSLocalStorageClosedError:
+                        pass
+
     def _open_cursor(self) -> AsyncContextManager[Cursor]:
         # It doesn't matter for blocks to be commited as soon as they're added
         # since they exists in the remote storage anyway. But it's simply more
@@ -159,38 +199,134 @@ class BlockStorage(ChunkStorage):
         # least compare to the downloading of the block).
         return self.localdb.open_cursor(commit=True)
 
-    # Garbage collection
+    # Database initialization
+
+    async def _create_db(self) -> None:
+        await super()._create_db()
+        async with self._open_cursor() as cursor:
+            cursor.execute("CREATE INDEX IF NOT EXISTS chunks_accessed_on ON chunks (accessed_on)")
+
+    async def _load_stats(self) -> None:
+        async with self._open_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM chunks")
+            self._nb_blocks, self._total_size = cursor.fetchone()
+
+    # Size and chunks
 
     @property
-    def block_limit(self) -> int:
-        return self.cache_size // DEFAULT_BLOCK_SIZE
+    def nb_blocks(self) -> int:
+        return self._nb_blocks
+
+    @property
+    def total_size(self) -> int:
+        return self._total_size
+
+    # Access times
+
+    async def register_access(self, chunk_id: ChunkID) -> None:
+        self._pending_accesses[chunk_id] = time.time()
+        if (
+            len(self._pending_accesses) >= ACCESS_TIMES_FLUSH_BATCH_SIZE
+            or time.monotonic() - self._last_accesses_flush >= ACCESS_TIMES_FLUSH_DELAY
+        ):
+            await self.flush_access_times()
+
+    async def flush_access_times(self) -> None:
+        self._last_accesses_flush = time.monotonic()
+        if not self._pending_accesses:
+            return
+        pending, self._pending_accesses = self._pending_accesses, {}
+        async with self._open_cursor() as cursor:
+            cursor.executemany(
+                "UPDATE chunks SET accessed_on = ? WHERE chunk_id = ?",
+                ((accessed_on, chunk_id.bytes) for chunk_id, accessed_on in pending.items()),
+            )
+
+    # Garbage collection
 
     async def clear_all_blocks(self) -> None:
         async with self._open_cursor() as cursor:
             cursor.execute("DELETE FROM chunks")
+        self._pending_accesses.clear()
+        self._nb_blocks = 0
+        self._total_size = 0
+
+    async def clear_old_blocks(self, size: int, keep: Optional[ChunkID] = None) -> None:
+        """Remove the least recently accessed blocks until at least `size` bytes are freed."""
+        # Make sure the eviction order takes the latest accesses into account
+        await self.flush_access_times()
 
-    async def clear_old_blocks(self, limit: int) -> None:
+        removed = []
+        removed_size = 0
         async with self._open_cursor() as cursor:
-            cursor.execute(
-                """
-                DELETE FROM chunks WHERE chunk_id IN (
-                    SELECT chunk_id FROM chunks ORDER BY accessed_on ASC LIMIT ?
-                )
-                """,
-                (limit,),
+            # The index on `accessed_on` allows to walk the table without sorting it
+            cursor.execute("SELECT chunk_id, size FROM chunks ORDER BY accessed_on ASC")
+            while removed_size < size:
+                rows = cursor.fetchmany(EVICTION_FETCH_SIZE)
+                if not rows:
+                    break
+                for chunk_id, chunk_size in rows:
+                    if keep is not None and chunk_id == keep.bytes:
+                        continue
+                    removed.append(chunk_id)
+                    removed_size += chunk_size
+                    if removed_size >= size:
+                        break
+            cursor.executemany(
+                "DELETE FROM chunks WHERE chunk_id = ?", ((chunk_id,) for chunk_id in removed)
             )
 
-    # Upgraded set method
+        self._nb_blocks -= len(removed)
+        self._total_size -= removed_size
+
+    # Upgraded get/set/clear methods
+
+    async def get_chunk(self, chunk_id: ChunkID) -> bytes:
+        async with self._open_cursor() as cursor:
+            cursor.execute("SELECT data FROM chunks WHERE chunk_id = ?", (chunk_id.bytes,))
+            row = cursor.fetchone()
+        if not row:
+            raise FSLocalMissError(chunk_id)
+        await self.register_access(chunk_id)
+        return self.local_symkey.decrypt(row[0])
 
     async def set_chunk(self, chunk_id: ChunkID, raw: bytes) -> None:
-        # Actual set operation
-        await super().set_chunk(chunk_id, raw)
+        assert isinstance(raw, (bytes, bytearray))
+        ciphered = self.local_symkey.encrypt(raw)
 
-        # Clean up if necessary
-        nb_blocks = await self.get_nb_blocks()
-        extra_blocks = nb_blocks - self.block_limit
-        if extra_blocks > 0:
+        # Update database
+        async with self._open_cursor() as cursor:
+            cursor.execute("SELECT size FROM chunks WHERE chunk_id = ?", (chunk_id.bytes,))
+            row = cursor.fetchone()
+            cursor.execute(
+                """INSERT OR REPLACE INTO
+                chunks (chunk_id, size, offline, accessed_on, data)
+                VALUES (?, ?, ?, ?, ?)""",
+                (chunk_id.bytes, len(ciphered), False, time.time(), ciphered),
+            )
+
+        # Update the stats
+        if row:
+            self._total_size -= row[0]
+        else:
+            self._nb_blocks += 1
+        self._total_size += len(ciphered)
+        self._pending_accesses.pop(chunk_id, None)
+
+        # Clean up if necessary, removing the extra data plus 10% of the cache size
+        extra_size = self._total_size - self.cache_size
+        if extra_size > 0:
+            await self.clear_old_blocks(extra_size + self.cache_size // 10, keep=chunk_id)
+
+    async def clear_chunk(self, chunk_id: ChunkID) -> None:
+        async with self._open_cursor() as cursor:
+            cursor.execute("SELECT size FROM chunks WHERE chunk_id = ?", (chunk_id.bytes,))
+            row = cursor.fetchone()
+            cursor.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id.bytes,))
+
+        if not row:
+            raise FSLocalMissError(chunk_id)
 
-            # Remove the extra block plus 10 % of the cache size, i.e about 100 blocks
-            limit = extra_blocks + self.block_limit // 10
-            await self.clear_old_blocks(limit=limit)
+        self._nb_blocks -= 1
+        self._total_size -= row[0]
+        self._pending_accesses.pop(chunk_id, None)
@@ -5,7 +5,18 @@ import re
 import trio
 from pathlib import Path
 from structlog import get_logger
-from typing import Dict, Tuple, Set, Optional, Union, Pattern, AsyncIterator, AsyncContextManager
+from typing import (
+    Dict,
+    Tuple,
+    Set,
+    Optional,
+    Union,
+    Pattern,
+    Iterable,
+    Iterator,
+    AsyncIterator,
+    AsyncContextManager,
+)
 from async_generator import asynccontextmanager
 
 from parsec.core.fs.exceptions import FSLocalMissError, FSLocalStorageClosedError
@@ -14,6 +25,13 @@ from parsec.core.fs.storage.local_database import LocalDatabase, Cursor
 
 logger = get_logger()
 
+# Maximum number of entry ids looked up in a single query (sqlite limits the
+# number of parameters of a query to 999 by default)
+MANIFEST_LOOKUP_BATCH_SIZE = 500
+
+# Maximum number of manifests written in a single transaction
+DEFAULT_MANIFEST_FLUSH_BATCH_SIZE = 1000
+
 EMPTY_PATTERN = r"^\b$"  # Do not match anything (https://stackoverflow.com/a/2302992/2846140)
 
 
@@ -21,12 +39,28 @@ class ManifestStorage:
     """Persistent storage with cache for storing manifests.
 
     Also stores the checkpoint.
+
+    By default, a manifest is written to the local database as soon as it is set.
+    If `flush_max_delay` is provided, the storage works in group-commit mode instead:
+    the written manifests are kept in the cache and flushed together in a single
+    transaction, at most `flush_max_delay` seconds later or as soon as
+    `flush_batch_size` manifests are waiting to be written.
     """
 
-    def __init__(self, device: LocalDevice, localdb: LocalDatabase, realm_id: EntryID):
+    def __init__(
+        self,
+        device: LocalDevice,
+        localdb: LocalDatabase,
+        realm_id: EntryID,
+        flush_max_delay: Optional[float] = None,
+        flush_batch_size: int = DEFAULT_MANIFEST_FLUSH_BATCH_SIZE,
+    ):
+        assert flush_batch_size > 0
         self.device = device
         self.localdb = localdb
         self.realm_id = realm_id
+        self.flush_max_delay = flush_max_delay
+        self.flush_batch_size = flush_batch_size
 
         # This cache contains all the manifests that have been set or accessed
         # since the last call to `clear_memory_cache`
@@ -40,6 +74,13 @@ class ManifestStorage:
         # still requires to be flushed.
         self._cache_ahead_of_localdb: Dict[EntryID, Set[Union[ChunkID, BlockID]]] = {}
 
+        # In group-commit mode, this set contains the entry ids of the manifests
+        # that have been set without the `cache_only` flag but whose write to
+        # the localdb has been delayed. It is a subset of the keys of
+        # `_cache_ahead_of_localdb`.
+        self._pending_flush: Set[EntryID] = set()
+        self._pending_flush_event = trio.Event()
+
     @property
     def path(self) -> Path:
         return Path(self.localdb.path)
@@ -47,12 +88,29 @@ class ManifestStorage:
     @classmethod
     @asynccontextmanager
     async def run(
-        cls, device: LocalDevice, localdb: LocalDatabase, realm_id: EntryID
+        cls,
+        device: LocalDevice,
+        localdb: LocalDatabase,
+        realm_id: EntryID,
+        flush_max_delay: Optional[float] = None,
+        flush_batch_size: int = DEFAULT_MANIFEST_FLUSH_BATCH_SIZE,
     ) -> AsyncIterator["ManifestStorage"]:
-        self = cls(device, localdb, realm_id)
+        self = cls(
+            device,
+            localdb,
+            realm_id,
+            flush_max_delay=flush_max_delay,
+            flush_batch_size=flush_batch_size,
+        )
         await self._create_db()
         try:
-            yield self
+            async with trio.open_nursery() as nursery:
+                if self.flush_max_delay is not None:
+                    nursery.start_soon(self._group_commit_task)
+                try:
+                    yield self
+                finally:
+                    nursery.cancel_scope.cancel()
         finally:
             with trio.CancelScope(shield=True):
                 # Flush the in-memory cache before closing the storage
@@ -70,6 +128,9 @@ class ManifestStorage:
     async def clear_memory_cache(self, flush: bool = True) -> None:
         if flush:
             await self._flush_cache_ahead_of_persistance()
+        # The delayed writes are not cache-only, they must not be discarded
+        elif self._pending_flush:
+            await self._flush_pending()
         self._cache_ahead_of_localdb.clear()
         self._cache.clear()
 
@@ -171,6 +232,9 @@ class ManifestStorage:
         Raises: Nothing !
         """
         async with self._open_cursor() as cursor:
+            # Delayed writes have to reach the database first, otherwise
+            # their remote version would not be updated
+            self._write_manifests(cursor, self._pending_flush)
             cursor.executemany(
                 "UPDATE vlobs SET remote_version = ? WHERE vlob_id = ?",
                 ((version, entry_id.bytes) for entry_id, version in changed_vlobs.items()),
@@ -234,6 +298,25 @@ class ManifestStorage:
         # Always return the cached value
         return self._cache[entry_id]
 
+    async def get_missing_manifests(self, entry_ids: Iterable[EntryID]) -> Set[EntryID]:
+        """Return the entry ids that are available neither in cache nor in the database."""
+        missing = [entry_id for entry_id in entry_ids if entry_id not in self._cache]
+        if not missing:
+            return set()
+
+        # Look into the database, with a bounded number of parameters per query
+        found: Set[EntryID] = set()
+        async with self._open_cursor() as cursor:
+            for i in range(0, len(missing), MANIFEST_LOOKUP_BATCH_SIZE):
+                batch = missing[i : i + MANIFEST_LOOKUP_BATCH_SIZE]
+                cursor.execute(
+                    f"SELECT vlob_id FROM vlobs WHERE vlob_id IN ({', '.join('?' * len(batch))})",
+                    [entry_id.bytes for entry_id in batch],
+                )
+                found.update(EntryID(row[0]) for row in cursor.fetchall())
+
+        return set(missing) - found
+
     async def set_manifest(
         self,
         entry_id: EntryID,
@@ -246,6 +329,11 @@ class ManifestStorage:
         """
         assert isinstance(entry_id, EntryID)
 
+        # A delayed write must not be replaced by a cache-only manifest,
+        # otherwise it would be lost if the cache is cleared without flushing
+        if cache_only and entry_id in self._pending_flush:
+            await self._ensure_manifest_persistent(entry_id)
+
         # Set the cache first
         self._cache[entry_id] = manifest
 
@@ -256,51 +344,77 @@ class ManifestStorage:
         if removed_ids:
             self._cache_ahead_of_localdb[entry_id] |= removed_ids
 
+        # Cache-only manifests are purposely kept out of the localdb
+        if cache_only:
+            return
+
         # Flush the cached value to the localdb
-        if not cache_only:
+        if self.flush_max_delay is None:
             await self._ensure_manifest_persistent(entry_id)
 
-    async def _ensure_manifest_persistent(self, entry_id: EntryID) -> None:
-
-        # Get cursor
-        async with self._open_cursor() as cursor:
-
-            # Flushing is not necessary
-            if entry_id not in self._cache_ahead_of_localdb:
-                return
-
-            # Safely get the manifest
-            manifest = self._cache[entry_id]
-
-            # Dump and decrypt the manifest
-            ciphered = manifest.dump_and_encrypt(self.device.local_symkey)
-
-            # Insert into the local database
-            cursor.execute(
-                """INSERT OR REPLACE INTO vlobs (vlob_id, blob, need_sync, base_version, remote_version)
-                VALUES (
-                    ?, ?, ?, ?,
-                    max(
-                        ?,
-                        IFNULL((SELECT remote_version FROM vlobs WHERE vlob_id=?), 0)
-                    )
-                )""",
-                (
+        # Group-commit mode: delay the write
+        else:
+            self._pending_flush.add(entry_id)
+            if len(self._pending_flush) >= self.flush_batch_size:
+                await self._flush_pending()
+            else:
+                self._pending_flush_event.set()
+
+    def _write_manifests(self, cursor: Cursor, entry_ids: Iterable[EntryID]) -> None:
+        # Flushing is not necessary for entries that are already up-to-date
+        entry_ids = [entry_id for entry_id in entry_ids if entry_id in self._cache_ahead_of_localdb]
+        if not entry_ids:
+            return
+
+        def _vlob_rows() -> Iterator[Tuple[bytes, bytes, bool, int, int, bytes]]:
+            for entry_id in entry_ids:
+                # Safely get the manifest
+                manifest = self._cache[entry_id]
+                # Dump and decrypt the manifest
+                ciphered = manifest.dump_and_encrypt(self.device.local_symkey)
+                yield (
                     entry_id.bytes,
                     ciphered,
                     manifest.need_sync,
                     manifest.base_version,
                     manifest.base_version,
                     entry_id.bytes,
-                ),
-            )
+                )
+
+        # Insert into the local database
+        cursor.executemany(
+            """INSERT OR REPLACE INTO vlobs (vlob_id, blob, need_sync, base_version, remote_version)
+            VALUES (
+                ?, ?, ?, ?,
+                max(
+                    ?,
+                    IFNULL((SELECT remote_version FROM vlobs WHERE vlob_id=?), 0)
+                )
+            )""",
+            _vlob_rows(),
+        )
+
+        # Clean all the pending chunks
+        removed_chunks = [
+            (chunk_id.bytes,)
+            for entry_id in entry_ids
+            for chunk_id in self._cache_ahead_of_localdb[entry_id]
+        ]
+        if removed_chunks:
+            cursor.executemany("DELETE FROM chunks WHERE chunk_id = ?", removed_chunks)
+
+        # Safely tag entries as up-to-date
+        for entry_id in entry_ids:
+            self._cache_ahead_of_localdb.pop(entry_id)
+            self._pending_flush.discard(entry_id)
 
-            # Clean all the pending chunks
-            for chunk_id in self._cache_ahead_of_localdb[entry_id]:
-                cursor.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id.bytes,))
+    async def _flush_manifests(self, entry_ids: Iterable[EntryID]) -> None:
+        # Write all the manifests in a single transaction
+        async with self._open_cursor() as cursor:
+            self._write_manifests(cursor, entry_ids)
 
-            # Safely tag entry as up-to-date
-            self._cache_ahead_of_localdb.pop(entry_id)
+    async def _ensure_manifest_persistent(self, entry_id: EntryID) -> None:
+        await self._flush_manifests((entry_id,))
 
     async def ensure_manifest_persistent(self, entry_id: EntryID) -> None:
         """
@@ -311,11 +425,27 @@ class ManifestStorage:
         if entry_id in self._cache_ahead_of_localdb:
             await self._ensure_manifest_persistent(entry_id)
 
+    async def _flush_pending(self) -> None:
+        await self._flush_manifests(list(self._pending_flush))
+
     async def _flush_cache_ahead_of_persistance(self) -> None:
-        # Flush until the all the cache is gone
+        # Flush until the all the cache is gone, one batch at a time
         while self._cache_ahead_of_localdb:
-            entry_id = next(iter(self._cache_ahead_of_localdb))
-            await self._ensure_manifest_persistent(entry_id)
+            entry_ids = list(self._cache_ahead_of_localdb)[: self.flush_batch_size]
+            await self._flush_manifests(entry_ids)
+
+    async def _group_commit_task(self) -> None:
+        assert self.flush_max_delay is not None
+        while True:
+            await self._pending_flush_event.wait()
+            # Let the writes accumulate before flushing them all together
+            await trio.sleep(self.flush_max_delay)
+            self._pending_flush_event = trio.Event()
+            try:
+                await self._flush_pending()
+            # The storage is closed following an operational error, nothing more to do
+            except FSLocalStorageClosedError:
+                return
 
     # This method is not used in the code base but it is still tested
     # as it might come handy in a cleanup routine later
@@ -339,6 +469,7 @@ class ManifestStorage:
             # Clean all the pending chunks
             # TODO: should also add the content of the popped manifest
             pending_chunk_ids = self._cache_ahead_of_localdb.pop(entry_id, ())
+            self._pending_flush.discard(entry_id)
             for chunk_id in pending_chunk_ids:
                 cursor.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id.bytes,))
 
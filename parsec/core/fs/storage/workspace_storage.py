@@ -2,7 +2,7 @@
 
 from pathlib import Path
 from collections import defaultdict
-from typing import Dict, Tuple, Set, Optional, Union, AsyncIterator, NoReturn, Pattern
+from typing import Dict, Tuple, Set, Optional, Union, Iterable, AsyncIterator, NoReturn, Pattern
 
 import trio
 from trio import lowlevel
@@ -22,8 +22,12 @@ from parsec.core.types import (
 from parsec.core.fs.exceptions import FSError, FSLocalMissError, FSInvalidFileDescriptor
 
 from parsec.core.fs.storage.local_database import LocalDatabase
-from parsec.core.fs.storage.manifest_storage import ManifestStorage
+from parsec.core.fs.storage.manifest_storage import (
+    ManifestStorage,
+    DEFAULT_MANIFEST_FLUSH_BATCH_SIZE,
+)
 from parsec.core.fs.storage.chunk_storage import ChunkStorage, BlockStorage
+from parsec.core.fs.storage.chunk_cache import ChunkCache
 from parsec.core.fs.storage.version import WORKSPACE_DATA_STORAGE_NAME, WORKSPACE_CACHE_STORAGE_NAME
 
 
@@ -32,6 +36,9 @@ logger = get_logger()
 # TODO: should be in config.py
 DEFAULT_BLOCK_CACHE_SIZE = 512 * 1024 * 1024
 DEFAULT_CHUNK_VACUUM_THRESHOLD = 512 * 1024 * 1024
+DEFAULT_CHUNK_MEMORY_CACHE_SIZE = 32 * 1024 * 1024
+# Group-commit delay used for the workspaces accessed through the user fs
+DEFAULT_MANIFEST_FLUSH_MAX_DELAY = 0.1  # seconds
 
 
 class BaseWorkspaceStorage:
@@ -46,6 +53,7 @@ class BaseWorkspaceStorage:
         workspace_id: EntryID,
         block_storage: ChunkStorage,
         chunk_storage: ChunkStorage,
+        chunk_cache: ChunkCache,
     ):
         self.path = path
         self.device = device
@@ -64,6 +72,11 @@ class BaseWorkspaceStorage:
         self.block_storage = block_storage
         self.chunk_storage = chunk_storage
 
+        # In-memory cache of the clean blocks, in front of the block storage.
+        # Dirty chunks are not cached given the manifest storage removes them
+        # from the local database on its own when flushing a manifest.
+        self.chunk_cache = chunk_cache
+
         # Pattern attributes
         # Set by `_load_prevent_sync_pattern` in WorkspaceStorage.run()
         self._prevent_sync_pattern: Pattern[str]
@@ -88,6 +101,9 @@ class BaseWorkspaceStorage:
     ) -> None:
         raise NotImplementedError
 
+    async def get_missing_manifests(self, entry_ids: Iterable[EntryID]) -> Set[EntryID]:
+        raise NotImplementedError
+
     async def ensure_manifest_persistent(self, entry_id: EntryID) -> None:
         raise NotImplementedError
 
@@ -147,10 +163,13 @@ class BaseWorkspaceStorage:
 
     async def set_clean_block(self, block_id: BlockID, block: bytes) -> None:
         assert isinstance(block_id, BlockID)
-        return await self.block_storage.set_chunk(ChunkID(block_id), block)
+        chunk_id = ChunkID(block_id)
+        await self.block_storage.set_chunk(chunk_id, block)
+        self.chunk_cache.set(chunk_id, block)
 
     async def clear_clean_block(self, block_id: BlockID) -> None:
         assert isinstance(block_id, BlockID)
+        self.chunk_cache.invalidate(ChunkID(block_id))
         try:
             await self.block_storage.clear_chunk(ChunkID(block_id))
         except FSLocalMissError:
@@ -161,19 +180,37 @@ class BaseWorkspaceStorage:
 
     # Chunk interface
 
+    async def is_chunk(self, chunk_id: ChunkID) -> bool:
+        assert isinstance(chunk_id, ChunkID)
+        if await self.chunk_storage.is_chunk(chunk_id):
+            return True
+        return await self.block_storage.is_chunk(chunk_id)
+
     async def get_chunk(self, chunk_id: ChunkID) -> bytes:
         assert isinstance(chunk_id, ChunkID)
+        # A cached block cannot be shadowed by a dirty chunk, given
+        # `set_chunk` invalidates the corresponding cache entry
+        data = self.chunk_cache.get(chunk_id)
+        if data is not None:
+            # Only clean blocks are cached, keep their access time up to date
+            # so the block storage doesn't evict them as if they were unused
+            await self.block_storage.register_access(chunk_id)
+            return data
         try:
             return await self.chunk_storage.get_chunk(chunk_id)
         except FSLocalMissError:
-            return await self.block_storage.get_chunk(chunk_id)
+            data = await self.block_storage.get_chunk(chunk_id)
+        self.chunk_cache.set(chunk_id, data)
+        return data
 
     async def set_chunk(self, chunk_id: ChunkID, block: bytes) -> None:
         assert isinstance(chunk_id, ChunkID)
+        self.chunk_cache.invalidate(chunk_id)
         return await self.chunk_storage.set_chunk(chunk_id, block)
 
     async def clear_chunk(self, chunk_id: ChunkID, miss_ok: bool = False) -> None:
         assert isinstance(chunk_id, ChunkID)
+        self.chunk_cache.invalidate(chunk_id)
         try:
             await self.chunk_storage.clear_chunk(chunk_id)
         except FSLocalMissError:
@@ -212,9 +249,10 @@ class WorkspaceStorage(BaseWorkspaceStorage):
         cache_localdb: LocalDatabase,
         block_storage: ChunkStorage,
         chunk_storage: ChunkStorage,
+        chunk_cache: ChunkCache,
         manifest_storage: ManifestStorage,
     ):
-        super().__init__(device, path, workspace_id, block_storage, chunk_storage)
+        super().__init__(device, path, workspace_id, block_storage, chunk_storage, chunk_cache)
         self.data_localdb = data_localdb
         self.cache_localdb = cache_localdb
         self.manifest_storage = manifest_storage
@@ -228,6 +266,9 @@ class WorkspaceStorage(BaseWorkspaceStorage):
         workspace_id: EntryID,
         cache_size: int = DEFAULT_BLOCK_CACHE_SIZE,
         vacuum_threshold: int = DEFAULT_CHUNK_VACUUM_THRESHOLD,
+        chunk_memory_cache_size: int = DEFAULT_CHUNK_MEMORY_CACHE_SIZE,
+        manifest_flush_max_delay: Optional[float] = None,
+        manifest_flush_batch_size: int = DEFAULT_MANIFEST_FLUSH_BATCH_SIZE,
     ) -> AsyncIterator["WorkspaceStorage"]:
         data_path = path / WORKSPACE_DATA_STORAGE_NAME
         cache_path = path / WORKSPACE_CACHE_STORAGE_NAME
@@ -247,7 +288,11 @@ class WorkspaceStorage(BaseWorkspaceStorage):
 
                     # Manifest storage service
                     async with ManifestStorage.run(
-                        device, data_localdb, workspace_id
+                        device,
+                        data_localdb,
+                        workspace_id,
+                        flush_max_delay=manifest_flush_max_delay,
+                        flush_batch_size=manifest_flush_batch_size,
                     ) as manifest_storage:
 
                         # Chunk storage service
@@ -262,6 +307,7 @@ class WorkspaceStorage(BaseWorkspaceStorage):
                                 cache_localdb=cache_localdb,
                                 block_storage=block_storage,
                                 chunk_storage=chunk_storage,
+                                chunk_cache=ChunkCache(chunk_memory_cache_size),
                                 manifest_storage=manifest_storage,
                             )
 
@@ -298,6 +344,9 @@ class WorkspaceStorage(BaseWorkspaceStorage):
         """Raises: FSLocalMissError"""
         return await self.manifest_storage.get_manifest(entry_id)
 
+    async def get_missing_manifests(self, entry_ids: Iterable[EntryID]) -> Set[EntryID]:
+        return await self.manifest_storage.get_missing_manifests(entry_ids)
+
     async def set_manifest(
         self,
         entry_id: EntryID,
@@ -370,6 +419,7 @@ class WorkspaceStorageTimestamped(BaseWorkspaceStorage):
             workspace_storage.workspace_id,
             block_storage=workspace_storage.block_storage,
             chunk_storage=workspace_storage.chunk_storage,
+            chunk_cache=workspace_storage.chunk_cache,
         )
 
         self._cache: Dict[EntryID, BaseLocalManifest] = {}
@@ -420,6 +470,9 @@ class WorkspaceStorageTimestamped(BaseWorkspaceStorage):
         except KeyError:
             raise FSLocalMissError(entry_id)
 
+    async def get_missing_manifests(self, entry_ids: Iterable[EntryID]) -> Set[EntryID]:
+        return {entry_id for entry_id in entry_ids if entry_id not in self._cache}
+
     async def set_manifest(
         self,
         entry_id: EntryID,
@@ -1,6 +1,7 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
 import trio
+from uuid import UUID
 from pathlib import Path
 from trio_typing import TaskStatus
 from pendulum import DateTime, now as pendulum_now
@@ -57,6 +58,7 @@ from parsec.core.remote_devices_manager import RemoteDevicesManager
 from parsec.core.fs.workspacefs import WorkspaceFS
 from parsec.core.fs.remote_loader import UserRemoteLoader
 from parsec.core.fs.storage import UserStorage, WorkspaceStorage
+from parsec.core.fs.storage.workspace_storage import DEFAULT_MANIFEST_FLUSH_MAX_DELAY
 from parsec.core.fs.userfs.merging import merge_local_user_manifests, merge_workspace_entry
 from parsec.core.fs.exceptions import (
     FSError,
@@ -71,6 +73,13 @@ from parsec.core.fs.exceptions import (
 
 logger = get_logger()
 
+# Messages are fetched and processed by pages to bound memory usage
+MESSAGE_GET_PAGE_SIZE = 100
+
+# Reencryption batches are split in chunks processed concurrently in worker threads
+REENCRYPTION_MAX_WORKERS = 4
+REENCRYPTION_CHUNK_SIZE = 100
+
 AnyEntryName = Union[EntryName, str]
 
 
@@ -80,11 +89,47 @@ class ReencryptionJob:
         backend_cmds: BackendAuthenticatedCmds,
         new_workspace_entry: WorkspaceEntry,
         old_workspace_entry: WorkspaceEntry,
+        max_workers: int = REENCRYPTION_MAX_WORKERS,
     ) -> None:
         self.backend_cmds = backend_cmds
         self.new_workspace_entry = new_workspace_entry
         self.old_workspace_entry = old_workspace_entry
         assert new_workspace_entry.id == old_workspace_entry.id
+        self._limiter = trio.CapacityLimiter(max_workers)
+
+    def _reencrypt_chunk(
+        self, items: List[Tuple[UUID, int, bytes]]
+    ) -> List[Tuple[UUID, int, bytes]]:
+        old_key = self.old_workspace_entry.key
+        new_key = self.new_workspace_entry.key
+        return [
+            (vlob_id, version, new_key.encrypt(old_key.decrypt(blob)))
+            for vlob_id, version, blob in items
+        ]
+
+    async def _reencrypt_batch(
+        self, items: List[Tuple[UUID, int, bytes]]
+    ) -> List[Tuple[UUID, int, bytes]]:
+        # Crypto operations release the GIL, so they run in parallel in the
+        # worker threads instead of blocking the trio loop
+        chunks = [
+            items[i : i + REENCRYPTION_CHUNK_SIZE]
+            for i in range(0, len(items), REENCRYPTION_CHUNK_SIZE)
+        ]
+        results: List[List[Tuple[UUID, int, bytes]]] = [[] for _ in chunks]
+
+        async def _reencrypt_chunk_in_thread(
+            index: int, chunk: List[Tuple[UUID, int, bytes]]
+        ) -> None:
+            results[index] = await trio.to_thread.run_sync(
+                self._reencrypt_chunk, chunk, limiter=self._limiter
+            )
+
+        async with open_service_nursery() as nursery:
+            for index, chunk in enumerate(chunks):
+                nursery.start_soon(_reencrypt_chunk_in_thread, index, chunk)
+
+        return [item for result in results for item in result]
 
     async def do_one_batch(self, size: int = 1000) -> Tuple[int, int]:
         """
@@ -113,11 +158,9 @@ class ReencryptionJob:
                     f"Cannot do reencryption maintenance on workspace {workspace_id}: {rep}"
                 )
 
-            donebatch = []
-            for item in rep["batch"]:
-                cleartext = self.old_workspace_entry.key.decrypt(item["blob"])
-                newciphered = self.new_workspace_entry.key.encrypt(cleartext)
-                donebatch.append((item["vlob_id"], item["version"], newciphered))
+            donebatch = await self._reencrypt_batch(
+                [(item["vlob_id"], item["version"], item["blob"]) for item in rep["batch"]]
+            )
 
             rep = await self.backend_cmds.vlob_maintenance_save_reencryption_batch(
                 workspace_id, new_encryption_revision, donebatch
@@ -275,7 +318,14 @@ class UserFS:
         async def workspace_storage_task(
             task_status: TaskStatus[WorkspaceStorage] = trio.TASK_STATUS_IGNORED
         ) -> None:
-            async with WorkspaceStorage.run(self.device, path, workspace_id) as workspace_storage:
+            # Group the manifest writes, so that creating many files doesn't
+            # require one commit per file
+            async with WorkspaceStorage.run(
+                self.device,
+                path,
+                workspace_id,
+                manifest_flush_max_delay=DEFAULT_MANIFEST_FLUSH_MAX_DELAY,
+            ) as workspace_storage:
                 task_status.started(workspace_storage)
                 await trio.sleep_forever()
 
@@ -713,32 +763,42 @@ class UserFS:
         async with self._process_messages_lock:
             user_manifest = self.get_user_manifest()
             initial_last_processed_message = user_manifest.last_processed_message
-            try:
-                rep = await self.backend_cmds.message_get(offset=initial_last_processed_message)
+            new_last_processed_message = initial_last_processed_message
+            offset = initial_last_processed_message
+            while True:
+                try:
+                    rep = await self.backend_cmds.message_get(
+                        offset=offset, page_size=MESSAGE_GET_PAGE_SIZE
+                    )
 
-            except BackendNotAvailable as exc:
-                raise FSBackendOfflineError(str(exc)) from exc
+                except BackendNotAvailable as exc:
+                    raise FSBackendOfflineError(str(exc)) from exc
 
-            except BackendConnectionError as exc:
-                raise FSError(f"Cannot retrieve user messages: {exc}") from exc
+                except BackendConnectionError as exc:
+                    raise FSError(f"Cannot retrieve user messages: {exc}") from exc
 
-            if rep["status"] != "ok":
-                raise FSError(f"Cannot retrieve user messages: {rep}")
+                if rep["status"] != "ok":
+                    raise FSError(f"Cannot retrieve user messages: {rep}")
 
-            new_last_processed_message = initial_last_processed_message
-            for msg in rep["messages"]:
-                try:
-                    await self._process_message(msg["sender"], msg["timestamp"], msg["body"])
-                    new_last_processed_message = msg["count"]
+                for msg in rep["messages"]:
+                    try:
+                        await self._process_message(msg["sender"], msg["timestamp"], msg["body"])
+                        new_last_processed_message = msg["count"]
 
-                except FSBackendOfflineError:
-                    raise
+                    except FSBackendOfflineError:
+                        raise
 
-                except FSError as exc:
-                    logger.warning(
-                        "Invalid message", reason=exc, sender=msg["sender"], count=msg["count"]
-                    )
-                    errors.append((msg["count"], exc))
+                    except FSError as exc:
+                        logger.warning(
+                            "Invalid message", reason=exc, sender=msg["sender"], count=msg["count"]
+                        )
+                        errors.append((msg["count"], exc))
+
+                # Note backends older than API 2.3 ignore the page size and
+                # return all the messages at once
+                if len(rep["messages"]) < MESSAGE_GET_PAGE_SIZE:
+                    break
+                offset = rep["messages"][-1]["count"]
 
             # Update message offset in user manifest
             async with self._update_user_manifest_lock:
@@ -1,11 +1,14 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
-from typing import Tuple, cast, Optional, AsyncIterator, Dict
+from typing import Tuple, cast, Optional, AsyncIterator, Dict, Callable
 from async_generator import asynccontextmanager
+from structlog import get_logger
 
 from parsec.core.types import (
     EntryID,
     FsPath,
+    LocalDevice,
+    WorkspaceEntry,
     WorkspaceRole,
     BaseLocalManifest,
     LocalFileManifest,
@@ -16,9 +19,13 @@ from parsec.core.types import (
 )
 
 
+from parsec.event_bus import EventBus
 from parsec.core.core_events import CoreEvent
-from parsec.core.fs.workspacefs.file_transactions import FileTransactions
+from parsec.core.fs.remote_loader import RemoteLoader
+from parsec.core.fs.storage import BaseWorkspaceStorage
+from parsec.core.fs.workspacefs.file_transactions import FileTransactions, DEFAULT_READAHEAD_BLOCKS
 from parsec.core.fs.exceptions import (
+    FSError,
     FSPermissionError,
     FSNoAccessError,
     FSReadOnlyError,
@@ -31,11 +38,33 @@ from parsec.core.fs.exceptions import (
     FSLocalMissError,
 )
 
+logger = get_logger()
 
 WRITE_RIGHT_ROLES = (WorkspaceRole.OWNER, WorkspaceRole.MANAGER, WorkspaceRole.CONTRIBUTOR)
 
 
 class EntryTransactions(FileTransactions):
+    def __init__(
+        self,
+        workspace_id: EntryID,
+        get_workspace_entry: Callable[[], WorkspaceEntry],
+        device: LocalDevice,
+        local_storage: BaseWorkspaceStorage,
+        remote_loader: RemoteLoader,
+        event_bus: EventBus,
+        readahead_blocks: int = DEFAULT_READAHEAD_BLOCKS,
+    ):
+        super().__init__(
+            workspace_id,
+            get_workspace_entry,
+            device,
+            local_storage,
+            remote_loader,
+            event_bus,
+            readahead_blocks=readahead_blocks,
+        )
+        # Base version of the folders whose children manifests have been prefetched
+        self._prefetched_folders: Dict[EntryID, int] = {}
 
     # Right management helper
 
@@ -124,6 +153,43 @@ class EntryTransactions(FileTransactions):
         manifest = await self._load_manifest(entry_id)
         return manifest, confined
 
+    async def _prefetch_children_manifests(self, manifest: BaseLocalManifest) -> None:
+        """Download the missing children manifests of a folder in bulk.
+
+        Listing a folder is typically followed by a look-up of each of its children,
+        which means one `vlob_read` round-trip per child that is not available locally.
+        This is a best-effort optimization: on error, the children manifests are simply
+        going to be downloaded one by one when accessed.
+        """
+        if not isinstance(manifest, (LocalFolderManifest, LocalWorkspaceManifest)):
+            return
+        # The children of a folder only change remotely along with its base version
+        if self._prefetched_folders.get(manifest.id) == manifest.base_version:
+            return
+        missing = await self.local_storage.get_missing_manifests(manifest.children.values())
+        if not missing:
+            self._prefetched_folders[manifest.id] = manifest.base_version
+            return
+
+        try:
+            remote_manifests = await self.remote_loader.load_manifests(missing)
+        except FSError as exc:
+            logger.debug("Cannot prefetch children manifests", entry_id=manifest.id, exc_info=exc)
+            return
+
+        prevent_sync_pattern = self.local_storage.get_prevent_sync_pattern()
+        for entry_id, remote_manifest in remote_manifests.items():
+            async with self.local_storage.lock_entry_id(entry_id):
+                # The manifest might have been fetched in the meantime
+                if not await self.local_storage.get_missing_manifests([entry_id]):
+                    continue
+                local_manifest = BaseLocalManifest.from_remote(
+                    remote_manifest, prevent_sync_pattern=prevent_sync_pattern
+                )
+                await self.local_storage.set_manifest(entry_id, local_manifest)
+
+        self._prefetched_folders[manifest.id] = manifest.base_version
+
     @asynccontextmanager
     async def _lock_parent_manifest_from_path(
         self, path: FsPath
@@ -191,6 +257,22 @@ class EntryTransactions(FileTransactions):
         stats["confinement_point"] = confinement_point
         return stats
 
+    async def entry_list_info(self, path: FsPath) -> Dict[str, object]:
+        """Same as `entry_info`, meant to be used when listing a folder.
+
+        The missing children manifests of the folder are prefetched given
+        the listing is typically followed by a look-up of each child.
+        """
+        # Check read rights
+        self.check_read_rights(path)
+
+        # Fetch data
+        manifest, confinement_point = await self._get_manifest_from_path(path)
+        await self._prefetch_children_manifests(manifest)
+        stats = manifest.to_stats()
+        stats["confinement_point"] = confinement_point
+        return stats
+
     async def entry_rename(
         self, source: FsPath, destination: FsPath, overwrite: bool = True
     ) -> Optional[EntryID]:
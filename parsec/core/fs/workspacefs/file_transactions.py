@@ -1,11 +1,12 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
 from parsec.core.core_events import CoreEvent
-from typing import Tuple, List, Callable, Dict, Optional, cast, AsyncIterator
+from typing import Tuple, List, Callable, Dict, Optional, Union, cast, AsyncIterator
 
 from collections import defaultdict
 from async_generator import asynccontextmanager
 
+from parsec.utils import open_service_nursery
 from parsec.event_bus import EventBus
 from parsec.core.types import FileDescriptor, EntryID, LocalDevice
 
@@ -32,6 +33,9 @@ from parsec.api.data import BlockAccess
 
 __all__ = ("FSInvalidFileDescriptor", "FileTransactions")
 
+# Number of blocks to download ahead of a sequential read
+DEFAULT_READAHEAD_BLOCKS = 4
+
 
 # Helpers
 
@@ -40,7 +44,7 @@ def normalize_argument(arg: int, manifest: LocalFileManifest) -> int:
     return manifest.size if arg < 0 else arg
 
 
-def padded_data(data: bytes, start: int, stop: int) -> bytes:
+def padded_data(data: Union[bytes, memoryview], start: int, stop: int) -> bytes:
     """Return the data between the start and stop index.
 
     The data is treated as padded with an infinite amount of null bytes before index 0.
@@ -49,7 +53,7 @@ def padded_data(data: bytes, start: int, stop: int) -> bytes:
     if start <= stop <= 0:
         return b"\x00" * (stop - start)
     if 0 <= start <= stop:
-        return data[start:stop]
+        return bytes(data[start:stop])
     return b"\x00" * (0 - start) + data[0:stop]
 
 
@@ -83,6 +87,7 @@ class FileTransactions:
         local_storage: BaseWorkspaceStorage,
         remote_loader: RemoteLoader,
         event_bus: EventBus,
+        readahead_blocks: int = DEFAULT_READAHEAD_BLOCKS,
     ):
         self.workspace_id = workspace_id
         self.get_workspace_entry = get_workspace_entry
@@ -90,7 +95,9 @@ class FileTransactions:
         self.local_storage = local_storage
         self.remote_loader = remote_loader
         self.event_bus = event_bus
+        self.readahead_blocks = readahead_blocks
         self._write_count: Dict[FileDescriptor, int] = defaultdict(int)
+        self._read_end: Dict[FileDescriptor, int] = {}
 
     # Event helper
 
@@ -99,19 +106,30 @@ class FileTransactions:
 
     # Helper
 
-    async def _read_chunk(self, chunk: Chunk) -> bytes:
+    async def _read_chunk(self, chunk: Chunk) -> memoryview:
+        # Slicing a memoryview does not copy the underlying data
         data = await self.local_storage.get_chunk(chunk.id)
-        return data[chunk.start - chunk.raw_offset : chunk.stop - chunk.raw_offset]
+        return memoryview(data)[chunk.start - chunk.raw_offset : chunk.stop - chunk.raw_offset]
 
-    async def _write_chunk(self, chunk: Chunk, content: bytes, offset: int = 0) -> int:
+    async def _write_chunk(
+        self, chunk: Chunk, content: Union[bytes, memoryview], offset: int = 0
+    ) -> int:
         data = padded_data(content, offset, offset + chunk.stop - chunk.start)
         await self.local_storage.set_chunk(chunk.id, data)
         return len(data)
 
-    async def _build_data(self, chunks: Tuple[Chunk, ...]) -> Tuple[bytes, List[BlockAccess]]:
+    async def _build_data(self, chunks: Tuple[Chunk, ...]) -> Tuple[memoryview, List[BlockAccess]]:
         # Empty array
         if not chunks:
-            return bytearray(), []
+            return memoryview(b""), []
+
+        # Fast path: the data is fully covered by a single chunk, no copy needed
+        if len(chunks) == 1:
+            try:
+                return await self._read_chunk(chunks[0]), []
+            except FSLocalMissError:
+                assert chunks[0].access is not None
+                return memoryview(b""), [chunks[0].access]
 
         # Build byte array
         missing = []
@@ -125,7 +143,26 @@ class FileTransactions:
                 missing.append(chunk.access)
 
         # Return byte array
-        return result, missing
+        return memoryview(result), missing
+
+    async def _get_readahead(self, manifest: LocalFileManifest, offset: int) -> List[BlockAccess]:
+        # Read-ahead is disabled
+        if self.readahead_blocks <= 0 or offset >= manifest.size:
+            return []
+
+        # Stick to block boundaries
+        start = offset - offset % manifest.blocksize
+        size = self.readahead_blocks * manifest.blocksize
+        chunks = prepare_read(manifest, size, start)
+
+        # Only consider the blocks that are not available locally
+        accesses = []
+        for chunk in chunks:
+            if chunk.access is None or chunk.access in accesses:
+                continue
+            if not await self.local_storage.is_chunk(chunk.id):
+                accesses.append(chunk.access)
+        return accesses
 
     # Locking helper
 
@@ -199,8 +236,9 @@ class FileTransactions:
             # Atomic change
             self.local_storage.remove_file_descriptor(fd)
 
-            # Clear write count
+            # Clear write count and read position
             self._write_count.pop(fd, None)
+            self._read_end.pop(fd, None)
 
     async def fd_write(
         self, fd: FileDescriptor, content: bytes, offset: int, constrained: bool = False
@@ -257,12 +295,29 @@ class FileTransactions:
     async def fd_read(
         self, fd: FileDescriptor, size: int, offset: int, raise_eof: bool = False
     ) -> bytes:
+        data = await self.fd_read_buffer(fd, size, offset, raise_eof=raise_eof)
+        return data.tobytes()
+
+    async def fd_read_buffer(
+        self, fd: FileDescriptor, size: int, offset: int, raise_eof: bool = False
+    ) -> memoryview:
+        """Same as `fd_read`, but avoid copying the data by returning a memoryview.
+
+        The returned memoryview is read-only when it directly references the content
+        of a chunk, and writable when the data had to be gathered from several chunks.
+        """
         # Loop over attemps
         missing: List[BlockAccess] = []
+        readahead: List[BlockAccess] = []
         while True:
 
-            # Load missing blocks
-            await self.remote_loader.load_blocks(missing)
+            # Load missing blocks, along with the following blocks in case of sequential read
+            if readahead:
+                async with open_service_nursery() as nursery:
+                    nursery.start_soon(self.remote_loader.prefetch_blocks, readahead)
+                    await self.remote_loader.load_blocks(missing)
+            else:
+                await self.remote_loader.load_blocks(missing)
 
             # Fetch and lock
             async with self._load_and_lock_file(fd) as manifest:
@@ -277,7 +332,7 @@ class FileTransactions:
 
                 # No-op
                 if offset > manifest.size:
-                    return b""
+                    return memoryview(b"")
 
                 # Prepare
                 chunks = prepare_read(manifest, size, offset)
@@ -285,8 +340,18 @@ class FileTransactions:
 
                 # Return the data
                 if not missing:
+                    self._read_end[fd] = offset + len(data)
                     return data
 
+                # Sequential read, also fetch the following blocks
+                readahead = []
+                if self._read_end.get(fd, 0) == offset:
+                    readahead = [
+                        access
+                        for access in await self._get_readahead(manifest, offset + size)
+                        if access not in missing
+                    ]
+
     async def fd_flush(self, fd: FileDescriptor) -> None:
         async with self._load_and_lock_file(fd) as manifest:
             await self._manifest_reshape(manifest)
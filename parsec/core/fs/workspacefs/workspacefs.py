@@ -7,7 +7,8 @@ from typing import List, Dict, Tuple, AsyncIterator, cast, Pattern, Callable, Op
 from pendulum import DateTime, now as pendulum_now
 
 from parsec.event_bus import EventBus
-from parsec.api.data import BaseManifest as BaseRemoteManifest
+from parsec.core.core_events import CoreEvent
+from parsec.api.data import BlockAccess, BaseManifest as BaseRemoteManifest
 from parsec.api.data import FileManifest as RemoteFileManifest
 from parsec.api.protocol import UserID, MaintenanceType
 from parsec.core.types import (
@@ -282,7 +283,7 @@ class WorkspaceFS:
             FSError
         """
         path = FsPath(path)
-        info = await self.transactions.entry_info(path)
+        info = await self.transactions.entry_list_info(path)
         if "children" not in info:
             raise FSNotADirectoryError(filename=str(path))
         for child in cast(Dict[str, EntryID], info["children"]):
@@ -504,12 +505,16 @@ class WorkspaceFS:
             await self.minimal_sync(child)
 
     async def _upload_blocks(self, manifest: RemoteFileManifest) -> None:
-        for access in manifest.blocks:
-            try:
-                data = await self.local_storage.get_dirty_block(access.id)
-            except FSLocalMissError:
-                continue
-            await self.remote_loader.upload_block(access, data)
+        def _on_block_uploaded(access: BlockAccess) -> None:
+            self.event_bus.send(
+                CoreEvent.FS_BLOCK_UPLOADED,
+                workspace_id=self.workspace_id,
+                id=manifest.id,
+                block_id=access.id,
+                size=access.size,
+            )
+
+        await self.remote_loader.upload_blocks(manifest.blocks, on_uploaded=_on_block_uploaded)
 
     async def minimal_sync(self, entry_id: EntryID) -> None:
         """
@@ -41,6 +41,7 @@ from parsec.core.mountpoint import mountpoint_manager_factory, MountpointManager
 from parsec.core.messages_monitor import monitor_messages
 from parsec.core.sync_monitor import monitor_sync
 from parsec.core.fs import UserFS
+from parsec.core.fs.storage import CertificateStorage
 
 
 logger = get_logger()
@@ -327,35 +328,39 @@ async def logged_core_factory(
         max_cooldown=config.backend_max_cooldown,
         max_pool=config.backend_max_connections,
         keepalive=config.backend_connection_keepalive,
+        multiplexing=config.backend_multiplexing,
     )
 
     path = config.data_base_dir / device.slug
-    remote_devices_manager = RemoteDevicesManager(backend_conn.cmds, device.root_verify_key)
-    async with UserFS.run(
-        device, path, backend_conn.cmds, remote_devices_manager, event_bus, prevent_sync_pattern
-    ) as user_fs:
-
-        backend_conn.register_monitor(partial(monitor_messages, user_fs, event_bus))
-        backend_conn.register_monitor(partial(monitor_sync, user_fs, event_bus))
-
-        async with backend_conn.run():
-            async with mountpoint_manager_factory(
-                user_fs,
-                event_bus,
-                config.mountpoint_base_dir,
-                mount_all=config.mountpoint_enabled,
-                mount_on_workspace_created=config.mountpoint_enabled,
-                mount_on_workspace_shared=config.mountpoint_enabled,
-                unmount_on_workspace_revoked=config.mountpoint_enabled,
-                exclude_from_mount_all=config.disabled_workspaces,
-            ) as mountpoint_manager:
-
-                yield LoggedCore(
-                    config=config,
-                    device=device,
-                    event_bus=event_bus,
-                    mountpoint_manager=mountpoint_manager,
-                    user_fs=user_fs,
-                    remote_devices_manager=remote_devices_manager,
-                    backend_conn=backend_conn,
-                )
+    async with CertificateStorage.run(path) as certificate_storage:
+        remote_devices_manager = RemoteDevicesManager(
+            backend_conn.cmds, device.root_verify_key, certificate_storage=certificate_storage
+        )
+        async with UserFS.run(
+            device, path, backend_conn.cmds, remote_devices_manager, event_bus, prevent_sync_pattern
+        ) as user_fs:
+
+            backend_conn.register_monitor(partial(monitor_messages, user_fs, event_bus))
+            backend_conn.register_monitor(partial(monitor_sync, user_fs, event_bus))
+
+            async with backend_conn.run():
+                async with mountpoint_manager_factory(
+                    user_fs,
+                    event_bus,
+                    config.mountpoint_base_dir,
+                    mount_all=config.mountpoint_enabled,
+                    mount_on_workspace_created=config.mountpoint_enabled,
+                    mount_on_workspace_shared=config.mountpoint_enabled,
+                    unmount_on_workspace_revoked=config.mountpoint_enabled,
+                    exclude_from_mount_all=config.disabled_workspaces,
+                ) as mountpoint_manager:
+
+                    yield LoggedCore(
+                        config=config,
+                        device=device,
+                        event_bus=event_bus,
+                        mountpoint_manager=mountpoint_manager,
+                        user_fs=user_fs,
+                        remote_devices_manager=remote_devices_manager,
+                        backend_conn=backend_conn,
+                    )
@@ -3,6 +3,7 @@
 from parsec.core.core_events import CoreEvent
 import os
 import errno
+import ctypes
 from typing import Optional
 from structlog import get_logger
 from contextlib import contextmanager
@@ -31,6 +32,20 @@ def is_banned(name):
     return any(name.startswith(prefix) for prefix in BANNED_PREFIXES)
 
 
+def buffer_to_fuse_reply(buffer: memoryview):
+    """Turn the buffer returned by `fd_read_buffer` into an object fusepy can
+    copy into the reply (i.e. passed to `ctypes.memmove`), avoiding copies when possible.
+    """
+    # Writable buffer (gathered from several chunks): share its memory through ctypes
+    if not buffer.readonly:
+        return (ctypes.c_char * buffer.nbytes).from_buffer(buffer)
+    # Read-only buffer covering a whole bytes object (e.g. a full block)
+    if isinstance(buffer.obj, bytes) and len(buffer.obj) == buffer.nbytes:
+        return buffer.obj
+    # Part of a chunk: ctypes cannot reference read-only memory, a single copy is required
+    return buffer.tobytes()
+
+
 @contextmanager
 def translate_error(event_bus, operation, path):
     try:
@@ -130,7 +145,7 @@ class FuseOperations(LoggingMixIn, Operations):
         return
 
     def readdir(self, path: FsPath, fh: int):
-        stat = self.fs_access.entry_info(path)
+        stat = self.fs_access.entry_list_info(path)
 
         if stat["type"] == "file":
             raise FuseOSError(errno.ENOTDIR)
@@ -154,9 +169,8 @@ class FuseOperations(LoggingMixIn, Operations):
 
     def read(self, path: FsPath, size: int, offset: int, fh: int):
         # Atomic read
-        ret = self.fs_access.fd_read(fh, size, offset, raise_eof=False)
-        # Fuse wants bytes but fd_read returns a bytearray
-        return bytes(ret)
+        buffer = self.fs_access.fd_read_buffer(fh, size, offset, raise_eof=False)
+        return buffer_to_fuse_reply(buffer)
 
     def write(self, path: FsPath, data: bytes, offset: int, fh: int):
         return self.fs_access.fd_write(fh, data, offset)
@@ -27,6 +27,9 @@ class ThreadFSAccess:
     def entry_info(self, path):
         return self._run(self.workspace_fs.transactions.entry_info, path)
 
+    def entry_list_info(self, path):
+        return self._run(self.workspace_fs.transactions.entry_list_info, path)
+
     def entry_rename(self, source, destination, *, overwrite):
         return self._run(
             self.workspace_fs.transactions.entry_rename, source, destination, overwrite
@@ -65,6 +68,9 @@ class ThreadFSAccess:
     def fd_read(self, fh, size, offset, raise_eof=False):
         return self._run(self.workspace_fs.transactions.fd_read, fh, size, offset, raise_eof)
 
+    def fd_read_buffer(self, fh, size, offset, raise_eof=False):
+        return self._run(self.workspace_fs.transactions.fd_read_buffer, fh, size, offset, raise_eof)
+
     def fd_write(self, fh, data, offset, constrained=False):
         return self._run(self.workspace_fs.transactions.fd_write, fh, data, offset, constrained)
 
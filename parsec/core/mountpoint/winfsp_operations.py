@@ -281,7 +281,7 @@ class WinFSPOperations(BaseFileSystemOperations):
     @handle_error
     def read_directory(self, file_context, marker):
         entries = []
-        stat = self.fs_access.entry_info(file_context.path)
+        stat = self.fs_access.entry_list_info(file_context.path)
 
         if stat["type"] == "file":
             raise NTStatusError(NTSTATUS.STATUS_NOT_A_DIRECTORY)
@@ -331,7 +331,8 @@ class WinFSPOperations(BaseFileSystemOperations):
 
     @handle_error
     def read(self, file_context, offset, length):
-        buffer = self.fs_access.fd_read(file_context.fd, length, offset, raise_eof=True)
+        # The buffer is copied by winfspy (`ffi.memmove` accepts any buffer object)
+        buffer = self.fs_access.fd_read_buffer(file_context.fd, length, offset, raise_eof=True)
         return buffer
 
     @handle_error
@@ -1,6 +1,7 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
-from typing import Tuple, Optional, List
+from pendulum import now as pendulum_now
+from typing import TYPE_CHECKING, Tuple, Optional, List, Set, Dict
 
 from parsec.crypto import VerifyKey
 from parsec.api.protocol import DeviceID, UserID
@@ -17,6 +18,9 @@ from parsec.core.backend_connection import (
 )
 from parsec.core.trustchain import TrustchainContext, TrustchainError
 
+if TYPE_CHECKING:
+    from parsec.core.fs.storage import CertificateStorage
+
 
 DEFAULT_CACHE_VALIDITY = 60 * 60  # 1h
 
@@ -57,6 +61,11 @@ class RemoteDevicesManager:
     """
     Fetch users&devices from backend, verify their trustchain and keep
     a cache of them for a limited duration.
+
+    If a certificate storage is provided, the verified certificates are also
+    kept on disk: device certificates never change so they are never fetched
+    again, while users are fetched again once their revocation status is older
+    than the cache validity.
     """
 
     def __init__(
@@ -64,9 +73,13 @@ class RemoteDevicesManager:
         backend_cmds: BackendAuthenticatedCmds,
         root_verify_key: VerifyKey,
         cache_validity: int = DEFAULT_CACHE_VALIDITY,
+        certificate_storage: Optional["CertificateStorage"] = None,
     ):
         self._backend_cmds = backend_cmds
         self._trustchain_ctx = TrustchainContext(root_verify_key, cache_validity)
+        self._certificate_storage = certificate_storage
+        # Users whose stored revocation status is known to be outdated
+        self._outdated_users: Set[UserID] = set()
 
     @property
     def cache_validity(self) -> int:
@@ -74,6 +87,64 @@ class RemoteDevicesManager:
 
     def invalidate_user_cache(self, user_id: UserID) -> None:
         self._trustchain_ctx.invalidate_user_cache(user_id)
+        self._outdated_users.add(user_id)
+
+    async def _get_stored_user(
+        self, user_id: UserID
+    ) -> Optional[Tuple[UserCertificateContent, Optional[RevokedUserCertificateContent]]]:
+        if not self._certificate_storage or user_id in self._outdated_users:
+            return None
+        stored = await self._certificate_storage.get_user_certificates(user_id)
+        if not stored:
+            return None
+        user_certif, revoked_user_certif, refreshed_on = stored
+        now = pendulum_now()
+        if revoked_user_certif:
+            # Revocation is final, no need to ask the backend again
+            refreshed_on = now
+        elif (now - refreshed_on).total_seconds() >= self.cache_validity:
+            return None
+
+        # Certificates have been verified before being stored
+        user = UserCertificateContent.unsecure_load(user_certif)
+        revoked_user = (
+            RevokedUserCertificateContent.unsecure_load(revoked_user_certif)
+            if revoked_user_certif
+            else None
+        )
+        self._trustchain_ctx.populate_cache(
+            refreshed_on, users=[user], revoked_users=[revoked_user] if revoked_user else []
+        )
+        return user, revoked_user
+
+    async def _get_stored_device(self, device_id: DeviceID) -> Optional[DeviceCertificateContent]:
+        if not self._certificate_storage:
+            return None
+        device_certif = await self._certificate_storage.get_device_certificate(device_id)
+        if not device_certif:
+            return None
+        device = DeviceCertificateContent.unsecure_load(device_certif)
+        self._trustchain_ctx.populate_cache(pendulum_now(), devices=[device])
+        return device
+
+    async def _store_certificates(self, rep: dict) -> None:
+        if not self._certificate_storage:
+            return
+        users: Dict[UserID, bytes] = {}
+        revoked_users: Dict[UserID, bytes] = {}
+        devices: Dict[DeviceID, bytes] = {}
+        for certif in (rep["user_certificate"], *rep["trustchain"]["users"]):
+            users[UserCertificateContent.unsecure_load(certif).user_id] = certif
+        revoked_user_certifs = rep["trustchain"]["revoked_users"]
+        if rep["revoked_user_certificate"]:
+            revoked_user_certifs = (rep["revoked_user_certificate"], *revoked_user_certifs)
+        for certif in revoked_user_certifs:
+            revoked_users[RevokedUserCertificateContent.unsecure_load(certif).user_id] = certif
+        for certif in (*rep["device_certificates"], *rep["trustchain"]["devices"]):
+            devices[DeviceCertificateContent.unsecure_load(certif).device_id] = certif
+        await self._certificate_storage.set_certificates(
+            pendulum_now(), users=users, revoked_users=revoked_users, devices=devices
+        )
 
     async def get_user(
         self, user_id: UserID, no_cache: bool = False
@@ -92,6 +163,10 @@ class RemoteDevicesManager:
             )
         except TrustchainError as exc:
             raise RemoteDevicesManagerInvalidTrustchainError(exc) from exc
+        if not verified_user and not no_cache:
+            stored = await self._get_stored_user(user_id)
+            if stored:
+                verified_user, verified_revoked_user = stored
         if not verified_user:
             verified_user, verified_revoked_user, _ = await self.get_user_and_devices(
                 user_id, no_cache=True
@@ -113,6 +188,8 @@ class RemoteDevicesManager:
             verified_device = None if no_cache else self._trustchain_ctx.get_device(device_id)
         except TrustchainError as exc:
             raise RemoteDevicesManagerInvalidTrustchainError(exc) from exc
+        if not verified_device and not no_cache:
+            verified_device = await self._get_stored_device(device_id)
         if not verified_device:
             _, _, verified_devices = await self.get_user_and_devices(
                 device_id.user_id, no_cache=True
@@ -143,7 +220,9 @@ class RemoteDevicesManager:
             RemoteDevicesManagerInvalidTrustchainError
         """
         try:
-            rep = await self._backend_cmds.user_get(user_id)
+            rep = await self._backend_cmds.user_get(
+                user_id, known_trustchain=self._trustchain_ctx.get_known_trustchain()
+            )
         except BackendNotAvailable as exc:
             raise RemoteDevicesManagerBackendOfflineError(
                 f"User `{user_id}` is not in local cache and we are offline."
@@ -161,7 +240,7 @@ class RemoteDevicesManager:
             raise RemoteDevicesManagerError(f"Cannot fetch user {user_id}: `{rep['status']}`")
 
         try:
-            return self._trustchain_ctx.load_user_and_devices(
+            verified = self._trustchain_ctx.load_user_and_devices(
                 trustchain=rep["trustchain"],
                 user_certif=rep["user_certificate"],
                 revoked_user_certif=rep["revoked_user_certificate"],
@@ -171,6 +250,10 @@ class RemoteDevicesManager:
         except TrustchainError as exc:
             raise RemoteDevicesManagerInvalidTrustchainError(exc) from exc
 
+        await self._store_certificates(rep)
+        self._outdated_users.discard(user_id)
+        return verified
+
 
 async def get_device_invitation_creator(
     backend_cmds: APIV1_BackendAnonymousCmds, root_verify_key: VerifyKey, new_device_id: DeviceID
@@ -1,12 +1,15 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
 import math
+import heapq
+from typing import Dict, List, Optional
 from collections import defaultdict
 
 import trio
 from trio.lowlevel import current_clock
 from structlog import get_logger
 
+from parsec.utils import open_service_nursery
 from parsec.core.core_events import CoreEvent
 from parsec.core.types import EntryID, WorkspaceRole
 from parsec.core.fs import (
@@ -17,6 +20,7 @@ from parsec.core.fs import (
     FSWorkspaceInMaintenance,
 )
 from parsec.core.backend_connection import BackendConnectionError, BackendNotAvailable
+from parsec.api.protocol import VLOB_BATCH_POLL_CHANGES_MAX_REALMS
 
 
 logger = get_logger()
@@ -25,6 +29,12 @@ MIN_WAIT = 1
 MAX_WAIT = 60
 MAINTENANCE_MIN_WAIT = 30
 TICK_CRASH_COOLDOWN = 5
+# Maximum number of entries synchronized at the same time by a sync context
+MAX_CONCURRENT_SYNCS = 4
+# Maximum number of vlob changes fetched at once during sync bootstrap
+VLOB_POLL_CHANGES_PAGE_SIZE = 1000
+# Same thing, but per realm when polling all the realms at once on startup
+VLOB_BATCH_POLL_CHANGES_PAGE_SIZE = 100
 
 
 async def freeze_sync_monitor_mockpoint():
@@ -67,13 +77,24 @@ class SyncContext:
       storage to get the list of changes (entry id + version) it has missed
     """
 
-    def __init__(self, user_fs, id: EntryID, read_only: bool = False):
+    def __init__(
+        self,
+        user_fs,
+        id: EntryID,
+        read_only: bool = False,
+        max_concurrent_syncs: int = MAX_CONCURRENT_SYNCS,
+    ):
         self.user_fs = user_fs
         self.id = id
         self.read_only = read_only
+        self.max_concurrent_syncs = max_concurrent_syncs
         self.due_time = math.inf
         self._changes_loaded = False
         self._local_changes = {}
+        # Local changes indexed by due time, as a heap of `(due_time, entry_id)`.
+        # The heap is updated lazily: when a change is bumped a new item is pushed,
+        # the outdated one gets discarded once it reaches the top of the heap.
+        self._local_changes_heap = []
         self._remote_changes = set()
         self._local_confinement_points = defaultdict(set)
 
@@ -89,7 +110,12 @@ class SyncContext:
     def __repr__(self):
         return f"{type(self).__name__}(id={self.id!r})"
 
-    async def _load_changes(self) -> bool:
+    async def _load_changes(self, first_page: Optional[dict] = None) -> bool:
+        """
+        `first_page` is the reply to the first `vlob_poll_changes` from the
+        current realm checkpoint, if it has already been fetched (see
+        `batch_poll_changes`).
+        """
         if self._changes_loaded:
             return True
 
@@ -98,33 +124,50 @@ class SyncContext:
         # make it worth to retry
         self.due_time = math.inf
 
-        # 1) Fetch new checkpoint and changes
+        # 1) Fetch new checkpoint and changes, page by page
         realm_checkpoint = await self._get_local_storage().get_realm_checkpoint()
-        try:
-            rep = await self._get_backend_cmds().vlob_poll_changes(self.id, realm_checkpoint)
+        while True:
+            if first_page is not None:
+                rep, first_page = first_page, None
+                page_size = VLOB_BATCH_POLL_CHANGES_PAGE_SIZE
+            else:
+                page_size = VLOB_POLL_CHANGES_PAGE_SIZE
+                try:
+                    rep = await self._get_backend_cmds().vlob_poll_changes(
+                        self.id, realm_checkpoint, page_size=page_size
+                    )
+
+                except BackendNotAvailable:
+                    raise
+
+                # Another backend error
+                except BackendConnectionError as exc:
+                    logger.warning(
+                        "Unexpected backend response during sync bootstrap", exc_info=exc
+                    )
+                    return False
+
+            if rep["status"] == "not_found":
+                # Workspace not yet synchronized with backend
+                new_checkpoint = 0
+                changes = {}
+            elif rep["status"] in ("in_maintenance", "not_allowed"):
+                return False
+            elif rep["status"] != "ok":
+                return False
+            else:
+                new_checkpoint = rep["current_checkpoint"]
+                changes = rep["changes"]
 
-        except BackendNotAvailable:
-            raise
+            # 2) Store new checkpoint and changes, each page is a consistent
+            # state so the next bootstrap can resume from there if interrupted
+            await self._get_local_storage().update_realm_checkpoint(new_checkpoint, changes)
 
-        # Another backend error
-        except BackendConnectionError as exc:
-            logger.warning("Unexpected backend response during sync bootstrap", exc_info=exc)
-            return False
-
-        if rep["status"] == "not_found":
-            # Workspace not yet synchronized with backend
-            new_checkpoint = 0
-            changes = {}
-        elif rep["status"] in ("in_maintenance", "not_allowed"):
-            return False
-        elif rep["status"] != "ok":
-            return False
-        else:
-            new_checkpoint = rep["current_checkpoint"]
-            changes = rep["changes"]
-
-        # 2) Store new checkpoint and changes
-        await self._get_local_storage().update_realm_checkpoint(new_checkpoint, changes)
+            # Note backends older than API 2.4 ignore the page size and
+            # return all the changes at once
+            if len(changes) < page_size:
+                break
+            realm_checkpoint = new_checkpoint
 
         # 3) Compute local and remote changes that need to be synced
         need_sync_local, need_sync_remote = await self._get_local_storage().get_need_sync_entries()
@@ -132,6 +175,11 @@ class SyncContext:
         # Ignore local changes in read only mode
         if not self.read_only:
             self._local_changes = {entry_id: LocalChange(now) for entry_id in need_sync_local}
+            self._local_changes_heap = [
+                (change_info.due_time, entry_id)
+                for entry_id, change_info in self._local_changes.items()
+            ]
+            heapq.heapify(self._local_changes_heap)
         self._remote_changes = need_sync_remote
 
         # 4) Finally refresh due time according to the changes
@@ -162,6 +210,7 @@ class SyncContext:
             local_change = LocalChange(now)
             self._local_changes[entry_id] = local_change
             new_due_time = local_change.due_time
+        self._push_local_change(entry_id, new_due_time)
 
         # Trigger a wake up if necessary
         if new_due_time <= self.due_time:
@@ -178,24 +227,54 @@ class SyncContext:
     def set_confined_entry(self, entry_id: EntryID, cause_id: EntryID) -> None:
         self._local_confinement_points[cause_id].add(entry_id)
 
+    def _push_local_change(self, entry_id: EntryID, due_time: float) -> None:
+        heapq.heappush(self._local_changes_heap, (due_time, entry_id))
+        # Outdated items pile up when the same entries keep being modified,
+        # rebuild the heap once they make up the majority of it
+        if len(self._local_changes_heap) > 2 * len(self._local_changes) + 64:
+            self._local_changes_heap = [
+                (change_info.due_time, entry_id)
+                for entry_id, change_info in self._local_changes.items()
+            ]
+            heapq.heapify(self._local_changes_heap)
+
+    def _reset_local_change(self, entry_id: EntryID, now: float) -> None:
+        local_change = LocalChange(now)
+        self._local_changes[entry_id] = local_change
+        self._push_local_change(entry_id, local_change.due_time)
+
+    def _next_local_due_time(self) -> float:
+        heap = self._local_changes_heap
+        while heap:
+            due_time, entry_id = heap[0]
+            change_info = self._local_changes.get(entry_id)
+            if change_info is not None and change_info.due_time == due_time:
+                return due_time
+            # Outdated item
+            heapq.heappop(heap)
+        return math.inf
+
+    def _pop_due_local_changes(self, now: float, max_count: int):
+        entry_ids = []
+        while len(entry_ids) < max_count and self._next_local_due_time() <= now:
+            _, entry_id = heapq.heappop(self._local_changes_heap)
+            del self._local_changes[entry_id]
+            entry_ids.append(entry_id)
+        return entry_ids
+
     def _compute_due_time(self, now=None, min_due_time=None):
         if self._remote_changes:
             self.due_time = now or timestamp()
-        elif self._local_changes:
-            # TODO: index changes by due_time to avoid this O(n) operation
-            self.due_time = min(
-                change_info.due_time for change_info in self._local_changes.values()
-            )
         else:
-            self.due_time = math.inf
+            self.due_time = self._next_local_due_time()
 
         if min_due_time:
             self.due_time = max(self.due_time, min_due_time)
 
         return self.due_time
 
-    async def bootstrap(self) -> float:
-        await self._load_changes()
+    async def bootstrap(self, first_page: Optional[dict] = None) -> float:
+        await self._load_changes(first_page)
         return self.due_time
 
     async def tick(self) -> float:
@@ -212,55 +291,14 @@ class SyncContext:
 
         # Remote changes sync have priority over local changes
         if self._remote_changes:
-            entry_id = self._remote_changes.pop()
-            try:
-                await self._sync(entry_id)
-            except FSBackendOfflineError as exc:
-                raise BackendNotAvailable from exc
-            except FSWorkspaceNoReadAccess:
-                # We've just lost the read access to the workspace.
-                # This likely means a `sharing.updated` event we soon arrive
-                # and destroy this sync context.
-                # Until then just pretent nothing happened.
-                min_due_time = now + MIN_WAIT
-                self._remote_changes.add(entry_id)
-            except FSWorkspaceNoWriteAccess:
-                # We don't have write access and this entry contains local
-                # modifications. Hence we can forget about this change given
-                # it's `self._local_changes` role to keep track of local changes.
-                pass
-            except FSWorkspaceInMaintenance:
-                # Not the right time for the sync, retry later
-                min_due_time = now + MAINTENANCE_MIN_WAIT
-                self._remote_changes.add(entry_id)
-
-        elif self._local_changes:
-            entry_id = next(
-                (
-                    entry_id
-                    for entry_id, change_info in self._local_changes.items()
-                    if change_info.due_time <= now
-                ),
-                None,
-            )
-            if entry_id:
-                del self._local_changes[entry_id]
-                try:
-                    await self._sync(entry_id)
-                except FSBackendOfflineError as exc:
-                    raise BackendNotAvailable from exc
-                except (FSWorkspaceNoReadAccess, FSWorkspaceNoWriteAccess):
-                    # We've just lost the write access to the workspace, and
-                    # the corresponding `sharing.updated` event hasn't updated
-                    # the `read_only` flag yet.
-                    # We keep track of the change (given we may be given back
-                    # the write access in the future) but pretent it just accured
-                    # to avoid a busy sync loop until `read_only` flag is updated.
-                    self._local_changes[entry_id] = LocalChange(now)
-                except FSWorkspaceInMaintenance:
-                    # Not the right time for the sync, retry later
-                    min_due_time = now + MAINTENANCE_MIN_WAIT
-                    self._local_changes[entry_id] = LocalChange(now)
+            count = min(len(self._remote_changes), self.max_concurrent_syncs)
+            entry_ids = [self._remote_changes.pop() for _ in range(count)]
+            min_due_time = await self._sync_entries(self._sync_remote_change, entry_ids, now)
+
+        else:
+            entry_ids = self._pop_due_local_changes(now, self.max_concurrent_syncs)
+            if entry_ids:
+                min_due_time = await self._sync_entries(self._sync_local_change, entry_ids, now)
 
                 # This is where we plug our vacuuming routine
                 # as it corresponds to a fresh synchronized state
@@ -270,6 +308,70 @@ class SyncContext:
         self._compute_due_time(now=now, min_due_time=min_due_time)
         return self.due_time
 
+    async def _sync_entries(self, sync, entry_ids, now: float):
+        """Synchronize the given entries concurrently.
+
+        Returns the minimal due time required by the entries that couldn't
+        get synchronized, if any.
+        """
+        min_due_times = []
+
+        async def _sync_entry(entry_id):
+            min_due_time = await sync(entry_id, now)
+            if min_due_time is not None:
+                min_due_times.append(min_due_time)
+
+        if len(entry_ids) == 1:
+            await _sync_entry(entry_ids[0])
+        else:
+            async with open_service_nursery() as nursery:
+                for entry_id in entry_ids:
+                    nursery.start_soon(_sync_entry, entry_id)
+
+        return max(min_due_times, default=None)
+
+    async def _sync_remote_change(self, entry_id: EntryID, now: float):
+        try:
+            await self._sync(entry_id)
+        except FSBackendOfflineError as exc:
+            raise BackendNotAvailable from exc
+        except FSWorkspaceNoReadAccess:
+            # We've just lost the read access to the workspace.
+            # This likely means a `sharing.updated` event we soon arrive
+            # and destroy this sync context.
+            # Until then just pretent nothing happened.
+            self._remote_changes.add(entry_id)
+            return now + MIN_WAIT
+        except FSWorkspaceNoWriteAccess:
+            # We don't have write access and this entry contains local
+            # modifications. Hence we can forget about this change given
+            # it's `self._local_changes` role to keep track of local changes.
+            pass
+        except FSWorkspaceInMaintenance:
+            # Not the right time for the sync, retry later
+            self._remote_changes.add(entry_id)
+            return now + MAINTENANCE_MIN_WAIT
+        return None
+
+    async def _sync_local_change(self, entry_id: EntryID, now: float):
+        try:
+            await self._sync(entry_id)
+        except FSBackendOfflineError as exc:
+            raise BackendNotAvailable from exc
+        except (FSWorkspaceNoReadAccess, FSWorkspaceNoWriteAccess):
+            # We've just lost the write access to the workspace, and
+            # the corresponding `sharing.updated` event hasn't updated
+            # the `read_only` flag yet.
+            # We keep track of the change (given we may be given back
+            # the write access in the future) but pretent it just accured
+            # to avoid a busy sync loop until `read_only` flag is updated.
+            self._reset_local_change(entry_id, now)
+        except FSWorkspaceInMaintenance:
+            # Not the right time for the sync, retry later
+            self._reset_local_change(entry_id, now)
+            return now + MAINTENANCE_MIN_WAIT
+        return None
+
 
 class WorkspaceSyncContext(SyncContext):
     def __init__(self, user_fs, id: EntryID):
@@ -336,6 +438,53 @@ class SyncContextStore:
         self._ctxs.pop(entry_id, None)
 
 
+async def batch_poll_changes(backend_cmds, ctxs: List[SyncContext]) -> Dict[EntryID, dict]:
+    """
+    Fetch the first page of changes of all the sync contexts' realms with
+    as few requests as possible, so they can be bootstrapped without
+    doing a request each.
+
+    Returns: the `vlob_poll_changes`-like reply for each realm, realms missing
+    from the result have to be polled by their sync context.
+    """
+    checkpoints = {}
+    for ctx in ctxs:
+        try:
+            checkpoints[ctx.id] = await ctx._get_local_storage().get_realm_checkpoint()
+        except Exception:
+            # Leave the realm out of the batch, its sync context is going to
+            # bootstrap itself (and deal with the error) on its own
+            logger.exception("Cannot retrieve realm checkpoint", workspace_id=ctx.id)
+
+    first_pages: Dict[EntryID, dict] = {}
+    realm_ids = list(checkpoints)
+    for i in range(0, len(realm_ids), VLOB_BATCH_POLL_CHANGES_MAX_REALMS):
+        batch = {
+            realm_id: checkpoints[realm_id]
+            for realm_id in realm_ids[i : i + VLOB_BATCH_POLL_CHANGES_MAX_REALMS]
+        }
+        try:
+            rep = await backend_cmds.vlob_batch_poll_changes(
+                batch, page_size=VLOB_BATCH_POLL_CHANGES_PAGE_SIZE
+            )
+
+        except BackendNotAvailable:
+            raise
+
+        # Another backend error
+        except BackendConnectionError as exc:
+            logger.warning("Unexpected backend response during sync bootstrap", exc_info=exc)
+            break
+
+        if rep["status"] != "ok":
+            # Backend is too old, `vlob_batch_poll_changes` has been added in api v2.5
+            break
+        for realm_id, realm_rep in rep["realms"].items():
+            first_pages[EntryID(realm_id)] = realm_rep
+
+    return first_pages
+
+
 async def monitor_sync(user_fs, event_bus, task_status):
     ctxs = SyncContextStore(user_fs)
     early_wakeup = trio.Event()
@@ -379,9 +528,9 @@ async def monitor_sync(user_fs, event_bus, task_status):
         if ctx is not None:
             ctx.set_confined_entry(entry_id, cause_id)
 
-    async def _ctx_action(ctx, meth):
+    async def _ctx_action(ctx, meth, *args):
         try:
-            return await getattr(ctx, meth)()
+            return await getattr(ctx, meth)(*args)
         except BackendNotAvailable:
             raise
         except Exception:
@@ -404,15 +553,17 @@ async def monitor_sync(user_fs, event_bus, task_status):
     ):
         due_times = []
         # Init userfs sync context
-        ctx = ctxs.get(user_fs.user_manifest_id)
-        due_times.append(await _ctx_action(ctx, "bootstrap"))
+        bootstrap_ctxs = [ctxs.get(user_fs.user_manifest_id)]
         # Init workspaces sync context
         user_manifest = user_fs.get_user_manifest()
         for entry in user_manifest.workspaces:
             if entry.role is not None:
                 ctx = ctxs.get(entry.id)
                 if ctx:
-                    due_times.append(await _ctx_action(ctx, "bootstrap"))
+                    bootstrap_ctxs.append(ctx)
+        first_pages = await batch_poll_changes(user_fs.backend_cmds, bootstrap_ctxs)
+        for ctx in bootstrap_ctxs:
+            due_times.append(await _ctx_action(ctx, "bootstrap", first_pages.get(ctx.id)))
 
         task_status.started()
         while True:
@@ -14,6 +14,11 @@ from parsec.api.data import (
 )
 
 
+# Certificates about to expire from the cache are not declared as known to the
+# backend, so they are still in cache when its answer is processed
+KNOWN_CERTIFICATES_VALIDITY_MARGIN = 60
+
+
 class TrustchainError(Exception):
     pass
 
@@ -76,6 +81,45 @@ class TrustchainContext:
             pass
         return None
 
+    def populate_cache(
+        self,
+        cached_on: DateTime,
+        users: Sequence[UserCertificateContent] = (),
+        revoked_users: Sequence[RevokedUserCertificateContent] = (),
+        devices: Sequence[DeviceCertificateContent] = (),
+    ) -> None:
+        """
+        Add certificates that have already been verified (e.g. retrieved from
+        a persistent storage) to the cache.
+        """
+        for user in users:
+            self._users_cache[user.user_id] = (cached_on, user)
+        for revoked_user in revoked_users:
+            self._revoked_users_cache[revoked_user.user_id] = (cached_on, revoked_user)
+        for device in devices:
+            self._devices_cache[device.device_id] = (cached_on, device)
+
+    def get_known_trustchain(self, now: DateTime = None) -> dict:
+        """
+        Ids of the verified certificates in cache, to be provided to the backend
+        so it doesn't return them again as part of a trustchain.
+        """
+        now = now or pendulum_now()
+        max_age = self.cache_validity - KNOWN_CERTIFICATES_VALIDITY_MARGIN
+
+        def _still_valid(cache):
+            return [
+                key
+                for key, (cached_on, _) in cache.items()
+                if (now - cached_on).total_seconds() < max_age
+            ]
+
+        return {
+            "users": _still_valid(self._users_cache),
+            "revoked_users": _still_valid(self._revoked_users_cache),
+            "devices": _still_valid(self._devices_cache),
+        }
+
     def load_user_and_devices(
         self,
         trustchain: dict,
@@ -178,17 +222,20 @@ class TrustchainContext:
         except DataError as exc:
             raise TrustchainError(f"Invalid certificate: {exc}") from exc
 
+        # Certificates already in cache may have been omitted from the trustchain
+        # (see `get_known_trustchain`), hence the fallback on the cache
+
         def _get_eventually_verified_user(user_id):
             try:
                 return users_states[user_id].content
             except KeyError:
-                return None
+                return self.get_user(user_id, now)
 
         def _get_eventually_verified_revoked_user(user_id):
             try:
                 return revoked_users_states[user_id].content
             except KeyError:
-                return None
+                return self.get_revoked_user(user_id, now)
 
         def _verify_created_by_root(certif, certif_cls, sign_chain):
             try:
@@ -250,6 +297,9 @@ class TrustchainContext:
             try:
                 state = devices_states[device_id]
             except KeyError:
+                verified_device = self.get_device(device_id, now)
+                if verified_device:
+                    return verified_device
                 path = _build_signature_path(*signed_children, device_id)
                 raise TrustchainError(f"{path}: Missing device certificate for {device_id}")
 
@@ -48,12 +48,43 @@ def test_good_authenticated_handshake(alice):
         "organization_id": alice.organization_id,
         "device_id": alice.device_id,
         "rvk": alice.root_verify_key,
+        "multiplexing": False,
     }
     result_req = sh.build_result_req(alice.verify_key)
     assert sh.state == "result"
 
     ch.process_result_req(result_req)
     assert sh.client_api_version == API_V2_VERSION
+    assert not sh.multiplexing
+    assert not ch.multiplexing
+
+
+@pytest.mark.parametrize("backend_support", (True, False))
+def test_authenticated_handshake_multiplexing(alice, backend_support):
+    sh = ServerHandshake()
+
+    ch = AuthenticatedClientHandshake(
+        alice.organization_id,
+        alice.device_id,
+        alice.signing_key,
+        alice.root_verify_key,
+        multiplexing=True,
+    )
+    challenge_req = sh.build_challenge_req()
+    answer_req = ch.process_challenge_req(challenge_req)
+    if not backend_support:
+        # Simulate a backend older than api v2.8
+        answer_data = unpackb(answer_req)
+        answer_data.pop("multiplexing")
+        answer_req = packb(answer_data)
+
+    sh.process_answer_req(answer_req)
+    assert sh.answer_data["multiplexing"] is backend_support
+    result_req = sh.build_result_req(alice.verify_key)
+
+    ch.process_result_req(result_req)
+    assert sh.multiplexing is backend_support
+    assert ch.multiplexing is backend_support
 
 
 @pytest.mark.parametrize("invitation_type", (InvitationType.USER, InvitationType.DEVICE))
@@ -18,13 +18,17 @@ from parsec.api.protocol import (
     realm_finish_reencryption_maintenance_serializer,
     vlob_create_serializer,
     vlob_read_serializer,
+    vlob_batch_read_serializer,
     vlob_update_serializer,
     vlob_list_versions_serializer,
     vlob_poll_changes_serializer,
+    vlob_batch_poll_changes_serializer,
     vlob_maintenance_get_reencryption_batch_serializer,
     vlob_maintenance_save_reencryption_batch_serializer,
     events_subscribe_serializer,
     events_listen_serializer,
+    events_batch_listen_serializer,
+    EVENTS_BATCH_LISTEN_MAX_SIZE,
     user_get_serializer,
     human_find_serializer,
     user_create_serializer,
@@ -210,6 +214,16 @@ vlob_read = CmdSock(
         "encryption_revision": encryption_revision,
     },
 )
+vlob_batch_read = CmdSock(
+    "vlob_batch_read",
+    vlob_batch_read_serializer,
+    parse_args=lambda self, realm_id, vlob_ids, timestamp=None, encryption_revision=1: {
+        "realm_id": realm_id,
+        "vlob_ids": vlob_ids,
+        "timestamp": timestamp,
+        "encryption_revision": encryption_revision,
+    },
+)
 vlob_update = CmdSock(
     "vlob_update",
     vlob_update_serializer,
@@ -233,11 +247,17 @@ vlob_list_versions = CmdSock(
 vlob_poll_changes = CmdSock(
     "vlob_poll_changes",
     vlob_poll_changes_serializer,
-    parse_args=lambda self, realm_id, last_checkpoint: {
+    parse_args=lambda self, realm_id, last_checkpoint, page_size=None: {
         "realm_id": realm_id,
         "last_checkpoint": last_checkpoint,
+        "page_size": page_size,
     },
 )
+vlob_batch_poll_changes = CmdSock(
+    "vlob_batch_poll_changes",
+    vlob_batch_poll_changes_serializer,
+    parse_args=lambda self, realms, page_size=None: {"realms": realms, "page_size": page_size},
+)
 vlob_maintenance_get_reencryption_batch = CmdSock(
     "vlob_maintenance_get_reencryption_batch",
     vlob_maintenance_get_reencryption_batch_serializer,
@@ -283,11 +303,26 @@ async def events_listen(sock):
         yield box
 
 
+events_batch_listen = CmdSock(
+    "events_batch_listen",
+    events_batch_listen_serializer,
+    parse_args=lambda self, wait=False, max_events=EVENTS_BATCH_LISTEN_MAX_SIZE: {
+        "wait": wait,
+        "max_events": max_events,
+    },
+)
+
+
 ### User ###
 
 
 user_get = CmdSock(
-    "user_get", user_get_serializer, parse_args=lambda self, user_id: {"user_id": user_id}
+    "user_get",
+    user_get_serializer,
+    parse_args=lambda self, user_id, known_trustchain=None: {
+        "user_id": user_id,
+        "known_trustchain": known_trustchain,
+    },
 )
 human_find = CmdSock(
     "human_find",
@@ -4,13 +4,16 @@ import pytest
 from uuid import UUID, uuid4
 
 from tests.backend.common import realm_stats
-from tests.backend.common import vlob_create, block_create
+from tests.backend.common import vlob_create, vlob_update, block_create
 
 REALM_ID_FAKE = UUID("00000000-0000-0000-0000-000000000001")
 
 
 @pytest.mark.trio
 async def test_realm_stats_ok(backend, alice_backend_sock, realm):
+    # Nothing written in the realm yet
+    rep = await realm_stats(alice_backend_sock, realm_id=realm)
+    assert rep == {"status": "ok", "blocks_size": 0, "vlobs_size": 0}
 
     # Create new data
     await block_create(alice_backend_sock, realm_id=realm, block_id=uuid4(), block=b"1234")
@@ -18,10 +21,16 @@ async def test_realm_stats_ok(backend, alice_backend_sock, realm):
     assert rep == {"status": "ok", "blocks_size": 4, "vlobs_size": 0}
 
     # Create new metadata
-    await vlob_create(alice_backend_sock, realm_id=realm, vlob_id=uuid4(), blob=b"1234")
+    vlob_id = uuid4()
+    await vlob_create(alice_backend_sock, realm_id=realm, vlob_id=vlob_id, blob=b"1234")
     rep = await realm_stats(alice_backend_sock, realm_id=realm)
     assert rep == {"status": "ok", "blocks_size": 4, "vlobs_size": 4}
 
+    # All the versions of the vlob are accounted for
+    await vlob_update(alice_backend_sock, vlob_id=vlob_id, version=2, blob=b"123456")
+    rep = await realm_stats(alice_backend_sock, realm_id=realm)
+    assert rep == {"status": "ok", "blocks_size": 4, "vlobs_size": 10}
+
 
 @pytest.mark.trio
 async def test_realm_stats_ko(
@@ -15,7 +15,13 @@ from parsec.api.protocol import (
 from parsec.backend.realm import RealmGrantedRole
 
 from tests.common import freeze_time
-from tests.backend.common import vlob_create, vlob_update, vlob_read, vlob_list_versions
+from tests.backend.common import (
+    vlob_create,
+    vlob_update,
+    vlob_read,
+    vlob_batch_read,
+    vlob_list_versions,
+)
 
 
 VLOB_ID = UUID("00000000000000000000000000000001")
@@ -288,6 +294,72 @@ async def test_read_bad_version(alice_backend_sock, vlobs):
     assert rep == {"status": "bad_version"}
 
 
+@pytest.mark.trio
+async def test_batch_read_ok(alice, alice_backend_sock, realm, vlobs):
+    rep = await vlob_batch_read(alice_backend_sock, realm, [vlobs[1], uuid4(), vlobs[0]])
+    assert rep["status"] == "ok"
+    assert sorted(rep["vlobs"], key=lambda x: x["vlob_id"]) == [
+        {
+            "vlob_id": vlobs[0],
+            "blob": b"r:A b:1 v:2",
+            "version": 2,
+            "author": alice.device_id,
+            "timestamp": datetime(2000, 1, 3),
+        },
+        {
+            "vlob_id": vlobs[1],
+            "blob": b"r:A b:2 v:1",
+            "version": 1,
+            "author": alice.device_id,
+            "timestamp": datetime(2000, 1, 4),
+        },
+    ]
+
+    rep = await vlob_batch_read(alice_backend_sock, realm, [])
+    assert rep == {"status": "ok", "vlobs": []}
+
+
+@pytest.mark.trio
+async def test_batch_read_ok_timestamp(alice, alice_backend_sock, realm, vlobs):
+    rep = await vlob_batch_read(
+        alice_backend_sock, realm, list(vlobs), timestamp=datetime(2000, 1, 2, 10)
+    )
+    assert rep == {
+        "status": "ok",
+        "vlobs": [
+            {
+                "vlob_id": vlobs[0],
+                "blob": b"r:A b:1 v:1",
+                "version": 1,
+                "author": alice.device_id,
+                "timestamp": datetime(2000, 1, 2),
+            }
+        ],
+    }
+
+
+@pytest.mark.trio
+async def test_batch_read_other_realm(alice_backend_sock, other_realm, vlobs):
+    # Vlobs from another realm are silently ignored
+    rep = await vlob_batch_read(alice_backend_sock, other_realm, list(vlobs))
+    assert rep == {"status": "ok", "vlobs": []}
+
+
+@pytest.mark.trio
+async def test_batch_read_errors(alice_backend_sock, bob_backend_sock, realm, vlobs):
+    rep = await vlob_batch_read(bob_backend_sock, realm, list(vlobs))
+    assert rep == {"status": "not_allowed"}
+
+    rep = await vlob_batch_read(alice_backend_sock, realm, list(vlobs), encryption_revision=42)
+    assert rep == {"status": "bad_encryption_revision"}
+
+    rep = await vlob_batch_read(alice_backend_sock, uuid4(), list(vlobs))
+    assert rep["status"] == "not_found"
+
+    rep = await vlob_batch_read(alice_backend_sock, realm, [uuid4() for _ in range(1001)])
+    assert rep["status"] == "bad_message"
+
+
 @pytest.mark.trio
 async def test_update_ok(alice_backend_sock, vlobs):
     await vlob_update(alice_backend_sock, vlobs[0], version=3, blob=b"Next version.")
@@ -1,13 +1,19 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
+import trio
 import pytest
-from uuid import UUID
+from uuid import UUID, uuid4
 from pendulum import datetime, now as pendulum_now
 
 from parsec.api.data import RealmRoleCertificateContent
 from parsec.api.protocol import RealmRole
 
-from tests.backend.common import realm_update_roles, vlob_update, vlob_poll_changes
+from tests.backend.common import (
+    realm_update_roles,
+    vlob_update,
+    vlob_poll_changes,
+    vlob_batch_poll_changes,
+)
 
 
 NOW = datetime(2000, 1, 1)
@@ -56,6 +62,54 @@ async def test_realm_updated_by_vlob(backend, alice, alice_backend_sock, realm):
         assert rep == {"status": "ok", "current_checkpoint": 2, "changes": {VLOB_ID: 2}}
 
 
+@pytest.mark.trio
+@pytest.mark.postgresql
+async def test_concurrent_vlob_writes(backend, alice, alice_backend_sock, realm, monkeypatch):
+    # Concurrent writes to a realm should not conflict on the checkpoint allocation
+    retries = 0
+
+    def _on_retry(*args, **kwargs):
+        nonlocal retries
+        retries += 1
+
+    monkeypatch.setattr("parsec.backend.postgresql.handler.logger.warning", _on_retry)
+
+    vlob_ids = [uuid4() for _ in range(20)]
+
+    async def _create_and_update(vlob_id):
+        await backend.vlob.create(
+            organization_id=alice.organization_id,
+            author=alice.device_id,
+            realm_id=realm,
+            encryption_revision=1,
+            vlob_id=vlob_id,
+            timestamp=NOW,
+            blob=b"v1",
+        )
+        await backend.vlob.update(
+            organization_id=alice.organization_id,
+            author=alice.device_id,
+            encryption_revision=1,
+            vlob_id=vlob_id,
+            version=2,
+            timestamp=NOW,
+            blob=b"v2",
+        )
+
+    async with trio.open_nursery() as nursery:
+        for vlob_id in vlob_ids:
+            nursery.start_soon(_create_and_update, vlob_id)
+
+    # Each write got its own checkpoint, without any gap
+    rep = await vlob_poll_changes(alice_backend_sock, realm, 0)
+    assert rep == {
+        "status": "ok",
+        "current_checkpoint": 2 * len(vlob_ids),
+        "changes": {vlob_id: 2 for vlob_id in vlob_ids},
+    }
+    assert retries == 0
+
+
 @pytest.mark.trio
 async def test_vlob_poll_changes_checkpoint_up_to_date(backend, alice, alice_backend_sock, realm):
     await backend.vlob.create(
@@ -81,6 +135,58 @@ async def test_vlob_poll_changes_checkpoint_up_to_date(backend, alice, alice_bac
     assert rep == {"status": "ok", "current_checkpoint": 2, "changes": {}}
 
 
+@pytest.mark.trio
+async def test_vlob_poll_changes_paginated(backend, alice, alice_backend_sock, realm):
+    # Checkpoints: VLOB_ID v1=1, OTHER_VLOB_ID v1=2, VLOB_ID v2=3, YET_ANOTHER_VLOB_ID v1=4
+    for vlob_id in (VLOB_ID, OTHER_VLOB_ID):
+        await backend.vlob.create(
+            organization_id=alice.organization_id,
+            author=alice.device_id,
+            realm_id=realm,
+            encryption_revision=1,
+            vlob_id=vlob_id,
+            timestamp=NOW,
+            blob=b"v1",
+        )
+    await backend.vlob.update(
+        organization_id=alice.organization_id,
+        author=alice.device_id,
+        encryption_revision=1,
+        vlob_id=VLOB_ID,
+        version=2,
+        timestamp=NOW,
+        blob=b"v2",
+    )
+    await backend.vlob.create(
+        organization_id=alice.organization_id,
+        author=alice.device_id,
+        realm_id=realm,
+        encryption_revision=1,
+        vlob_id=YET_ANOTHER_VLOB_ID,
+        timestamp=NOW,
+        blob=b"v1",
+    )
+
+    # Changes are compacted to the latest version of each vlob
+    rep = await vlob_poll_changes(alice_backend_sock, realm, 0, page_size=2)
+    assert rep == {
+        "status": "ok",
+        "current_checkpoint": 3,
+        "changes": {OTHER_VLOB_ID: 1, VLOB_ID: 2},
+    }
+    rep = await vlob_poll_changes(alice_backend_sock, realm, 3, page_size=2)
+    assert rep == {"status": "ok", "current_checkpoint": 4, "changes": {YET_ANOTHER_VLOB_ID: 1}}
+
+    rep = await vlob_poll_changes(alice_backend_sock, realm, 0, page_size=3)
+    assert rep == {
+        "status": "ok",
+        "current_checkpoint": 4,
+        "changes": {OTHER_VLOB_ID: 1, VLOB_ID: 2, YET_ANOTHER_VLOB_ID: 1},
+    }
+    rep = await vlob_poll_changes(alice_backend_sock, realm, 4, page_size=3)
+    assert rep == {"status": "ok", "current_checkpoint": 4, "changes": {}}
+
+
 @pytest.mark.trio
 async def test_vlob_poll_changes_not_found(alice_backend_sock):
     rep = await vlob_poll_changes(alice_backend_sock, UNKNOWN_REALM_ID, 0)
@@ -161,3 +267,51 @@ async def test_vlob_poll_changes_during_maintenance(backend, alice, alice_backen
     # Realm under maintenance are simply skipped
     rep = await vlob_poll_changes(alice_backend_sock, realm, 1)
     assert rep == {"status": "in_maintenance"}
+
+
+@pytest.mark.trio
+async def test_vlob_batch_poll_changes(
+    backend, alice, bob, alice_backend_sock, bob_backend_sock, realm, realm_factory
+):
+    other_realm = await realm_factory(backend, bob)
+    maintenance_realm = await realm_factory(backend, alice)
+    for realm_id, vlob_id in ((realm, VLOB_ID), (other_realm, OTHER_VLOB_ID)):
+        await backend.vlob.create(
+            organization_id=alice.organization_id,
+            author=alice.device_id if realm_id == realm else bob.device_id,
+            realm_id=realm_id,
+            encryption_revision=1,
+            vlob_id=vlob_id,
+            timestamp=NOW,
+            blob=b"v1",
+        )
+    await backend.realm.start_reencryption_maintenance(
+        alice.organization_id,
+        alice.device_id,
+        maintenance_realm,
+        2,
+        {alice.user_id: b"whatever"},
+        datetime(2000, 1, 2),
+    )
+
+    rep = await vlob_batch_poll_changes(
+        alice_backend_sock, {realm: 0, other_realm: 0, maintenance_realm: 0, UNKNOWN_REALM_ID: 0}
+    )
+    assert rep == {
+        "status": "ok",
+        "realms": {
+            realm: {"status": "ok", "current_checkpoint": 1, "changes": {VLOB_ID: 1}},
+            other_realm: {"status": "not_allowed"},
+            maintenance_realm: {"status": "in_maintenance"},
+            UNKNOWN_REALM_ID: {"status": "not_found"},
+        },
+    }
+
+    rep = await vlob_batch_poll_changes(bob_backend_sock, {other_realm: 1, realm: 0})
+    assert rep == {
+        "status": "ok",
+        "realms": {
+            other_realm: {"status": "ok", "current_checkpoint": 1, "changes": {}},
+            realm: {"status": "not_allowed"},
+        },
+    }
@@ -16,7 +16,7 @@ from parsec.api.protocol import (
 
 async def check_forbidden_cmds(backend_sock, cmds):
     for cmd in cmds:
-        if cmd == "events_listen":
+        if cmd in ("events_listen", "events_batch_listen"):
             # Must pass wait option otherwise backend will hang forever
             await backend_sock.send(packb({"cmd": cmd, "wait": False}))
         else:
@@ -27,7 +27,7 @@ async def check_forbidden_cmds(backend_sock, cmds):
 
 async def check_allowed_cmds(backend_sock, cmds):
     for cmd in cmds:
-        if cmd == "events_listen":
+        if cmd in ("events_listen", "events_batch_listen"):
             # Must pass wait option otherwise backend will hang forever
             await backend_sock.send(packb({"cmd": cmd, "wait": False}))
         else:
@@ -0,0 +1,250 @@
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+import pytest
+import trio
+from uuid import uuid4
+from pathlib import Path
+
+from parsec.api.protocol import OrganizationID
+from parsec.backend.config import CachedBlockStoreConfig, MockedBlockStoreConfig
+from parsec.backend.blockstore import blockstore_factory
+from parsec.backend.memory import MemoryBlockStoreComponent
+from parsec.backend.block import BlockNotFoundError, BlockTimeoutError
+from parsec.backend.cached_blockstore import CachedBlockStoreComponent, DiskTier, LFUCache
+
+
+ORG = OrganizationID("CoolOrg")
+
+
+class SpyBlockStore(MemoryBlockStoreComponent):
+    def __init__(self):
+        super().__init__()
+        self.reads = []
+        self.read_allowed = trio.Event()
+        self.read_allowed.set()
+        self.read_error = None
+
+    async def read(self, organization_id, block_id):
+        self.reads.append(block_id)
+        await self.read_allowed.wait()
+        if self.read_error:
+            raise self.read_error
+        return await super().read(organization_id, block_id)
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("eviction_policy", ["LRU", "LFU"])
+async def test_memory_cache(eviction_policy):
+    spy = SpyBlockStore()
+    blockstore = CachedBlockStoreComponent(spy, memory_size=20, eviction_policy=eviction_policy)
+    ids = [uuid4() for _ in range(3)]
+    for id in ids:
+        await spy.create(ORG, id, b"x" * 10)
+
+    assert await blockstore.read(ORG, ids[0]) == b"x" * 10
+    assert await blockstore.read(ORG, ids[0]) == b"x" * 10
+    assert await blockstore.read(ORG, ids[1]) == b"x" * 10
+    assert spy.reads == ids[:2]
+
+    # ids[0] is both the least recently and the most frequently used
+    await blockstore.read(ORG, ids[0])
+    await blockstore.read(ORG, ids[1])
+    await blockstore.read(ORG, ids[2])
+    spy.reads.clear()
+    await blockstore.read(ORG, ids[0])
+    if eviction_policy == "LRU":
+        assert spy.reads == [ids[0]]
+    else:
+        assert spy.reads == []
+
+    with pytest.raises(BlockNotFoundError):
+        await blockstore.read(ORG, uuid4())
+
+    stats = blockstore.get_stats()
+    assert stats["memory_size"] == 20
+    assert stats["misses"] + stats["memory_hits"] == 8
+    assert stats["hit_ratio"] == stats["memory_hits"] / 8
+
+
+def test_lfu_eviction_order():
+    cache = LFUCache(max_size=3)
+    for key in "abc":
+        cache.add(key, 1)
+    cache.touch("a")
+    cache.touch("a")
+    cache.touch("b")
+    assert [cache.pop_victim() for _ in range(3)] == ["c", "b", "a"]
+    assert cache.size == 0
+    assert cache.evictions == 3
+
+
+@pytest.mark.trio
+async def test_created_block_is_cached():
+    spy = SpyBlockStore()
+    blockstore = CachedBlockStoreComponent(spy, memory_size=1024)
+    id = uuid4()
+    await blockstore.create(ORG, id, b"foo")
+    assert await blockstore.read(ORG, id) == b"foo"
+    assert spy.reads == []
+
+    # Blocks bigger than the cache are never cached
+    id = uuid4()
+    await blockstore.create(ORG, id, b"x" * 2048)
+    assert await blockstore.read(ORG, id) == b"x" * 2048
+    assert await blockstore.read(ORG, id) == b"x" * 2048
+    assert spy.reads == [id, id]
+
+
+@pytest.mark.trio
+async def test_concurrent_misses_are_deduplicated():
+    spy = SpyBlockStore()
+    blockstore = CachedBlockStoreComponent(spy, memory_size=1024)
+    id = uuid4()
+    await spy.create(ORG, id, b"foo")
+    spy.read_allowed = trio.Event()
+    results = []
+
+    async def _read():
+        results.append(await blockstore.read(ORG, id))
+
+    async with trio.open_nursery() as nursery:
+        for _ in range(5):
+            nursery.start_soon(_read)
+        await trio.testing.wait_all_tasks_blocked()
+        spy.read_allowed.set()
+
+    assert results == [b"foo"] * 5
+    assert spy.reads == [id]
+    assert blockstore.get_stats()["deduplicated_misses"] == 4
+
+    # Errors are also shared between the concurrent readers
+    spy.reads.clear()
+    spy.read_allowed = trio.Event()
+    spy.read_error = BlockTimeoutError()
+    errors = []
+
+    async def _failing_read():
+        with pytest.raises(BlockTimeoutError) as exc:
+            await blockstore.read(ORG, missing_id)
+        errors.append(exc.value)
+
+    missing_id = uuid4()
+    async with trio.open_nursery() as nursery:
+        for _ in range(3):
+            nursery.start_soon(_failing_read)
+        await trio.testing.wait_all_tasks_blocked()
+        spy.read_allowed.set()
+
+    assert len(errors) == 3
+    assert spy.reads == [missing_id]
+
+
+@pytest.mark.trio
+async def test_cancelled_miss_is_retried_by_waiters():
+    spy = SpyBlockStore()
+    blockstore = CachedBlockStoreComponent(spy, memory_size=1024)
+    id = uuid4()
+    await spy.create(ORG, id, b"foo")
+    spy.read_allowed = trio.Event()
+    first_reader_scope = trio.CancelScope()
+    results = []
+
+    async def _first_read():
+        with first_reader_scope:
+            await blockstore.read(ORG, id)
+
+    async def _read():
+        results.append(await blockstore.read(ORG, id))
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_first_read)
+        await trio.testing.wait_all_tasks_blocked()
+        nursery.start_soon(_read)
+        await trio.testing.wait_all_tasks_blocked()
+        # The first reader gets cancelled, the second one takes over
+        first_reader_scope.cancel()
+        await trio.testing.wait_all_tasks_blocked()
+        spy.read_allowed.set()
+
+    assert results == [b"foo"]
+    assert spy.reads == [id, id]
+
+
+@pytest.mark.trio
+async def test_disk_cache(tmpdir):
+    spy = SpyBlockStore()
+    ids = [uuid4() for _ in range(3)]
+    for id in ids:
+        await spy.create(ORG, id, id.bytes)
+
+    blockstore = CachedBlockStoreComponent(spy, memory_size=16, disk_path=tmpdir, disk_size=32)
+    for id in ids:
+        assert await blockstore.read(ORG, id) == id.bytes
+    assert spy.reads == ids
+
+    # Memory only contains the last block, disk the last two ones
+    spy.reads.clear()
+    for id in reversed(ids):
+        assert await blockstore.read(ORG, id) == id.bytes
+    assert spy.reads == [ids[0]]
+    stats = blockstore.get_stats()
+    assert stats["memory_hits"] == 1
+    assert stats["disk_hits"] == 1
+    assert stats["disk_size"] == 32
+
+    # Disk cache is kept across restarts
+    spy.reads.clear()
+    blockstore = CachedBlockStoreComponent(spy, memory_size=16, disk_path=tmpdir, disk_size=32)
+    assert blockstore.get_stats()["disk_size"] == 32
+    for id in ids:
+        assert await blockstore.read(ORG, id) == id.bytes
+    assert len(spy.reads) == 1
+
+
+@pytest.mark.trio
+@pytest.mark.parametrize("eviction_policy", ["LRU", "LFU"])
+async def test_disk_cache_eviction_during_read(tmpdir, monkeypatch, eviction_policy):
+    disk = DiskTier(Path(tmpdir), max_size=16, eviction_policy=eviction_policy)
+    read_key = (ORG, uuid4())
+    other_key = (ORG, uuid4())
+    await disk.set(read_key, b"x" * 16)
+
+    reading = trio.Event()
+    evicted = trio.Event()
+    run_sync = trio.to_thread.run_sync
+
+    async def _run_sync(fn, *args, **kwargs):
+        if getattr(fn, "__name__", None) == "read_bytes":
+            reading.set()
+            await evicted.wait()
+        return await run_sync(fn, *args, **kwargs)
+
+    monkeypatch.setattr(trio.to_thread, "run_sync", _run_sync)
+
+    async def _read():
+        assert await disk.get(read_key) is None
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(_read)
+        await reading.wait()
+        # Writing another block evicts the one being read
+        await disk.set(other_key, b"y" * 16)
+        evicted.set()
+
+    assert read_key not in disk._index
+    assert other_key in disk._index
+    assert disk._index.size == 16
+    assert await disk.get(other_key) == b"y" * 16
+
+
+def test_blockstore_factory(tmpdir):
+    config = CachedBlockStoreConfig(
+        blockstore=MockedBlockStoreConfig(),
+        memory_size=1024,
+        eviction_policy="LFU",
+        disk_path=str(tmpdir),
+        disk_size=4096,
+    )
+    blockstore = blockstore_factory(config)
+    assert isinstance(blockstore, CachedBlockStoreComponent)
+    assert isinstance(blockstore.blockstore, MemoryBlockStoreComponent)
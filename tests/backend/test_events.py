@@ -2,16 +2,20 @@
 
 import pytest
 import trio
+from uuid import uuid4
 
-from parsec.api.protocol import APIEvent
+from parsec.event_bus import EventBus
+from parsec.api.protocol import APIEvent, OrganizationID, RealmRole
 from parsec.api.transport import TransportError
 from parsec.backend.backend_events import BackendEvent
+from parsec.backend.events import EventsQueue, EventsRouter
 
 from tests.backend.common import (
     events_subscribe,
     events_listen,
     events_listen_wait,
     events_listen_nowait,
+    events_batch_listen,
     ping,
 )
 
@@ -132,4 +136,165 @@ async def test_cross_backend_event(backend_factory, backend_sock_factory, alice,
             assert rep == {"status": "no_events"}
 
 
+@pytest.mark.trio
+async def test_events_unsubscribed_on_disconnection(backend, backend_sock_factory, alice, bob):
+    async with backend_sock_factory(backend, alice) as alice_sock:
+        async with backend_sock_factory(backend, bob) as bob_sock:
+            await events_subscribe(alice_sock)
+            await events_subscribe(bob_sock)
+            assert backend.events.router.stats() == {alice.organization_id: 2}
+
+        await trio.testing.wait_all_tasks_blocked()
+        assert backend.events.router.stats() == {alice.organization_id: 1}
+
+    await trio.testing.wait_all_tasks_blocked()
+    assert backend.events.router.stats() == {}
+
+
+def test_events_router_dispatch(alice, alice2, bob):
+    class FakeClientContext:
+        def __init__(self, device, realms):
+            self.organization_id = device.organization_id
+            self.device_id = device.device_id
+            self.user_id = device.user_id
+            self.realms = set(realms)
+            self.events_queue = EventsQueue()
+
+        def receive_all(self):
+            try:
+                return self.events_queue.receive_batch_nowait(100)
+            except trio.WouldBlock:
+                return []
+
+    event_bus = EventBus()
+    router = EventsRouter(event_bus)
+    realm_id = uuid4()
+    alice_ctx = FakeClientContext(alice, [realm_id])
+    alice2_ctx = FakeClientContext(alice2, [realm_id])
+    bob_ctx = FakeClientContext(bob, [])
+    for client_ctx in (alice_ctx, alice2_ctx, bob_ctx):
+        router.subscribe(client_ctx)
+
+    def _send_vlobs_updated():
+        event_bus.send(
+            BackendEvent.REALM_VLOBS_UPDATED,
+            organization_id=alice.organization_id,
+            author=alice.device_id,
+            realm_id=realm_id,
+            checkpoint=1,
+            src_id=realm_id,
+            src_version=1,
+        )
+
+    vlobs_updated = {
+        "event": APIEvent.REALM_VLOBS_UPDATED,
+        "realm_id": realm_id,
+        "checkpoint": 1,
+        "src_id": realm_id,
+        "src_version": 1,
+    }
+
+    # Only the realm members are notified, the author excepted
+    _send_vlobs_updated()
+    assert alice_ctx.receive_all() == []
+    assert alice2_ctx.receive_all() == [vlobs_updated]
+    assert bob_ctx.receive_all() == []
+
+    # Sharing the realm subscribes bob to it
+    event_bus.send(
+        BackendEvent.REALM_ROLES_UPDATED,
+        organization_id=alice.organization_id,
+        author=alice.device_id,
+        realm_id=realm_id,
+        user=bob.user_id,
+        role=RealmRole.READER,
+    )
+    assert bob_ctx.receive_all() == [
+        {"event": APIEvent.REALM_ROLES_UPDATED, "realm_id": realm_id, "role": RealmRole.READER}
+    ]
+    _send_vlobs_updated()
+    assert alice2_ctx.receive_all() == [vlobs_updated]
+    assert bob_ctx.receive_all() == [vlobs_updated]
+
+    # Disconnected clients are no longer notified
+    router.unsubscribe(alice2_ctx)
+    _send_vlobs_updated()
+    assert alice2_ctx.receive_all() == []
+    assert bob_ctx.receive_all() == [vlobs_updated]
+
+    # Other organizations are not concerned
+    event_bus.send(
+        BackendEvent.PINGED,
+        organization_id=OrganizationID("AnotherOrg"),
+        author=alice.device_id,
+        ping="foo",
+    )
+    assert bob_ctx.receive_all() == []
+    assert alice_ctx.receive_all() == []
+
+
+@pytest.mark.trio
+async def test_events_batch_listen(backend, alice_backend_sock, alice2_backend_sock):
+    await events_subscribe(alice_backend_sock)
+
+    rep = await events_batch_listen(alice_backend_sock)
+    assert rep == {"status": "no_events"}
+
+    with backend.event_bus.listen() as spy:
+        for i in range(3):
+            await ping(alice2_backend_sock, f"ping{i}")
+
+        # No guarantees those events occur before the commands' return
+        await spy.wait_multiple_with_timeout([BackendEvent.PINGED] * 3)
+
+    rep = await events_batch_listen(alice_backend_sock, max_events=2)
+    assert rep == {
+        "status": "ok",
+        "events": [
+            {"event": APIEvent.PINGED, "ping": "ping0"},
+            {"event": APIEvent.PINGED, "ping": "ping1"},
+        ],
+    }
+    rep = await events_batch_listen(alice_backend_sock, wait=True)
+    assert rep == {"status": "ok", "events": [{"event": APIEvent.PINGED, "ping": "ping2"}]}
+    rep = await events_batch_listen(alice_backend_sock)
+    assert rep == {"status": "no_events"}
+
+
+def test_events_queue_coalesce_vlobs_updated():
+    realm_id = uuid4()
+    vlob_ids = [uuid4(), uuid4()]
+    queue = EventsQueue(max_size=3)
+
+    def _vlobs_updated(vlob_id, checkpoint):
+        return {
+            "event": APIEvent.REALM_VLOBS_UPDATED,
+            "realm_id": realm_id,
+            "checkpoint": checkpoint,
+            "src_id": vlob_id,
+            "src_version": checkpoint,
+        }
+
+    queue.send_nowait(_vlobs_updated(vlob_ids[0], 1))
+    queue.send_nowait({"event": APIEvent.PINGED, "ping": "foo"})
+    for checkpoint in range(2, 100):
+        queue.send_nowait(_vlobs_updated(vlob_ids[checkpoint % 2], checkpoint))
+    # Events arriving out of order don't override the latest checkpoint
+    queue.send_nowait(_vlobs_updated(vlob_ids[1], 50))
+    assert len(queue) == 3
+
+    # Queue is full, only the pending vlobs can still be updated
+    with pytest.raises(trio.WouldBlock):
+        queue.send_nowait({"event": APIEvent.PINGED, "ping": "bar"})
+    queue.send_nowait(_vlobs_updated(vlob_ids[0], 100))
+
+    assert queue.receive_batch_nowait(10) == [
+        {"event": APIEvent.PINGED, "ping": "foo"},
+        _vlobs_updated(vlob_ids[1], 99),
+        _vlobs_updated(vlob_ids[0], 100),
+    ]
+    with pytest.raises(trio.WouldBlock):
+        queue.receive_batch_nowait(10)
+
+
 # TODO: test message.received and beacon.updated events
@@ -84,6 +84,47 @@ async def test_authenticated_handshake_good(backend, server_factory, alice):
         assert ch.backend_api_version == API_VERSION
 
 
+@pytest.mark.trio
+async def test_authenticated_handshake_multiplexing(backend, server_factory, alice, bob):
+    ch = AuthenticatedClientHandshake(
+        organization_id=alice.organization_id,
+        device_id=alice.device_id,
+        user_signkey=alice.signing_key,
+        root_verify_key=alice.root_verify_key,
+        multiplexing=True,
+    )
+
+    async with server_factory(backend.handle_client) as server:
+        stream = server.connection_factory()
+        transport = await Transport.init_for_client(stream, server.addr.hostname)
+
+        challenge_req = await transport.recv()
+        answer_req = ch.process_challenge_req(challenge_req)
+
+        await transport.send(answer_req)
+        result_req = await transport.recv()
+        ch.process_result_req(result_req)
+        assert ch.multiplexing
+
+        # A pending request doesn't prevent the following ones from being processed
+        await transport.send(packb({"cmd": "events_subscribe", "req_id": 1}))
+        rep = await transport.recv()
+        assert unpackb(rep) == {"status": "ok", "req_id": 1}
+        await transport.send(packb({"cmd": "events_listen", "wait": True, "req_id": 2}))
+        await transport.send(packb({"cmd": "ping", "ping": "foo", "req_id": 3}))
+        rep = await transport.recv()
+        assert unpackb(rep) == {"status": "ok", "pong": "foo", "req_id": 3}
+
+        await backend.ping.ping(bob.organization_id, bob.device_id, "bar")
+        rep = await transport.recv()
+        assert unpackb(rep) == {"status": "ok", "event": "pinged", "ping": "bar", "req_id": 2}
+
+        # Request id is mandatory
+        await transport.send(packb({"cmd": "ping", "ping": "foo"}))
+        rep = await transport.recv()
+        assert unpackb(rep) == {"status": "invalid_msg_format", "reason": "Invalid message format"}
+
+
 @pytest.mark.trio
 async def test_authenticated_handshake_bad_rvk(backend, server_factory, alice, otherorg):
     ch = AuthenticatedClientHandshake(
@@ -10,8 +10,12 @@ from parsec.backend.config import PostgreSQLBlockStoreConfig
 from tests.backend.test_events import events_subscribe, events_listen, events_listen_nowait
 
 
-async def message_get(sock, offset=0):
-    await sock.send(message_get_serializer.req_dumps({"cmd": "message_get", "offset": offset}))
+async def message_get(sock, offset=0, page_size=None):
+    await sock.send(
+        message_get_serializer.req_dumps(
+            {"cmd": "message_get", "offset": offset, "page_size": page_size}
+        )
+    )
     raw_rep = await sock.recv()
     return message_get_serializer.rep_loads(raw_rep)
 
@@ -54,6 +58,36 @@ async def test_message_get_with_offset(backend, alice, bob, alice_backend_sock):
     }
 
 
+@pytest.mark.trio
+async def test_message_get_with_page_size(backend, alice, bob, alice_backend_sock):
+    d1 = datetime(2000, 1, 1)
+    for i in range(5):
+        await backend.message.send(
+            bob.organization_id, bob.device_id, alice.user_id, d1, str(i).encode()
+        )
+
+    pages = []
+    offset = 0
+    while True:
+        rep = await message_get(alice_backend_sock, offset, page_size=2)
+        assert rep["status"] == "ok"
+        pages.append([(msg["count"], msg["body"]) for msg in rep["messages"]])
+        if len(rep["messages"]) < 2:
+            break
+        offset = rep["messages"][-1]["count"]
+
+    assert pages == [[(1, b"0"), (2, b"1")], [(3, b"2"), (4, b"3")], [(5, b"4")]]
+
+    rep = await message_get(alice_backend_sock, 5, page_size=2)
+    assert rep == {"status": "ok", "messages": []}
+
+    # Messages are indexed per recipient
+    await backend.message.send(bob.organization_id, alice.device_id, bob.user_id, d1, b"bob")
+    assert await backend.message.get(bob.organization_id, bob.user_id, 0) == [
+        (1, alice.device_id, d1, b"bob")
+    ]
+
+
 @pytest.mark.trio
 @pytest.mark.postgresql
 async def test_message_from_bob_to_alice_multi_backends(
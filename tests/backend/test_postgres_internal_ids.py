@@ -0,0 +1,65 @@
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+import pytest
+from uuid import uuid4
+
+from parsec.api.protocol import OrganizationID, UserID, DeviceID
+from parsec.backend.postgresql.internal_ids import PGInternalIDsCache
+
+
+class FakeConn:
+    def __init__(self):
+        self.rows = {}
+        self.queries = []
+
+    async def fetchval(self, sql, *args):
+        self.queries.append(args)
+        return self.rows.get(args)
+
+
+@pytest.mark.trio
+async def test_internal_ids_cache():
+    conn = FakeConn()
+    cache = PGInternalIDsCache()
+    org = OrganizationID("CoolOrg")
+    other_org = OrganizationID("OtherOrg")
+    realm_id = uuid4()
+    conn.rows = {(org,): 1, (other_org,): 2, (1, realm_id): 10, (2, realm_id): 20}
+
+    # Resolved ids are cached
+    assert await cache.realm(conn, org, realm_id) == 10
+    assert conn.queries == [(org,), (1, realm_id)]
+    assert await cache.realm(conn, org, realm_id) == 10
+    assert await cache.organization(conn, org) == 1
+    assert len(conn.queries) == 2
+
+    # Unknown ids are not cached, given they may be created later
+    conn.queries.clear()
+    assert await cache.user(conn, org, UserID("alice")) is None
+    conn.rows[(1, UserID("alice"))] = 100
+    assert await cache.user(conn, org, UserID("alice")) == 100
+    assert conn.queries == [(1, "alice"), (1, "alice")]
+
+    # Unknown organization
+    conn.queries.clear()
+    assert await cache.device(conn, OrganizationID("Dummy"), DeviceID("alice@dev1")) is None
+    assert conn.queries == [("Dummy",)]
+
+
+@pytest.mark.trio
+async def test_internal_ids_cache_max_size():
+    conn = FakeConn()
+    cache = PGInternalIDsCache(max_size=2)
+    orgs = [OrganizationID(f"Org{i}") for i in range(3)]
+    conn.rows = {(org,): i for i, org in enumerate(orgs)}
+
+    for org in orgs:
+        await cache.organization(conn, org)
+    conn.queries.clear()
+
+    # The oldest entry has been evicted
+    assert await cache.organization(conn, orgs[2]) == 2
+    assert await cache.organization(conn, orgs[1]) == 1
+    assert conn.queries == []
+    assert await cache.organization(conn, orgs[0]) == 0
+    assert conn.queries == [(orgs[0],)]
@@ -0,0 +1,139 @@
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+import pytest
+import trio
+from uuid import uuid4
+
+from parsec.api.protocol import OrganizationID
+from parsec.backend.memory import MemoryBlockStoreComponent
+from parsec.backend.block import BlockNotFoundError, BlockTimeoutError
+from parsec.backend.raid1_blockstore import (
+    RAID1BlockStoreComponent,
+    DEFAULT_HEDGE_INITIAL_DELAY,
+    DEFAULT_HEDGE_MARGIN,
+    DEFAULT_MIRROR_DOWN_DURATION,
+)
+
+
+ORG = OrganizationID("CoolOrg")
+
+
+class SlowBlockStore(MemoryBlockStoreComponent):
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+        self.reads = 0
+        self.failing = False
+
+    async def read(self, organization_id, block_id):
+        self.reads += 1
+        await trio.sleep(self.latency)
+        if self.failing:
+            raise BlockTimeoutError()
+        return await super().read(organization_id, block_id)
+
+
+async def _create_raid1(latencies, read_strategy="HEDGED"):
+    mirrors = [SlowBlockStore(latency) for latency in latencies]
+    blockstore = RAID1BlockStoreComponent(mirrors, read_strategy=read_strategy)
+    id = uuid4()
+    await blockstore.create(ORG, id, b"foo")
+    return blockstore, mirrors, id
+
+
+@pytest.mark.trio
+async def test_fanout_read(autojump_clock):
+    blockstore, mirrors, id = await _create_raid1([1, 0.01], read_strategy="FANOUT")
+    assert await blockstore.read(ORG, id) == b"foo"
+    assert [m.reads for m in mirrors] == [1, 1]
+
+
+@pytest.mark.trio
+async def test_hedged_read_prefers_fastest_mirror(autojump_clock):
+    blockstore, mirrors, id = await _create_raid1([0.05, 0.01, 0.03])
+
+    # Unknown mirrors are all tried at first
+    for _ in range(3):
+        assert await blockstore.read(ORG, id) == b"foo"
+    assert [m.reads for m in mirrors] == [1, 1, 1]
+
+    # Then the fastest one is used
+    for m in mirrors:
+        m.reads = 0
+    for _ in range(20):
+        assert await blockstore.read(ORG, id) == b"foo"
+    assert [m.reads for m in mirrors] == [0, 20, 0]
+
+
+@pytest.mark.trio
+async def test_hedged_read_on_slow_mirror(autojump_clock):
+    blockstore, mirrors, id = await _create_raid1([0.01, 0.02])
+    for _ in range(20):
+        await blockstore.read(ORG, id)
+    # Second mirror has been read once to get to know its latency
+    assert [m.reads for m in mirrors] == [19, 1]
+    for m in mirrors:
+        m.reads = 0
+
+    # Mirror becomes unusually slow, second mirror is read after the hedging delay
+    mirrors[0].latency = 10
+    start = trio.current_time()
+    assert await blockstore.read(ORG, id) == b"foo"
+    assert trio.current_time() - start == pytest.approx(0.01 + DEFAULT_HEDGE_MARGIN + 0.02)
+    assert [m.reads for m in mirrors] == [1, 1]
+
+    # The cancelled read is not accounted as an actual latency...
+    stats = blockstore.read_strategy.mirrors[0]
+    assert stats.ewma_latency == pytest.approx(0.01)
+    assert max(stats.latencies) == pytest.approx(0.01)
+    # ...but the mirror is now known to be slower than the other one
+    assert stats.latency_lower_bound == pytest.approx(0.01 + DEFAULT_HEDGE_MARGIN + 0.02)
+    for m in mirrors:
+        m.reads = 0
+    assert await blockstore.read(ORG, id) == b"foo"
+    assert [m.reads for m in mirrors] == [0, 1]
+
+
+@pytest.mark.trio
+async def test_hedged_read_mirror_down(autojump_clock):
+    blockstore, mirrors, id = await _create_raid1([0.01, 0.02])
+    for _ in range(20):
+        await blockstore.read(ORG, id)
+    for m in mirrors:
+        m.reads = 0
+
+    mirrors[0].failing = True
+    assert await blockstore.read(ORG, id) == b"foo"
+    assert [m.reads for m in mirrors] == [1, 1]
+
+    # Failing mirror is no longer read first...
+    mirrors[0].failing = False
+    for _ in range(5):
+        assert await blockstore.read(ORG, id) == b"foo"
+    assert [m.reads for m in mirrors] == [1, 6]
+
+    # ...until it is considered up again
+    await trio.sleep(DEFAULT_MIRROR_DOWN_DURATION)
+    assert await blockstore.read(ORG, id) == b"foo"
+    assert [m.reads for m in mirrors] == [2, 6]
+
+
+@pytest.mark.trio
+async def test_hedged_read_not_found(autojump_clock):
+    blockstore, mirrors, id = await _create_raid1([0.01, 0.01])
+    # Block missing from a mirror (e.g. creation partially failed)
+    del mirrors[0]._blocks[(ORG, id)]
+    mirrors[1].latency = 1
+    start = trio.current_time()
+    assert await blockstore.read(ORG, id) == b"foo"
+    # Second mirror is read right away, not after the hedging delay
+    assert trio.current_time() - start == pytest.approx(1.01)
+    assert DEFAULT_HEDGE_INITIAL_DELAY < 1
+
+    with pytest.raises(BlockNotFoundError):
+        await blockstore.read(ORG, uuid4())
+
+
+def test_unknown_read_strategy():
+    with pytest.raises(ValueError):
+        RAID1BlockStoreComponent([], read_strategy="DUMMY")
@@ -8,6 +8,9 @@ from botocore.exceptions import (
     EndpointConnectionError as S3EndpointConnectionError,
 )
 import pytest
+import threading
+import time
+import trio
 
 from parsec.backend.s3_blockstore import S3BlockStoreComponent
 from parsec.backend.block import BlockAlreadyExistsError, BlockNotFoundError, BlockTimeoutError
@@ -49,34 +52,18 @@ async def test_s3_create():
         client_mock().head_container.return_value = True
         blockstore = S3BlockStoreComponent("europe", "parsec", "john", "secret")
         # Ok
-        client_mock().head_object.side_effect = S3ClientError(
-            error_response={"Error": {"Code": "404"}}, operation_name="HEAD"
-        )
         await blockstore.create("org42", 123, "content")
-        client_mock().put_object.assert_called_with(
+        client_mock().put_object.assert_called_once_with(
             Bucket="parsec", Key="org42/123", Body="content"
         )
-        client_mock().put_object.reset_mock()
-        # Already exist
-        client_mock().head_object.side_effect = None
-        with pytest.raises(BlockAlreadyExistsError):
-            await blockstore.create("org42", 123, "content")
-        client_mock().put_object.assert_not_called()
-        # Connection error at HEAD
-        client_mock().head_object.side_effect = S3EndpointConnectionError(endpoint_url="url")
-        with pytest.raises(BlockTimeoutError):
-            await blockstore.create("org42", 123, "content")
-        client_mock().put_object.assert_not_called()
-        # Unknown exception at HEAD
-        client_mock().head_object.side_effect = S3ClientError(
-            error_response={"Error": {"Code": "401"}}, operation_name="HEAD"
+        client_mock().head_object.assert_not_called()
+        # Already exist (conditional put failed)
+        client_mock().put_object.side_effect = S3ClientError(
+            error_response={"Error": {"Code": "PreconditionFailed"}}, operation_name="PUT"
         )
-        with pytest.raises(BlockTimeoutError):
+        with pytest.raises(BlockAlreadyExistsError):
             await blockstore.create("org42", 123, "content")
         # Connection error at PUT
-        client_mock().head_object.side_effect = S3ClientError(
-            error_response={"Error": {"Code": "404"}}, operation_name="HEAD"
-        )
         client_mock().put_object.side_effect = S3EndpointConnectionError(endpoint_url="url")
         with pytest.raises(BlockTimeoutError):
             await blockstore.create("org42", 123, "content")
@@ -86,3 +73,43 @@ async def test_s3_create():
         )
         with pytest.raises(BlockTimeoutError):
             await blockstore.create("org42", 123, "content")
+
+        assert blockstore.get_stats()["create"]["count"] == 4
+        assert blockstore.get_stats()["create"]["errors"] == 3
+
+
+def test_s3_conditional_put():
+    with mock.patch("boto3.client") as client_mock:
+        S3BlockStoreComponent("europe", "parsec", "john", "secret")
+        client_mock().meta.events.register.assert_called_once()
+        event_name, handler = client_mock().meta.events.register.call_args[0]
+        assert event_name == "before-call.s3.PutObject"
+        params = {"headers": {}}
+        handler(params=params)
+        assert params["headers"] == {"If-None-Match": "*"}
+
+
+@pytest.mark.trio
+async def test_s3_worker_pool():
+    with mock.patch("boto3.client") as client_mock:
+        blockstore = S3BlockStoreComponent("europe", "parsec", "john", "secret", max_workers=2)
+        running = 0
+        max_running = 0
+        lock = threading.Lock()
+
+        def _put_object(**kwargs):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+
+        client_mock().put_object.side_effect = _put_object
+        async with trio.open_nursery() as nursery:
+            for i in range(10):
+                nursery.start_soon(blockstore.create, "org42", i, "content")
+
+        assert max_running == 2
+        assert blockstore.get_stats()["create"]["count"] == 10
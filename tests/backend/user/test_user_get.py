@@ -171,3 +171,26 @@ async def test_api_user_get_other_organization(
     async with sock_from_other_organization_factory(backend) as sock:
         rep = await user_get(sock, alice.user_id)
         assert rep == {"status": "not_found"}
+
+
+@pytest.mark.trio
+async def test_api_user_get_known_trustchain(certificates_store, alice_backend_sock, bob):
+    # Backend populates CoolOrg trustchain this way:
+    # <root> --> alice@dev1 --> alice@dev2 --> adam@dev1 --> bob@dev1
+    rep = await user_get(
+        alice_backend_sock,
+        bob.user_id,
+        known_trustchain={"users": ["alice"], "devices": ["alice@dev1", "adam@dev1"]},
+    )
+    assert rep["status"] == "ok"
+    assert certificates_store.translate_certifs(rep["trustchain"]["users"]) == [
+        "<adam user certif>"
+    ]
+    assert certificates_store.translate_certifs(rep["trustchain"]["devices"]) == [
+        "<alice@dev2 device certif>"
+    ]
+
+    # Trustchain is complete when no certificate is known
+    rep = await user_get(alice_backend_sock, bob.user_id, known_trustchain={})
+    assert len(rep["trustchain"]["users"]) == 2
+    assert len(rep["trustchain"]["devices"]) == 3
@@ -241,9 +241,7 @@ async def test_events_listen_wait_has_watchdog(monkeypatch, mock_clock, running_
                 assert isinstance(event, Pong)
                 assert client_transport is client_transport2
 
-            await backend_client_ctx.send_events_channel.send(
-                {"event": APIEvent.PINGED, "ping": "foo"}
-            )
+            backend_client_ctx.events_queue.send_nowait({"event": APIEvent.PINGED, "ping": "foo"})
 
     assert events_listen_rep == {"status": "ok", "event": APIEvent.PINGED, "ping": "foo"}
 
@@ -2,15 +2,18 @@
 
 import pytest
 import trio
+from trio.testing import wait_all_tasks_blocked
 
 from parsec.backend.backend_events import BackendEvent
-from parsec.api.protocol import RealmRole
+from parsec.api.protocol import RealmRole, HandshakeType, packb, unpackb
+from parsec.api.transport import TransportError
 from parsec.core.backend_connection import (
     BackendAuthenticatedConn,
     BackendConnStatus,
     BackendNotAvailable,
     BackendConnectionRefused,
 )
+from parsec.core.backend_connection.transport import MultiplexedTransport, TransportPool
 from parsec.core.core_events import CoreEvent
 
 
@@ -131,10 +134,15 @@ async def test_monitor_crash(running_backend, event_bus, alice, during_bootstrap
 
 
 @pytest.mark.trio
-async def test_switch_offline(mock_clock, running_backend, event_bus, alice):
+@pytest.mark.parametrize("multiplexing", (False, True))
+async def test_switch_offline(mock_clock, running_backend, event_bus, alice, multiplexing):
     mock_clock.rate = 1.0
     conn = BackendAuthenticatedConn(
-        alice.organization_addr, alice.device_id, alice.signing_key, event_bus
+        alice.organization_addr,
+        alice.device_id,
+        alice.signing_key,
+        event_bus,
+        multiplexing=multiplexing,
     )
     with event_bus.listen() as spy:
         async with conn.run():
@@ -144,6 +152,8 @@ async def test_switch_offline(mock_clock, running_backend, event_bus, alice):
                 CoreEvent.BACKEND_CONNECTION_CHANGED,
                 {"status": BackendConnStatus.READY, "status_exc": None},
             )
+            rep = await conn.cmds.ping("foo")
+            assert rep == {"status": "ok", "pong": "foo"}
 
             # Switch backend offline and wait for according event
             spy.clear()
@@ -164,6 +174,8 @@ async def test_switch_offline(mock_clock, running_backend, event_bus, alice):
                 {"status": BackendConnStatus.READY, "status_exc": None},
             )
             assert conn.status == BackendConnStatus.READY
+            rep = await conn.cmds.ping("foo")
+            assert rep == {"status": "ok", "pong": "foo"}
 
             # Make sure event system still works as expected
             spy.clear()
@@ -207,6 +219,47 @@ async def test_concurrency_sends(running_backend, alice, event_bus):
             await work_all_done.wait()
 
 
+@pytest.mark.trio
+async def test_concurrency_sends_with_multiplexing(running_backend, alice, event_bus):
+    CONCURRENCY = 10
+
+    async def sender(cmds, x):
+        rep = await cmds.ping(x)
+        assert rep == {"status": "ok", "pong": str(x)}
+
+    conn = BackendAuthenticatedConn(
+        alice.organization_addr,
+        alice.device_id,
+        alice.signing_key,
+        event_bus,
+        max_pool=2,
+        multiplexing=True,
+    )
+    with event_bus.listen() as spy:
+        async with conn.run():
+            await spy.wait_with_timeout(
+                CoreEvent.BACKEND_CONNECTION_CHANGED,
+                {"status": BackendConnStatus.READY, "status_exc": None},
+            )
+
+            with trio.fail_after(1):
+                async with trio.open_service_nursery() as nursery:
+                    for x in range(CONCURRENCY):
+                        nursery.start_soon(sender, conn.cmds, str(x))
+
+            # All the requests have been sent on a single connection, while
+            # the event listener keeps its own
+            assert len(conn._transport_pool._multiplexed_transports) == 1
+
+            running_backend.backend.event_bus.send(
+                BackendEvent.PINGED,
+                organization_id=alice.organization_id,
+                author="bob@test",
+                ping="foo",
+            )
+            await spy.wait_with_timeout(CoreEvent.BACKEND_PINGED, {"ping": "foo"})
+
+
 @pytest.mark.trio
 async def test_realm_notif_on_new_entry_sync(running_backend, alice_backend_conn, alice2_user_fs):
     wid = await alice2_user_fs.workspace_create("foo")
@@ -291,6 +344,32 @@ async def test_realm_notif_maintenance(running_backend, alice_backend_conn, alic
         )
 
 
+@pytest.mark.trio
+async def test_events_listen_fallback_on_old_backend(
+    monkeypatch, running_backend, event_bus, alice, alice2_user_fs
+):
+    # Backend is too old to provide `events_batch_listen`
+    monkeypatch.delitem(
+        running_backend.backend.apis[HandshakeType.AUTHENTICATED], "events_batch_listen"
+    )
+
+    conn = BackendAuthenticatedConn(
+        alice.organization_addr, alice.device_id, alice.signing_key, event_bus
+    )
+    with event_bus.listen() as spy:
+        async with conn.run():
+            await spy.wait_with_timeout(
+                CoreEvent.BACKEND_CONNECTION_CHANGED,
+                {"status": BackendConnStatus.READY, "status_exc": None},
+            )
+
+            wid = await alice2_user_fs.workspace_create("foo")
+            await alice2_user_fs.sync()
+            await spy.wait_with_timeout(
+                CoreEvent.BACKEND_REALM_ROLES_UPDATED, {"realm_id": wid, "role": RealmRole.OWNER}
+            )
+
+
 @pytest.mark.trio
 async def test_connection_refused(mock_clock, running_backend, event_bus, mallory):
     mock_clock.rate = 1.0
@@ -309,3 +388,90 @@ async def test_connection_refused(mock_clock, running_backend, event_bus, mallor
             # Trying to use the connection should endup with an exception
             with pytest.raises(BackendConnectionRefused):
                 await conn.cmds.ping()
+
+
+class FakeTransport:
+    def __init__(self):
+        self.logger = None
+        self.sent = []
+        self.send_allowed = trio.Event()
+        self.send_allowed.set()
+        self.replies_send, self.replies_recv = trio.open_memory_channel(10)
+        self.closed = False
+
+    async def send(self, msg):
+        await self.send_allowed.wait()
+        self.sent.append(unpackb(msg))
+
+    async def recv(self):
+        return await self.replies_recv.receive()
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.mark.trio
+async def test_multiplexed_request_cancelled_during_send():
+    fake = FakeTransport()
+    transport = MultiplexedTransport(fake)
+
+    async def _request(req, task_status=trio.TASK_STATUS_IGNORED):
+        with trio.CancelScope() as cancel_scope:
+            task_status.started(cancel_scope)
+            return await transport.request(req)
+
+    with trio.fail_after(1):
+        async with trio.open_nursery() as nursery:
+            first_rep = None
+
+            async def _first_request():
+                nonlocal first_rep
+                first_rep = await _request({"cmd": "ping", "ping": "first"})
+
+            nursery.start_soon(_first_request)
+            await wait_all_tasks_blocked()
+            assert len(fake.sent) == 1
+
+            # Second request gets cancelled while sending
+            fake.send_allowed = trio.Event()
+            cancel_scope = await nursery.start(_request, {"cmd": "ping", "ping": "second"})
+            await wait_all_tasks_blocked()
+            cancel_scope.cancel()
+            await wait_all_tasks_blocked()
+
+            # The send is completed before the cancellation is taken into account
+            fake.send_allowed.set()
+            await wait_all_tasks_blocked()
+            assert [req["ping"] for req in fake.sent] == ["first", "second"]
+            assert not transport.broken
+
+            # The connection is still usable by the first request
+            await fake.replies_send.send(packb({"req_id": 2, "status": "ok", "pong": "second"}))
+            await fake.replies_send.send(packb({"req_id": 1, "status": "ok", "pong": "first"}))
+
+    assert first_rep == {"status": "ok", "pong": "first"}
+    assert not transport.broken
+
+
+@pytest.mark.trio
+async def test_transport_pool_skips_broken_multiplexed_transport():
+    transports = []
+
+    async def _connect():
+        transport = MultiplexedTransport(FakeTransport())
+        transports.append(transport)
+        return transport
+
+    pool = TransportPool(_connect, max_pool=4)
+    async with pool.acquire() as transport1:
+        transport1._set_broken(TransportError("boom"))
+        # Another transport is used while the broken one is still in use
+        async with pool.acquire() as transport2:
+            assert transport2 is not transport1
+        assert not transport1.transport.closed
+
+    # Broken transport is discarded once released
+    assert transport1.transport.closed
+    assert pool._multiplexed_transports == [transport2]
+    async with pool.acquire() as transport3:
+        assert transport3 is transport2
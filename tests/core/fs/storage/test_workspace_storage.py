@@ -2,6 +2,7 @@
 
 from pathlib import Path
 
+import trio
 import pytest
 from pendulum import now
 
@@ -196,6 +197,79 @@ async def test_cache_flushed_on_exit(tmpdir, alice, workspace_id):
         assert await aws2.get_manifest(manifest.id) == manifest
 
 
+async def _get_persisted_manifest_ids(aws):
+    async with aws.manifest_storage.localdb.open_cursor() as cursor:
+        cursor.execute("SELECT vlob_id FROM vlobs")
+        return {EntryID(row[0]) for row in cursor.fetchall()}
+
+
+@pytest.mark.trio
+async def test_manifest_group_commit(tmpdir, alice, workspace_id, autojump_clock):
+    manifests = [create_manifest(alice, LocalFileManifest) for _ in range(5)]
+    async with WorkspaceStorage.run(
+        alice, tmpdir, workspace_id, manifest_flush_max_delay=1, manifest_flush_batch_size=3
+    ) as aws:
+        commits = 0
+        vanilla_commit = aws.manifest_storage.localdb._commit
+
+        async def _commit():
+            nonlocal commits
+            commits += 1
+            await vanilla_commit()
+
+        aws.manifest_storage.localdb._commit = _commit
+
+        # Writes are delayed...
+        for manifest in manifests[:2]:
+            await aws.set_manifest(manifest.id, manifest, check_lock_status=False)
+        assert await _get_persisted_manifest_ids(aws) == set()
+        assert await aws.get_manifest(manifests[0].id) == manifests[0]
+
+        # ...then flushed together once the max delay is reached
+        await trio.sleep(1.5)
+        assert await _get_persisted_manifest_ids(aws) == {m.id for m in manifests[:2]}
+        assert commits == 1
+
+        # Reaching the batch size triggers the flush right away
+        commits = 0
+        for manifest in manifests[2:]:
+            await aws.set_manifest(manifest.id, manifest, check_lock_status=False)
+        assert await _get_persisted_manifest_ids(aws) == {m.id for m in manifests}
+        assert commits == 1
+
+        # Cache-only manifests are not part of the group commit, however the
+        # pending delayed write of the same entry is performed beforehand
+        new_manifest = manifests[0].evolve(need_sync=False)
+        cache_only_manifest = new_manifest.evolve(need_sync=True)
+        await aws.set_manifest(manifests[0].id, new_manifest, check_lock_status=False)
+        commits = 0
+        await aws.set_manifest(
+            manifests[0].id, cache_only_manifest, cache_only=True, check_lock_status=False
+        )
+        assert commits == 1
+        assert not aws.manifest_storage._pending_flush
+        await trio.sleep(1.5)
+        assert aws.manifest_storage._cache_ahead_of_localdb.keys() == {manifests[0].id}
+
+        # Delayed writes are performed before updating the remote versions
+        await aws.set_manifest(manifests[1].id, manifests[1], check_lock_status=False)
+        await aws.update_realm_checkpoint(1, {manifests[1].id: 2})
+        _, remote_changes = await aws.get_need_sync_entries()
+        assert remote_changes == {manifests[1].id}
+
+        # Delayed writes survive a cache clearing, unlike cache-only manifests
+        await aws.set_manifest(manifests[2].id, manifests[2], check_lock_status=False)
+        await aws.clear_memory_cache(flush=False)
+        assert await aws.get_manifest(manifests[0].id) == new_manifest
+        assert await aws.get_manifest(manifests[2].id) == manifests[2]
+
+        # Pending writes are flushed on exit
+        await aws.set_manifest(manifests[3].id, new_manifest, check_lock_status=False)
+
+    async with WorkspaceStorage.run(alice, tmpdir, workspace_id) as aws:
+        assert await aws.get_manifest(manifests[3].id) == new_manifest
+
+
 @pytest.mark.trio
 async def test_clear_cache(alice_workspace_storage):
     aws = alice_workspace_storage
@@ -385,6 +459,95 @@ async def test_chunk_interface(alice_workspace_storage):
     await aws.clear_chunk(chunk.id, miss_ok=True)
 
 
+@pytest.mark.trio
+async def test_chunk_memory_cache(alice_workspace_storage):
+    data = b"0123456"
+    aws = alice_workspace_storage
+    cache = aws.chunk_cache
+    chunk = Chunk.new(0, 7).evolve_as_block(data)
+    block_id = chunk.access.id
+
+    # Downloaded blocks are cached
+    await aws.set_clean_block(block_id, data)
+    assert chunk.id in cache
+    assert await aws.get_chunk(chunk.id) == data
+    assert cache.stats()["hits"] == 1
+
+    # Clearing the block invalidates the cache
+    await aws.clear_clean_block(block_id)
+    assert chunk.id not in cache
+    with pytest.raises(FSLocalMissError):
+        await aws.get_chunk(chunk.id)
+    assert cache.stats()["misses"] == 1
+
+    # Reading from the block storage fills the cache
+    await aws.block_storage.set_chunk(chunk.id, data)
+    assert await aws.get_chunk(chunk.id) == data
+    assert chunk.id in cache
+    assert await aws.get_chunk(chunk.id) == data
+    assert cache.stats()["hits"] == 2
+
+    # Dirty chunks take precedence and are not cached
+    await aws.set_chunk(chunk.id, b"dirty")
+    assert chunk.id not in cache
+    assert await aws.get_chunk(chunk.id) == b"dirty"
+    assert chunk.id not in cache
+
+    # Clearing the dirty chunk gives access to the clean block again
+    await aws.clear_chunk(chunk.id)
+    assert chunk.id not in cache
+    assert await aws.get_chunk(chunk.id) == data
+
+
+@pytest.mark.trio
+async def test_chunk_memory_cache_size(tmpdir, alice, workspace_id):
+    data = b"\x00" * 10
+    chunks = [Chunk.new(0, 10).evolve_as_block(data) for _ in range(4)]
+
+    async with WorkspaceStorage.run(alice, tmpdir, workspace_id, chunk_memory_cache_size=25) as aws:
+        cache = aws.chunk_cache
+        for chunk in chunks[:2]:
+            await aws.set_clean_block(chunk.access.id, data)
+        assert cache.size == 20
+
+        # Access the first chunk so the second one is the least recently used
+        await aws.get_chunk(chunks[0].id)
+        await aws.set_clean_block(chunks[2].access.id, data)
+        assert cache.size == 20
+        assert chunks[0].id in cache
+        assert chunks[1].id not in cache
+        assert chunks[2].id in cache
+
+        # Too big to fit in the cache
+        await aws.set_clean_block(chunks[3].access.id, data * 3)
+        assert chunks[3].id not in cache
+        assert cache.size == 20
+
+        # The timestamped storage shares the same cache
+        assert aws.to_timestamped(now()).chunk_cache is cache
+
+
+@pytest.mark.trio
+async def test_chunk_memory_cache_hit_registers_access(tmpdir, alice, workspace_id):
+    data = b"\x00" * 1000
+    chunks = [Chunk.new(0, 1000).evolve_as_block(data) for _ in range(4)]
+
+    async with WorkspaceStorage.run(alice, tmpdir, workspace_id, cache_size=3500) as aws:
+        block_storage = aws.block_storage
+        for chunk in chunks[:3]:
+            await aws.set_clean_block(chunk.access.id, data)
+
+        # Served from the memory cache, but the access is still registered
+        assert await aws.get_chunk(chunks[0].id) == data
+        assert aws.chunk_cache.stats()["hits"] == 1
+        assert chunks[0].id in block_storage._pending_accesses
+
+        # Hence the first block is not the least recently used one
+        await aws.set_clean_block(chunks[3].access.id, data)
+        assert await block_storage.is_chunk(chunks[0].id)
+        assert not await block_storage.is_chunk(chunks[1].id)
+
+
 @pytest.mark.trio
 async def test_file_descriptor(alice_workspace_storage):
     aws = alice_workspace_storage
@@ -523,6 +686,55 @@ async def test_garbage_collection(tmpdir, alice, workspace_id):
         assert await aws.block_storage.get_nb_blocks() == 0
 
 
+@pytest.mark.trio
+async def test_garbage_collection_by_size(tmpdir, alice, workspace_id):
+    data = b"\x00" * 1000
+    chunks = [Chunk.new(0, 1000).evolve_as_block(data) for _ in range(5)]
+
+    async with WorkspaceStorage.run(alice, tmpdir, workspace_id, cache_size=3500) as aws:
+        block_storage = aws.block_storage
+        for chunk in chunks[:3]:
+            await aws.set_clean_block(chunk.access.id, data)
+        assert block_storage.nb_blocks == 3
+        assert block_storage.total_size == await block_storage.get_total_size()
+        assert block_storage.total_size > 3000
+
+        # Access the first block so the second one becomes the least recently used
+        await block_storage.get_chunk(chunks[0].id)
+
+        # Access times are not written to the database right away
+        assert chunks[0].id in block_storage._pending_accesses
+
+        # Going over the limit removes the least recently used block
+        await aws.set_clean_block(chunks[3].access.id, data)
+        assert not block_storage._pending_accesses
+        assert await block_storage.is_chunk(chunks[0].id)
+        assert not await block_storage.is_chunk(chunks[1].id)
+        assert block_storage.nb_blocks == await block_storage.get_nb_blocks() == 3
+        assert block_storage.total_size == await block_storage.get_total_size()
+
+        # Clearing a block updates the stats
+        await aws.clear_clean_block(chunks[0].access.id)
+        assert block_storage.nb_blocks == await block_storage.get_nb_blocks() == 2
+        assert block_storage.total_size == await block_storage.get_total_size()
+
+        # Access times are flushed when the storage is closed
+        await block_storage.get_chunk(chunks[2].id)
+        assert chunks[2].id in block_storage._pending_accesses
+
+    async with WorkspaceStorage.run(alice, tmpdir, workspace_id, cache_size=3500) as aws:
+        # The stats are loaded from the database
+        block_storage = aws.block_storage
+        assert block_storage.nb_blocks == 2
+        assert block_storage.total_size == await block_storage.get_total_size()
+
+        # Block 3 is now the least recently used one
+        await aws.set_clean_block(chunks[1].access.id, data)
+        await aws.set_clean_block(chunks[4].access.id, data)
+        assert not await block_storage.is_chunk(chunks[3].id)
+        assert await block_storage.is_chunk(chunks[2].id)
+
+
 @pytest.mark.trio
 async def test_storage_file_tree(alice, tmpdir, workspace_id):
     path = Path(tmpdir)
@@ -80,6 +80,25 @@ async def test_do_reencryption(running_backend, workspace, alice, alice_user_fs)
         await job.do_one_batch()
 
 
+@pytest.mark.trio
+async def test_reencryption_chunks(
+    monkeypatch, running_backend, workspace, alice_user_fs, alice2_user_fs
+):
+    monkeypatch.setattr("parsec.core.fs.userfs.userfs.REENCRYPTION_CHUNK_SIZE", 1)
+    job = await alice_user_fs.workspace_start_reencryption(workspace)
+    total, done = await job.do_one_batch(size=3)
+    assert (total, done) == (4, 3)
+    total, done = await job.do_one_batch(size=3)
+    assert (total, done) == (4, 4)
+
+    # Vlobs have been correctly reencrypted
+    await alice2_user_fs.process_last_messages()
+    await alice2_user_fs.sync()
+    aw = alice2_user_fs.get_workspace(workspace)
+    assert aw.get_encryption_revision() == 2
+    assert await aw.read_bytes("/foo.txt") == b"v2"
+
+
 @pytest.mark.trio
 async def test_reencrypt_placeholder(running_backend, alice, alice_user_fs):
     wid = await alice_user_fs.workspace_create("w1")
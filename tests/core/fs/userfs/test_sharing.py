@@ -103,6 +103,23 @@ async def test_share_ok(running_backend, alice_user_fs, bob_user_fs, alice, bob,
     assert aw_stat == bw_stat
 
 
+@pytest.mark.trio
+async def test_process_messages_by_pages(
+    monkeypatch, running_backend, alice_user_fs, bob_user_fs, bob
+):
+    monkeypatch.setattr("parsec.core.fs.userfs.userfs.MESSAGE_GET_PAGE_SIZE", 2)
+    wids = []
+    for name in ("w1", "w2", "w3", "w4", "w5"):
+        wid = await alice_user_fs.workspace_create(name)
+        await alice_user_fs.workspace_share(wid, bob.user_id, WorkspaceRole.READER)
+        wids.append(wid)
+
+    await bob_user_fs.process_last_messages()
+    bum = bob_user_fs.get_user_manifest()
+    assert bum.last_processed_message == 5
+    assert sorted(w.name for w in bum.workspaces) == ["w1", "w2", "w3", "w4", "w5"]
+
+
 @pytest.mark.trio
 async def test_share_workspace_then_rename_it(
     running_backend, alice_user_fs, bob_user_fs, alice, bob
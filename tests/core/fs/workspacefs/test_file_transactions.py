@@ -161,6 +161,34 @@ async def test_flush_file(alice_file_transactions, foo_txt):
     )
 
 
+@pytest.mark.trio
+async def test_read_buffer(alice_file_transactions, foo_txt):
+    file_transactions = alice_file_transactions
+    fd = foo_txt.open()
+
+    # Two chunks: "hello " and "world !"
+    await file_transactions.fd_write(fd, b"hello ", 0)
+    await file_transactions.fd_write(fd, b"world !", -1)
+
+    # Read covered by a single chunk: the chunk data is referenced, not copied
+    buffer = await file_transactions.fd_read_buffer(fd, 3, 7)
+    assert isinstance(buffer, memoryview)
+    assert buffer.readonly
+    assert buffer == b"orl"
+    assert buffer.obj == b"world !"
+
+    # Read over several chunks: the data is gathered in a new buffer
+    buffer = await file_transactions.fd_read_buffer(fd, 6, 3)
+    assert not buffer.readonly
+    assert buffer == b"lo wor"
+
+    # Out of range
+    assert await file_transactions.fd_read_buffer(fd, 10, 20) == b""
+
+    # The bytes-oriented API is still available
+    assert await file_transactions.fd_read(fd, -1, 0) == b"hello world !"
+
+
 @pytest.mark.trio
 async def test_block_not_loaded_entry(alice_file_transactions, foo_txt):
     file_transactions = alice_file_transactions
@@ -211,6 +239,73 @@ async def test_load_block_from_remote(alice_file_transactions, foo_txt):
     assert data == chunk1_data + chunk2_data[:4]
 
 
+async def _prepare_remote_blocks(file_transactions, foo_txt, blocks_data, blocksize):
+    # Prepare the backend
+    workspace_id = file_transactions.remote_loader.workspace_id
+    await file_transactions.remote_loader.create_realm(workspace_id)
+
+    # One chunk per block
+    chunks = []
+    for i, data in enumerate(blocks_data):
+        chunks.append(Chunk.new(i * blocksize, i * blocksize + len(data)).evolve_as_block(data))
+    foo_manifest = await foo_txt.get_manifest()
+    foo_manifest = foo_manifest.evolve(
+        blocks=tuple((chunk,) for chunk in chunks),
+        blocksize=blocksize,
+        size=sum(len(data) for data in blocks_data),
+    )
+    await foo_txt.set_manifest(foo_manifest)
+
+    # Only keep the blocks in the backend
+    for chunk, data in zip(chunks, blocks_data):
+        await file_transactions.remote_loader.upload_block(chunk.access, data)
+        await file_transactions.local_storage.clear_clean_block(chunk.access.id)
+    return chunks
+
+
+@pytest.mark.trio
+async def test_load_blocks_concurrently(alice_file_transactions, foo_txt):
+    file_transactions = alice_file_transactions
+    local_storage = file_transactions.local_storage
+    blocks_data = [bytes([i]) * 8 for i in range(10)]
+    chunks = await _prepare_remote_blocks(file_transactions, foo_txt, blocks_data, blocksize=8)
+
+    await file_transactions.remote_loader.load_blocks([chunk.access for chunk in chunks])
+    for chunk, data in zip(chunks, blocks_data):
+        assert await local_storage.get_chunk(chunk.id) == data
+
+
+@pytest.mark.trio
+async def test_sequential_read_prefetch_blocks(alice_file_transactions, foo_txt):
+    file_transactions = alice_file_transactions
+    file_transactions.readahead_blocks = 2
+    local_storage = file_transactions.local_storage
+    blocks_data = [bytes([i]) * 8 for i in range(5)]
+    chunks = await _prepare_remote_blocks(file_transactions, foo_txt, blocks_data, blocksize=8)
+
+    fd = foo_txt.open()
+
+    # First read also downloads the two following blocks
+    data = await file_transactions.fd_read(fd, 8, 0)
+    assert data == blocks_data[0]
+    assert [await local_storage.is_chunk(chunk.id) for chunk in chunks] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+
+    # Random access doesn't trigger read-ahead
+    data = await file_transactions.fd_read(fd, 4, 36)
+    assert data == blocks_data[4][4:]
+    assert not await local_storage.is_chunk(chunks[3].id)
+
+    # The read position is forgotten when the file descriptor is closed
+    await file_transactions.fd_close(fd)
+    assert file_transactions._read_end == {}
+
+
 size = st.integers(min_value=0, max_value=4 * 1024 ** 2)  # Between 0 and 4MB
 
 
@@ -3,7 +3,9 @@
 from functools import partial
 import pytest
 
-from parsec.core.types import FsPath
+from parsec.core.core_events import CoreEvent
+from parsec.core.types import FsPath, DEFAULT_BLOCK_SIZE
+from parsec.core.fs.exceptions import FSError
 
 from tests.common import create_shared_workspace
 
@@ -92,3 +94,46 @@ async def test_sync_by_id_couple(alice_workspace, bob_workspace):
     expected = [FsPath("/a"), FsPath("/b")]
     assert await bob_workspace.listdir("/") == expected
     assert await alice_workspace.listdir("/") == expected
+
+
+@pytest.mark.trio
+async def test_sync_upload_blocks_concurrently(alice_workspace, bob_workspace):
+    blocksize = DEFAULT_BLOCK_SIZE
+    data = b"".join(bytes([i]) * blocksize for i in range(5)) + b"tail"
+    await alice_workspace.write_bytes("/f", data)
+    f_id = await alice_workspace.path_id("/f")
+
+    with alice_workspace.event_bus.listen() as spy:
+        await alice_workspace.sync()
+
+    uploaded = [event.kwargs for event in spy.events if event.event == CoreEvent.FS_BLOCK_UPLOADED]
+    assert len(uploaded) == 6
+    assert {kwargs["id"] for kwargs in uploaded} == {f_id}
+    assert sum(kwargs["size"] for kwargs in uploaded) == len(data)
+
+    await bob_workspace.sync()
+    assert await bob_workspace.read_bytes("/f") == data
+
+
+@pytest.mark.trio
+async def test_sync_upload_blocks_retry_one_by_one(alice_workspace, bob_workspace, monkeypatch):
+    remote_loader = alice_workspace.remote_loader
+    vanilla_upload_block = remote_loader.upload_block
+    failures = []
+
+    async def _flaky_upload_block(access, data):
+        # Each block fails on its first upload attempt
+        if access.id not in failures:
+            failures.append(access.id)
+            raise FSError("Flaky backend")
+        await vanilla_upload_block(access, data)
+
+    monkeypatch.setattr(remote_loader, "upload_block", _flaky_upload_block)
+
+    data = b"".join(bytes([i]) * DEFAULT_BLOCK_SIZE for i in range(3))
+    await alice_workspace.write_bytes("/f", data)
+    await alice_workspace.sync()
+    assert len(failures) == 3
+
+    await bob_workspace.sync()
+    assert await bob_workspace.read_bytes("/f") == data
@@ -1,6 +1,7 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
 import pytest
+from pendulum import now as pendulum_now
 
 from parsec.core.types import WorkspaceRole
 from parsec.core.fs import FSBackendOfflineError
@@ -41,3 +42,44 @@ async def test_while_offline_on_non_placeholder(running_backend, alice_user_fs):
     with running_backend.offline():
         with pytest.raises(FSBackendOfflineError):
             await workspace.get_user_roles()
+
+
+@pytest.mark.trio
+async def test_role_certificates_loaded_incrementally(
+    running_backend, alice_user_fs, monkeypatch, alice, bob, adam
+):
+    wid = await alice_user_fs.workspace_create("w")
+    await alice_user_fs.sync()
+    workspace = alice_user_fs.get_workspace(wid)
+    remote_loader = workspace.remote_loader
+    backend_cmds = remote_loader.backend_cmds
+    vanilla_realm_get_role_certificates = backend_cmds.realm_get_role_certificates
+    since_params = []
+
+    async def _spy_realm_get_role_certificates(realm_id, since=None):
+        since_params.append(since)
+        return await vanilla_realm_get_role_certificates(realm_id, since=since)
+
+    monkeypatch.setattr(
+        backend_cmds, "realm_get_role_certificates", _spy_realm_get_role_certificates
+    )
+
+    await alice_user_fs.workspace_share(wid, bob.user_id, WorkspaceRole.READER)
+    role = await remote_loader._get_user_realm_role_at(bob.user_id, pendulum_now())
+    assert role == WorkspaceRole.READER
+    assert since_params == [None]
+
+    # Only the certificates following the known ones are verified
+    await alice_user_fs.workspace_share(wid, adam.user_id, WorkspaceRole.CONTRIBUTOR)
+    await alice_user_fs.workspace_share(wid, bob.user_id, None)
+    assert await remote_loader._get_user_realm_role_at(adam.user_id, pendulum_now()) == (
+        WorkspaceRole.CONTRIBUTOR
+    )
+    assert await remote_loader._get_user_realm_role_at(bob.user_id, pendulum_now()) is None
+    assert len(since_params) == 3
+    assert since_params[1] is not None
+    assert len(remote_loader._realm_role_certificates_cache) == 4
+    assert remote_loader._realm_current_roles_cache == {
+        alice.user_id: WorkspaceRole.OWNER,
+        adam.user_id: WorkspaceRole.CONTRIBUTOR,
+    }
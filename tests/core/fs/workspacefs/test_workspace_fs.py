@@ -10,6 +10,8 @@ from parsec.core.types import FsPath, EntryID
 from parsec.core.fs.exceptions import FSError, FSBackendOfflineError
 from parsec.core.fs.workspacefs.workspacefs import ReencryptionNeed
 
+from tests.common import create_shared_workspace
+
 
 @pytest.mark.trio
 async def test_workspace_properties(alice_workspace):
@@ -411,6 +413,79 @@ async def test_path_info_remote_loader_exceptions(monkeypatch, alice_workspace,
     assert "Invalid author: expected `alice@dev1`, got `mallory@pc1`" in str(exc.value)
 
 
+@pytest.fixture
+async def bob_workspace_with_folder(running_backend, alice_user_fs, bob_user_fs, monkeypatch):
+    wid = await create_shared_workspace("w", alice_user_fs, bob_user_fs)
+    alice_w = alice_user_fs.get_workspace(wid)
+    await alice_w.mkdir("/foo")
+    for i in range(5):
+        await alice_w.touch(f"/foo/{i}.txt")
+    await alice_w.sync()
+
+    # Keep track of the vlobs read by bob
+    bob_w = bob_user_fs.get_workspace(wid)
+    bob_w.vlob_reads = []
+    bob_w.vlob_batch_reads = []
+    backend_vlob = running_backend.backend.vlob
+    vanilla_read = backend_vlob.read
+    vanilla_batch_read = backend_vlob.batch_read
+
+    async def _read(*args, **kwargs):
+        bob_w.vlob_reads.append(kwargs["vlob_id"])
+        return await vanilla_read(*args, **kwargs)
+
+    async def _batch_read(*args, **kwargs):
+        bob_w.vlob_batch_reads.append(kwargs["vlob_ids"])
+        return await vanilla_batch_read(*args, **kwargs)
+
+    monkeypatch.setattr(backend_vlob, "read", _read)
+    monkeypatch.setattr(backend_vlob, "batch_read", _batch_read)
+    return bob_w
+
+
+@pytest.mark.trio
+async def test_children_manifests_prefetch(bob_workspace_with_folder):
+    bob_w = bob_workspace_with_folder
+
+    # Getting info on a folder doesn't prefetch its children
+    assert (await bob_w.path_info("/foo"))["type"] == "folder"
+    assert not bob_w.vlob_batch_reads
+
+    # Workspace and folder manifests are fetched one by one, children in bulk
+    children = await bob_w.listdir("/foo")
+    assert sorted(str(child) for child in children) == [f"/foo/{i}.txt" for i in range(5)]
+    assert bob_w.vlob_reads == [bob_w.workspace_id, await bob_w.path_id("/foo")]
+    assert len(bob_w.vlob_batch_reads) == 1
+    assert len(bob_w.vlob_batch_reads[0]) == 5
+
+    # Children manifests are now available locally
+    for child in children:
+        assert (await bob_w.path_info(child))["type"] == "file"
+    assert len(bob_w.vlob_reads) == 2
+    assert len(bob_w.vlob_batch_reads) == 1
+
+    # Nothing left to prefetch
+    await bob_w.listdir("/foo")
+    assert len(bob_w.vlob_batch_reads) == 1
+
+
+@pytest.mark.trio
+async def test_children_manifests_prefetch_not_supported(bob_workspace_with_folder, monkeypatch):
+    bob_w = bob_workspace_with_folder
+
+    async def _unknown_command(*args, **kwargs):
+        return {"status": "unknown_command", "reason": "Unknown command"}
+
+    monkeypatch.setattr(bob_w.remote_loader.backend_cmds, "vlob_batch_read", _unknown_command)
+
+    # Children manifests are fetched one by one on access
+    children = await bob_w.listdir("/foo")
+    assert len(bob_w.vlob_reads) == 2
+    for child in children:
+        assert (await bob_w.path_info(child))["type"] == "file"
+    assert len(bob_w.vlob_reads) == 7
+
+
 @pytest.mark.trio
 async def test_get_reencryption_need(alice_workspace, running_backend, monkeypatch):
     expected = ReencryptionNeed(user_revoked=(), role_revoked=())
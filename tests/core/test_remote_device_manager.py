@@ -3,7 +3,11 @@
 import pytest
 from pendulum import datetime
 
-from parsec.core.remote_devices_manager import RemoteDevicesManagerBackendOfflineError
+from parsec.core.fs.storage import CertificateStorage
+from parsec.core.remote_devices_manager import (
+    RemoteDevicesManager,
+    RemoteDevicesManagerBackendOfflineError,
+)
 
 from tests.common import freeze_time
 
@@ -103,3 +107,73 @@ async def test_retrieve_user_and_devices(
         with pytest.raises(RemoteDevicesManagerBackendOfflineError):
             with running_backend.offline():
                 await remote_devices_manager.get_user_and_devices(alice.user_id)
+
+
+@pytest.mark.trio
+async def test_known_trustchain_not_retrieved_again(
+    running_backend, alice_remote_devices_manager, monkeypatch, adam, bob
+):
+    remote_devices_manager = alice_remote_devices_manager
+    backend_cmds = remote_devices_manager._backend_cmds
+    vanilla_user_get = backend_cmds.user_get
+    reps = []
+
+    async def _spy_user_get(user_id, known_trustchain=None):
+        rep = await vanilla_user_get(user_id, known_trustchain=known_trustchain)
+        reps.append(rep)
+        return rep
+
+    monkeypatch.setattr(backend_cmds, "user_get", _spy_user_get)
+
+    # <root> --> alice@dev1 --> alice@dev2 --> adam@dev1 --> bob@dev1
+    await remote_devices_manager.get_user(adam.user_id)
+    assert len(reps[0]["trustchain"]["devices"]) == 2
+
+    # Adam's trustchain is in cache, so bob's one is mostly omitted by the backend
+    user, revoked_user = await remote_devices_manager.get_user(bob.user_id)
+    assert user.user_id == bob.user_id
+    assert revoked_user is None
+    assert reps[1]["trustchain"] == {"devices": [], "users": [], "revoked_users": []}
+
+
+@pytest.mark.trio
+async def test_certificate_storage(
+    running_backend, alice_remote_devices_manager, tmpdir, alice, bob
+):
+    backend_cmds = alice_remote_devices_manager._backend_cmds
+    d1 = datetime(2000, 1, 1)
+    with freeze_time(d1):
+        async with CertificateStorage.run(tmpdir) as certificate_storage:
+            rdm = RemoteDevicesManager(
+                backend_cmds, alice.root_verify_key, certificate_storage=certificate_storage
+            )
+            await rdm.get_device(bob.device_id)
+
+    # Certificates are kept across restarts
+    d2 = d1.add(seconds=rdm.cache_validity - 1)
+    with freeze_time(d2):
+        async with CertificateStorage.run(tmpdir) as certificate_storage:
+            rdm = RemoteDevicesManager(
+                backend_cmds, alice.root_verify_key, certificate_storage=certificate_storage
+            )
+            with running_backend.offline():
+                device = await rdm.get_device(bob.device_id)
+                assert device.verify_key == bob.verify_key
+                user, revoked_user = await rdm.get_user(bob.user_id)
+                assert user.public_key == bob.public_key
+                assert revoked_user is None
+
+    # Device certificates never change, but revocation status must be refreshed
+    d3 = d1.add(seconds=rdm.cache_validity + 1)
+    with freeze_time(d3):
+        async with CertificateStorage.run(tmpdir) as certificate_storage:
+            rdm = RemoteDevicesManager(
+                backend_cmds, alice.root_verify_key, certificate_storage=certificate_storage
+            )
+            with running_backend.offline():
+                device = await rdm.get_device(bob.device_id)
+                assert device.verify_key == bob.verify_key
+                with pytest.raises(RemoteDevicesManagerBackendOfflineError):
+                    await rdm.get_user(bob.user_id)
+            user, revoked_user = await rdm.get_user(bob.user_id)
+            assert user.public_key == bob.public_key
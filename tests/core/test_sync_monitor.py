@@ -1,6 +1,7 @@
 # Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
 
 import re
+import math
 import trio
 import pytest
 from unittest.mock import ANY
@@ -8,12 +9,197 @@ from unittest.mock import ANY
 from parsec.core.backend_connection import BackendConnStatus
 from parsec.backend.backend_events import BackendEvent
 from parsec.core.core_events import CoreEvent
-from parsec.core.types import WorkspaceRole
-from parsec.core.fs.exceptions import FSReadOnlyError
+from parsec.core.types import EntryID, WorkspaceRole
+from parsec.core.fs.exceptions import FSError, FSReadOnlyError
+from parsec.core.sync_monitor import SyncContext, MIN_WAIT, batch_poll_changes
 
 from tests.common import create_shared_workspace
 
 
+class InMemorySyncContext(SyncContext):
+    def __init__(self, **kwargs):
+        super().__init__(user_fs=None, id=EntryID(), **kwargs)
+        # Changes are provided by the test
+        self._changes_loaded = True
+        self.synced = []
+        self.vacuumed = 0
+        self.running = 0
+        self.max_running = 0
+
+    async def _sync(self, entry_id):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await trio.sleep(1)
+        self.running -= 1
+        self.synced.append(entry_id)
+
+    def _get_local_storage(self):
+        return self
+
+    async def run_vacuum(self):
+        self.vacuumed += 1
+
+
+@pytest.mark.trio
+async def test_sync_context_local_changes_scheduling(autojump_clock):
+    ctx = InMemorySyncContext(max_concurrent_syncs=3)
+    entry_ids = [EntryID() for _ in range(10)]
+    for entry_id in entry_ids:
+        ctx.set_local_change(entry_id)
+    now = trio.current_time()
+    assert ctx.due_time == now + MIN_WAIT
+
+    # Nothing to do yet
+    await trio.sleep(MIN_WAIT / 2)
+    assert await ctx.tick() == now + MIN_WAIT
+    assert ctx.synced == []
+
+    # Keep modifying the first entry, which delays its synchronization
+    ctx.set_local_change(entry_ids[0])
+    bumped_due_time = trio.current_time() + MIN_WAIT
+
+    # Due entries are synchronized concurrently, by batches
+    await trio.sleep_until(ctx.due_time)
+    assert await ctx.tick() == now + MIN_WAIT  # Other entries are still due
+    assert len(ctx.synced) == 3
+    assert ctx.max_running == 3
+    assert entry_ids[0] not in ctx.synced
+
+    while ctx.due_time < bumped_due_time:
+        await ctx.tick()
+    assert sorted(ctx.synced) == sorted(entry_ids[1:])
+    assert ctx.vacuumed == 0
+
+    # Last entry gets synchronized once its due time is reached
+    assert ctx.due_time == bumped_due_time
+    await trio.sleep_until(ctx.due_time)
+    assert await ctx.tick() == math.inf
+    assert ctx.synced[-1] == entry_ids[0]
+    assert ctx.vacuumed == 1
+    assert ctx.max_running == 3
+
+
+@pytest.mark.trio
+async def test_sync_context_local_changes_outdated_items(autojump_clock):
+    ctx = InMemorySyncContext()
+    entry_ids = [EntryID() for _ in range(10)]
+    for _ in range(100):
+        for entry_id in entry_ids:
+            ctx.set_local_change(entry_id)
+        await trio.sleep(0.1)
+
+    # Outdated items are not kept forever
+    assert len(ctx._local_changes_heap) <= 2 * len(entry_ids) + 64
+
+    while ctx.due_time != math.inf:
+        await trio.sleep_until(ctx.due_time)
+        await ctx.tick()
+    assert sorted(ctx.synced) == sorted(entry_ids)
+    assert not ctx._local_changes_heap
+
+
+class PagedChangesSyncContext(InMemorySyncContext):
+    def __init__(self, remote_changes):
+        super().__init__()
+        self._changes_loaded = False
+        self.remote_changes = remote_changes
+        self.checkpoint = 0
+        self.changes = {}
+        self.polls = []
+
+    def _get_backend_cmds(self):
+        return self
+
+    async def vlob_poll_changes(self, realm_id, last_checkpoint, page_size):
+        self.polls.append(last_checkpoint)
+        page = self.remote_changes[last_checkpoint : last_checkpoint + page_size]
+        return {
+            "status": "ok",
+            "current_checkpoint": last_checkpoint + len(page),
+            "changes": dict(page),
+        }
+
+    async def get_realm_checkpoint(self):
+        return self.checkpoint
+
+    async def update_realm_checkpoint(self, new_checkpoint, changes):
+        self.checkpoint = new_checkpoint
+        self.changes.update(changes)
+
+    async def get_need_sync_entries(self):
+        return set(), set(self.changes)
+
+
+@pytest.mark.trio
+async def test_sync_context_load_changes_by_pages(monkeypatch):
+    monkeypatch.setattr("parsec.core.sync_monitor.VLOB_POLL_CHANGES_PAGE_SIZE", 2)
+    remote_changes = [(EntryID(), 1) for _ in range(5)]
+    ctx = PagedChangesSyncContext(remote_changes)
+    assert await ctx._load_changes()
+    assert ctx.polls == [0, 2, 4]
+    assert ctx.checkpoint == 5
+    assert ctx._remote_changes == {entry_id for entry_id, _ in remote_changes}
+
+
+@pytest.mark.trio
+async def test_sync_context_bootstrap_from_batch_poll_changes(monkeypatch):
+    monkeypatch.setattr("parsec.core.sync_monitor.VLOB_BATCH_POLL_CHANGES_PAGE_SIZE", 2)
+    monkeypatch.setattr("parsec.core.sync_monitor.VLOB_POLL_CHANGES_PAGE_SIZE", 3)
+    ctxs = [PagedChangesSyncContext([(EntryID(), 1) for _ in range(count)]) for count in (1, 4)]
+    batch_polls = []
+
+    class BackendCmds:
+        async def vlob_batch_poll_changes(self, realms, page_size):
+            batch_polls.append(realms)
+            return {
+                "status": "ok",
+                "realms": {
+                    ctx.id: await ctx.vlob_poll_changes(ctx.id, realms[ctx.id], page_size)
+                    for ctx in ctxs
+                },
+            }
+
+    first_pages = await batch_poll_changes(BackendCmds(), ctxs)
+    assert batch_polls == [{ctx.id: 0 for ctx in ctxs}]
+    for ctx in ctxs:
+        ctx.polls.clear()
+        await ctx.bootstrap(first_pages[ctx.id])
+        assert ctx._remote_changes == {entry_id for entry_id, _ in ctx.remote_changes}
+    # Only the realm with more changes than the batch page size is polled again
+    assert [ctx.polls for ctx in ctxs] == [[], [2]]
+
+    # Backend is too old for batch polling
+    class OldBackendCmds:
+        async def vlob_batch_poll_changes(self, realms, page_size):
+            return {"status": "unknown_command"}
+
+    assert await batch_poll_changes(OldBackendCmds(), ctxs) == {}
+
+
+@pytest.mark.trio
+async def test_batch_poll_changes_with_broken_local_storage():
+    ctxs = [PagedChangesSyncContext([(EntryID(), 1)]) for _ in range(2)]
+
+    async def _get_realm_checkpoint():
+        raise FSError("Local storage is broken")
+
+    ctxs[0].get_realm_checkpoint = _get_realm_checkpoint
+
+    class BackendCmds:
+        async def vlob_batch_poll_changes(self, realms, page_size):
+            return {
+                "status": "ok",
+                "realms": {
+                    realm_id: {"status": "ok", "current_checkpoint": 1, "changes": {}}
+                    for realm_id in realms
+                },
+            }
+
+    # The failing realm is left to its sync context
+    first_pages = await batch_poll_changes(BackendCmds(), ctxs)
+    assert first_pages.keys() == {ctxs[1].id}
+
+
 @pytest.mark.trio
 async def test_monitors_idle(autojump_clock, running_backend, alice_core, alice):
     assert alice_core.are_monitors_idle()
@@ -73,6 +73,7 @@ async def asyncio_reset_postgresql_testbed():
         """
 TRUNCATE TABLE
     organization,
+    organization_stats,
 
     user_,
     device,
@@ -80,12 +81,15 @@ TRUNCATE TABLE
     device_invitation,
 
     message,
+    message_counter,
 
     realm,
     realm_user_role,
     vlob_encryption_revision,
     vlob_atom,
     realm_vlob_update,
+    realm_vlob_checkpoint,
+    realm_stats,
 
     block,
     block_data
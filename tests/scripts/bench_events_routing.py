@@ -0,0 +1,113 @@
+#! /usr/bin/env python3
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+"""
+Microbenchmark of the backend events dispatching to the subscribed clients.
+
+The `routed` column uses `EventsRouter`, the `per client` column connects one
+filtering callback per client on the event bus (i.e. the previous behavior).
+"""
+
+import math
+import random
+import argparse
+from uuid import uuid4
+from timeit import timeit
+from functools import partial
+
+import structlog
+
+from parsec.logging import configure_logging
+from parsec.event_bus import EventBus
+from parsec.api.protocol import OrganizationID, DeviceID, APIEvent
+from parsec.backend.backend_events import BackendEvent
+from parsec.backend.events import EventsQueue, EventsRouter
+
+
+NB_CLIENTS = (1000, 10000, 50000)
+CLIENTS_PER_ORGANIZATION = 100
+REALMS_PER_ORGANIZATION = 20
+REALMS_PER_CLIENT = 3
+
+
+class FakeClientContext:
+    def __init__(self, organization_id, device_id, realms):
+        self.organization_id = organization_id
+        self.device_id = device_id
+        self.user_id = device_id.user_id
+        self.realms = set(realms)
+        self.events_queue = EventsQueue(max_size=math.inf)
+        self.logger = structlog.get_logger()
+
+
+def generate_clients(nb_clients):
+    clients = []
+    organizations = []
+    for org_index in range(math.ceil(nb_clients / CLIENTS_PER_ORGANIZATION)):
+        organization_id = OrganizationID(f"Org{org_index}")
+        realms = [uuid4() for _ in range(REALMS_PER_ORGANIZATION)]
+        organizations.append((organization_id, realms))
+        for client_index in range(CLIENTS_PER_ORGANIZATION):
+            device_id = DeviceID(f"user{client_index}@dev1")
+            clients.append(
+                FakeClientContext(
+                    organization_id, device_id, random.sample(realms, REALMS_PER_CLIENT)
+                )
+            )
+    return clients[:nb_clients], organizations
+
+
+def connect_per_client(event_bus, client_ctx):
+    def _on_realm_events(event, backend_event, organization_id, author, realm_id, **kwargs):
+        if (
+            organization_id != client_ctx.organization_id
+            or author == client_ctx.device_id
+            or realm_id not in client_ctx.realms
+        ):
+            return
+        client_ctx.events_queue.send_nowait({"event": event, "realm_id": realm_id, **kwargs})
+
+    event_bus.connect(
+        BackendEvent.REALM_VLOBS_UPDATED, partial(_on_realm_events, APIEvent.REALM_VLOBS_UPDATED)
+    )
+
+
+def bench(nb_clients, number):
+    clients, organizations = generate_clients(nb_clients)
+    routed_event_bus = EventBus()
+    router = EventsRouter(routed_event_bus)
+    per_client_event_bus = EventBus()
+    for client_ctx in clients:
+        router.subscribe(client_ctx)
+        connect_per_client(per_client_event_bus, client_ctx)
+
+    def _dispatch(event_bus):
+        organization_id, realms = random.choice(organizations)
+        event_bus.send(
+            BackendEvent.REALM_VLOBS_UPDATED,
+            organization_id=organization_id,
+            author=DeviceID("user0@dev1"),
+            realm_id=random.choice(realms),
+            checkpoint=1,
+            src_id=uuid4(),
+            src_version=1,
+        )
+
+    return [
+        timeit(partial(_dispatch, event_bus), number=number) / number
+        for event_bus in (routed_event_bus, per_client_event_bus)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200, help="Events dispatched per measure")
+    args = parser.parse_args()
+
+    # Event bus logs each event sent, keep the benchmark focused on the dispatching
+    configure_logging(log_level="WARNING")
+
+    print(f"{'clients':>8} {'routed':>10} {'per client':>10}")
+    for nb_clients in NB_CLIENTS:
+        timings = bench(nb_clients, args.number)
+        print(f"{nb_clients:>8} " + " ".join(f"{t * 1000:>8.3f}ms" for t in timings))
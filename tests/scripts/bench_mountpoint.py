@@ -101,6 +101,10 @@ def main():
                 # Copy it into the workspace
                 print("********** starting bench ***********")
                 run(f"time pv {file} > {mountdir}/w1/sample", shell=True)
+                # Read it back, with the typical FUSE read size and a full block size
+                for block_size in ("128K", "512K"):
+                    print(f"********** reading with {block_size} blocks ***********")
+                    run(f"time dd if={mountdir}/w1/sample of=/dev/null bs={block_size}", shell=True)
                 print("********** bench done ***********")
             finally:
                 file.unlink()
@@ -0,0 +1,127 @@
+#! /usr/bin/env python3
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+"""
+Benchmark the realm checkpoint allocation under concurrent vlob writes.
+
+The `max+1` strategy computes the next index from `realm_vlob_update` and
+retries on unique violation (i.e. the previous behavior), the `counter`
+strategy increments a per-realm `realm_vlob_checkpoint` row.
+
+Dedicated `bench_*` tables are created (and dropped) in the target database.
+"""
+
+import trio
+import triopg
+import argparse
+from time import monotonic
+from triopg import UniqueViolationError
+
+from parsec.utils import trio_run
+
+
+REALM = 1
+
+SETUP_SQL = """
+DROP TABLE IF EXISTS bench_realm_vlob_update, bench_realm_vlob_checkpoint;
+CREATE TABLE bench_realm_vlob_update (
+    _id SERIAL PRIMARY KEY,
+    realm INTEGER NOT NULL,
+    index INTEGER NOT NULL,
+    UNIQUE(realm, index)
+);
+CREATE TABLE bench_realm_vlob_checkpoint (
+    realm INTEGER PRIMARY KEY,
+    checkpoint INTEGER NOT NULL
+);
+"""
+
+TEARDOWN_SQL = "DROP TABLE bench_realm_vlob_update, bench_realm_vlob_checkpoint;"
+
+
+async def write_max_plus_one(conn):
+    await conn.execute(
+        """
+INSERT INTO bench_realm_vlob_update (realm, index)
+SELECT $1, COALESCE(MAX(index) + 1, 1) FROM bench_realm_vlob_update WHERE realm = $1
+""",
+        REALM,
+    )
+
+
+async def write_counter(conn):
+    index = await conn.fetchval(
+        """
+INSERT INTO bench_realm_vlob_checkpoint (realm, checkpoint)
+VALUES ($1, 1)
+ON CONFLICT (realm) DO UPDATE SET checkpoint = bench_realm_vlob_checkpoint.checkpoint + 1
+RETURNING checkpoint
+""",
+        REALM,
+    )
+    await conn.execute(
+        "INSERT INTO bench_realm_vlob_update (realm, index) VALUES ($1, $2)", REALM, index
+    )
+
+
+STRATEGIES = {"max+1": write_max_plus_one, "counter": write_counter}
+
+
+async def bench(pool, strategy, writes, concurrency):
+    write = STRATEGIES[strategy]
+    retries = 0
+    remaining = writes
+
+    async def _writer():
+        nonlocal retries, remaining
+        while remaining > 0:
+            remaining -= 1
+            # Same retry policy than `retry_on_unique_violation`
+            while True:
+                try:
+                    async with pool.acquire() as conn:
+                        async with conn.transaction():
+                            await write(conn)
+                    break
+                except UniqueViolationError:
+                    retries += 1
+
+    async with pool.acquire() as conn:
+        await conn.execute("TRUNCATE bench_realm_vlob_update, bench_realm_vlob_checkpoint")
+
+    start = monotonic()
+    async with trio.open_nursery() as nursery:
+        for _ in range(concurrency):
+            nursery.start_soon(_writer)
+    duration = monotonic() - start
+
+    async with pool.acquire() as conn:
+        last_index = await conn.fetchval("SELECT MAX(index) FROM bench_realm_vlob_update")
+    assert last_index == writes, last_index
+    print(
+        f"{strategy:>7}: {writes} writes in {duration:.2f}s "
+        f"({writes / duration:.1f} writes/s, {retries} retries)"
+    )
+
+
+async def main(url, writes, concurrency):
+    async with triopg.create_pool(url, min_size=concurrency, max_size=concurrency) as pool:
+        async with pool.acquire() as conn:
+            await conn.execute(SETUP_SQL)
+        try:
+            for strategy in STRATEGIES:
+                await bench(pool, strategy, writes, concurrency)
+        finally:
+            async with pool.acquire() as conn:
+                await conn.execute(TEARDOWN_SQL)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("url", help="PostgreSQL URL (e.g. postgresql://user@localhost/parsec)")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+    for concurrency in args.concurrency:
+        print(f"===> concurrency={concurrency}")
+        trio_run(main, args.url, args.writes, concurrency, use_asyncio=True)
@@ -0,0 +1,57 @@
+#! /usr/bin/env python3
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+"""
+Microbenchmark of the RAID5 blockstore parity encoding and decoding.
+"""
+
+import os
+import argparse
+from timeit import timeit
+
+from parsec.backend.raid5_blockstore import (
+    split_block_in_chunks,
+    generate_checksum_chunk,
+    rebuild_block_from_chunks,
+)
+
+
+BLOCK_SIZES = (512 * 1024, 4 * 1024 * 1024)
+NB_NODES = range(3, 9)
+
+
+def bench(block_size, nb_nodes, number):
+    block = os.urandom(block_size)
+    nb_chunks = nb_nodes - 1
+
+    def _write():
+        chunks = split_block_in_chunks(block, nb_chunks)
+        generate_checksum_chunk(chunks)
+
+    chunks = split_block_in_chunks(block, nb_chunks)
+    checksum = generate_checksum_chunk(chunks)
+    degraded_chunks = [None, *chunks[1:]]
+
+    def _read():
+        rebuild_block_from_chunks(chunks, None)
+
+    def _degraded_read():
+        rebuild_block_from_chunks(list(degraded_chunks), checksum)
+
+    assert rebuild_block_from_chunks(list(degraded_chunks), checksum) == block
+    return [timeit(fn, number=number) / number for fn in (_write, _read, _degraded_read)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=50, help="Runs per measure")
+    args = parser.parse_args()
+
+    print(f"{'block size':>10} {'nodes':>5} {'write':>10} {'read':>10} {'degraded':>10}")
+    for block_size in BLOCK_SIZES:
+        for nb_nodes in NB_NODES:
+            timings = bench(block_size, nb_nodes, args.number)
+            print(
+                f"{block_size // 1024:>8}KB {nb_nodes:>5} "
+                + " ".join(f"{t * 1000:>8.3f}ms" for t in timings)
+            )
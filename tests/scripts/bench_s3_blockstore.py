@@ -0,0 +1,118 @@
+#! /usr/bin/env python3
+# Parsec Cloud (https://parsec.cloud) Copyright (c) AGPLv3 2019 Scille SAS
+
+"""
+Benchmark the S3 blockstore against a local S3 stand-in.
+
+By default a moto server is started (`pip install moto[server]`), use
+`--endpoint-url` to target another S3-compatible server (e.g. minio) instead.
+"""
+
+import trio
+import boto3
+import argparse
+from uuid import uuid4
+from time import monotonic, sleep
+from subprocess import Popen, DEVNULL
+from contextlib import contextmanager
+
+from parsec.backend.s3_blockstore import S3BlockStoreComponent, DEFAULT_S3_MAX_WORKERS
+
+
+REGION = "us-east-1"
+BUCKET = "parsec-bench"
+KEY = "bench"
+SECRET = "bench"
+ORGNAME = "Org42"
+
+
+@contextmanager
+def moto_server(port):
+    cmd = f"moto_server s3 -p {port}"
+    print(f"===> {cmd}")
+    process = Popen(cmd.split(), stdout=DEVNULL, stderr=DEVNULL)
+    try:
+        sleep(1)
+        if process.poll() is not None:
+            raise RuntimeError(f"Error during command `{cmd}`")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def create_bucket(endpoint_url):
+    s3 = boto3.client(
+        "s3",
+        region_name=REGION,
+        aws_access_key_id=KEY,
+        aws_secret_access_key=SECRET,
+        endpoint_url=endpoint_url,
+    )
+    try:
+        s3.create_bucket(Bucket=BUCKET)
+    except s3.exceptions.BucketAlreadyOwnedByYou:
+        pass
+
+
+async def bench(blockstore, operation, ids, block, concurrency):
+    send_channel, receive_channel = trio.open_memory_channel(len(ids))
+    for id in ids:
+        send_channel.send_nowait(id)
+    send_channel.close()
+
+    async def _worker():
+        async for id in receive_channel:
+            if operation == "create":
+                await blockstore.create(ORGNAME, id, block)
+            else:
+                await blockstore.read(ORGNAME, id)
+
+    start = monotonic()
+    async with trio.open_nursery() as nursery:
+        for _ in range(concurrency):
+            nursery.start_soon(_worker)
+    duration = monotonic() - start
+    size = len(ids) * len(block) / 1024 / 1024
+    print(
+        f"{operation:>6}: {len(ids)} blocks in {duration:.2f}s "
+        f"({len(ids) / duration:.1f} blocks/s, {size / duration:.1f} MB/s)"
+    )
+
+
+async def main(endpoint_url, blocks, block_size, concurrency, max_workers):
+    blockstore = S3BlockStoreComponent(
+        REGION, BUCKET, KEY, SECRET, endpoint_url, max_workers=max_workers
+    )
+    ids = [uuid4() for _ in range(blocks)]
+    block = b"x" * block_size
+    await bench(blockstore, "create", ids, block, concurrency)
+    await bench(blockstore, "read", ids, block, concurrency)
+    for operation, stats in blockstore.get_stats().items():
+        print(
+            f"{operation:>6}: count={stats['count']} errors={stats['errors']} "
+            f"mean={stats['mean_time'] * 1000:.1f}ms max={stats['max_time'] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--endpoint-url", help="Use an already running S3 server")
+    parser.add_argument("--port", type=int, default=5000, help="Port for the moto server")
+    parser.add_argument("--blocks", type=int, default=500)
+    parser.add_argument("--block-size", type=int, default=512 * 1024)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_S3_MAX_WORKERS)
+    args = parser.parse_args()
+
+    def _run(endpoint_url):
+        create_bucket(endpoint_url)
+        trio.run(
+            main, endpoint_url, args.blocks, args.block_size, args.concurrency, args.max_workers
+        )
+
+    if args.endpoint_url:
+        _run(args.endpoint_url)
+    else:
+        with moto_server(args.port) as endpoint_url:
+            _run(endpoint_url)
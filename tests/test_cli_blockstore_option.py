@@ -10,6 +10,8 @@ from parsec.backend.config import (
     S3BlockStoreConfig,
     SWIFTBlockStoreConfig,
     RAID0BlockStoreConfig,
+    RAID1BlockStoreConfig,
+    CachedBlockStoreConfig,
 )
 
 
@@ -113,6 +115,41 @@ def test_parse_simple_raid():
     )
 
 
+def test_parse_cached():
+    config = _parse_blockstore_params(["cached:lfu:64M", "POSTGRESQL"])
+    assert config == CachedBlockStoreConfig(
+        blockstore=PostgreSQLBlockStoreConfig(), memory_size=64 * 1024 ** 2, eviction_policy="LFU"
+    )
+
+    config = _parse_blockstore_params(
+        ["raid1:0:MOCKED", "CACHED:LRU:1024:/tmp/cache:2G", "raid1:1:POSTGRESQL"]
+    )
+    assert config == CachedBlockStoreConfig(
+        blockstore=RAID1BlockStoreConfig(
+            blockstores=[MockedBlockStoreConfig(), PostgreSQLBlockStoreConfig()]
+        ),
+        memory_size=1024,
+        eviction_policy="LRU",
+        disk_path="/tmp/cache",
+        disk_size=2 * 1024 ** 3,
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        ["cached:LRU:1M"],  # Nothing to cache
+        ["cached:LRU:1M", "cached:LRU:1M", "MOCKED"],  # Multiple caches
+        ["cached:foo:1M", "MOCKED"],  # Unknown eviction policy
+        ["cached:LRU:1T", "MOCKED"],  # Invalid size
+        ["cached:LRU:1M:/tmp/cache", "MOCKED"],  # Missing disk size
+    ],
+)
+def test_bad_cached_params(params):
+    with pytest.raises(BadParameter):
+        _parse_blockstore_params(params)
+
+
 @pytest.mark.parametrize(
     "param",
     [